@@ -3,6 +3,83 @@ __license__  = "This source code is licensed under the BSD-style license found i
 
 import yaml
 import re
+import numpy as np
+
+# the sequences of at least kBulkSequenceMinLength plain scalars (e.g. the values of the Aux data)
+# are not composed node by node: their strings are kept as they are parsed, converted at once
+# by GetIntArray/GetFloatArray
+kBulkSequenceMinLength = 64
+
+# resolves the tags of the scalar nodes of a CBulkSequenceNode, as the loaders do
+gBulkResolver = yaml.resolver.Resolver()
+
+class CBulkSequenceNode(yaml.nodes.SequenceNode):
+    """ A sequence of plain scalars kept as their strings, its scalar nodes are only made if value is used """
+    def __init__(self, inTag, inStrings, inStartMark=None, inEndMark=None, inFlowStyle=None):
+        super().__init__(inTag, [], inStartMark, inEndMark, inFlowStyle)
+        self.mStrings = inStrings
+        self.mNodes = None
+
+    @property
+    def value(self):
+        if self.mNodes is None:
+            self.mNodes = [yaml.nodes.ScalarNode(gBulkResolver.resolve(yaml.nodes.ScalarNode, theString, (True, False)), theString, self.start_mark, self.end_mark)
+                           for theString in self.mStrings]
+        return self.mNodes
+
+    @value.setter
+    def value(self, inValue):
+        self.mNodes = inValue if len(inValue) > 0 else None
+
+    def GetStrings(self):
+        return self.mStrings
+
+class CBulkComposer(yaml.composer.Composer):
+    """ The composer of the loaders, keeping the sequences of plain scalars as their strings """
+
+    def compose_sequence_node(self, inAnchor):
+        theStartEvent = self.get_event()
+        theTag = theStartEvent.tag
+        if theTag is None or theTag == "!":
+            theTag = self.resolve(yaml.nodes.SequenceNode, None, theStartEvent.implicit)
+        # the plain scalars (style None, '' in libyaml) without tag nor anchor are gathered from the
+        # events, the others are composed
+        theStrings = []
+        while True:
+            theEvent = self.peek_event()
+            if type(theEvent) is not yaml.events.ScalarEvent or theEvent.style or theEvent.tag is not None or theEvent.anchor is not None:
+                break
+            theStrings.append(self.get_event().value)
+        if type(theEvent) is yaml.events.SequenceEndEvent and len(theStrings) >= kBulkSequenceMinLength:
+            ouNode = CBulkSequenceNode(theTag, theStrings, theStartEvent.start_mark, None, theStartEvent.flow_style)
+            if inAnchor is not None:
+                self.anchors[inAnchor] = ouNode
+            ouNode.end_mark = self.get_event().end_mark
+            return ouNode
+        ouNode = yaml.nodes.SequenceNode(theTag, [], theStartEvent.start_mark, None, flow_style=theStartEvent.flow_style)
+        if inAnchor is not None:
+            self.anchors[inAnchor] = ouNode
+        # the scalars gathered, with the marks of the sequence
+        for theString in theStrings:
+            ouNode.value.append(yaml.nodes.ScalarNode(self.resolve(yaml.nodes.ScalarNode, theString, (True, False)), theString, theStartEvent.start_mark, theStartEvent.end_mark))
+        while not self.check_event(yaml.events.SequenceEndEvent):
+            ouNode.value.append(self.compose_node(ouNode, len(ouNode.value)))
+        ouNode.end_mark = self.get_event().end_mark
+        return ouNode
+
+if getattr(yaml, "__with_libyaml__", False):
+    class CBulkLoader(CBulkComposer, yaml.CSafeLoader):
+        """ the safe loader of libyaml (C parser), with the composer of CBulkComposer """
+        def __init__(self, inStream):
+            yaml.CSafeLoader.__init__(self, inStream)
+            CBulkComposer.__init__(self)
+else:
+    class CBulkLoader(CBulkComposer, yaml.SafeLoader):
+        """ the safe loader (pure Python), with the composer of CBulkComposer """
+
+def ComposeYaml(inStream):
+    """ yaml.compose, with the libyaml parser when available and the long sequences of plain scalars kept as strings """
+    return yaml.compose(inStream, Loader=CBulkLoader)
 
 class BaseDecoder(object):
     def __init__(self):
@@ -11,6 +88,8 @@ class BaseDecoder(object):
 
 
     def RestoreSpecialCharacters(self, inString):
+        if "_" not in inString:
+            return inString
         ouString = inString
         ouString = re.sub("_#9;", "\t",ouString)
         ouString = re.sub("_#10;", "\n",ouString)
@@ -48,46 +127,32 @@ class BaseDecoder(object):
         return -1,-1
 
     def GetStringArray(self, inNode, inLogName, inFirstIsSize, inRestoreSpecialValues):
-        theArray = []
         if not isinstance(inNode,yaml.nodes.SequenceNode):
+            return []
+        if isinstance(inNode,CBulkSequenceNode):
+            theArray = inNode.GetStrings()
+        else:
+            theArray = [theListNode.value for theListNode in inNode.value]
+        if len(theArray) < 1:
             return theArray
-        theList = inNode.value
-        if len(theList) < 1:
-            return theArray
-        #theOff = 1 if inFirstIsSize else 0
-        for theListNode in range(len(theList)):
-            theAttrValue = theList[theListNode].value
-            if theListNode == 0 and inFirstIsSize:
-                if not int(theAttrValue) == len(theList)-1:
-                    print("Error: List Size mismatch")
-                continue
-            if inRestoreSpecialValues:
-                theAttrValue = self.RestoreSpecialCharacters(theAttrValue)
-            theArray.append(theAttrValue)
+        if inFirstIsSize:
+            if not int(theArray[0]) == len(theArray)-1:
+                print("Error: List Size mismatch")
+            theArray = theArray[1:]
+        if inRestoreSpecialValues:
+            theArray = [self.RestoreSpecialCharacters(theAttrValue) for theAttrValue in theArray]
 
         return theArray
-        
-    def GetIntArray(self, inNode, inLogName, inFirstIsSize):
 
-        theIntArray = []
+    def GetIntArray(self, inNode, inLogName, inFirstIsSize):
+        """ the values of a sequence as an int64 numpy array, converted at once """
         theStringArray = self.GetStringArray(inNode,inLogName,inFirstIsSize,False)
-        if len(theStringArray) == 0:
-            return theIntArray
-        for theString in theStringArray:
-            theIntArray.append(int(theString))
-
-        return theIntArray
+        return np.array(theStringArray,dtype=np.int64)
 
     def GetFloatArray(self, inNode, inLogName, inFirstIsSize):
-
-        theFloatArray = []
+        """ the values of a sequence as a float64 numpy array, converted at once """
         theStringArray = self.GetStringArray(inNode,inLogName,inFirstIsSize,False)
-        if len(theStringArray) == 0:
-            return theFloatArray
-        for theString in theStringArray:
-            theFloatArray.append(float(theString))
-
-        return theFloatArray
+        return np.array(theStringArray,dtype=np.float64)
 
     def DecodeUnknownString(self, inUnknownString, inAttrKeyNode):
         return False
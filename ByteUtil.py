@@ -102,5 +102,7 @@ def bytes_to_type(inBytes,inType):
         theArr = np.frombuffer(inBytes,np.float64)
     elif(inType == 's'):
         theArr = bytes_to_string(inBytes)
+    elif(inType == 'b'):
+        theArr = inBytes
 
     return theArr
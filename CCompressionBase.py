@@ -3,6 +3,27 @@ __license__  = "This source code is licensed under the BSD-style license found i
 
 import numpy as np
 import pyzstd 
+import zlib
+import threading
+
+# the algorithms by name, as given on the command lines
+kCompressionAlgorithms = {"none" : 0, "zstd" : 1, "zlib" : 2, "lz4" : 3, "rle" : 5}
+
+# the zstd decompression contexts of the threads, created once per thread and reused for every block
+gZstdContexts = threading.local()
+
+def GetZstdContext():
+    # a zstandard.ZstdDecompressor if the package is installed (decodes into the output array),
+    # a pyzstd.EndlessZstdDecompressor otherwise. A context must not be shared between threads
+    theContext = getattr(gZstdContexts,"mContext",None)
+    if theContext is None:
+        try:
+            import zstandard
+            theContext = zstandard.ZstdDecompressor()
+        except ImportError:
+            theContext = pyzstd.EndlessZstdDecompressor()
+        gZstdContexts.mContext = theContext
+    return theContext
 
 class CCompressionBase(object):
     def __init__(self):
@@ -53,7 +74,8 @@ class CCompressionBase(object):
         self.mDataLenBY = self.mNumX * self.mNumY * self.mNumZ * self.mUint16Size
 
     def ReadDictionary(self,inStream):
-        ouBuf = inStream.read(self.mNumZ*self.mBlockDictionarySize)
+        inStream.seek(self.mDictionaryPosition,0)
+        ouBuf = inStream.read(self.mNumBlocks*self.mBlockDictionarySize)
 
         self.mBlockDictionary = np.frombuffer(ouBuf,dtype=np.uint64)
         self.mDictionaryRead = True
@@ -70,43 +92,140 @@ class CCompressionBase(object):
        theLen = self.mBlockDictionary[inBlock*2+1]
        return theLen
 
-    def DecompressBuffer(self,inBuffer):
+    def DecompressBuffer(self,inBuffer,outArray=None):
+        # outArray: an optional preallocated uint16 array of mDataLenBY bytes, the block is decoded into it
+        # the zstd, zlib and lz4 decoders release the GIL, blocks can be decoded by several threads
+        # zlib and lz4 cannot decode into a given buffer (decompressobj and lz4.block return new bytes):
+        # their block is copied once into outArray, without outArray it is returned without copy
         if self.mAlgorythm == self.eCompressionZstd:
-            theDecompressedBuf = pyzstd.decompress(inBuffer)
-            return theDecompressedBuf
+            if outArray is None:
+                outArray = np.empty(self.mDataLenBY // self.mUint16Size,dtype=np.uint16)
+            return self.DecompressZstd(inBuffer,outArray)
+        elif self.mAlgorythm == self.eCompressionZlib:
+            # zlib or gzip header (47 = 32 + 15: detected automatically), the output is limited to the size of a block
+            theDecompressor = zlib.decompressobj(47)
+            theBytes = theDecompressor.decompress(inBuffer,self.mDataLenBY)
+            if len(theDecompressor.unconsumed_tail) > 0 or not theDecompressor.eof:
+                raise NameError("Error in decoding")
+            theDecompressedBuf = np.frombuffer(theBytes,dtype=np.uint16)
+        elif self.mAlgorythm == self.eCompressionLz4:
+            import lz4.block
+            # a bytearray: the array returned without outArray is writable, as for the other algorithms
+            theDecompressedBuf = np.frombuffer(lz4.block.decompress(inBuffer,uncompressed_size=self.mDataLenBY,return_bytearray=True),dtype=np.uint16)
         elif self.mAlgorythm == self.eCompressionRLE:
-            theUncompressedSize = int(self.mDataLenBY/self.mUint16Size)
-            theDataP = np.frombuffer(inBuffer,dtype=np.uint16)
-            theCompressedSize = theDataP.size
-
-            theDecompressedBuf = np.empty(theUncompressedSize, dtype=np.uint16)
-            j = 0
-            i = 0
-            while True:
-                theValue = theDataP[j]
-                j += 1
-
-                # Is this a count?
-                if theValue & 0x8000:
-                    theCount = theValue & 0x7fff
-                    theValue = theDataP[j]
-                    j += 1
-                else:
-                    theCount = 1
-
-                while theCount > 0 and i < theUncompressedSize:
-                    theDecompressedBuf[i] = theValue
-                    i += 1
-                    theCount -= 1
-
-                if i >= theUncompressedSize or j >= theCompressedSize:
-                    break
-            return theDecompressedBuf
+            if outArray is None:
+                outArray = np.empty(self.mDataLenBY // self.mUint16Size,dtype=np.uint16)
+            self.DecompressRLE(np.frombuffer(inBuffer,dtype=np.uint16),outArray.reshape(-1))
+            return outArray
+        else:
+            raise Exception("Invalid compression type")
 
+        if outArray is None:
+            return theDecompressedBuf
+        if theDecompressedBuf.size != outArray.size:
+            raise NameError("Error in decoding")
+        outArray.reshape(-1)[:] = theDecompressedBuf
+        return outArray
+
+    def DecompressZstd(self,inBuffer,outArray):
+        # decodes a zstd block with the context of the thread, straight into outArray when zstandard is installed
+        theContext = GetZstdContext()
+        theOutput = memoryview(outArray.reshape(-1)).cast("B")
+        if isinstance(theContext,pyzstd.EndlessZstdDecompressor):
+            theDecompressedBuf = theContext.decompress(inBuffer,theOutput.nbytes)
+            if not theContext.at_frame_edge:
+                # a block larger than the output, or truncated: the context keeps data, it is replaced
+                gZstdContexts.mContext = None
+                raise NameError("Error in decoding")
+            if len(theDecompressedBuf) != theOutput.nbytes:
+                raise NameError("Error in decoding")
+            theOutput[:] = theDecompressedBuf
+            return outArray
+        theReader = theContext.stream_reader(inBuffer,read_size=max(len(inBuffer),1),read_across_frames=True)
+        theSize = 0
+        while theSize < theOutput.nbytes:
+            theNumRead = theReader.readinto(theOutput[theSize:])
+            if theNumRead == 0:
+                break
+            theSize += theNumRead
+        if theSize != theOutput.nbytes or len(theReader.read(1)) != 0:
+            raise NameError("Error in decoding")
+        return outArray
+
+    def DecompressRLE(self,inData,outArray):
+        # a value with the bit 0x8000 is a count, followed by the value to repeat, other values are single
+        # the first value of a run of values >= 0x8000 is a count, then they alternate value, count...
+        theSize = inData.size
+        theIndexes = np.arange(theSize)
+        theIsHigh = (inData & 0x8000) != 0
+        theRunStarts = np.maximum.accumulate(np.where(theIsHigh,0,theIndexes + 1))
+        theIsCount = theIsHigh & ((theIndexes - theRunStarts) % 2 == 0)
+        theIsValue = np.zeros(theSize,dtype=bool)
+        theIsValue[1:] = theIsCount[:-1]
+        theIsLiteral = ~theIsCount & ~theIsValue
+        theIsCount[-1:] = False     # a count without its value is ignored
+
+        theTokens = np.flatnonzero(theIsCount | theIsLiteral)
+        theTokenIsCount = theIsCount[theTokens]
+        theCounts = np.where(theTokenIsCount,inData[theTokens] & 0x7fff,1)
+        theValues = inData[np.minimum(theTokens + theTokenIsCount,theSize - 1)]
+
+        # the values beyond the end of the output are dropped, a short output is completed with 0
+        # np.repeat makes an array of the decoded size, copied into outArray: decoding in place with a
+        # cumulative sum of the differences between runs avoids it, but is about 10 times slower on masks
+        theEnds = np.cumsum(theCounts)
+        theNumTokens = int(np.searchsorted(theEnds,outArray.size)) + 1
+        theDecoded = np.repeat(theValues[:theNumTokens],theCounts[:theNumTokens])
+        theNumDecoded = min(theDecoded.size,outArray.size)
+        outArray[:theNumDecoded] = theDecoded[:theNumDecoded]
+        outArray[theNumDecoded:] = 0
+        return outArray
+
+    def CompressBuffer(self,inBuffer,inLevel=1):
+        if self.mAlgorythm == self.eCompressionZstd:
+            return pyzstd.compress(inBuffer,inLevel)
+        elif self.mAlgorythm == self.eCompressionZlib:
+            return zlib.compress(inBuffer,inLevel)
+        elif self.mAlgorythm == self.eCompressionLz4:
+            import lz4.block
+            return lz4.block.compress(inBuffer,store_size=False)
+        elif self.mAlgorythm == self.eCompressionRLE:
+            return self.CompressRLE(np.frombuffer(inBuffer,dtype=np.uint16))
         else:
             raise Exception("Invalid compression type")
 
-    def ReadData(self,inStream,inBlock):
+    def CompressRLE(self,inData):
+        # inverse of the RLE decoder: a run is written as (0x8000 | count, value),
+        # a single value below 0x8000 is written as it is
+        theData = np.ascontiguousarray(inData,dtype=np.uint16).ravel()
+        if theData.size == 0:
+            return b''
+        theStarts = np.flatnonzero(np.diff(theData)) + 1
+        theStarts = np.concatenate(([0],theStarts))
+        theCounts = np.diff(np.concatenate((theStarts,[theData.size])))
+        theValues = theData[theStarts]
+
+        # split the runs longer than the maximum count
+        theMaxCount = 0x7fff
+        theNumPieces = (theCounts + theMaxCount - 1) // theMaxCount
+        if np.any(theNumPieces > 1):
+            theValues = np.repeat(theValues,theNumPieces)
+            theRunEnds = np.cumsum(theNumPieces)
+            theLastPiece = theCounts - (theNumPieces - 1) * theMaxCount
+            theCounts = np.full(theValues.size,theMaxCount,dtype=np.int64)
+            theCounts[theRunEnds - 1] = theLastPiece
+
+        theIsLiteral = (theCounts == 1) & (theValues < 0x8000)
+        theSizes = np.where(theIsLiteral,1,2)
+        theOffsets = np.cumsum(theSizes) - theSizes
+        ouData = np.empty(int(theSizes.sum()),dtype=np.uint16)
+        ouData[theOffsets[theIsLiteral]] = theValues[theIsLiteral]
+        theIsRun = ~theIsLiteral
+        ouData[theOffsets[theIsRun]] = (theCounts[theIsRun] | 0x8000).astype(np.uint16)
+        ouData[theOffsets[theIsRun] + 1] = theValues[theIsRun]
+        return ouData.tobytes()
+
+    def ReadData(self,inStream,inBlock,outArray=None):
 
         if not self.mDictionaryRead:
             self.ReadDictionary(inStream)
@@ -119,14 +238,11 @@ class CCompressionBase(object):
         ouBuf = inStream.read(theCompressedLengthBY)
 
         #decompress
-        theUncompressedBuf = self.DecompressBuffer(ouBuf)
+        theUncompressedBuf = self.DecompressBuffer(ouBuf,outArray)
 
 
-        if self.mNumBlocks == 0:
-            if theUncompressedBuf.nbytes != self.mNumX * self.mNumY * self.mUint16Size :
-                raise NameError("Error in decoding")
-        else:
-            if theUncompressedBuf.nbytes != self.mNumX * self.mNumY * self.mNumZ * self.mUint16Size :
-                raise NameError("Error in decoding")
+        # a block is a plane (Initialize) or a full stack (InitializeEx)
+        if theUncompressedBuf.nbytes != self.mDataLenBY :
+            raise NameError("Error in decoding")
 
         return theUncompressedBuf
@@ -0,0 +1,165 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Histograms and percentiles of the pixels of a capture, computed from its planes
+
+For the captures without HistogramData files. The histogram of a plane is a np.bincount of
+65536 bins over one pixel every mPixelStep rows and columns, so a step of 4 counts 1/16 of
+the pixels. The partial histograms are kept per (time point, channel), the sum of those of
+the z planes, as their non zero bins and counts: they merge by addition into one running
+histogram, e.g. the histogram of a channel over time.
+With more than one thread the planes are read, decompressed and counted by a CPlaneReaderPool.
+The partial histograms of a channel can be saved in one compressed file of the sidecar
+directory of the capture (CSidecarStore), and are computed again only for the time points
+whose ImageData file changed.
+
+    theLow, theHigh = theSBFileReader.GetPercentiles(0, theChannel, [0.1, 99.9])
+"""
+
+from collections import deque
+import numpy as np
+from CSidecarStore import CSidecarStore
+
+
+kNumBins = 65536
+
+def GetPlaneHistogram(inPlane, inPixelStep=1):
+    """ the histogram (int64, 65536 bins) of one pixel every inPixelStep rows and columns of a 2D plane """
+    thePixels = inPlane[::inPixelStep, ::inPixelStep] if inPixelStep > 1 else inPlane
+    return np.bincount(thePixels.reshape(-1), minlength=kNumBins).astype(np.int64, copy=False)
+
+def GetHistogramPercentiles(inHistogram, inPercentiles):
+    """ the smallest values below which are inPercentiles % of the pixels counted (the inverted cdf) """
+    theCumulative = np.cumsum(inHistogram, dtype=np.int64)
+    theNumPixels = int(theCumulative[-1])
+    if theNumPixels == 0:
+        raise Exception("CHistogramEngine: empty histogram")
+    thePercentiles = np.asarray(inPercentiles, dtype=np.float64)
+    if np.any(thePercentiles < 0) or np.any(thePercentiles > 100):
+        raise Exception("CHistogramEngine: percentiles must be in [0,100]: " + str(inPercentiles))
+    theRanks = np.clip(np.ceil(thePercentiles / 100.0 * theNumPixels), 1, theNumPixels)
+    return np.searchsorted(theCumulative, theRanks, side="left").astype(np.uint16)
+
+
+class CHistogramEngine(object):
+    """ Computes and keeps the partial histograms of a capture per (time point, channel) """
+
+    def __init__(self, inSBFileReader, inCaptureIndex, inPositionIndex=0, inPixelStep=4, inNumThreads=1, inUseSidecar=False):
+        inSBFileReader.mDL.CheckCaptureIndex(inCaptureIndex)
+        if inPixelStep < 1:
+            raise Exception("CHistogramEngine: invalid pixel step: " + str(inPixelStep))
+        self.mSBFileReader = inSBFileReader
+        self.mCaptureIndex = inCaptureIndex
+        self.mPositionIndex = inPositionIndex
+        self.mPixelStep = inPixelStep
+        self.mNumThreads = inNumThreads
+        # (time point, channel) -> (bins, counts, file state) of the non zero bins
+        self.mHistograms = dict()
+        self.mSidecar = None
+        self.mSidecarChannels = set()
+        if inUseSidecar:
+            theImageGroup = inSBFileReader.mDL.GetImageGroup(inCaptureIndex)
+            self.mSidecar = CSidecarStore(theImageGroup.mFile.GetSidecarDirectory(theImageGroup.mImageTitle))
+
+    def GetSidecarName(self, inChannelIndex):
+        return "Histograms_Ch%d_P%d_S%d" % (inChannelIndex, self.mPositionIndex, self.mPixelStep)
+
+    def GetFileState(self, inTimepointIndex, inChannelIndex):
+        if self.mSidecar is None:
+            return None
+        theDataLoader = self.mSBFileReader.mDL
+        thePath = theDataLoader.GetPlaneDataFile(theDataLoader.GetImageGroup(self.mCaptureIndex), inTimepointIndex, inChannelIndex)
+        return self.mSidecar.GetFileState([thePath])
+
+    def LoadSidecar(self, inChannelIndex):
+        # the partial histograms of the channel in the sidecar, of the time points whose file did not change
+        theArrays = self.mSidecar.LoadArrays(self.GetSidecarName(inChannelIndex))
+        if theArrays is None or any(theName not in theArrays for theName in ("mTimepoints", "mFileStates", "mOffsets", "mBins", "mCounts")):
+            return
+        theOffsets = theArrays["mOffsets"]
+        for theIndex, theTimepoint in enumerate(theArrays["mTimepoints"]):
+            theKey = (int(theTimepoint), inChannelIndex)
+            if theKey in self.mHistograms:
+                continue
+            theFileState = self.GetFileState(*theKey)
+            if np.array_equal(theArrays["mFileStates"][theIndex], theFileState):
+                theBins = slice(theOffsets[theIndex], theOffsets[theIndex + 1])
+                self.mHistograms[theKey] = (theArrays["mBins"][theBins], theArrays["mCounts"][theBins], theFileState)
+
+    def SaveSidecar(self, inChannelIndex):
+        # all the partial histograms of the channel known, in one compressed file
+        theKeys = sorted(theKey for theKey in self.mHistograms if theKey[1] == inChannelIndex)
+        theBins = [self.mHistograms[theKey][0] for theKey in theKeys]
+        self.mSidecar.SaveArrays(self.GetSidecarName(inChannelIndex), {
+            "mTimepoints": np.array([theKey[0] for theKey in theKeys], dtype=np.int64),
+            "mFileStates": np.array([self.mHistograms[theKey][2] for theKey in theKeys], dtype=np.int64).reshape(len(theKeys), -1),
+            "mOffsets": np.concatenate([[0], np.cumsum([len(theKeyBins) for theKeyBins in theBins])]).astype(np.int64),
+            "mBins": np.concatenate(theBins).astype(np.uint16),
+            "mCounts": np.concatenate([self.mHistograms[theKey][1] for theKey in theKeys]).astype(np.int64)}, True)
+
+    def ComputePlaneHistogram(self, inReader, inTimepointIndex, inZPlaneIndex, inChannelIndex):
+        thePlane = inReader.mDL.ReadPlane(self.mCaptureIndex, self.mPositionIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex, True)
+        return GetPlaneHistogram(thePlane, self.mPixelStep)
+
+    def ComputePlaneHistograms(self, inPlanes):
+        # yields the (time point, channel) and the histogram of the planes inPlanes, in order
+        if self.mNumThreads > 1 and len(inPlanes) > 1:
+            thePool = self.mSBFileReader.mDL.GetReaderPool(self.mNumThreads)
+            thePending = deque()
+            for theTimepoint, theZPlane, theChannel in inPlanes:
+                thePending.append(((theTimepoint, theChannel), thePool.Submit(self.ComputePlaneHistogram, theTimepoint, theZPlane, theChannel)))
+                if len(thePending) >= thePool.mMaxPending:
+                    theKey, theFuture = thePending.popleft()
+                    yield theKey, theFuture.result()
+            while len(thePending) > 0:
+                theKey, theFuture = thePending.popleft()
+                yield theKey, theFuture.result()
+        else:
+            for theTimepoint, theZPlane, theChannel in inPlanes:
+                yield (theTimepoint, theChannel), self.ComputePlaneHistogram(self.mSBFileReader, theTimepoint, theZPlane, theChannel)
+
+    def ComputeHistograms(self, inKeys):
+        # yields the partial histogram of each (time point, channel) of inKeys, summed over the z planes
+        theNumZPlanes = self.mSBFileReader.GetNumZPlanes(self.mCaptureIndex)
+        thePlanes = [(theTimepoint, theZPlane, theChannel) for theTimepoint, theChannel in inKeys for theZPlane in range(theNumZPlanes)]
+        theKey = None
+        for thePlaneKey, thePlaneHistogram in self.ComputePlaneHistograms(thePlanes):
+            if thePlaneKey != theKey:
+                if theKey is not None:
+                    yield theKey, theHistogram
+                theKey = thePlaneKey
+                theHistogram = thePlaneHistogram
+            else:
+                theHistogram += thePlaneHistogram
+        if theKey is not None:
+            yield theKey, theHistogram
+
+    def AddHistograms(self, inTimepoints, inChannelIndex, ioHistogram):
+        """ adds the partial histograms of the time points to ioHistogram, from memory, the sidecar, or computed """
+        if self.mSidecar is not None and inChannelIndex not in self.mSidecarChannels:
+            self.mSidecarChannels.add(inChannelIndex)
+            self.LoadSidecar(inChannelIndex)
+        theMissingKeys = list(dict.fromkeys((theTimepoint, inChannelIndex) for theTimepoint in inTimepoints if (theTimepoint, inChannelIndex) not in self.mHistograms))
+        if len(theMissingKeys) > 0:
+            theFileStates = dict((theKey, self.GetFileState(*theKey)) for theKey in theMissingKeys)
+            for theKey, theHistogram in self.ComputeHistograms(theMissingKeys):
+                theBins = np.flatnonzero(theHistogram)
+                self.mHistograms[theKey] = (theBins.astype(np.uint16), theHistogram[theBins], theFileStates[theKey])
+            if self.mSidecar is not None:
+                self.SaveSidecar(inChannelIndex)
+        for theTimepoint in inTimepoints:
+            theBins, theCounts, theFileState = self.mHistograms[(theTimepoint, inChannelIndex)]
+            ioHistogram[theBins] += theCounts
+        return ioHistogram
+
+    def GetHistogram(self, inChannelIndex, inTimepoints=None):
+        """ the histogram of a channel, merged over inTimepoints (all of them if None) """
+        if inTimepoints is None:
+            inTimepoints = range(self.mSBFileReader.GetNumTimepoints(self.mCaptureIndex))
+        theTimepoints = list(inTimepoints)
+        if len(theTimepoints) == 0:
+            raise Exception("CHistogramEngine: no time point")
+        return self.AddHistograms(theTimepoints, inChannelIndex, np.zeros(kNumBins, dtype=np.int64))
+
+    def GetPercentiles(self, inChannelIndex, inPercentiles, inTimepoints=None):
+        return GetHistogramPercentiles(self.GetHistogram(inChannelIndex, inTimepoints), inPercentiles)
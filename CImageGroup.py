@@ -1,7 +1,7 @@
 __copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
 __license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
 
-from BaseDecoder import BaseDecoder
+from BaseDecoder import BaseDecoder, ComposeYaml
 from CMetadataLib import *
 from CNpyHeader import *
 from CSBFile70 import *
@@ -52,6 +52,40 @@ class CAuxXmlData(CBaseAuxData):
         super().__init__()
         mXmlData = str()
 
+def GroupCoordinates(inValues, inTolerance):
+    """ the index of the group of each value, the groups in increasing order, a new group after a gap larger than inTolerance """
+    theOrder = np.argsort(inValues, kind="stable")
+    theGroups = np.empty(len(inValues), dtype=np.int64)
+    theGroups[theOrder] = np.concatenate(([0], np.cumsum(np.diff(inValues[theOrder]) > inTolerance)))
+    return theGroups
+
+class CPositionLayout(object):
+    """ The montage positions of an image group, computed once from the stage positions of its images """
+    def __init__(self, inStagePositions, inVoxelSize, inNumColumns, inNumRows):
+        theNumImages = len(inStagePositions)
+        self.mNumPositions = 1
+        if theNumImages > 1:
+            # the images go through the positions, then again from the first one at the next time point
+            theX = inStagePositions[:, 0]
+            theY = inStagePositions[:, 1]
+            theRepeats = np.flatnonzero((theX[1:] == theX[0]) & (theY[1:] == theY[0]))
+            self.mNumPositions = int(theRepeats[0]) + 1 if len(theRepeats) > 0 else theNumImages
+        self.mPositions = inStagePositions[:self.mNumPositions]
+        self.mImagePositions = np.arange(theNumImages) % self.mNumPositions
+        self.mMontageRows = np.zeros(self.mNumPositions, dtype=np.int64)
+        self.mMontageColumns = np.zeros(self.mNumPositions, dtype=np.int64)
+        if len(self.mPositions) > 1:
+            # the positions less than half a tile apart are in the same row or column
+            theVoxelSize = max(inVoxelSize, 0.0)
+            self.mMontageRows = GroupCoordinates(self.mPositions[:, 1], 0.5 * inNumRows * theVoxelSize)
+            self.mMontageColumns = GroupCoordinates(self.mPositions[:, 0], 0.5 * inNumColumns * theVoxelSize)
+
+# the EROI_Shapes of the graphic types of the annotations (GetROIAnnotation, GetFRAPAnnotation, GetFRAPRegion)
+kGraphicTypeToShape = (1,2,3,4,7,7,6,7,5)
+
+kFRAPRegionDtype = np.dtype([("mRegionIndex","<i4"),("mGraphicType","<i4"),("mShape","<i4"),("mIsBackground","?"),
+                             ("mIsStimulation","?"),("mFirstVertex","<i8"),("mNumVertexes","<i8")])
+
 class CImageGroup(BaseDecoder):
     def __init__(self, inFile, inImageTitle):
         super(CImageGroup, self).__init__()
@@ -67,9 +101,13 @@ class CImageGroup(BaseDecoder):
         self.mRemapManipRecList = []
         self.mHistogramRecordList = []
         self.mMaskRecordList = []
-        self.mElapsedTimes = []
+        self.mElapsedTimes = np.zeros(0,dtype=np.int64)
         self.mSAPositionList = []
-        self.mStagePositions = []
+        self.mSAPositions = np.zeros((0,0),dtype=np.int64)
+        self.mFRAPRegionTables = dict()
+        # (x,y,z) in um per image, and the positions computed from them on first use
+        self.mStagePositions = np.zeros((0,3),dtype=np.float64)
+        self.mPositionLayout = None
         self.mAuxFloatDataList = []
         self.mAuxDoubleDataList = []
         self.mAuxSInt32DataList = []
@@ -169,7 +207,7 @@ class CImageGroup(BaseDecoder):
             self.mImageRecord = CImageRecord70()
             thePath = self.mFile.GetImageGroupDirectory(self.mImageTitle) + os.sep +  self.mFile.kImageRecordFilename
             inputStream = open(thePath,"r")
-            theNode = yaml.compose(inputStream)
+            theNode = ComposeYaml(inputStream)
             theLastIndex = self.mImageRecord.Decode(theNode)
             if self.mDebugPrint:
                 print ("LoadImageRecord: theLastIndex " , theLastIndex)
@@ -186,7 +224,7 @@ class CImageGroup(BaseDecoder):
         try:
             thePath = self.mFile.GetImageGroupDirectory(self.mImageTitle) + os.sep +  self.mFile.kChannelRecordFilename
             inputStream = open(thePath,"r")
-            theNode = yaml.compose(inputStream)
+            theNode = ComposeYaml(inputStream)
 
             self.mChannelRecordList = []
             self.mRemapChannelLUTList = []
@@ -246,7 +284,7 @@ class CImageGroup(BaseDecoder):
         try:
             thePath = self.mFile.GetImageGroupDirectory(self.mImageTitle) + os.sep +  self.mFile.kMaskRecordFilename
             inputStream = open(thePath,"r")
-            theNode = yaml.compose(inputStream)
+            theNode = ComposeYaml(inputStream)
 
             theNodeList = theNode.value
             theTuple = theNodeList[0]
@@ -294,11 +332,12 @@ class CImageGroup(BaseDecoder):
         try:
             thePath = self.mFile.GetImageGroupDirectory(self.mImageTitle) + os.sep +  self.mFile.kAnnotationRecordFilename
             inputStream = open(thePath,"r")
-            theNode = yaml.compose(inputStream)
+            theNode = ComposeYaml(inputStream)
 
             theDataTableHeaderRecord70 = CDataTableHeaderRecord70()
             theLastIndex = theDataTableHeaderRecord70.Decode(theNode)
             self.mAnnotationList = []
+            self.mFRAPRegionTables = dict()
             while True:
                 theTimePointIndex,theLastIndex = self.GetIntValue(theNode,theLastIndex,"theTimepointIndex")
                 if theLastIndex < 0:
@@ -342,7 +381,7 @@ class CImageGroup(BaseDecoder):
         try:
             thePath = self.mFile.GetImageGroupDirectory(self.mImageTitle) + os.sep +  self.mFile.kElapsedTimesFilename
             inputStream = open(thePath,"r")
-            theNode = yaml.compose(inputStream)
+            theNode = ComposeYaml(inputStream)
 
             theNodeList = theNode.value
             theTuple = theNodeList[0]
@@ -350,7 +389,7 @@ class CImageGroup(BaseDecoder):
             if not theKey == "theElapsedTimes":
                 return False
             theCurrentNode = theTuple[1]
-            self.mElapsedTimes = self.GetIntArray(theCurrentNode, "theElapsedTimes", True)
+            self.mElapsedTimes = np.asarray(self.GetIntArray(theCurrentNode, "theElapsedTimes", True),dtype=np.int64)
         except:
             print ("CImageGroup::LoadElapsedTimes error")
         return True
@@ -359,7 +398,7 @@ class CImageGroup(BaseDecoder):
         try:
             thePath = self.mFile.GetImageGroupDirectory(self.mImageTitle) + os.sep +  self.mFile.kSAPositionDataFilename
             inputStream = open(thePath,"r")
-            theNode = yaml.compose(inputStream)
+            theNode = ComposeYaml(inputStream)
 
             theNodeList = theNode.value
             theLastIndex = 0
@@ -372,10 +411,17 @@ class CImageGroup(BaseDecoder):
                 if not theKey == "theSAPositions":
                     break
                 theCurrentNode = theTuple[1]
-                theSAPositionsvector = self.GetIntArray(theCurrentNode,"theSAPositions",True);
+                theSAPositionsvector = np.asarray(self.GetIntArray(theCurrentNode,"theSAPositions",True),dtype=np.int64);
                 self.mSAPositionList.append(theSAPositionsvector)
                 theLastIndex += 1
                 theImageIndex += 1
+            # one row per image when the images have the same number of values
+            if len(self.mSAPositionList) == 0:
+                self.mSAPositions = np.zeros((0,0),dtype=np.int64)
+            elif len(set(len(theVector) for theVector in self.mSAPositionList)) == 1:
+                self.mSAPositions = np.array(self.mSAPositionList,dtype=np.int64)
+            else:
+                self.mSAPositions = None
         except:
             print ("CImageGroup::LoadSAPositions error")
         return True
@@ -384,7 +430,7 @@ class CImageGroup(BaseDecoder):
         try:
             thePath = self.mFile.GetImageGroupDirectory(self.mImageTitle) + os.sep +  self.mFile.kStagePositionDataFilename
             inputStream = open(thePath,"r")
-            theNode = yaml.compose(inputStream)
+            theNode = ComposeYaml(inputStream)
             theNodeList = theNode.value
 
             theLastIndex = 0
@@ -392,20 +438,16 @@ class CImageGroup(BaseDecoder):
 
             if theLastIndex < 0:
                 return True
-            self.mStagePositions = []
+            self.mStagePositions = np.zeros((0,3),dtype=np.float64)
+            self.mPositionLayout = None
             theTuple = theNodeList[theLastIndex]
             theKey = theTuple[0].value
             if not theKey == "StructArrayValues":
                 return False
             theCurrentNode = theTuple[1]
-            thePoints = self.GetFloatArray(theCurrentNode,"StructArrayValues",False);
-
-            for theP in range(0,len(thePoints),3):
-                thePoint = CSBPoint(0.0)
-                thePoint.mX = thePoints[theP]
-                thePoint.mY = thePoints[theP + 1]
-                thePoint.mZ = thePoints[theP + 2]
-                self.mStagePositions.append(thePoint)
+            thePoints = np.asarray(self.GetFloatArray(theCurrentNode,"StructArrayValues",False),dtype=np.float64)
+            theNumPoints = len(thePoints) // 3
+            self.mStagePositions = thePoints[:theNumPoints * 3].reshape(theNumPoints,3)
         except:
             print ("CImageGroup::LoadStagePosition error")
         return True
@@ -414,7 +456,7 @@ class CImageGroup(BaseDecoder):
         try:
             thePath = self.mFile.GetImageGroupDirectory(self.mImageTitle) + os.sep +  self.mFile.kAuxDataFilename
             inputStream = open(thePath,"r")
-            theNode = yaml.compose(inputStream)
+            theNode = ComposeYaml(inputStream)
             theNodeList = theNode.value
 
             # FLOAT
@@ -545,31 +587,62 @@ class CImageGroup(BaseDecoder):
     def GetNumPlanes(self):
         return self.mImageRecord.mNumPlanes
 
-    def GetNumPositions(self):
-        theNumStagePositions = len(self.mStagePositions)
-        if theNumStagePositions <= 1:
-            return 1
-        thePoint0 = self.mStagePositions[0]
-        if self.mDebugPrint:
-            print ("GetNumPositions: thePoint0 mX=" , thePoint0.mX , ", mY=" , thePoint0.mY)
-        theNumUniquePositions = 1
-        thePosition = 1
-        for thePosition in range(1,theNumStagePositions):
-            thePoint1 = self.mStagePositions[thePosition]
+    def GetPositionLayout(self):
+        if self.mPositionLayout is None:
+            self.mPositionLayout = CPositionLayout(self.mStagePositions,self.GetVoxelSize(),self.GetNumColumns(),self.GetNumRows())
             if self.mDebugPrint:
-                print ("GetNumPositions: thePoint1 mX=" , thePoint1.mX , ", mY=" , thePoint1.mY)
-            if thePoint0.mX == thePoint1.mX and thePoint0.mY == thePoint1.mY:
-                break
-            theNumUniquePositions += 1
-        if self.mDebugPrint:
-            print ("GetNumPositions: theNumUniquePositions=" , theNumUniquePositions)
-        return theNumUniquePositions
+                print ("GetNumPositions: theNumUniquePositions=" , self.mPositionLayout.mNumPositions)
+        return self.mPositionLayout
+
+    def GetNumPositions(self):
+        return self.GetPositionLayout().mNumPositions
+
+    def GetStagePositions(self):
+        return self.mStagePositions
+
+    def GetMontageRow(self, inPosition):
+        return int(self.GetPositionLayout().mMontageRows[inPosition])
+
+    def GetMontageColumn(self, inPosition):
+        return int(self.GetPositionLayout().mMontageColumns[inPosition])
 
     def GetNumTimepoints(self):
         return self.mImageRecord.mNumTimepoints
 
     def GetElapsedTime(self, inTimepoint):
-        return self.mElapsedTimes[inTimepoint]
+        return int(self.mElapsedTimes[inTimepoint])
+
+    def GetElapsedTimes(self):
+        return self.mElapsedTimes
+
+    def GetSAPositions(self):
+        return self.mSAPositionList
+
+    def GetSAPositionArray(self):
+        if self.mSAPositions is None:
+            raise Exception("CImageGroup: the time points do not have the same number of SA positions")
+        return self.mSAPositions
+
+    def GetFRAPRegionTable(self, inTimepoint):
+        # the regions of the FRAP annotation of a time point, built on first use
+        theTable = self.mFRAPRegionTables.get(inTimepoint)
+        if theTable is not None:
+            return theTable
+        theRegions = []
+        if 0 <= inTimepoint < len(self.mAnnotationList) and len(self.mAnnotationList[inTimepoint].mFRAPRegionAnnotationList) > 0:
+            theRegions = self.mAnnotationList[inTimepoint].mFRAPRegionAnnotationList[0].mRegions
+        ouRegions = np.zeros(len(theRegions),dtype=kFRAPRegionDtype)
+        ouRegions["mRegionIndex"] = [theRegion.mRegionIndex for theRegion in theRegions]
+        ouRegions["mGraphicType"] = [theRegion.mAnn.mGraphicType70 for theRegion in theRegions]
+        ouRegions["mShape"] = np.array(kGraphicTypeToShape)[ouRegions["mGraphicType"]]
+        ouRegions["mIsBackground"] = [theRegion.mIsBackground for theRegion in theRegions]
+        ouRegions["mIsStimulation"] = [theRegion.mIsStimulation for theRegion in theRegions]
+        ouRegions["mNumVertexes"] = [len(theRegion.mAnn.mVertexArray) for theRegion in theRegions]
+        ouRegions["mFirstVertex"] = np.cumsum(ouRegions["mNumVertexes"]) - ouRegions["mNumVertexes"]
+        ouVertexes = np.concatenate([theRegion.mAnn.mVertexArray for theRegion in theRegions] + [np.zeros((0,3),dtype=np.int64)])
+        theTable = (ouRegions,ouVertexes)
+        self.mFRAPRegionTables[inTimepoint] = theTable
+        return theTable
 
     def GetBytesPerPixel(self):
         return 2
@@ -605,16 +678,16 @@ class CImageGroup(BaseDecoder):
         return self.mChannelRecordList[inChannel].mExposureRecord.mExposureTime
 
     def GetXPosition(self, inPosition):
-        thePoint = self.mStagePositions[inPosition]
-        return thePoint.mX
+        return float(self.mStagePositions[inPosition,0])
 
     def GetYPosition(self, inPosition):
-        thePoint = self.mStagePositions[inPosition]
-        return thePoint.mY
+        return float(self.mStagePositions[inPosition,1])
 
     def GetZPosition(self, inPosition, zplane):
-        thePoint = self.mStagePositions[inPosition]
-        return thePoint.mZ + self.GetInterplaneSpacing() * zplane
+        return float(self.mStagePositions[inPosition,2]) + self.GetInterplaneSpacing() * zplane
+
+    def GetZPositions(self, inPosition):
+        return self.mStagePositions[inPosition,2] + self.GetInterplaneSpacing() * np.arange(self.GetNumPlanes(),dtype=np.float64)
 
     def GetMaskNames(self):
         names = []
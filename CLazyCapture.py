@@ -0,0 +1,80 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Lazy dask and xarray views of a capture
+
+The arrays have the dimensions (T,C,Z,Y,X) and one chunk per (timepoint, channel): a z stack,
+the content of one file on disk, read by DataLoader.ReadStack when dask computes the chunk.
+CLazyCapture, the function computing the chunks, can be pickled and opens the slide again
+(essential metadata only) in every thread or process, so the arrays can be computed by the
+threaded scheduler as well as by a dask distributed cluster.
+
+    theArray = theSBFileReader.AsXarray(0)
+    theMip = theArray.max("z").compute()
+
+dask and xarray packages
+-----------------
+conda install dask xarray  or  pip install dask xarray
+"""
+
+import threading
+import numpy as np
+from SBReadFile import SBReadFile
+
+
+class CLazyCapture(object):
+    """ Reads the chunks (z stacks) of a capture for dask, in any thread or process """
+    def __init__(self, inSBFileReader, inCaptureIndex, inPositionIndex=0):
+        self.mSlidePath = inSBFileReader.mDL.mSlidePath
+        self.mCaptureIndex = inCaptureIndex
+        self.mPositionIndex = inPositionIndex
+        self.mLocal = threading.local()
+        self.mLocal.mReader = inSBFileReader
+
+    def __getstate__(self):
+        theState = self.__dict__.copy()
+        del theState["mLocal"]
+        return theState
+
+    def __setstate__(self, inState):
+        self.__dict__.update(inState)
+        self.mLocal = threading.local()
+
+    def GetReader(self):
+        theReader = getattr(self.mLocal, "mReader", None)
+        if theReader is None:
+            theReader = SBReadFile()
+            if not theReader.Open(self.mSlidePath, False):
+                raise Exception("CLazyCapture: could not open: " + self.mSlidePath)
+            self.mLocal.mReader = theReader
+        return theReader
+
+    def ReadBlock(self, block_id=None):
+        """ the chunk (1,1,Z,Y,X) at block_id (timepoint, channel, 0, 0, 0), called by dask.array.map_blocks """
+        theTimepoint, theChannel = block_id[0], block_id[1]
+        theStack = self.GetReader().mDL.ReadStack(self.mCaptureIndex, self.mPositionIndex, theTimepoint, theChannel)
+        return theStack[np.newaxis, np.newaxis]
+
+    def AsDaskArray(self, inShape):
+        import dask.array as da
+        theNumTimepoints, theNumChannels, theNumZPlanes, theNumRows, theNumColumns = inShape
+        theChunks = ((1,) * theNumTimepoints, (1,) * theNumChannels, (theNumZPlanes,), (theNumRows,), (theNumColumns,))
+        theName = "sbreadfile-" + self.mSlidePath + "-" + str(self.mCaptureIndex) + "-" + str(self.mPositionIndex)
+        return da.map_blocks(self.ReadBlock, chunks=theChunks, dtype=np.uint16, meta=np.empty((0, 0, 0, 0, 0), dtype=np.uint16), name=theName)
+
+
+def GetCaptureCoordinates(inSBFileReader, inCaptureIndex):
+    """ the xarray coordinates of a capture: t in ms, c channel names, z, y and x in um """
+    theNumTimepoints = inSBFileReader.GetNumTimepoints(inCaptureIndex)
+    theXSize, theYSize, theZSize = inSBFileReader.GetVoxelSize(inCaptureIndex)
+    try:
+        theTimes = [inSBFileReader.GetElapsedTime(inCaptureIndex, theTimepoint) for theTimepoint in range(theNumTimepoints)]
+    except IndexError:
+        theTimes = range(theNumTimepoints)
+    return {
+        "t" : np.asarray(theTimes, dtype=np.float64),
+        "c" : [inSBFileReader.GetChannelName(inCaptureIndex, theChannel) for theChannel in range(inSBFileReader.GetNumChannels(inCaptureIndex))],
+        "z" : np.arange(inSBFileReader.GetNumZPlanes(inCaptureIndex)) * theZSize,
+        "y" : np.arange(inSBFileReader.GetNumYRows(inCaptureIndex)) * theYSize,
+        "x" : np.arange(inSBFileReader.GetNumXColumns(inCaptureIndex)) * theXSize,
+    }
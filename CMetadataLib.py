@@ -4,6 +4,7 @@ __license__  = "This source code is licensed under the BSD-style license found i
 from BaseDecoder import BaseDecoder
 from CSBPoint import CSBPoint
 import yaml
+import numpy as np
 
 class CAlignManipRecord70(BaseDecoder):
     """ generated source for class CAlignManipRecord70 """
@@ -48,6 +49,8 @@ class CAnnotation70(BaseDecoder):
         self.mRelativePower = float()
         self.mBorderFillPixels = int()
         self.mVertexes = []
+        # the vertexes as a (number of vertexes,3) array of (x,y,z)
+        self.mVertexArray = np.zeros((0,3),dtype=np.int64)
 
 
     def DecodeUnknownString(self, inUnknownString, inAttrKeyNode):
@@ -66,12 +69,14 @@ class CAnnotation70(BaseDecoder):
             return True
         elif isinstance(inAttrKeyNode[1], yaml.nodes.SequenceNode):
             self.mVertexes = []
-            thePoints = self.GetIntArray(inAttrKeyNode[1],"inUnknownString",False)
-            for theP in range(0, len(thePoints),3):
+            thePoints = np.asarray(self.GetIntArray(inAttrKeyNode[1],"inUnknownString",False),dtype=np.int64)
+            theNumPoints = len(thePoints) // 3
+            self.mVertexArray = thePoints[:theNumPoints * 3].reshape(theNumPoints,3)
+            for theX, theY, theZ in self.mVertexArray.tolist():
                 thePoint = CSBPoint(0)
-                thePoint.mX = thePoints[theP]
-                thePoint.mY = thePoints[theP + 1]
-                thePoint.mZ = thePoints[theP + 2]
+                thePoint.mX = theX
+                thePoint.mY = theY
+                thePoint.mZ = theZ
                 self.mVertexes.append(thePoint)
             return True
         else:
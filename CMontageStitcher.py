@@ -0,0 +1,133 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Assembles the tiles of a montage capture into a mosaic, placed by their stage positions
+
+SlideBook stores the tiles of a montage as consecutive images: the tile of a position at a
+time point is the image (SlideBook time point) timepoint * number of positions + position,
+whose stage position (StagePositionData.yaml) is the center of the tile in um. The tiles are
+placed at their stage X/Y divided by the X/Y voxel size, relative to the first row and column.
+
+The mosaic is written band by band of rows into the output, a numpy array by default, or any
+2D array accepting slice assignment: a np.memmap or a zarr array for mosaics larger than the
+memory (StitchToNpy). Only the tiles crossing the current band are kept, each tile is read
+once, by a CPlaneReaderPool with more than one thread. In the overlaps, 'linear' blends the
+tiles with weights decreasing to their edges, 'none' keeps the last tile.
+
+    theMosaic = theSBFileReader.StitchMontage(0, theTimepoint, theZPlane, theChannel)
+"""
+
+import numpy as np
+
+
+class CMontageStitcher(object):
+    """ Places the tiles of a montage capture and writes the mosaic of a plane """
+
+    kBlendModes = ("linear", "none")
+
+    def __init__(self, inSBFileReader, inCaptureIndex, inBlend="linear", inNumThreads=1, inFlipX=False, inFlipY=False):
+        inSBFileReader.mDL.CheckCaptureIndex(inCaptureIndex)
+        if inBlend not in self.kBlendModes:
+            raise Exception("CMontageStitcher: unknown blend mode: " + str(inBlend))
+        self.mSBFileReader = inSBFileReader
+        self.mCaptureIndex = inCaptureIndex
+        self.mBlend = inBlend
+        self.mNumThreads = inNumThreads
+        self.mNumPositions = inSBFileReader.GetNumPositions(inCaptureIndex)
+        self.mNumRows = inSBFileReader.GetNumYRows(inCaptureIndex)
+        self.mNumColumns = inSBFileReader.GetNumXColumns(inCaptureIndex)
+        self.mTileOrigins = self.ComputeTileOrigins(inFlipX, inFlipY)
+        self.mWeights = None
+        if inBlend == "linear":
+            # the distance to the closest edge of the tile, from 1
+            theRowWeights = np.minimum(np.arange(1, self.mNumRows + 1), np.arange(self.mNumRows, 0, -1)).astype(np.float32)
+            theColumnWeights = np.minimum(np.arange(1, self.mNumColumns + 1), np.arange(self.mNumColumns, 0, -1)).astype(np.float32)
+            self.mWeights = np.minimum(theRowWeights[:, None], theColumnWeights[None, :])
+
+    def ComputeTileOrigins(self, inFlipX, inFlipY):
+        # the (row, column) of the top left pixel of each tile in the mosaic
+        theXSize, theYSize, theZSize = self.mSBFileReader.GetVoxelSize(self.mCaptureIndex)
+        if theXSize <= 0 or theYSize <= 0:
+            raise Exception("CMontageStitcher: invalid voxel size: " + str((theXSize, theYSize)))
+        theX = self.mSBFileReader.GetXStagePositions(self.mCaptureIndex)
+        theY = self.mSBFileReader.GetYStagePositions(self.mCaptureIndex)
+        theColumns = np.rint((-theX if inFlipX else theX) / theXSize).astype(np.int64)
+        theRows = np.rint((-theY if inFlipY else theY) / theYSize).astype(np.int64)
+        return np.stack([theRows - theRows.min(), theColumns - theColumns.min()], axis=1)
+
+    def GetMosaicShape(self):
+        """ the (rows, columns) of the mosaic """
+        return (int(self.mTileOrigins[:, 0].max()) + self.mNumRows, int(self.mTileOrigins[:, 1].max()) + self.mNumColumns)
+
+    def GetImageIndex(self, inTimepointIndex, inPositionIndex):
+        """ the SlideBook time point of the tile of a position """
+        return inTimepointIndex * self.mNumPositions + inPositionIndex
+
+    def ReadTiles(self, inTimepointIndex, inZPlaneIndex, inChannelIndex, inPositions):
+        # yields (position, tile) in the order of inPositions
+        theIndexes = [(self.GetImageIndex(inTimepointIndex, thePosition), inZPlaneIndex, inChannelIndex) for thePosition in inPositions]
+        if self.mNumThreads > 1 and len(theIndexes) > 1:
+            thePool = self.mSBFileReader.mDL.GetReaderPool(self.mNumThreads)
+            theTiles = (theTile for theIndex, theTile in thePool.ReadPlanes(self.mCaptureIndex, theIndexes, 0))
+        else:
+            theTiles = (self.mSBFileReader.mDL.ReadPlane(self.mCaptureIndex, 0, theImage, theZPlane, theChannel, True) for theImage, theZPlane, theChannel in theIndexes)
+        for thePosition, theTile in zip(inPositions, theTiles):
+            yield thePosition, theTile
+
+    def Stitch(self, inTimepointIndex, inZPlaneIndex, inChannelIndex, inOutput=None, inBandRows=None):
+        """ writes the mosaic of a plane into inOutput (allocated if None), band by band, and returns it """
+        theMosaicRows, theMosaicColumns = self.GetMosaicShape()
+        if inOutput is None:
+            inOutput = np.zeros((theMosaicRows, theMosaicColumns), dtype=np.uint16)
+        elif tuple(inOutput.shape) != (theMosaicRows, theMosaicColumns):
+            raise Exception("CMontageStitcher: the output must be of shape " + str((theMosaicRows, theMosaicColumns)))
+        theBandRows = self.mNumRows if inBandRows is None else max(1, inBandRows)
+        # the tiles by first row, a tile is read at the first band it crosses and kept until its last
+        theOrder = np.argsort(self.mTileOrigins[:, 0], kind="stable")
+        theNextTile = 0
+        theTiles = dict()
+        for theBandStart in range(0, theMosaicRows, theBandRows):
+            theBandEnd = min(theBandStart + theBandRows, theMosaicRows)
+            theNewPositions = []
+            while theNextTile < len(theOrder) and self.mTileOrigins[theOrder[theNextTile], 0] < theBandEnd:
+                theNewPositions.append(int(theOrder[theNextTile]))
+                theNextTile += 1
+            for thePosition, theTile in self.ReadTiles(inTimepointIndex, inZPlaneIndex, inChannelIndex, theNewPositions):
+                theTiles[thePosition] = theTile
+            inOutput[theBandStart:theBandEnd] = self.BlendBand(theBandStart, theBandEnd, theMosaicColumns, theTiles)
+            for thePosition in [thePosition for thePosition in theTiles if self.mTileOrigins[thePosition, 0] + self.mNumRows <= theBandEnd]:
+                del theTiles[thePosition]
+        return inOutput
+
+    def BlendBand(self, inBandStart, inBandEnd, inMosaicColumns, inTiles):
+        # the rows [inBandStart, inBandEnd) of the mosaic, from the tiles crossing them, in position order
+        theBand = np.zeros((inBandEnd - inBandStart, inMosaicColumns), dtype=np.uint16 if self.mWeights is None else np.float32)
+        theWeightSum = None if self.mWeights is None else np.zeros_like(theBand)
+        for thePosition in sorted(inTiles):
+            theTop, theLeft = self.mTileOrigins[thePosition]
+            theFirstRow = max(inBandStart, theTop)
+            theEndRow = min(inBandEnd, theTop + self.mNumRows)
+            if theFirstRow >= theEndRow:
+                continue
+            theTileRows = slice(theFirstRow - theTop, theEndRow - theTop)
+            theBandRows = slice(theFirstRow - inBandStart, theEndRow - inBandStart)
+            theBandColumns = slice(theLeft, theLeft + self.mNumColumns)
+            if self.mWeights is None:
+                theBand[theBandRows, theBandColumns] = inTiles[thePosition][theTileRows]
+            else:
+                theWeights = self.mWeights[theTileRows]
+                theBand[theBandRows, theBandColumns] += inTiles[thePosition][theTileRows] * theWeights
+                theWeightSum[theBandRows, theBandColumns] += theWeights
+        if self.mWeights is None:
+            return theBand
+        np.divide(theBand, theWeightSum, out=theBand, where=theWeightSum > 0)
+        return np.rint(theBand).astype(np.uint16)
+
+    def StitchToNpy(self, inTimepointIndex, inZPlaneIndex, inChannelIndex, inPath, inBandRows=None):
+        """ writes the mosaic of a plane to a .npy file, memory mapped, without holding it in memory """
+        theOutput = np.lib.format.open_memmap(inPath, mode="w+", dtype=np.uint16, shape=self.GetMosaicShape())
+        try:
+            self.Stitch(inTimepointIndex, inZPlaneIndex, inChannelIndex, theOutput, inBandRows)
+            theOutput.flush()
+        finally:
+            del theOutput
@@ -2,6 +2,7 @@ __copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc.
 __license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
 
 import numpy
+import struct
 
 class CNpyHeader(object):
     """ generated source for class CNpyHeader """
@@ -43,4 +44,18 @@ class CNpyHeader(object):
             return False
         return True
 
-
+    def WriteNpyHeader(self, outStream, inShape, inCompressionFlag):
+        """ writes a uint16 npy header, the minor version carries the compression flag """
+        theDict = "{'descr': '<u2', 'fortran_order': False, 'shape': %s, }" % repr(tuple(int(theDim) for theDim in inShape))
+        # magic (6) + version (2) + header length (2) + dictionary + new line, padded to 64 bytes
+        thePadding = (64 - (10 + len(theDict) + 1) % 64) % 64
+        theDict += ' ' * thePadding + '\n'
+        theBuffer = b'\x93NUMPY' + bytes([1, inCompressionFlag]) + struct.pack('<H', len(theDict)) + theDict.encode('latin1')
+        outStream.write(theBuffer)
+        self.mShape = tuple(inShape)
+        self.mFortranOrder = False
+        self.mDataType = 'uint16'
+        self.mBytesPerPixel = 2
+        self.mCompressionFlag = inCompressionFlag
+        self.mHeaderSize = len(theBuffer)
+        return self.mHeaderSize
@@ -0,0 +1,142 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Writes .npyz files (and .npy files) block by block, the counterpart of CCompressionBase
+
+The file starts with the npy header, whose minor version is the compression algorithm as
+CNpyHeader.ParseNpyHeader reads it, then the dictionary of the blocks, one (offset,size) uint64
+pair per block, reserved when the file is created and filled when it is closed, then the blocks.
+A block is an element of the first dimension of the shape: a plane of a (Z,Y,X) image, a
+timepoint of a single file multi timepoints (T,Y,X) image, a mask of a (NumMasks,Z,Y,X) mask file.
+
+The blocks are compressed as they arrive (zstd, zlib, lz4 or RLE, the masks are RLE), optionally by a pool
+of threads, and written in order. For a mask file, the block positions returned by Close() are
+the theMaskFileOffsets and theMaskCompressedSizes of the MaskRecord.
+
+    with CNpyzWriter(thePath, (theNumMasks, theNumZ, theNumY, theNumX), CCompressionBase().eCompressionRLE) as theWriter:
+        for theMask in theMasks:
+            theWriter.WriteBlock(theMask)
+    theBlockPositions = theWriter.GetBlockPositions()
+"""
+
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from CNpyHeader import CNpyHeader
+from CCompressionBase import CCompressionBase, kCompressionAlgorithms
+
+
+class CNpyzWriter(object):
+    """ Writes the blocks of a uint16 .npyz (or .npy if not compressed) file as they arrive """
+
+    def __init__(self, inPath, inShape, inAlgorithm=1, inLevel=1, inNumThreads=0):
+        """ Creates the file
+
+        Parameters
+        ----------
+        inPath: str
+            The path of the file
+        inShape: tuple of int
+            The shape of the data, the blocks are the elements of the first dimension
+        inAlgorithm: int, optional
+            CCompressionBase().eCompressionZstd (default), eCompressionZlib, eCompressionLz4, eCompressionRLE,
+            or eCompressionNone for a .npy file
+        inLevel: int, optional
+            The zstd level
+        inNumThreads: int, optional
+            The number of threads compressing the blocks, 0 (default) to compress in WriteBlock
+        """
+        self.mPath = inPath
+        self.mShape = tuple(int(theDim) for theDim in inShape)
+        self.mNumBlocks = self.mShape[0]
+        self.mBlockLength = int(np.prod(self.mShape[1:]))
+        self.mLevel = inLevel
+        self.mCompressor = CCompressionBase()
+        self.mCompressor.mAlgorythm = inAlgorithm
+        if inAlgorithm not in kCompressionAlgorithms.values():
+            raise Exception("CNpyzWriter: unsupported compression algorithm: " + str(inAlgorithm))
+        self.mBlockPositions = []
+        self.mPending = deque()
+        self.mExecutor = None
+        self.mMaxPending = 2 * inNumThreads
+        if inNumThreads > 0:
+            self.mExecutor = ThreadPoolExecutor(max_workers=inNumThreads, thread_name_prefix="CNpyzWriter")
+        self.mStream = open(inPath, "wb")
+        self.mHeaderSize = CNpyHeader().WriteNpyHeader(self.mStream, self.mShape, inAlgorithm)
+        if self.IsCompressed():
+            self.mStream.write(bytes(self.mNumBlocks * self.mCompressor.mBlockDictionarySize))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, inType, inValue, inTraceback):
+        if inType is None:
+            self.Close()
+        else:
+            self.Abort()
+
+    def IsCompressed(self):
+        return self.mCompressor.mAlgorythm != self.mCompressor.eCompressionNone
+
+    def GetBlockPositions(self):
+        """ the (offset,size) in the file of the blocks written so far, empty if not compressed """
+        if not self.IsCompressed():
+            return []
+        return list(self.mBlockPositions)
+
+    def CompressBlock(self, inData):
+        """ the bytes to write for a block, can be called from any thread """
+        theData = np.ascontiguousarray(inData, dtype=np.uint16)
+        if theData.size != self.mBlockLength:
+            raise Exception("CNpyzWriter: invalid block size: " + str(theData.size) + ", expected: " + str(self.mBlockLength))
+        if not self.IsCompressed():
+            return theData.tobytes()
+        return self.mCompressor.CompressBuffer(theData, self.mLevel)
+
+    def WriteBlock(self, inData):
+        """ compresses and writes the next block (a numpy array of the block shape) """
+        if self.mExecutor is None:
+            self.WriteCompressedBlock(self.CompressBlock(inData))
+            return
+        self.mPending.append(self.mExecutor.submit(self.CompressBlock, inData))
+        while len(self.mPending) >= self.mMaxPending:
+            self.WriteCompressedBlock(self.mPending.popleft().result())
+
+    def WriteCompressedBlock(self, inBuffer):
+        """ writes the next block, already compressed (by CompressBlock) """
+        if len(self.mBlockPositions) >= self.mNumBlocks:
+            raise Exception("CNpyzWriter: too many blocks written to: " + self.mPath)
+        thePosition = self.mStream.tell()
+        self.mStream.write(inBuffer)
+        self.mBlockPositions.append((thePosition, len(inBuffer)))
+
+    def Close(self):
+        """ writes the pending blocks and the dictionary, closes the file
+
+        Returns
+        -------
+        list of (int,int)
+            The (offset,size) of the blocks, empty if not compressed
+        """
+        try:
+            while len(self.mPending) > 0:
+                self.WriteCompressedBlock(self.mPending.popleft().result())
+            if len(self.mBlockPositions) != self.mNumBlocks:
+                raise Exception("CNpyzWriter: " + str(len(self.mBlockPositions)) + " blocks written, expected: " + str(self.mNumBlocks))
+            if self.IsCompressed():
+                self.mStream.seek(self.mHeaderSize, 0)
+                self.mStream.write(np.array(self.mBlockPositions, dtype=np.uint64).tobytes())
+        finally:
+            self.Abort()
+        return self.GetBlockPositions()
+
+    def Abort(self):
+        """ closes the file without completing it """
+        for theFuture in self.mPending:
+            theFuture.cancel()
+        self.mPending.clear()
+        if self.mExecutor is not None:
+            self.mExecutor.shutdown(wait=True)
+            self.mExecutor = None
+        if not self.mStream.closed:
+            self.mStream.close()
@@ -0,0 +1,131 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""A cache of decoded planes, shared by the SBReadFile objects of a process
+
+The planes are kept by (slide path, capture, timepoint, z plane, channel) up to a budget of
+bytes, the least recently used ones are dropped first. With each plane is kept the state
+(modification time, size) of its file when it was read: SBReadFile.Refresh() drops the
+planes of the capture whose file changed since. The planes are returned read only, as the
+planes read from uncompressed files are, since they are shared.
+
+    theCache = CPlaneCache(512 * 1024 * 1024)
+    theSBFileReader.SetPlaneCache(theCache)
+    theOtherSBFileReader.SetPlaneCache(theCache)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class CPlaneCache(object):
+    """ A least recently used cache of decoded planes, with a budget of bytes, thread safe """
+
+    def __init__(self, inMaxBytes=256 * 1024 * 1024):
+        self.mMaxBytes = inMaxBytes
+        self.mNumBytes = 0
+        self.mPlanes = OrderedDict()
+        self.mLock = threading.Lock()
+        self.mNumHits = 0
+        self.mNumMisses = 0
+
+    def GetKey(self, inSlidePath, inCaptureIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex):
+        return (os.path.abspath(inSlidePath), inCaptureIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex)
+
+    def GetFileState(self, inStream):
+        """ the state of an open file, compared by Refresh """
+        theStat = os.fstat(inStream.fileno())
+        return (theStat.st_mtime_ns, theStat.st_size)
+
+    def SetMaxBytes(self, inMaxBytes):
+        with self.mLock:
+            self.mMaxBytes = inMaxBytes
+            self.Evict()
+
+    def GetNumBytes(self):
+        return self.mNumBytes
+
+    def Get(self, inKey):
+        """ the plane (read only) or None """
+        with self.mLock:
+            theEntry = self.mPlanes.get(inKey)
+            if theEntry is None:
+                self.mNumMisses += 1
+                return None
+            self.mPlanes.move_to_end(inKey)
+            self.mNumHits += 1
+            return theEntry[0]
+
+    def Put(self, inKey, inPlane, inPath, inFileState):
+        """ keeps a plane read from inPath, whose state was inFileState before the read """
+        if inPlane.nbytes > self.mMaxBytes:
+            return inPlane
+        thePlane = inPlane.view()
+        thePlane.flags.writeable = False
+        with self.mLock:
+            theEntry = self.mPlanes.pop(inKey, None)
+            if theEntry is not None:
+                self.mNumBytes -= theEntry[0].nbytes
+            self.mPlanes[inKey] = (thePlane, inPath, inFileState)
+            self.mNumBytes += thePlane.nbytes
+            self.Evict()
+        return thePlane
+
+    def Evict(self):
+        # called with the lock held
+        while self.mNumBytes > self.mMaxBytes and len(self.mPlanes) > 0:
+            theEntry = self.mPlanes.popitem(last=False)[1]
+            self.mNumBytes -= theEntry[0].nbytes
+
+    def Invalidate(self, inSlidePath, inCaptureIndex=None, inOnlyChanged=False):
+        """ drops the planes of a slide, or of one of its captures, or only those whose file changed
+
+        Returns
+        -------
+        int
+            The number of planes dropped
+        """
+        theSlidePath = os.path.abspath(inSlidePath)
+        with self.mLock:
+            theKeys = [theKey for theKey in self.mPlanes if theKey[0] == theSlidePath and (inCaptureIndex is None or theKey[1] == inCaptureIndex)]
+        theFileStates = dict()
+        theNumDropped = 0
+        for theKey in theKeys:
+            with self.mLock:
+                theEntry = self.mPlanes.get(theKey)
+            if theEntry is None:
+                continue
+            if inOnlyChanged:
+                thePath = theEntry[1]
+                if thePath not in theFileStates:
+                    try:
+                        theStat = os.stat(thePath)
+                        theFileStates[thePath] = (theStat.st_mtime_ns, theStat.st_size)
+                    except OSError:
+                        theFileStates[thePath] = None
+                if theFileStates[thePath] == theEntry[2]:
+                    continue
+            with self.mLock:
+                if self.mPlanes.get(theKey) is theEntry:
+                    del self.mPlanes[theKey]
+                    self.mNumBytes -= theEntry[0].nbytes
+                    theNumDropped += 1
+        return theNumDropped
+
+    def Clear(self):
+        with self.mLock:
+            self.mPlanes.clear()
+            self.mNumBytes = 0
+
+
+gSharedPlaneCache = None
+gSharedPlaneCacheLock = threading.Lock()
+
+def GetSharedPlaneCache():
+    """ the cache of the process, created on first use with the default budget """
+    global gSharedPlaneCache
+    with gSharedPlaneCacheLock:
+        if gSharedPlaneCache is None:
+            gSharedPlaneCache = CPlaneCache()
+        return gSharedPlaneCache
@@ -0,0 +1,149 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Reads ahead the planes of a sequential walk through a capture
+
+DataLoader.ReadPlane hands every request to the prefetcher once DataLoader.EnablePrefetch()
+is called. When two consecutive requests follow one of the usual orders (z within a stack,
+then channel or time, or channel first, or time first), the next planes in that order are
+read and decompressed by a CPlaneReaderPool while the caller processes the current one.
+At most mNumPlanes planes are kept, a plane is dropped once it has been returned or when
+the walk changes direction. The byte ranges of the upcoming planes, in the files already
+open, are also advised to the kernel (posix_fadvise WILLNEED) so the reads are queued at once.
+
+    theSBFileReader.EnablePrefetch(8, 2)
+    for theZPlane in range(theNumZPlanes):
+        thePlane = theSBFileReader.ReadImagePlaneBuf(0, 0, 0, theZPlane, 0, True)
+"""
+
+import os
+from collections import OrderedDict
+from CPlaneReaderPool import CPlaneReaderPool
+
+
+class CPlanePrefetcher(object):
+    """ Detects sequential plane requests and reads the next planes in the background """
+
+    # the walk orders, the fastest changing index first
+    kOrders = (("z", "c", "t"), ("z", "t", "c"), ("c", "z", "t"), ("t", "z", "c"))
+
+    def __init__(self, inDataLoader, inNumPlanes=4, inNumThreads=2):
+        self.mDataLoader = inDataLoader
+        self.mNumPlanes = max(1, inNumPlanes)
+        self.mPool = CPlaneReaderPool(inDataLoader.mSlidePath, inNumThreads)
+        self.mPending = OrderedDict()
+        self.mLastKey = None
+        self.mOrder = None
+        self.mNumHits = 0
+        self.mNumMisses = 0
+
+    def Close(self):
+        self.Clear()
+        self.mPool.Close()
+
+    def Clear(self):
+        """ drops the planes read ahead, e.g. when the slide is being written """
+        for theFuture in self.mPending.values():
+            theFuture.cancel()
+        self.mPending.clear()
+        self.mLastKey = None
+        self.mOrder = None
+
+    def GetSizes(self, inCaptureId):
+        theImageGroup = self.mDataLoader.GetImageGroup(inCaptureId)
+        return {"t" : theImageGroup.GetNumTimepoints(), "z" : theImageGroup.GetNumPlanes(), "c" : theImageGroup.GetNumChannels()}
+
+    def GetNextKey(self, inKey, inOrder, inSizes):
+        """ the plane after inKey (capture, position, t, z, c) in the order, None at the end of the capture """
+        theIndexes = {"t" : inKey[2], "z" : inKey[3], "c" : inKey[4]}
+        for theAxis in inOrder:
+            theIndexes[theAxis] += 1
+            if theIndexes[theAxis] < inSizes[theAxis]:
+                return inKey[:2] + (theIndexes["t"], theIndexes["z"], theIndexes["c"])
+            theIndexes[theAxis] = 0
+        return None
+
+    def DetectOrder(self, inKey, inSizes):
+        if self.mLastKey is None or self.mLastKey[:2] != inKey[:2]:
+            return None
+        if self.mOrder is not None and self.GetNextKey(self.mLastKey, self.mOrder, inSizes) == inKey:
+            return self.mOrder
+        for theOrder in self.kOrders:
+            if self.GetNextKey(self.mLastKey, theOrder, inSizes) == inKey:
+                return theOrder
+        return None
+
+    def AdviseWillNeed(self, inKey):
+        # the range of a plane in a file already open by the DataLoader, its header and dictionary are known
+        if not hasattr(os, "posix_fadvise"):
+            return
+        theRange = self.mDataLoader.GetPlaneFileRange(inKey[0], inKey[2], inKey[3], inKey[4])
+        if theRange is None:
+            return
+        theStream, theOffset, theSize = theRange
+        try:
+            os.posix_fadvise(theStream.fileno(), theOffset, theSize, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+
+    def Schedule(self, inKey, inSizes):
+        # the window of the next planes: the others are dropped, the missing ones are submitted
+        theWindow = []
+        theKey = inKey
+        while len(theWindow) < self.mNumPlanes:
+            theKey = self.GetNextKey(theKey, self.mOrder, inSizes)
+            if theKey is None:
+                break
+            theWindow.append(theKey)
+        for theKey in list(self.mPending):
+            if theKey not in theWindow:
+                self.mPending.pop(theKey).cancel()
+        for theKey in theWindow:
+            if theKey not in self.mPending:
+                self.AdviseWillNeed(theKey)
+                self.mPending[theKey] = self.mPool.Submit(self.ReadPlaneInThread, theKey)
+
+    def ReadPlaneInThread(self, inReader, inKey):
+        # the plane, its file and the state of the file before the read (None if the plane could not be read)
+        theCaptureId, thePositionIndex, theTimepointIndex, theZPlaneIndex, theChannelIndex = inKey
+        theDataLoader = inReader.mDL
+        thePath = theDataLoader.GetPlaneDataFile(theDataLoader.GetImageGroup(theCaptureId), theTimepointIndex, theChannelIndex)
+        try:
+            theStat = os.stat(thePath)
+            theFileState = (theStat.st_mtime_ns, theStat.st_size)
+        except OSError:
+            theFileState = None
+        theNumErrors = len(theDataLoader.mErrorMessage)
+        thePlane = theDataLoader.ReadPlane(theCaptureId, thePositionIndex, theTimepointIndex, theZPlaneIndex, theChannelIndex, True)
+        if len(theDataLoader.mErrorMessage) != theNumErrors:
+            theFileState = None
+        return thePlane, thePath, theFileState
+
+    def ReadPlane(self, inCaptureId, inPositionIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex):
+        """ (the plane as a 2D array, its file, the state of the file before the read or None if the plane
+        is not valid) if it was read ahead, None otherwise (the caller reads it) """
+        theKey = (inCaptureId, inPositionIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex)
+        if theKey == self.mLastKey:
+            # the same plane again: the walk goes on
+            self.mNumMisses += 1
+            return None
+        theSizes = self.GetSizes(inCaptureId)
+        theFuture = self.mPending.pop(theKey, None)
+        self.mOrder = self.DetectOrder(theKey, theSizes)
+        self.mLastKey = theKey
+        if self.mOrder is None:
+            self.Clear()
+            self.mLastKey = theKey
+        else:
+            self.Schedule(theKey, theSizes)
+        if theFuture is None:
+            self.mNumMisses += 1
+            return None
+        try:
+            thePrefetched = theFuture.result()
+        except Exception:
+            # read again by the caller, which reports the error
+            self.mNumMisses += 1
+            return None
+        self.mNumHits += 1
+        return thePrefetched
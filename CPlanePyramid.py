@@ -0,0 +1,110 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Reduced resolution levels of the planes, for overviews of large planes
+
+Level 0 is the plane, each level halves the rows and the columns of the previous one
+(rounded up): 'mean' averages the blocks of 2x2 pixels as the OME-Zarr levels do
+(CZarrStore.Downsample2x, the last row or column is repeated for an odd size), 'stride' keeps
+their first pixel. A level is computed from the closest level already known, in memory or,
+optionally, in the sidecar directory of the capture (CSidecarStore, one file per plane and
+level), and the levels computed on the way are kept too.
+
+In memory the levels are kept in the plane cache of the DataLoader, when set, with the
+state of the ImageData file: Refresh drops them when the file changed, as it does the planes.
+The sidecar files carry the same state and are computed again once the file changed. The
+sidecar is off by default: a file per plane and level adds up to many small files, for a
+capture read often at reduced resolution it saves the reading and the downsampling.
+
+    theOverview = theSBFileReader.ReadPlaneLevel(0, theTimepoint, theZPlane, theChannel, 3)
+"""
+
+import os
+import numpy as np
+from CSidecarStore import CSidecarStore
+from CZarrStore import Downsample2x
+
+
+kModes = ("mean", "stride")
+
+def DownsamplePlane(inPlane, inMode="mean"):
+    """ the plane (2D uint16) halved in rows and columns, rounded up """
+    if inMode == "stride":
+        return np.ascontiguousarray(inPlane[::2, ::2])
+    if inMode != "mean":
+        raise Exception("CPlanePyramid: unknown downsampling mode: " + str(inMode))
+    return Downsample2x(inPlane)
+
+def GetLevelShape(inNumRows, inNumColumns, inLevel):
+    """ the (rows, columns) of a level """
+    theScale = 1 << inLevel
+    return ((inNumRows + theScale - 1) // theScale, (inNumColumns + theScale - 1) // theScale)
+
+def GetNumLevels(inNumRows, inNumColumns):
+    """ the number of levels down to a single pixel, level 0 included """
+    return max(inNumRows - 1, inNumColumns - 1, 1).bit_length() + 1
+
+
+class CPlanePyramid(object):
+    """ The levels of the planes of a capture """
+
+    def __init__(self, inSBFileReader, inCaptureIndex, inPositionIndex=0, inMode="mean", inUseSidecar=False):
+        inSBFileReader.mDL.CheckCaptureIndex(inCaptureIndex)
+        if inMode not in kModes:
+            raise Exception("CPlanePyramid: unknown downsampling mode: " + str(inMode))
+        self.mSBFileReader = inSBFileReader
+        self.mDataLoader = inSBFileReader.mDL
+        self.mCaptureIndex = inCaptureIndex
+        self.mPositionIndex = inPositionIndex
+        self.mMode = inMode
+        self.mImageGroup = self.mDataLoader.GetImageGroup(inCaptureIndex)
+        self.mSidecar = None
+        if inUseSidecar:
+            self.mSidecar = CSidecarStore(self.mImageGroup.mFile.GetSidecarDirectory(self.mImageGroup.mImageTitle))
+
+    def GetNumLevels(self):
+        return GetNumLevels(self.mImageGroup.GetNumRows(), self.mImageGroup.GetNumColumns())
+
+    def GetSidecarName(self, inTimepointIndex, inZPlaneIndex, inChannelIndex, inLevel):
+        return "Level%d_%s_Ch%d_TP%07d_Z%05d_P%d" % (inLevel, self.mMode, inChannelIndex, inTimepointIndex, inZPlaneIndex, self.mPositionIndex)
+
+    def GetCacheKey(self, inTimepointIndex, inZPlaneIndex, inChannelIndex, inLevel):
+        # the key of the plane, extended with the level: Invalidate matches the slide and the capture
+        theKey = self.mDataLoader.mPlaneCache.GetKey(self.mDataLoader.mSlidePath, self.mCaptureIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex)
+        return theKey + (self.mPositionIndex, self.mMode, inLevel)
+
+    def ReadLevel(self, inTimepointIndex, inZPlaneIndex, inChannelIndex, inLevel):
+        """ the level of a plane, a 2D uint16 array of GetLevelShape """
+        if inLevel < 0 or inLevel >= self.GetNumLevels():
+            raise Exception("CPlanePyramid: invalid level: " + str(inLevel) + ", number of levels: " + str(self.GetNumLevels()))
+        if inLevel == 0:
+            return self.mDataLoader.ReadPlane(self.mCaptureIndex, self.mPositionIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex, True)
+        thePlaneCache = self.mDataLoader.mPlaneCache
+        thePath = self.mDataLoader.GetPlaneDataFile(self.mImageGroup, inTimepointIndex, inChannelIndex)
+        try:
+            theStat = os.stat(thePath)
+            theFileState = (theStat.st_mtime_ns, theStat.st_size)
+        except OSError:
+            theFileState = (-1, -1)
+        # the closest level known, down from the one requested
+        theLevel = inLevel
+        thePlane = None
+        while theLevel > 0 and thePlane is None:
+            if thePlaneCache is not None:
+                thePlane = thePlaneCache.Get(self.GetCacheKey(inTimepointIndex, inZPlaneIndex, inChannelIndex, theLevel))
+            if thePlane is None and self.mSidecar is not None:
+                thePlane = self.mSidecar.Load(self.GetSidecarName(inTimepointIndex, inZPlaneIndex, inChannelIndex, theLevel), np.array(theFileState, dtype=np.int64))
+                if thePlane is not None and thePlaneCache is not None:
+                    thePlaneCache.Put(self.GetCacheKey(inTimepointIndex, inZPlaneIndex, inChannelIndex, theLevel), thePlane, thePath, theFileState)
+            if thePlane is None:
+                theLevel -= 1
+        if thePlane is None:
+            thePlane = self.mDataLoader.ReadPlane(self.mCaptureIndex, self.mPositionIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex, True)
+        while theLevel < inLevel:
+            thePlane = DownsamplePlane(thePlane, self.mMode)
+            theLevel += 1
+            if self.mSidecar is not None:
+                self.mSidecar.Save(self.GetSidecarName(inTimepointIndex, inZPlaneIndex, inChannelIndex, theLevel), thePlane, np.array(theFileState, dtype=np.int64))
+            if thePlaneCache is not None:
+                thePlane = thePlaneCache.Put(self.GetCacheKey(inTimepointIndex, inZPlaneIndex, inChannelIndex, theLevel), thePlane, thePath, theFileState)
+        return thePlane
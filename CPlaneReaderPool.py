@@ -0,0 +1,94 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Reads the planes of a slide with a pool of threads
+
+A DataLoader keeps its files open and is not thread safe, so every thread of the pool
+opens its own SBReadFile (essential metadata only), whose files are closed by Close(). ReadPlanes() keeps at most mMaxPending
+planes in flight and yields them in the requested order, so the memory is bounded and
+a single consumer (a file writer) can run while the next planes are read and decompressed.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from SBReadFile import SBReadFile
+
+
+class CPlaneReaderPool(object):
+    """ A pool of threads reading planes of one slide """
+    def __init__(self, inSlidePath, inNumThreads=4, inMaxPending=0):
+        self.mSlidePath = inSlidePath
+        self.mNumThreads = max(1, inNumThreads)
+        self.mMaxPending = inMaxPending if inMaxPending > 0 else 2 * self.mNumThreads
+        self.mLocal = threading.local()
+        # the readers of all the threads, their files are closed by Close
+        self.mReaders = []
+        self.mReadersLock = threading.Lock()
+        self.mExecutor = ThreadPoolExecutor(max_workers=self.mNumThreads, thread_name_prefix="CPlaneReaderPool")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, inType, inValue, inTraceback):
+        self.Close()
+
+    def Close(self):
+        self.mExecutor.shutdown(wait=True)
+        with self.mReadersLock:
+            for theReader in self.mReaders:
+                theReader.mDL.CloseFile()
+            self.mReaders = []
+
+    def GetReader(self):
+        """ the SBReadFile of the calling thread """
+        theReader = getattr(self.mLocal, "mReader", None)
+        if theReader is None:
+            theReader = SBReadFile()
+            if not theReader.Open(self.mSlidePath, False):
+                raise Exception("CPlaneReaderPool: could not open: " + self.mSlidePath)
+            self.mLocal.mReader = theReader
+            with self.mReadersLock:
+                self.mReaders.append(theReader)
+        return theReader
+
+    def ReadPlane(self, inCaptureIndex, inPositionIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex):
+        return self.GetReader().ReadImagePlaneBuf(inCaptureIndex, inPositionIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex, True)
+
+    def Submit(self, inFunction, *args):
+        """ runs inFunction(reader, *args) on a thread of the pool, returns a Future """
+        return self.mExecutor.submit(lambda: inFunction(self.GetReader(), *args))
+
+    def ReadPlanes(self, inCaptureIndex, inIndexes, inPositionIndex=0):
+        """ Reads planes in parallel, yields them in order
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group
+        inIndexes: iterable of (timepoint, z plane, channel)
+            The planes to read, consumed lazily
+        inPositionIndex: int, optional
+            The position of the planes
+
+        Yields
+        ------
+        tuple
+            the (timepoint, z plane, channel) and the plane as a 2D numpy uint16 array
+        """
+        thePending = deque()
+        try:
+            for theIndex in inIndexes:
+                theTimepoint, theZPlane, theChannel = theIndex
+                theFuture = self.mExecutor.submit(self.ReadPlane, inCaptureIndex, inPositionIndex, theTimepoint, theZPlane, theChannel)
+                thePending.append((theIndex, theFuture))
+                if len(thePending) >= self.mMaxPending:
+                    theIndex, theFuture = thePending.popleft()
+                    yield theIndex, theFuture.result()
+            while len(thePending) > 0:
+                theIndex, theFuture = thePending.popleft()
+                yield theIndex, theFuture.result()
+        finally:
+            # the consumer stopped early or failed: do not read the remaining planes
+            for theIndex, theFuture in thePending:
+                theFuture.cancel()
@@ -0,0 +1,82 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Intensity projections of a capture along z or time, computed plane by plane
+
+The planes are added one at a time to an accumulator of the size of a plane, so a projection
+never holds the stack: max keeps the maximum (uint16), sum the sum (uint64), mean and std
+the sum and the sum of the squares (float64). With more than one thread the planes are read
+and decompressed by a CPlaneReaderPool, a few planes ahead of the accumulation.
+
+    theMip = theSBFileReader.ProjectZ(0, theTimepoint, theChannel, "max")
+"""
+
+import numpy as np
+
+
+class CProjectionAccumulator(object):
+    """ Accumulates planes for a projection mode: 'max', 'mean', 'sum' or 'std' """
+
+    kModes = ("max", "mean", "sum", "std")
+
+    def __init__(self, inMode, inNumRows, inNumColumns):
+        if inMode not in self.kModes:
+            raise Exception("CProjectionAccumulator: unknown projection mode: " + str(inMode))
+        self.mMode = inMode
+        self.mNumPlanes = 0
+        self.mSumOfSquares = None
+        if inMode == "max":
+            self.mAccumulator = np.zeros((inNumRows, inNumColumns), dtype=np.uint16)
+        elif inMode == "sum":
+            self.mAccumulator = np.zeros((inNumRows, inNumColumns), dtype=np.uint64)
+        else:
+            self.mAccumulator = np.zeros((inNumRows, inNumColumns), dtype=np.float64)
+            if inMode == "std":
+                self.mSumOfSquares = np.zeros((inNumRows, inNumColumns), dtype=np.float64)
+                self.mSquare = np.empty((inNumRows, inNumColumns), dtype=np.float64)
+
+    def Add(self, inPlane):
+        if self.mMode == "max":
+            np.maximum(self.mAccumulator, inPlane, out=self.mAccumulator)
+        else:
+            np.add(self.mAccumulator, inPlane, out=self.mAccumulator)
+        if self.mSumOfSquares is not None:
+            np.multiply(inPlane, inPlane, out=self.mSquare, dtype=np.float64)
+            self.mSumOfSquares += self.mSquare
+        self.mNumPlanes += 1
+
+    def GetResult(self):
+        """ the projection: uint16 for max, uint64 for sum, float64 for mean and std (population) """
+        if self.mNumPlanes == 0:
+            raise Exception("CProjectionAccumulator: no plane to project")
+        if self.mMode == "mean":
+            return self.mAccumulator / self.mNumPlanes
+        if self.mMode == "std":
+            theMean = self.mAccumulator / self.mNumPlanes
+            theVariance = self.mSumOfSquares / self.mNumPlanes - theMean * theMean
+            return np.sqrt(np.maximum(theVariance, 0, out=theVariance), out=theVariance)
+        return self.mAccumulator
+
+
+def GetIndexRange(inRange, inNumIndexes):
+    """ the indexes of a (first, end) range, end excluded, all of them if inRange is None """
+    if inRange is None:
+        return range(inNumIndexes)
+    theFirst, theEnd = inRange
+    if theFirst < 0 or theEnd > inNumIndexes or theFirst >= theEnd:
+        raise Exception("Invalid projection range: " + str(inRange) + ", number of planes: " + str(inNumIndexes))
+    return range(theFirst, theEnd)
+
+def ProjectPlanes(inSBFileReader, inCaptureIndex, inPositionIndex, inIndexes, inMode, inNumThreads=1):
+    """ the projection of the planes inIndexes, a list of (timepoint, z plane, channel) """
+    theNumRows = inSBFileReader.GetNumYRows(inCaptureIndex)
+    theNumColumns = inSBFileReader.GetNumXColumns(inCaptureIndex)
+    theAccumulator = CProjectionAccumulator(inMode, theNumRows, theNumColumns)
+    if inNumThreads > 1 and len(inIndexes) > 1:
+        thePool = inSBFileReader.mDL.GetReaderPool(inNumThreads)
+        for theIndex, thePlane in thePool.ReadPlanes(inCaptureIndex, inIndexes, inPositionIndex):
+            theAccumulator.Add(thePlane)
+    else:
+        for theTimepoint, theZPlane, theChannel in inIndexes:
+            theAccumulator.Add(inSBFileReader.mDL.ReadPlane(inCaptureIndex, inPositionIndex, theTimepoint, theZPlane, theChannel, True))
+    return theAccumulator.GetResult()
@@ -10,6 +10,7 @@ class CSBFile70(object):
     kZSlideSuffix = ".sldyz"
     kRootDirSuffix = ".dir"
     kImageDirSuffix = ".imgdir"
+    kSidecarDirSuffix = ".sidecar"
     kBinaryFileSuffix = ".npy"
     kZBinaryFileSuffix = ".npyz";
     kImageRecordFilename = "ImageRecord.yaml"
@@ -94,6 +95,14 @@ class CSBFile70(object):
         theImageGroupDirectory = theRootDirectory + os.sep + inTitle + self.kImageDirSuffix + os.sep
         return theImageGroupDirectory
 
+    def GetSidecarDirectory(self, inTitle):
+        """ the directory of the data computed from an image group, next to the .dir: writing in the .imgdir would reorder the captures """
+        if inTitle == None:
+            return None
+        theRootDirectory = self.GetSlideRootDirectory()
+        theSidecarDirectory = re.sub(re.escape(self.kRootDirSuffix) + "$", self.kSidecarDirSuffix, theRootDirectory) + os.sep + inTitle + os.sep
+        return theSidecarDirectory
+
     def GetImageDataFile(self, inTitle, inChannel, inTimepoint):
         """ generated source for method GetImageDataFile """
         if inTitle == None:
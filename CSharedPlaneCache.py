@@ -0,0 +1,267 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""A cache of decoded planes shared by the processes of a machine
+
+The planes are kept in a memory mapped file under /dev/shm (the temporary directory where
+there is none), created by the first process and attached by name by the others, so a plane
+decoded by one worker is found by all of them. It is set like a CPlaneCache:
+
+    theCache = CSharedPlaneCache("analysis", 2 * 1024 * 1024 * 1024, 2048 * 2048 * 2)
+    theSBFileReader.SetPlaneCache(theCache)
+
+The file holds a table of slots then the planes, one plane per slot of inMaxPlaneBytes, a
+larger plane is not cached. A plane can be in one of the kNumWays slots of the set given by
+the hash of its key, the least recently used slot of the set is replaced. The writers hold
+a lock (flock on the file); the readers take no lock: each slot has a sequence number, odd
+while the slot is written, read before and after copying the plane, and the copy is only
+used if it did not change (seqlock). The plane is copied out of the shared memory since its
+slot can be reused at any time; a copy is much faster than decoding the plane again.
+
+The object can be pickled (it attaches the same file), e.g. given to multiprocessing workers.
+Remove() deletes the file once the analysis is done.
+
+The cache is POSIX only (Linux, macOS): it needs fcntl.flock and os.pread/os.pwrite, the
+constructor raises an exception elsewhere, e.g. on Windows, where a CPlaneCache per process
+is used instead.
+"""
+
+import os
+import mmap
+import time
+import struct
+import hashlib
+import tempfile
+import threading
+import numpy as np
+
+
+class CSharedPlaneCache(object):
+    """ A cache of decoded planes in shared memory, with lock free readers """
+
+    kMagic = b"SBPLANES"
+    kVersion = 1
+    kHeaderSize = 4096
+    kNumWays = 8
+    kMaxPathLength = 512
+    kSlotDtype = np.dtype([("mSequence", "<u8"), ("mKey", "<u8", (2,)), ("mSlide", "<u8"), ("mCapture", "<i8"),
+                           ("mLastUsed", "<u8"), ("mFileState", "<i8", (2,)), ("mNumRows", "<u4"), ("mNumColumns", "<u4"),
+                           ("mPath", "S" + str(kMaxPathLength))])
+
+    def __init__(self, inName, inMaxBytes=1024 * 1024 * 1024, inMaxPlaneBytes=2048 * 2048 * 2, inDirectory=None):
+        """ Creates the cache, or attaches it if a process already created it
+
+        Parameters
+        ----------
+        inName: str
+            The name of the cache, the same in all the processes
+        inMaxBytes: int, optional
+            The size of the planes area
+        inMaxPlaneBytes: int, optional
+            The size of a slot, the largest plane cached
+        inDirectory: str, optional
+            The directory of the file, /dev/shm by default
+        """
+        if not self.IsSupported():
+            raise Exception("CSharedPlaneCache: needs fcntl.flock and os.pread (POSIX), use a CPlaneCache on this platform")
+        if inDirectory is None:
+            inDirectory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        self.mName = inName
+        self.mDirectory = inDirectory
+        self.mPath = os.path.join(inDirectory, "SBPlaneCache_" + inName)
+        self.mMaxBytes = inMaxBytes
+        self.mMaxPlaneBytes = inMaxPlaneBytes
+        self.mNumSlots = max(1, inMaxBytes // inMaxPlaneBytes)
+        self.mNumWays = min(self.kNumWays, self.mNumSlots)
+        self.mNumSets = self.mNumSlots // self.mNumWays
+        self.mNumSlots = self.mNumSets * self.mNumWays
+        self.mTableSize = (self.mNumSlots * self.kSlotDtype.itemsize + mmap.PAGESIZE - 1) // mmap.PAGESIZE * mmap.PAGESIZE
+        self.mDataOffset = self.kHeaderSize + self.mTableSize
+        self.mWriteLock = threading.Lock()
+        self.mNumHits = 0
+        self.mNumMisses = 0
+        self.Attach()
+
+    @staticmethod
+    def IsSupported():
+        """ whether the platform has the file lock and the positioned reads the cache needs """
+        try:
+            import fcntl
+        except ImportError:
+            return False
+        return hasattr(fcntl, "flock") and hasattr(os, "pread") and hasattr(os, "pwrite")
+
+    def __getstate__(self):
+        return (self.mName, self.mMaxBytes, self.mMaxPlaneBytes, self.mDirectory)
+
+    def __setstate__(self, inState):
+        self.__init__(*inState)
+
+    def Attach(self):
+        theHeader = struct.pack("<8sIIQQ", self.kMagic, self.kVersion, self.mNumSlots, self.mMaxPlaneBytes, self.mMaxBytes)
+        theSize = self.mDataOffset + self.mNumSlots * self.mMaxPlaneBytes
+        self.mFile = os.fdopen(os.open(self.mPath, os.O_RDWR | os.O_CREAT, 0o600), "r+b")
+        with self.LockWriters():
+            if os.fstat(self.mFile.fileno()).st_size == 0:
+                # the file is sparse, the memory is used as the planes are written
+                os.ftruncate(self.mFile.fileno(), theSize)
+                os.pwrite(self.mFile.fileno(), theHeader, 0)
+            theIsValid = os.pread(self.mFile.fileno(), len(theHeader), 0) == theHeader and os.fstat(self.mFile.fileno()).st_size == theSize
+        if not theIsValid:
+            self.mFile.close()
+            raise Exception("CSharedPlaneCache: " + self.mPath + " exists with another layout")
+        self.mMap = mmap.mmap(self.mFile.fileno(), theSize)
+        self.mSlots = np.ndarray((self.mNumSlots,), dtype=self.kSlotDtype, buffer=self.mMap, offset=self.kHeaderSize)
+        self.mData = np.ndarray((self.mNumSlots, self.mMaxPlaneBytes // 2), dtype=np.uint16, buffer=self.mMap, offset=self.mDataOffset)
+
+    def Close(self):
+        """ detaches the cache, the file stays for the other processes """
+        self.mSlots = None
+        self.mData = None
+        self.mMap.close()
+        self.mFile.close()
+
+    def Remove(self):
+        """ detaches and deletes the cache """
+        self.Close()
+        try:
+            os.remove(self.mPath)
+        except OSError:
+            pass
+
+    def LockWriters(self):
+        return CWriterLock(self)
+
+    def GetKey(self, inSlidePath, inCaptureIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex):
+        return (os.path.abspath(inSlidePath), inCaptureIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex)
+
+    def GetFileState(self, inStream):
+        """ the state of an open file, compared by Refresh """
+        theStat = os.fstat(inStream.fileno())
+        return (theStat.st_mtime_ns, theStat.st_size)
+
+    def GetNumBytes(self):
+        return int(np.count_nonzero(self.mSlots["mNumRows"])) * self.mMaxPlaneBytes
+
+    def HashKey(self, inKey):
+        theDigest = hashlib.blake2b(repr(inKey).encode(), digest_size=16).digest()
+        return np.frombuffer(theDigest, dtype="<u8")
+
+    def HashSlide(self, inSlidePath):
+        return int(np.frombuffer(hashlib.blake2b(os.path.abspath(inSlidePath).encode(), digest_size=8).digest(), dtype="<u8")[0])
+
+    def GetSet(self, inHash):
+        theFirst = int(inHash[0] % self.mNumSets) * self.mNumWays
+        return range(theFirst, theFirst + self.mNumWays)
+
+    def FindSlot(self, inHash):
+        for theSlot in self.GetSet(inHash):
+            if self.mSlots["mKey"][theSlot][0] == inHash[0] and self.mSlots["mKey"][theSlot][1] == inHash[1]:
+                return theSlot
+        return -1
+
+    def Get(self, inKey):
+        """ a copy (read only) of the plane or None, without lock """
+        theHash = self.HashKey(inKey)
+        theSlot = self.FindSlot(theHash)
+        if theSlot >= 0:
+            theSequence = int(self.mSlots["mSequence"][theSlot])
+            theNumRows = int(self.mSlots["mNumRows"][theSlot])
+            theNumColumns = int(self.mSlots["mNumColumns"][theSlot])
+            if theSequence % 2 == 0 and theNumRows > 0:
+                thePlane = self.mData[theSlot, :theNumRows * theNumColumns].copy()
+                # the slot was not written meanwhile, and is still the plane of the key
+                if int(self.mSlots["mSequence"][theSlot]) == theSequence and self.FindSlot(theHash) == theSlot:
+                    self.mSlots["mLastUsed"][theSlot] = time.monotonic_ns()
+                    self.mNumHits += 1
+                    thePlane = thePlane.reshape(theNumRows, theNumColumns)
+                    thePlane.flags.writeable = False
+                    return thePlane
+        self.mNumMisses += 1
+        return None
+
+    def Put(self, inKey, inPlane, inPath, inFileState):
+        """ publishes a 2D plane read from inPath, whose state was inFileState before the read """
+        thePath = inPath.encode()
+        if inPlane.nbytes > self.mMaxPlaneBytes or inPlane.ndim != 2 or len(thePath) > self.kMaxPathLength:
+            return inPlane
+        theHash = self.HashKey(inKey)
+        with self.LockWriters():
+            theSlot = self.FindSlot(theHash)
+            if theSlot < 0:
+                theSet = self.GetSet(theHash)
+                theSlot = theSet[int(np.argmin(self.mSlots["mLastUsed"][theSet.start:theSet.stop]))]
+            theRecord = self.mSlots[theSlot]
+            theRecord["mSequence"] += 1
+            theRecord["mKey"] = theHash
+            theRecord["mSlide"] = self.HashSlide(inKey[0])
+            theRecord["mCapture"] = inKey[1]
+            theRecord["mFileState"] = inFileState
+            theRecord["mNumRows"] = inPlane.shape[0]
+            theRecord["mNumColumns"] = inPlane.shape[1]
+            theRecord["mPath"] = thePath
+            self.mData[theSlot, :inPlane.size] = inPlane.reshape(-1)
+            theRecord["mLastUsed"] = time.monotonic_ns()
+            theRecord["mSequence"] += 1
+        return inPlane
+
+    def ClearSlot(self, inSlot):
+        # called with the writers lock held
+        theRecord = self.mSlots[inSlot]
+        theRecord["mSequence"] += 1
+        theRecord["mKey"] = 0
+        theRecord["mNumRows"] = 0
+        theRecord["mLastUsed"] = 0
+        theRecord["mSequence"] += 1
+
+    def Invalidate(self, inSlidePath, inCaptureIndex=None, inOnlyChanged=False):
+        """ drops the planes of a slide, or of one of its captures, or only those whose file changed
+
+        Returns
+        -------
+        int
+            The number of planes dropped
+        """
+        theSlide = self.HashSlide(inSlidePath)
+        theNumDropped = 0
+        with self.LockWriters():
+            theIsMatching = (self.mSlots["mSlide"] == theSlide) & (self.mSlots["mNumRows"] > 0)
+            if inCaptureIndex is not None:
+                theIsMatching &= self.mSlots["mCapture"] == inCaptureIndex
+            theFileStates = dict()
+            for theSlot in np.flatnonzero(theIsMatching):
+                if inOnlyChanged:
+                    thePath = self.mSlots["mPath"][theSlot].decode()
+                    if thePath not in theFileStates:
+                        try:
+                            theStat = os.stat(thePath)
+                            theFileStates[thePath] = (theStat.st_mtime_ns, theStat.st_size)
+                        except OSError:
+                            theFileStates[thePath] = None
+                    if theFileStates[thePath] == tuple(int(theValue) for theValue in self.mSlots["mFileState"][theSlot]):
+                        continue
+                self.ClearSlot(theSlot)
+                theNumDropped += 1
+        return theNumDropped
+
+    def Clear(self):
+        with self.LockWriters():
+            for theSlot in np.flatnonzero(self.mSlots["mNumRows"] > 0):
+                self.ClearSlot(theSlot)
+
+
+class CWriterLock(object):
+    """ excludes the other writers: the threads of the process, then the other processes """
+    def __init__(self, inCache):
+        self.mCache = inCache
+
+    def __enter__(self):
+        import fcntl
+        self.mCache.mWriteLock.acquire()
+        fcntl.flock(self.mCache.mFile.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, inType, inValue, inTraceback):
+        import fcntl
+        fcntl.flock(self.mCache.mFile.fileno(), fcntl.LOCK_UN)
+        self.mCache.mWriteLock.release()
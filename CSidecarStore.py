@@ -0,0 +1,85 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Keeps data computed from a capture (histograms, reduced planes) next to the slide
+
+The files are written in the sidecar directory of the capture (CSBFile70.GetSidecarDirectory),
+outside the .dir of the slide: SlideBook orders the captures by the modification time of their
+.imgdir, which must not change. Each array is saved as a .npz file with the state (modification
+time and size) of the files it was computed from, Load() returns None once they changed.
+SaveArrays() and LoadArrays() keep several arrays in one file, e.g. compressed, the caller
+checks their state.
+Saving is best effort: a slide on a read only share simply has no sidecar.
+"""
+
+import os
+import zipfile
+import numpy as np
+
+
+class CSidecarStore(object):
+    """ Arrays computed from the files of a capture, saved in its sidecar directory """
+
+    kSuffix = ".npz"
+
+    def __init__(self, inDirectory):
+        self.mDirectory = inDirectory
+
+    def GetPath(self, inName):
+        return os.path.join(self.mDirectory, inName + self.kSuffix)
+
+    def GetFileState(self, inPaths):
+        """ the state of the source files, (modification time, size) of each, -1 for a missing file """
+        theState = []
+        for thePath in inPaths:
+            try:
+                theStat = os.stat(thePath)
+                theState += [theStat.st_mtime_ns, theStat.st_size]
+            except OSError:
+                theState += [-1, -1]
+        return np.array(theState, dtype=np.int64)
+
+    def Load(self, inName, inFileState):
+        """ the array saved as inName, None if there is none or it was computed from other files """
+        theArrays = self.LoadArrays(inName)
+        if theArrays is None or "mData" not in theArrays or not np.array_equal(theArrays.get("mFileState"), inFileState):
+            return None
+        return theArrays["mData"]
+
+    def Save(self, inName, inArray, inFileState):
+        """ saves an array computed from files in the state inFileState, returns False if it could not """
+        return self.SaveArrays(inName, {"mData": inArray, "mFileState": inFileState})
+
+    def LoadArrays(self, inName):
+        """ the arrays saved as inName by SaveArrays (a dict), None if there are none """
+        try:
+            with np.load(self.GetPath(inName)) as theFile:
+                return dict((theKey, theFile[theKey]) for theKey in theFile.files)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+    def SaveArrays(self, inName, inArrays, inCompressed=False):
+        """ saves a dict of arrays as inName, compressed (zip deflate) or not, returns False if it could not """
+        thePath = self.GetPath(inName)
+        theTemporaryPath = thePath + ".partial" + str(os.getpid())
+        try:
+            os.makedirs(self.mDirectory, exist_ok=True)
+            with open(theTemporaryPath, "wb") as theFile:
+                if inCompressed:
+                    np.savez_compressed(theFile, **inArrays)
+                else:
+                    np.savez(theFile, **inArrays)
+            os.replace(theTemporaryPath, thePath)
+        except OSError:
+            try:
+                os.remove(theTemporaryPath)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def Remove(self, inName):
+        try:
+            os.remove(self.GetPath(inName))
+        except OSError:
+            pass
@@ -0,0 +1,80 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""zarr 3 store adapter of a CZarrStore (CZarrStore.py)
+
+zarr 3 stores are asynchronous: the planes are read on worker threads (asyncio.to_thread),
+each with its own reader (see CZarrStore.GetReader).
+
+zarr package
+-----------------
+conda install zarr  or  pip install zarr
+"""
+
+import asyncio
+from zarr.abc.store import Store, RangeByteRequest, OffsetByteRequest, SuffixByteRequest
+
+
+class CZarr3Store(Store):
+    """ a read-only zarr 3 store over a CZarrStore """
+    def __init__(self, inStore):
+        super().__init__(read_only=True)
+        self.mStore = inStore
+
+    def __eq__(self, inOther):
+        return isinstance(inOther, CZarr3Store) and inOther.mStore is self.mStore
+
+    @property
+    def supports_writes(self):
+        return False
+
+    @property
+    def supports_deletes(self):
+        return False
+
+    @property
+    def supports_listing(self):
+        return True
+
+    async def get(self, key, prototype, byte_range=None):
+        if key not in self.mStore:
+            return None
+        theData = await asyncio.to_thread(self.mStore.__getitem__, key)
+        if isinstance(byte_range, RangeByteRequest):
+            theData = theData[byte_range.start:byte_range.end]
+        elif isinstance(byte_range, OffsetByteRequest):
+            theData = theData[byte_range.offset:]
+        elif isinstance(byte_range, SuffixByteRequest):
+            theData = theData[-byte_range.suffix:]
+        return prototype.buffer.from_bytes(theData)
+
+    async def get_partial_values(self, prototype, key_ranges):
+        return [await self.get(theKey, prototype, theRange) for theKey, theRange in key_ranges]
+
+    async def exists(self, key):
+        return key in self.mStore
+
+    async def set(self, key, value):
+        raise Exception("CZarr3Store: the store is read-only")
+
+    async def delete(self, key):
+        raise Exception("CZarr3Store: the store is read-only")
+
+    async def list(self):
+        for theKey in self.mStore:
+            yield theKey
+
+    async def list_prefix(self, prefix):
+        for theKey in self.mStore:
+            if theKey.startswith(prefix):
+                yield theKey
+
+    async def list_dir(self, prefix):
+        thePrefix = prefix.rstrip("/") + "/" if prefix else ""
+        theSeen = set()
+        for theKey in self.mStore:
+            if theKey.startswith(thePrefix):
+                theChild = theKey[len(thePrefix):].split("/")[0]
+                if theChild not in theSeen:
+                    theSeen.add(theChild)
+                    yield theChild
@@ -0,0 +1,353 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Chunked array access to SlideBook captures: a zarr store view and an OME-Zarr exporter
+
+CZarrStore presents a capture as a read-only zarr (format 2) store laid out as OME-Zarr 0.4:
+an array "0" of shape (T,C,Z,Y,X) with one chunk per plane. The chunk keys are mapped directly
+onto DataLoader.ReadPlane, nothing is converted or copied on disk. It is a Mapping, usable as is
+by zarr 2; CZarr3Store (CZarr3Store.py) wraps it for zarr 3 (OpenZarrGroup() picks the right one).
+
+    theStore = theSBFileReader.GetZarrStore(0)
+    theArray = OpenZarrGroup(theStore)["0"]        # or dask.array.from_zarr(...)
+
+COmeZarrWriter exports a capture to an OME-Zarr directory with multiscale levels (2x2 mean),
+one chunk per plane and level. The planes are read and the chunks written by a pool of threads,
+each chunk is written to a temporary file then renamed, so an interrupted export can be resumed:
+the chunks already written are skipped.
+
+zarr package (only needed to read the stores)
+-----------------
+conda install zarr  or  pip install zarr
+"""
+
+import os
+import json
+import zlib
+import threading
+import pyzstd
+import numpy as np
+from collections import deque
+from collections.abc import Mapping
+from SBReadFile import SBReadFile
+from CPlaneReaderPool import CPlaneReaderPool
+
+
+def GetZarrAttributes(inSBFileReader, inCaptureIndex, inNumLevels):
+    """ the OME-Zarr 0.4 group attributes (multiscales and omero) of a capture """
+    theXSize, theYSize, theZSize = inSBFileReader.GetVoxelSize(inCaptureIndex)
+    theNumTimepoints = inSBFileReader.GetNumTimepoints(inCaptureIndex)
+    theTimeInterval = 1.0
+    try:
+        if theNumTimepoints > 1:
+            theTimeInterval = (inSBFileReader.GetElapsedTime(inCaptureIndex, theNumTimepoints - 1) -
+                               inSBFileReader.GetElapsedTime(inCaptureIndex, 0)) / (theNumTimepoints - 1)
+    except IndexError:
+        pass
+    theAxes = [
+        {"name" : "t", "type" : "time", "unit" : "millisecond"},
+        {"name" : "c", "type" : "channel"},
+        {"name" : "z", "type" : "space", "unit" : "micrometer"},
+        {"name" : "y", "type" : "space", "unit" : "micrometer"},
+        {"name" : "x", "type" : "space", "unit" : "micrometer"},
+    ]
+    theDatasets = []
+    for theLevel in range(inNumLevels):
+        theFactor = 2 ** theLevel
+        theScale = [float(theTimeInterval) or 1.0, 1.0, float(theZSize) or 1.0, float(theYSize) * theFactor, float(theXSize) * theFactor]
+        theDatasets.append({"path" : str(theLevel), "coordinateTransformations" : [{"type" : "scale", "scale" : theScale}]})
+    theName = inSBFileReader.GetImageName(inCaptureIndex)
+    theChannels = []
+    for theChannel in range(inSBFileReader.GetNumChannels(inCaptureIndex)):
+        theChannels.append({"label" : inSBFileReader.GetChannelName(inCaptureIndex, theChannel), "color" : "FFFFFF", "active" : True,
+                            "window" : {"min" : 0, "max" : 65535, "start" : 0, "end" : 65535}})
+    return {
+        "multiscales" : [{"version" : "0.4", "name" : theName, "axes" : theAxes, "datasets" : theDatasets}],
+        "omero" : {"name" : theName, "channels" : theChannels, "rdefs" : {"defaultT" : 0, "defaultZ" : 0, "model" : "color"}},
+    }
+
+def GetZarrArrayMetadata(inShape, inCompressor=None):
+    """ the .zarray of a uint16 array with one chunk per plane """
+    return {
+        "zarr_format" : 2,
+        "shape" : list(inShape),
+        "chunks" : [1, 1, 1, inShape[3], inShape[4]],
+        "dtype" : "<u2",
+        "compressor" : inCompressor,
+        "fill_value" : 0,
+        "order" : "C",
+        "filters" : None,
+        "dimension_separator" : "/",
+    }
+
+def EncodeJson(inValue):
+    return json.dumps(inValue, indent=4).encode()
+
+def GetChunkKey(inLevel, inTimepointIndex, inChannelIndex, inZPlaneIndex):
+    return str(inLevel) + "/" + str(inTimepointIndex) + "/" + str(inChannelIndex) + "/" + str(inZPlaneIndex) + "/0/0"
+
+def Downsample2x(inPlane):
+    """ halves a 2D uint16 plane by averaging 2x2 pixels (rounded), the last row/column is repeated if odd """
+    theNumRows, theNumColumns = inPlane.shape
+    if theNumRows % 2 != 0 or theNumColumns % 2 != 0:
+        inPlane = np.pad(inPlane, ((0, theNumRows % 2), (0, theNumColumns % 2)), mode="edge")
+    # summed in place in a single uint32 array
+    theSum = inPlane[0::2, 0::2].astype(np.uint32)
+    theSum += inPlane[1::2, 0::2]
+    theSum += inPlane[0::2, 1::2]
+    theSum += inPlane[1::2, 1::2]
+    theSum += 2
+    theSum >>= 2
+    return theSum.astype(np.uint16)
+
+
+class CZarrStore(Mapping):
+    """ A read-only zarr (format 2) store of one capture, one chunk per plane read on demand
+
+    The store can be used from several threads (dask): the thread that created it uses the
+    given reader, the other threads open their own. It can also be pickled (dask distributed),
+    the slide is then reopened by the process which unpickles it.
+    """
+    def __init__(self, inSBFileReader, inCaptureIndex, inPositionIndex=0):
+        self.mSlidePath = inSBFileReader.mDL.mSlidePath
+        self.mCaptureIndex = inCaptureIndex
+        self.mPositionIndex = inPositionIndex
+        inSBFileReader.mDL.CheckCaptureIndex(inCaptureIndex)
+        self.mShape = (inSBFileReader.GetNumTimepoints(inCaptureIndex), inSBFileReader.GetNumChannels(inCaptureIndex),
+                       inSBFileReader.GetNumZPlanes(inCaptureIndex), inSBFileReader.GetNumYRows(inCaptureIndex),
+                       inSBFileReader.GetNumXColumns(inCaptureIndex))
+        self.mMetadata = {
+            ".zgroup" : EncodeJson({"zarr_format" : 2}),
+            ".zattrs" : EncodeJson(GetZarrAttributes(inSBFileReader, inCaptureIndex, 1)),
+            "0/.zarray" : EncodeJson(GetZarrArrayMetadata(self.mShape)),
+        }
+        self.mLocal = threading.local()
+        self.mLocal.mReader = inSBFileReader
+
+    def __getstate__(self):
+        theState = self.__dict__.copy()
+        del theState["mLocal"]
+        return theState
+
+    def __setstate__(self, inState):
+        self.__dict__.update(inState)
+        self.mLocal = threading.local()
+
+    def GetReader(self):
+        theReader = getattr(self.mLocal, "mReader", None)
+        if theReader is None:
+            theReader = SBReadFile()
+            if not theReader.Open(self.mSlidePath, False):
+                raise Exception("CZarrStore: could not open: " + self.mSlidePath)
+            self.mLocal.mReader = theReader
+        return theReader
+
+    def ParseChunkKey(self, inKey):
+        """ the (t,c,z) of a chunk key of the array "0", None if it is not a chunk of the capture """
+        theParts = inKey.split("/")
+        if len(theParts) != 6 or theParts[0] != "0" or theParts[4] != "0" or theParts[5] != "0":
+            return None
+        try:
+            theIndexes = tuple(int(thePart) for thePart in theParts[1:4])
+        except ValueError:
+            return None
+        for theIndex, theSize in zip(theIndexes, self.mShape):
+            if theIndex < 0 or theIndex >= theSize:
+                return None
+        return theIndexes
+
+    def __getitem__(self, inKey):
+        theMetadata = self.mMetadata.get(inKey)
+        if theMetadata is not None:
+            return theMetadata
+        theIndexes = self.ParseChunkKey(inKey)
+        if theIndexes is None:
+            raise KeyError(inKey)
+        theTimepoint, theChannel, theZPlane = theIndexes
+        theReader = self.GetReader()
+        return theReader.mDL.ReadPlane(self.mCaptureIndex, self.mPositionIndex, theTimepoint, theZPlane, theChannel).tobytes()
+
+    def __contains__(self, inKey):
+        return inKey in self.mMetadata or self.ParseChunkKey(inKey) is not None
+
+    def __iter__(self):
+        yield from self.mMetadata
+        theNumTimepoints, theNumChannels, theNumZPlanes = self.mShape[:3]
+        for theTimepoint in range(theNumTimepoints):
+            for theChannel in range(theNumChannels):
+                for theZPlane in range(theNumZPlanes):
+                    yield GetChunkKey(0, theTimepoint, theChannel, theZPlane)
+
+    def __len__(self):
+        return len(self.mMetadata) + self.mShape[0] * self.mShape[1] * self.mShape[2]
+
+
+def OpenZarrGroup(inStore):
+    """ opens a CZarrStore read-only with the installed zarr (2 or 3) """
+    import zarr
+    if int(zarr.__version__.split(".")[0]) >= 3:
+        from CZarr3Store import CZarr3Store
+        return zarr.open_group(CZarr3Store(inStore), mode="r", zarr_format=2)
+    return zarr.open_group(inStore, mode="r")
+
+
+class COmeZarrWriter(object):
+    """ Exports captures of a slide as OME-Zarr directories """
+
+    # the compressors, as zarr (numcodecs) declares them
+    kCompressors = ("zstd", "zlib")
+
+    def __init__(self, inSlidePath, inNumThreads=4):
+        self.mSlidePath = inSlidePath
+        self.mNumThreads = inNumThreads
+        self.mNumLevels = 0
+        self.mMinLevelSize = 256
+        self.mCompression = None
+        self.mCompressionLevel = 1
+        self.mPrintProgress = False
+        self.mPool = None
+        self.mSBFileReader = SBReadFile()
+        if not self.mSBFileReader.Open(inSlidePath):
+            raise Exception("COmeZarrWriter: could not open: " + inSlidePath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, inType, inValue, inTraceback):
+        self.Close()
+
+    def Close(self):
+        """ stops the reader threads, they are kept between exports otherwise """
+        if self.mPool is not None:
+            self.mPool.Close()
+            self.mPool = None
+
+    def GetPool(self):
+        if self.mPool is None:
+            self.mPool = CPlaneReaderPool(self.mSlidePath, self.mNumThreads)
+        return self.mPool
+
+    def SetNumLevels(self, inNumLevels):
+        """ the number of resolution levels, 0 (default) to halve until the planes are smaller than mMinLevelSize """
+        self.mNumLevels = inNumLevels
+
+    def SetCompression(self, inCompression, inLevel=1):
+        """ the compression of the chunks: 'zstd', 'zlib' or None """
+        if inCompression is not None and inCompression not in self.kCompressors:
+            raise Exception("COmeZarrWriter: unknown compression: " + str(inCompression))
+        self.mCompression = inCompression
+        self.mCompressionLevel = inLevel
+
+    def GetNumLevels(self, inNumRows, inNumColumns):
+        if self.mNumLevels > 0:
+            return self.mNumLevels
+        theNumLevels = 1
+        while max(inNumRows, inNumColumns) > self.mMinLevelSize:
+            inNumRows, inNumColumns = (inNumRows + 1) // 2, (inNumColumns + 1) // 2
+            theNumLevels += 1
+        return theNumLevels
+
+    def GetCompressor(self):
+        if self.mCompression is None:
+            return None
+        return {"id" : self.mCompression, "level" : self.mCompressionLevel}
+
+    def Compress(self, inPlane):
+        theBuffer = np.ascontiguousarray(inPlane).tobytes()
+        if self.mCompression == "zstd":
+            return pyzstd.compress(theBuffer, self.mCompressionLevel)
+        if self.mCompression == "zlib":
+            return zlib.compress(theBuffer, self.mCompressionLevel)
+        return theBuffer
+
+    def WriteFile(self, inPath, inData):
+        # written under another name then renamed: a chunk file is always complete
+        theTempPath = inPath + ".partial"
+        with open(theTempPath, "wb") as theFile:
+            theFile.write(inData)
+        os.replace(theTempPath, inPath)
+
+    def WriteMetadata(self, inZarrPath, inName, inValue, inResume):
+        thePath = os.path.join(inZarrPath, inName)
+        theData = EncodeJson(inValue)
+        if inResume and inName.endswith(".zarray") and os.path.exists(thePath):
+            with open(thePath, "rb") as theFile:
+                if json.loads(theFile.read()) != json.loads(theData):
+                    raise Exception("COmeZarrWriter: cannot resume, the existing array is different: " + thePath)
+        os.makedirs(os.path.dirname(thePath), exist_ok=True)
+        self.WriteFile(thePath, theData)
+
+    def GetChunkPaths(self, inZarrPath, inNumLevels, inTimepointIndex, inChannelIndex, inZPlaneIndex):
+        return [os.path.join(inZarrPath, *GetChunkKey(theLevel, inTimepointIndex, inChannelIndex, inZPlaneIndex).split("/"))
+                for theLevel in range(inNumLevels)]
+
+    def WriteChunks(self, inReader, inCaptureIndex, inPositionIndex, inIndex, inChunkPaths):
+        """ runs on a thread of the pool: reads a plane, writes its chunk at every level """
+        theTimepoint, theChannel, theZPlane = inIndex
+        thePlane = inReader.ReadImagePlaneBuf(inCaptureIndex, inPositionIndex, theTimepoint, theZPlane, theChannel, True)
+        for theLevel, thePath in enumerate(inChunkPaths):
+            if theLevel > 0:
+                thePlane = Downsample2x(thePlane)
+            os.makedirs(os.path.dirname(thePath), exist_ok=True)
+            self.WriteFile(thePath, self.Compress(thePlane))
+
+    def Export(self, inCaptureIndex, inZarrPath, inPositionIndex=0, inResume=True):
+        """ Exports a capture as an OME-Zarr directory
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inZarrPath: str
+            The path of the directory (.ome.zarr)
+        inPositionIndex: int, optional
+            The position of the images. If the image group is not a montage, use 0
+        inResume: bool, optional
+            if True (default), the planes whose chunks already exist are not written again
+
+        Returns
+        -------
+        int
+            The number of planes written
+        """
+        theReader = self.mSBFileReader
+        theReader.mDL.CheckCaptureIndex(inCaptureIndex)
+        theShape = (theReader.GetNumTimepoints(inCaptureIndex), theReader.GetNumChannels(inCaptureIndex),
+                    theReader.GetNumZPlanes(inCaptureIndex), theReader.GetNumYRows(inCaptureIndex),
+                    theReader.GetNumXColumns(inCaptureIndex))
+        theNumLevels = self.GetNumLevels(theShape[3], theShape[4])
+
+        os.makedirs(inZarrPath, exist_ok=True)
+        self.WriteMetadata(inZarrPath, ".zgroup", {"zarr_format" : 2}, inResume)
+        self.WriteMetadata(inZarrPath, ".zattrs", GetZarrAttributes(theReader, inCaptureIndex, theNumLevels), inResume)
+        theLevelShape = theShape
+        for theLevel in range(theNumLevels):
+            self.WriteMetadata(inZarrPath, str(theLevel) + "/.zarray", GetZarrArrayMetadata(theLevelShape, self.GetCompressor()), inResume)
+            theLevelShape = theLevelShape[:3] + ((theLevelShape[3] + 1) // 2, (theLevelShape[4] + 1) // 2)
+
+        thePool = self.GetPool()
+        theNumPlanes = theShape[0] * theShape[1] * theShape[2]
+        theNumWritten = 0
+        theCount = 0
+        thePending = deque()
+        try:
+            for theTimepoint in range(theShape[0]):
+                for theChannel in range(theShape[1]):
+                    for theZPlane in range(theShape[2]):
+                        theCount += 1
+                        if self.mPrintProgress and (theCount % 100 == 0 or theCount == theNumPlanes):
+                            print ("Exported planes: ", theCount, "/", theNumPlanes)
+                        theChunkPaths = self.GetChunkPaths(inZarrPath, theNumLevels, theTimepoint, theChannel, theZPlane)
+                        if inResume and all(os.path.exists(thePath) for thePath in theChunkPaths):
+                            continue
+                        thePending.append(thePool.Submit(self.WriteChunks, inCaptureIndex, inPositionIndex,
+                                                         (theTimepoint, theChannel, theZPlane), theChunkPaths))
+                        theNumWritten += 1
+                        if len(thePending) >= thePool.mMaxPending:
+                            thePending.popleft().result()
+            while len(thePending) > 0:
+                thePending.popleft().result()
+        finally:
+            for theFuture in thePending:
+                theFuture.cancel()
+        return theNumWritten
@@ -1,6 +1,7 @@
 __copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
 __license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
 
+from BaseDecoder import ComposeYaml
 from CMetadataLib import *
 from CCompressionBase import *
 from CSBFile70 import *
@@ -19,10 +20,15 @@ class DataLoader(object):
         self.mCImageGroupList = []
         self.mPathToStreamMap = dict()
         self.mCounterToPathMap = dict()
+        self.mPathToHeaderMap = dict()
+        self.mPathToCompressorMap = dict()
         self.kMaxNumberOpenFiles = 100
         self.mCurrentFileCounter = 0
         self.mDebugPrint = False
         self.mFirstPlaneOffset = 0
+        self.mPrefetcher = None
+        self.mPlaneCache = None
+        self.mReaderPool = None
 
     def CheckCaptureIndex(self,inCaptureIndex):
         if len(self.mCImageGroupList) == 0:
@@ -37,7 +43,7 @@ class DataLoader(object):
 
         
     def ReadSldFromStream(self, inInputStream):
-        theNode = yaml.compose(inInputStream)
+        theNode = ComposeYaml(inInputStream)
         self.mSlideRecord = CSlideRecord70()
         try:
             theLastIndex = self.mSlideRecord.Decode(theNode);
@@ -89,89 +95,250 @@ class DataLoader(object):
     def GetImageGroup(self, inCaptureId):
         return self.mCImageGroupList[inCaptureId]
 
+    def CloseOldestFile(self):
+        theCounter = next(iter(self.mCounterToPathMap))  # gets the first (oldest) entry
+        theKeyPath = self.mCounterToPathMap.pop(theCounter)
+        theKeyStream = self.mPathToStreamMap.pop(theKeyPath,None)
+        if theKeyStream != None:
+            theKeyStream.close()
+        self.mPathToHeaderMap.pop(theKeyPath,None)
+        self.mPathToCompressorMap.pop(theKeyPath,None)
+
+    def GetStream(self, inPath):
+        # the streams are kept open, up to kMaxNumberOpenFiles, with their header and compressor
+        if inPath in self.mPathToStreamMap:
+            return self.mPathToStreamMap[inPath]
+        while len(self.mCounterToPathMap) >= self.kMaxNumberOpenFiles:
+            self.CloseOldestFile()
+        try:
+            theStream = open(inPath,"rb")
+        except:
+            self.mErrorMessage += "Could not open file: " + inPath
+            return None
+        self.mPathToStreamMap[inPath] = theStream
+        self.mCounterToPathMap[self.mCurrentFileCounter] = inPath
+        self.mCurrentFileCounter += 1
+        return theStream
+
+    def EnablePrefetch(self, inNumPlanes=4, inNumThreads=2):
+        # reads ahead the next inNumPlanes planes of sequential ReadPlane calls, on inNumThreads threads
+        from CPlanePrefetcher import CPlanePrefetcher
+        self.DisablePrefetch()
+        self.mPrefetcher = CPlanePrefetcher(self, inNumPlanes, inNumThreads)
+
+    def DisablePrefetch(self):
+        if self.mPrefetcher != None:
+            self.mPrefetcher.Close()
+            self.mPrefetcher = None
+
+    def GetReaderPool(self, inNumThreads):
+        # a pool of reader threads, kept for the next calls with the same number of threads
+        from CPlaneReaderPool import CPlaneReaderPool
+        if self.mReaderPool == None or self.mReaderPool.mNumThreads != inNumThreads:
+            self.CloseReaderPool()
+            self.mReaderPool = CPlaneReaderPool(self.mSlidePath, inNumThreads)
+        return self.mReaderPool
+
+    def CloseReaderPool(self):
+        if self.mReaderPool != None:
+            self.mReaderPool.Close()
+            self.mReaderPool = None
+
+    def GetPlaneDataFile(self, inImageGroup, inTimepointIndex, inChannelIndex):
+        # the file of a plane: a single timepoint file holds all the timepoints in the file of timepoint 0
+        thePath = inImageGroup.mFile.GetImageDataFile(inImageGroup.mImageTitle, inChannelIndex, inTimepointIndex)
+        if inImageGroup.GetNumPlanes() == 1:
+            if inTimepointIndex > 0:
+                if inImageGroup.mSingleTimepointFile:
+                    teRes, theT0Path = inImageGroup.mFile.RenamePathToTimepoint0(thePath)
+                    thePath = theT0Path
+        return thePath
+
+    def GetPlaneFileRange(self, inCaptureId, inTimepointIndex, inZPlaneIndex, inChannelIndex):
+        # (stream, offset, size) of the bytes of a plane, None if its file is not open yet
+        theImageGroup = self.GetImageGroup(inCaptureId)
+        thePath = self.GetPlaneDataFile(theImageGroup, inTimepointIndex, inChannelIndex)
+        theStream = self.mPathToStreamMap.get(thePath)
+        theNpyHeader = self.mPathToHeaderMap.get(thePath)
+        if theStream == None or theNpyHeader == None:
+            return None
+        theBlock = inTimepointIndex if theImageGroup.mSingleTimepointFile else inZPlaneIndex
+        if theNpyHeader.mCompressionFlag == 0:
+            thePlaneSize = theImageGroup.GetNumColumns() * theImageGroup.GetNumRows() * theNpyHeader.mBytesPerPixel
+            return theStream, theNpyHeader.mHeaderSize + thePlaneSize * theBlock, thePlaneSize
+        theCompressor = self.mPathToCompressorMap.get(thePath)
+        if theCompressor == None or theBlock >= theCompressor.mNumBlocks or theCompressor.GetDataSizeForBlock(theBlock) == 0:
+            return None
+        return theStream, int(theCompressor.GetDataOffsetForBlock(theBlock)), int(theCompressor.GetDataSizeForBlock(theBlock))
+
     def ReadPlane(self, inCaptureId,  inPositionIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex, inAs2D=False):
         #print("ReadPlane: inPositionIndex: " , inPositionIndex)
         #print("ReadPlane: inTimepointIndex: " , inTimepointIndex)
         #print("ReadPlane: inZPlaneIndex: " , inZPlaneIndex)
         #print("ReadPlane: inChannelIndex: " , inChannelIndex)
+        if self.mPlaneCache != None:
+            theCacheKey = self.mPlaneCache.GetKey(self.mSlidePath, inCaptureId, inTimepointIndex, inZPlaneIndex, inChannelIndex)
+            theNpBuf = self.mPlaneCache.Get(theCacheKey)
+            if theNpBuf is not None:
+                return theNpBuf if inAs2D else theNpBuf.reshape(-1)
+        if self.mPrefetcher != None:
+            thePrefetched = self.mPrefetcher.ReadPlane(inCaptureId, inPositionIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex)
+            if thePrefetched is not None:
+                theNpBuf, thePath, theFileState = thePrefetched
+                if self.mPlaneCache != None and theFileState != None:
+                    # kept as the planes read here are, with the state of the file before the read
+                    theNpBuf = self.mPlaneCache.Put(theCacheKey, theNpBuf, thePath, theFileState)
+                return theNpBuf if inAs2D else theNpBuf.reshape(-1)
         theImageGroup = self.GetImageGroup(inCaptureId)
         theSbTimepointIndex = inTimepointIndex
-        thePath = theImageGroup.mFile.GetImageDataFile(theImageGroup.mImageTitle, inChannelIndex, theSbTimepointIndex)
+        thePath = self.GetPlaneDataFile(theImageGroup, theSbTimepointIndex, inChannelIndex)
         theNumRows = theImageGroup.GetNumRows()
         theNumColumns = theImageGroup.GetNumColumns()
         theNumPlanes = theImageGroup.GetNumPlanes()
-        if theNumPlanes == 1:
-            if theSbTimepointIndex > 0:
-                if theImageGroup.mSingleTimepointFile:
-                    teRes, theT0Path = theImageGroup.mFile.RenamePathToTimepoint0(thePath)
-                    thePath = theT0Path
 
-        if thePath not in self.mPathToStreamMap:
-            if len(self.mCounterToPathMap) > self.kMaxNumberOpenFiles:
-                theKeyValue = next(iter(self.mCounterToPathMap.values()))  # gets the first value
-                theKeyPath = self.mCounterToPathMap.get(theKeyValue)
-                if theKeyPath != None:
-                    theKeyStream = mPathToStreamMap.get(theKeyPath)
-                    if theKeyStream != None:
-                        theKeyStream.close()
-                        del self.mCounterToPathMap[theKeyValue]
-                        del self.mPathToStreamMap[theKeyPath]
-            try:
-                theStream = open(thePath,"rb")
-            except:
-                self.mErrorMessage += "Could not open file: " + thePath
-                theNpBuf = np.zeros(theNumRows*theNumColumns,dtype=np.uint16);
-                if inAs2D:
-                    theNpBuf = theNpBuf.reshape(theNumRows,theNumColumns)
-                return theNpBuf
-            if theImageGroup.mNpyHeader == None or inTimepointIndex != theImageGroup.mLastTimepoint or inChannelIndex != theImageGroup.mLastChannel:
-                theImageGroup.mLastTimepoint = inTimepointIndex
-                theImageGroup.mLastChannel = inChannelIndex
-                theImageGroup.mNpyHeader = CNpyHeader()
-                theRes = theImageGroup.mNpyHeader.ParseNpyHeader( theStream)
-                if not theRes:
-                    return False
-                theImageGroup.mCompressionFlag = theImageGroup.mNpyHeader.mCompressionFlag;
-                if theImageGroup.mCompressionFlag > 0:
-                    theImageGroup.mCompressor = CCompressionBase()
-                    theImageGroup.mCompressor.Initialize(theImageGroup.mNpyHeader.mHeaderSize,theImageGroup.mCompressionFlag,theNumColumns,theNumRows,theNumPlanes,0)
-                    theImageGroup.mCompressor.ReadDictionary(theStream)
-
-            self.mPathToStreamMap[thePath] = theStream
-            self.mCounterToPathMap[self.mCurrentFileCounter] = thePath
-            self.mCurrentFileCounter += 1
-        else:
-            theStream = self.mPathToStreamMap[thePath]
-
-        if theImageGroup.mCompressionFlag == 0:
-            thePlaneSize = theNumColumns * theNumRows * theImageGroup.mNpyHeader.mBytesPerPixel
+        theStream = self.GetStream(thePath)
+        if theStream == None:
+            theNpBuf = np.zeros(theNumRows*theNumColumns,dtype=np.uint16);
+            if inAs2D:
+                theNpBuf = theNpBuf.reshape(theNumRows,theNumColumns)
+            return theNpBuf
+        if self.mPlaneCache != None:
+            # the state of the file before the read, compared by Refresh
+            theFileState = self.mPlaneCache.GetFileState(theStream)
+
+        theNpyHeader = self.mPathToHeaderMap.get(thePath)
+        if theNpyHeader == None:
+            theNpyHeader = CNpyHeader()
+            theRes = theNpyHeader.ParseNpyHeader( theStream)
+            if not theRes:
+                return False
+            self.mPathToHeaderMap[thePath] = theNpyHeader
+            if theNpyHeader.mCompressionFlag > 0:
+                # one block per plane, or per timepoint for a single file containing multi time points
+                theNumBlocks = theNumPlanes
+                if len(theNpyHeader.mShape) == 3:
+                    theNumBlocks = theNpyHeader.mShape[0]
+                theCompressor = CCompressionBase()
+                theCompressor.InitializeEx(theNpyHeader.mHeaderSize,theNpyHeader.mCompressionFlag,theNumColumns,theNumRows,1,theNumBlocks,0)
+                theCompressor.ReadDictionary(theStream)
+                self.mPathToCompressorMap[thePath] = theCompressor
+        theImageGroup.mLastTimepoint = inTimepointIndex
+        theImageGroup.mLastChannel = inChannelIndex
+        theImageGroup.mNpyHeader = theNpyHeader
+        theImageGroup.mCompressionFlag = theNpyHeader.mCompressionFlag
+
+        if theNpyHeader.mCompressionFlag == 0:
+            thePlaneSize = theNumColumns * theNumRows * theNpyHeader.mBytesPerPixel
             if self.mDebugPrint:
                 print ("ReadPlane: thePlaneSize: " , thePlaneSize)
-            theSeekOffset = theImageGroup.mNpyHeader.mHeaderSize + thePlaneSize * inZPlaneIndex
+            theSeekOffset = theNpyHeader.mHeaderSize + thePlaneSize * inZPlaneIndex
             if theImageGroup.mSingleTimepointFile:
-                theSeekOffset = theImageGroup.mNpyHeader.mHeaderSize + thePlaneSize * theSbTimepointIndex
+                theSeekOffset = theNpyHeader.mHeaderSize + thePlaneSize * theSbTimepointIndex
             if self.mDebugPrint:
                 print ("ReadPlane: theSeekOffset: " , theSeekOffset)
             theStream.seek(theSeekOffset,0)
 
             ouBuf = theStream.read(thePlaneSize)
+            theNumValues = len(ouBuf) // theNpyHeader.mBytesPerPixel
         else:
-            ouBuf = theImageGroup.mCompressor.ReadData(theStream,inZPlaneIndex)
-
-        if len(ouBuf) < theNumRows*theNumColumns:
+            theCompressor = self.mPathToCompressorMap[thePath]
+            theImageGroup.mCompressor = theCompressor
+            theBlock = inZPlaneIndex
+            if theImageGroup.mSingleTimepointFile:
+                theBlock = theSbTimepointIndex
+            if theCompressor.GetDataSizeForBlock(theBlock) == 0:
+                # the file is still being written, reload the dictionary
+                theCompressor.ReadDictionary(theStream)
+            ouBuf = theCompressor.ReadData(theStream,theBlock)
+            theNumValues = len(ouBuf)
+
+        if theNumValues < theNumRows*theNumColumns:
             self.mErrorMessage += "Could not read the plane for path: " + thePath + "length found: " + str(len(ouBuf))
             theNpBuf = np.zeros(theNumRows*theNumColumns,dtype=np.uint16);
         else:
             theNpBuf = np.frombuffer(ouBuf,dtype=np.uint16)
+            if self.mPlaneCache != None:
+                theNpBuf = self.mPlaneCache.Put(theCacheKey, theNpBuf.reshape(theNumRows,theNumColumns), thePath, theFileState).reshape(-1)
         if inAs2D:
             theNpBuf = theNpBuf.reshape(theNumRows,theNumColumns)
 
 
         return theNpBuf
 
+    def SetPlaneCache(self, inPlaneCache):
+        self.mPlaneCache = inPlaneCache
+
+    def ReadStack(self, inCaptureId, inPositionIndex, inTimepointIndex, inChannelIndex):
+        # all the z planes of a timepoint and channel, as a new writable 3D array (nz,ny,nx)
+        # an uncompressed file holds the whole stack contiguously: it is read at once into the array
+        theImageGroup = self.GetImageGroup(inCaptureId)
+        theNumRows = theImageGroup.GetNumRows()
+        theNumColumns = theImageGroup.GetNumColumns()
+        theNumPlanes = theImageGroup.GetNumPlanes()
+        theFirstPlane = self.ReadPlane(inCaptureId, inPositionIndex, inTimepointIndex, 0, inChannelIndex, True)
+        ouStack = np.empty((theNumPlanes,theNumRows,theNumColumns),dtype=np.uint16)
+        # the plane may be read only (a file buffer or a cached plane), it is copied
+        ouStack[0] = theFirstPlane
+        if theNumPlanes == 1:
+            return ouStack
+        thePath = self.GetPlaneDataFile(theImageGroup, inTimepointIndex, inChannelIndex)
+        theNpyHeader = self.mPathToHeaderMap.get(thePath)
+        if theNpyHeader != None and theNpyHeader.mCompressionFlag == 0 and not theImageGroup.mSingleTimepointFile:
+            theStream = self.mPathToStreamMap[thePath]
+            theStream.seek(theNpyHeader.mHeaderSize,0)
+            if theStream.readinto(memoryview(ouStack).cast("B")) == ouStack.nbytes:
+                return ouStack
+            ouStack[0] = theFirstPlane
+        theCompressor = self.mPathToCompressorMap.get(thePath)
+        if theCompressor != None and not theImageGroup.mSingleTimepointFile:
+            # the compressed planes are decoded straight into the stack
+            theStream = self.mPathToStreamMap[thePath]
+            for theZPlane in range(1,theNumPlanes):
+                if theCompressor.GetDataSizeForBlock(theZPlane) == 0:
+                    theCompressor.ReadDictionary(theStream)
+                theCompressor.ReadData(theStream,theZPlane,ouStack[theZPlane])
+            return ouStack
+        for theZPlane in range(1,theNumPlanes):
+            ouStack[theZPlane] = self.ReadPlane(inCaptureId, inPositionIndex, inTimepointIndex, theZPlane, inChannelIndex, True)
+        return ouStack
+
     def CloseFile(self):
+        # closes the files kept open, with their headers and compressors, the next reads open them again
+        while len(self.mCounterToPathMap) > 0:
+            self.CloseOldestFile()
         return True
 
+    def ReadArrayFile(self, inPath):
+        # a whole .npy or .npyz file of any data type (the histograms), None if it does not exist
+        # an uncompressed file is memory mapped (read only), a compressed one is decoded block by block
+        if not os.path.exists(inPath):
+            return None
+        with open(inPath,"rb") as theStream:
+            theMajor, theMinor = np.lib.format.read_magic(theStream)
+            if theMajor == 1:
+                theShape, theFortranOrder, theDataType = np.lib.format.read_array_header_1_0(theStream)
+            else:
+                theShape, theFortranOrder, theDataType = np.lib.format.read_array_header_2_0(theStream)
+            theHeaderSize = theStream.tell()
+            if theMinor == 0:
+                if int(np.prod(theShape)) == 0:
+                    return np.zeros(theShape,dtype=theDataType)
+                return np.memmap(theStream,dtype=theDataType,mode="r",offset=theHeaderSize,shape=theShape,order="F" if theFortranOrder else "C")
+            # one block per element of the first dimension, or a single block for a 1D array
+            theNumBlocks = theShape[0] if len(theShape) > 1 else 1
+            theBlockShape = theShape[1:] if len(theShape) > 1 else theShape
+            theBlockSize = int(np.prod(theBlockShape)) * theDataType.itemsize
+            if theBlockSize % 2 != 0:
+                # the blocks are decoded as uint16
+                raise Exception("DataLoader: the blocks of " + inPath + " are " + str(theBlockSize) + " bytes, not a whole number of uint16")
+            theCompressor = CCompressionBase()
+            theCompressor.InitializeEx(theHeaderSize,theMinor,theBlockSize // theCompressor.mUint16Size,1,1,theNumBlocks,0)
+            ouArray = np.empty((theNumBlocks,) + tuple(theBlockShape),dtype=theDataType)
+            theBlocks = ouArray.reshape(theNumBlocks,-1).view(np.uint16)
+            for theBlock in range(theNumBlocks):
+                theCompressor.ReadData(theStream,theBlock,theBlocks[theBlock])
+            return ouArray.reshape(theShape)
+
     def ReadMaskBuf(self, inCaptureId, inMaskIndex,inTimepointIndex, inAs3D=False):
         #print("ReadPlane: inTimepointIndex: " , inTimepointIndex)
         #print("ReadPlane: inMaskIndex: " , inMaskIndex)
@@ -183,80 +350,66 @@ class DataLoader(object):
         theNumPlanes = theImageGroup.GetNumPlanes()
         theMaskSize = theNumRows * theNumColumns * theNumPlanes
 
-        if thePath not in self.mPathToStreamMap:
-            if len(self.mCounterToPathMap) > self.kMaxNumberOpenFiles:
-                theKeyValue = next(iter(self.mCounterToPathMap.values()))  # gets the first value
-                theKeyPath = self.mCounterToPathMap.get(theKeyValue)
-                if theKeyPath != None:
-                    theKeyStream = mPathToStreamMap.get(theKeyPath)
-                    if theKeyStream != None:
-                        theKeyStream.close()
-                        del self.mCounterToPathMap[theKeyValue]
-                        del self.mPathToStreamMap[theKeyPath]
-            try:
-                theStream = open(thePath,"rb")
-            except:
-                self.mErrorMessage += "Could not open file: " + thePath
+        theStream = self.GetStream(thePath)
+        if theStream == None:
+            theNpBuf = np.zeros(theMaskSize,dtype=np.uint16);
+            if inAs3D:
+                theNpBuf = theNpBuf.reshape(theNumPlanes,theNumRows,theNumColumns)
+            return theNpBuf
+
+        theMaskCompressor = self.mPathToCompressorMap.get(thePath)
+        if theMaskCompressor == None:
+            theImageGroup.mMaskNpyHeader = CNpyHeader()
+            theRes = theImageGroup.mMaskNpyHeader.ParseNpyHeader( theStream)
+            if not theRes:
+                return False
+            theNumDim = len(theImageGroup.mMaskNpyHeader.mShape)
+            theNumBlocks = 0
+            j = 0
+            if theNumDim == 4:
+                theNumBlocks = theImageGroup.mMaskNpyHeader.mShape[j]
+                j += 1
+
+            theNumMaskPlanes = theImageGroup.mMaskNpyHeader.mShape[j]
+            theNumMaskRows = theImageGroup.mMaskNpyHeader.mShape[j+1]
+            theNumMaskColumns = theImageGroup.mMaskNpyHeader.mShape[j+2]
+            theCompressionFlag = theImageGroup.mMaskNpyHeader.mCompressionFlag
+            if theNumMaskPlanes != theNumPlanes or theNumMaskRows != theNumRows or theNumMaskColumns != theNumColumns:
+                s = f"""
+                Error: Mask Size does not match Image size:
+                Num Mask Planes = {theNumMaskPlanes},
+                Num Image Planes = {theNumPlanes}
+                Num Mask Rows = {theNumMaskRows},
+                Num Image Rows = {theNumRows}
+                Num Mask Columns = {theNumMaskColumns},
+                Num Image Columns = {theNumColumns}
+                """
+                self.mErrorMessage += s
+                theNpBuf = np.zeros(theMaskSize,dtype=np.uint16);
+                if inAs3D:
+                    theNpBuf = theNpBuf.reshape(theNumPlanes,theNumRows,theNumColumns)
+                return theNpBuf
+
+            if theCompressionFlag == 0:
+                self.mErrorMessage += "Error: Mask File: " + thePath + " is not compressed"
                 theNpBuf = np.zeros(theMaskSize,dtype=np.uint16);
                 if inAs3D:
                     theNpBuf = theNpBuf.reshape(theNumPlanes,theNumRows,theNumColumns)
                 return theNpBuf
-            if theImageGroup.mMaskNpyHeader == None or inTimepointIndex != theImageGroup.mLastTimepoint:
-                #theImageGroup.mLastTimepoint = inTimepointIndex
-                #theImageGroup.mLastChannel = inChannelIndex
-                theImageGroup.mMaskNpyHeader = CNpyHeader()
-                theRes = theImageGroup.mMaskNpyHeader.ParseNpyHeader( theStream)
-                if not theRes:
-                    return False
-                theNumDim = len(theImageGroup.mMaskNpyHeader.mShape)
-                theNumBlocks = 0
-                j = 0
-                if theNumDim == 4:
-                    theNumBlocks = theImageGroup.mMaskNpyHeader.mShape[j]
-                    j += 1
-
-                theNumMaskPlanes = theImageGroup.mMaskNpyHeader.mShape[j]
-                theNumMaskRows = theImageGroup.mMaskNpyHeader.mShape[j+1]
-                theNumMaskColumns = theImageGroup.mMaskNpyHeader.mShape[j+2]
-                theCompressionFlag = theImageGroup.mMaskNpyHeader.mCompressionFlag
-                if theNumMaskPlanes != theNumPlanes or theNumMaskRows != theNumRows or theNumMaskColumns != theNumColumns:
-                    s = f"""
-                    Error: Mask Size does not match Image size:
-                    Num Mask Planes = {theNumMaskPlanes},
-                    Num Image Planes = {theNumPlanes}
-                    Num Mask Rows = {theNumMaskRows},
-                    Num Image Rows = {theNumRows}
-                    Num Mask Columns = {theNumMaskColumns},
-                    Num Image Columns = {theNumColumns}
-                    """
-                    self.mErrorMessage += s
-                    theNpBuf = np.zeros(theMaskSize,dtype=np.uint16);
-                    if inAs3D:
-                        theNpBuf = theNpBuf.reshape(theNumPlanes,theNumRows,theNumColumns)
-
-                if theCompressionFlag == 0:
-                    self.mErrorMessage += "Error: Mask File: " + thePath + " is not compressed"
-                    theNpBuf = np.zeros(theMaskSize,dtype=np.uint16);
-                    if inAs3D:
-                        theNpBuf = theNpBuf.reshape(theNumPlanes,theNumRows,theNumColumns)
-                    return theNpBuf
-
-
-                theImageGroup.mMaskCompressor = CCompressionBase()
-                if theNumDim == 4:
-                    theImageGroup.mMaskCompressor.InitializeEx(theImageGroup.mMaskNpyHeader.mHeaderSize,theImageGroup.mMaskNpyHeader.mCompressionFlag,theNumMaskColumns,theNumMaskRows,theNumMaskPlanes,theNumBlocks,0)
-                else:
-                    theImageGroup.mMaskCompressor.Initialize(theImageGroup.mMaskNpyHeader.mHeaderSize,theImageGroup.mMaskNpyHeader.mCompressionFlag,theNumMaskColumns,theNumMaskRows,theNumMaskPlanes,0)
 
-                theImageGroup.mMaskCompressor.ReadDictionary(theStream)
 
-            self.mPathToStreamMap[thePath] = theStream
-            self.mCounterToPathMap[self.mCurrentFileCounter] = thePath
-            self.mCurrentFileCounter += 1
-        else:
-            theStream = self.mPathToStreamMap[thePath]
+            theMaskCompressor = CCompressionBase()
+            if theNumDim == 4:
+                theMaskCompressor.InitializeEx(theImageGroup.mMaskNpyHeader.mHeaderSize,theImageGroup.mMaskNpyHeader.mCompressionFlag,theNumMaskColumns,theNumMaskRows,theNumMaskPlanes,theNumBlocks,0)
+            else:
+                theMaskCompressor.Initialize(theImageGroup.mMaskNpyHeader.mHeaderSize,theImageGroup.mMaskNpyHeader.mCompressionFlag,theNumMaskColumns,theNumMaskRows,theNumMaskPlanes,0)
+
+            theMaskCompressor.ReadDictionary(theStream)
+            self.mPathToHeaderMap[thePath] = theImageGroup.mMaskNpyHeader
+            self.mPathToCompressorMap[thePath] = theMaskCompressor
+        theImageGroup.mMaskCompressor = theMaskCompressor
 
-        ouBuf = theImageGroup.mMaskCompressor.ReadData(theStream,inMaskIndex)
+        ouBuf = theMaskCompressor.ReadData(theStream,inMaskIndex)
 
         if len(ouBuf) < theMaskSize:
             self.mErrorMessage += "Could not read the mask for path: " + thePath + "length found: " + str(len(ouBuf))
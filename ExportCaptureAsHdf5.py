@@ -0,0 +1,236 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Exports captures as chunked, compressed HDF5 datasets
+
+Each capture is written as a uint16 dataset /capture_<n> of shape (T,C,Z,Y,X), one chunk per
+plane, with the metadata as attributes (element_size_um, channel_names, elapsed_times_ms...).
+A pool of threads (CPlaneReaderPool) reads the planes and compresses the chunks, the calling
+thread, the only one using HDF5, writes them as they are (write_direct_chunk) in order.
+At most a few planes are in flight, so the memory is bounded whatever the size of the capture.
+
+The filters are the registered HDF5 ones: gzip (built in), zstd and lz4. Reading zstd or lz4
+datasets needs the filters, e.g. import hdf5plugin before opening the file with h5py.
+
+usage:
+python ExportCaptureAsHdf5.py -i input_file.sldy -o output_file.h5 [-n capture_number] [-c gzip|zstd|lz4|none] [-l level] [-j threads]
+example:
+python ExportCaptureAsHdf5.py -i c:\\Data\\Slides\\Slide1.sldyz -o c:\\Data\\H5\\Slide1.h5 -c zstd
+    -n the capture (base 0), all the captures by default
+    -c the filter of the chunks (default gzip)
+    -l the compression level (default 1)
+    -j the number of reader threads (default 4)
+
+h5py package
+-----------------
+conda install h5py  or  pip install h5py
+lz4 compression needs the lz4 package (pip install lz4)
+"""
+
+from SBReadFile import *
+from CPlaneReaderPool import CPlaneReaderPool
+from collections import deque
+import numpy as np
+import sys, getopt
+import struct
+import zlib
+import pyzstd
+import h5py
+
+
+class CHdf5Exporter(object):
+    """ Exports captures of a slide as HDF5 datasets """
+
+    # the registered HDF5 filter ids
+    kFilterIds = {"gzip" : 1, "lz4" : 32004, "zstd" : 32015}
+
+    def __init__(self, inSlidePath, inNumThreads=4):
+        self.mSlidePath = inSlidePath
+        self.mNumThreads = inNumThreads
+        self.mFilter = "gzip"
+        self.mCompressionLevel = 1
+        self.mPrintProgress = False
+        self.mPool = None
+        self.mSBFileReader = SBReadFile()
+        if not self.mSBFileReader.Open(inSlidePath):
+            raise Exception("CHdf5Exporter: could not open: " + inSlidePath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, inType, inValue, inTraceback):
+        self.Close()
+
+    def Close(self):
+        """ stops the reader threads, they are kept between exports otherwise """
+        if self.mPool is not None:
+            self.mPool.Close()
+            self.mPool = None
+
+    def GetPool(self):
+        if self.mPool is None:
+            self.mPool = CPlaneReaderPool(self.mSlidePath, self.mNumThreads)
+        return self.mPool
+
+    def SetFilter(self, inFilter, inLevel=1):
+        """ the filter of the chunks: 'gzip', 'zstd', 'lz4' or None """
+        if inFilter is not None and inFilter not in self.kFilterIds:
+            raise Exception("CHdf5Exporter: unknown filter: " + str(inFilter))
+        if inFilter == "lz4":
+            import lz4.block
+        self.mFilter = inFilter
+        self.mCompressionLevel = inLevel
+
+    def Compress(self, inPlane):
+        """ a chunk encoded as the HDF5 filter does """
+        theBuffer = np.ascontiguousarray(inPlane).tobytes()
+        if self.mFilter == "gzip":
+            return zlib.compress(theBuffer, self.mCompressionLevel)
+        if self.mFilter == "zstd":
+            return pyzstd.compress(theBuffer, self.mCompressionLevel)
+        if self.mFilter == "lz4":
+            # H5Zlz4: total size (8 bytes), block size (4 bytes), then each block with its size (4 bytes), big endian
+            import lz4.block
+            theBlock = lz4.block.compress(theBuffer, store_size=False)
+            if len(theBlock) >= len(theBuffer):
+                theBlock = theBuffer
+            return struct.pack(">qi", len(theBuffer), len(theBuffer)) + struct.pack(">i", len(theBlock)) + theBlock
+        return theBuffer
+
+    def ReadChunk(self, inReader, inCaptureIndex, inIndex):
+        """ runs on a thread of the pool: reads and compresses a plane """
+        theTimepoint, theChannel, theZPlane = inIndex
+        thePlane = inReader.ReadImagePlaneBuf(inCaptureIndex, 0, theTimepoint, theZPlane, theChannel, True)
+        return self.Compress(thePlane)
+
+    def WriteChunk(self, inDataset, inPending, inCount, inNumPlanes):
+        """ writes the chunk of a pending read, in the calling thread, returns the number of chunks written """
+        theIndex, theFuture = inPending
+        inDataset.id.write_direct_chunk(theIndex + (0, 0), theFuture.result())
+        inCount += 1
+        if self.mPrintProgress and (inCount % 100 == 0 or inCount == inNumPlanes):
+            print ("Exported planes: ", inCount, "/", inNumPlanes)
+        return inCount
+
+    def CreateDataset(self, inFile, inName, inShape):
+        theChunks = (1, 1, 1, inShape[3], inShape[4])
+        if self.mFilter is None:
+            return inFile.create_dataset(inName, shape=inShape, dtype=np.uint16, chunks=theChunks)
+        if self.mFilter == "gzip":
+            return inFile.create_dataset(inName, shape=inShape, dtype=np.uint16, chunks=theChunks, compression="gzip",
+                                         compression_opts=self.mCompressionLevel)
+        # the chunks are compressed here, the filter only needs to be known to read them back
+        return inFile.create_dataset(inName, shape=inShape, dtype=np.uint16, chunks=theChunks, compression=self.kFilterIds[self.mFilter],
+                                     allow_unknown_filter=True)
+
+    def WriteAttributes(self, inDataset, inCaptureIndex):
+        theReader = self.mSBFileReader
+        theXSize, theYSize, theZSize = theReader.GetVoxelSize(inCaptureIndex)
+        theNumChannels = theReader.GetNumChannels(inCaptureIndex)
+        inDataset.attrs["axes"] = "TCZYX"
+        inDataset.attrs["element_size_um"] = np.array([theZSize, theYSize, theXSize], dtype=np.float64)
+        inDataset.attrs["capture_name"] = theReader.GetImageName(inCaptureIndex)
+        inDataset.attrs["channel_names"] = [theReader.GetChannelName(inCaptureIndex, theChannel) for theChannel in range(theNumChannels)]
+        inDataset.attrs["exposure_times_ms"] = np.array([theReader.GetExposureTime(inCaptureIndex, theChannel) for theChannel in range(theNumChannels)], dtype=np.float64)
+        try:
+            theElapsedTimes = [theReader.GetElapsedTime(inCaptureIndex, theTimepoint) for theTimepoint in range(theReader.GetNumTimepoints(inCaptureIndex))]
+            inDataset.attrs["elapsed_times_ms"] = np.array(theElapsedTimes, dtype=np.float64)
+        except IndexError:
+            pass
+
+    def Export(self, inCaptureIndex, inHdf5File, inName=None):
+        """ Exports a capture as a dataset of an HDF5 file
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inHdf5File: h5py.File or h5py.Group
+            The file (or group) where the dataset is created
+        inName: str, optional
+            The name of the dataset, capture_<inCaptureIndex> by default
+
+        Returns
+        -------
+        int
+            The number of planes written
+        """
+        theReader = self.mSBFileReader
+        theReader.mDL.CheckCaptureIndex(inCaptureIndex)
+        if inName is None:
+            inName = "capture_" + str(inCaptureIndex)
+        theShape = (theReader.GetNumTimepoints(inCaptureIndex), theReader.GetNumChannels(inCaptureIndex),
+                    theReader.GetNumZPlanes(inCaptureIndex), theReader.GetNumYRows(inCaptureIndex),
+                    theReader.GetNumXColumns(inCaptureIndex))
+        theDataset = self.CreateDataset(inHdf5File, inName, theShape)
+        self.WriteAttributes(theDataset, inCaptureIndex)
+
+        thePool = self.GetPool()
+        theNumPlanes = theShape[0] * theShape[1] * theShape[2]
+        theCount = 0
+        thePending = deque()
+        try:
+            # the planes in the order of the files: timepoint, channel, z
+            for theTimepoint in range(theShape[0]):
+                for theChannel in range(theShape[1]):
+                    for theZPlane in range(theShape[2]):
+                        theIndex = (theTimepoint, theChannel, theZPlane)
+                        thePending.append((theIndex, thePool.Submit(self.ReadChunk, inCaptureIndex, theIndex)))
+                        if len(thePending) >= thePool.mMaxPending:
+                            theCount = self.WriteChunk(theDataset, thePending.popleft(), theCount, theNumPlanes)
+            while len(thePending) > 0:
+                theCount = self.WriteChunk(theDataset, thePending.popleft(), theCount, theNumPlanes)
+        finally:
+            for theIndex, theFuture in thePending:
+                theFuture.cancel()
+        return theCount
+
+
+def usage():
+    print ('usage: python ExportCaptureAsHdf5.py -i <sldy input_file> -o <output h5 file> [-n capture_number] [-c gzip|zstd|lz4|none] [-l level] [-j threads]')
+    print ('       exports a capture (base 0), or all, as (T,C,Z,Y,X) datasets of an HDF5 file')
+
+def main(argv):
+    theFileName = ''
+    theHdf5FileName = ''
+    theCapture = -1
+    theFilter = 'gzip'
+    theLevel = 1
+    theNumThreads = 4
+    try:
+        opts, args = getopt.getopt(argv,'hi:o:n:c:l:j:',['ifile=','ofile='])
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit()
+        elif opt in ("-i", "--ifile"):
+            theFileName = arg
+        elif opt in ("-o", "--ofile"):
+            theHdf5FileName = arg
+        elif opt == '-n':
+            theCapture = int(arg)
+        elif opt == '-c':
+            theFilter = None if arg == 'none' else arg
+        elif opt == '-l':
+            theLevel = int(arg)
+        elif opt == '-j':
+            theNumThreads = int(arg)
+    if theFileName == '' or theHdf5FileName == '':
+        usage()
+        sys.exit(2)
+
+    with CHdf5Exporter(theFileName, theNumThreads) as theExporter:
+        theExporter.SetFilter(theFilter, theLevel)
+        theExporter.mPrintProgress = True
+        theCaptures = [theCapture] if theCapture >= 0 else range(theExporter.mSBFileReader.GetNumCaptures())
+        with h5py.File(theHdf5FileName, 'w') as theFile:
+            for theIndex in theCaptures:
+                theNumPlanes = theExporter.Export(theIndex, theFile)
+                print ('Written ', theNumPlanes, ' planes of capture ', theIndex, ' to: ', theHdf5FileName)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,240 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Exports captures as multi-page OME-TIFF (BigTIFF when needed) files
+
+A whole capture, or a subset of its timepoints, channels and z planes, is written in one
+file with the axes TCZYX. A pool of reader threads (CPlaneReaderPool) reads and decompresses
+the planes ahead of the writer, the calling thread, which streams them into the file, so the
+memory stays bounded by a few planes whatever the size of the capture. With a single thread,
+the writer reads the planes itself, with the SBReadFile given to the exporter if any.
+Tiles can be compressed (zlib, lzma, and with imagecodecs zstd, lzw...), by several threads.
+
+usage:
+python ExportCaptureAsTiff.py -i input_file.sldy -o output_file.ome.tif -n capture_number [-c compression] [-t tile_size] [-j threads] [-b]
+example:
+python ExportCaptureAsTiff.py -i c:\\Data\\Slides\\Slide1.sldy -o c:\\Data\\Tiffs\\Slide1_1.ome.tif -n 1 -c zlib -t 256
+    -c the compression of the tiles or strips (default none)
+    -t the tile size in pixels, a multiple of 16 (default: strips)
+    -j the number of reader threads (default 4)
+    -b forces BigTIFF (by default it is used when the data is bigger than 4 GB)
+
+tifffile package
+-----------------
+conda install tifffile  or  pip install tifffile
+"""
+
+from SBReadFile import *
+from CPlaneReaderPool import CPlaneReaderPool
+import numpy as np
+import sys, getopt
+import tifffile as tiff
+
+
+class CTiffExporter(object):
+    """ Exports captures of a slide as multi-page OME-TIFF files """
+
+    # above this size (with a margin for the tags) a classic TIFF cannot address the data
+    kMaxClassicTiffBytes = 2**32 - 2**25
+
+    def __init__(self, inSlidePath, inNumThreads=4, inSBFileReader=None):
+        # inSBFileReader: an SBReadFile of the slide already open, it reads the planes when there is a single thread
+        self.mSlidePath = inSlidePath
+        self.mNumThreads = inNumThreads
+        self.mCompression = None
+        self.mTileSize = None
+        self.mBigTiff = None
+        self.mOme = True
+        self.mPrintProgress = False
+        self.mPool = None
+        self.mSBFileReader = inSBFileReader
+        if self.mSBFileReader is None:
+            self.mSBFileReader = SBReadFile()
+            if not self.mSBFileReader.Open(inSlidePath):
+                raise Exception("CTiffExporter: could not open: " + inSlidePath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, inType, inValue, inTraceback):
+        self.Close()
+
+    def Close(self):
+        """ stops the reader threads, they are kept between exports otherwise """
+        if self.mPool is not None:
+            self.mPool.Close()
+            self.mPool = None
+
+    def GetPool(self):
+        if self.mPool is None:
+            self.mPool = CPlaneReaderPool(self.mSlidePath, self.mNumThreads)
+        return self.mPool
+
+    def SetCompression(self, inCompression):
+        """ the tifffile compression of the tiles or strips, e.g. 'zlib', 'zstd', 'lzw', None for none """
+        self.mCompression = inCompression
+
+    def SetTileSize(self, inNumRows, inNumColumns):
+        """ writes tiles of (inNumRows,inNumColumns) pixels, multiples of 16, instead of strips """
+        if inNumRows % 16 != 0 or inNumColumns % 16 != 0:
+            raise Exception("CTiffExporter: the tile size must be a multiple of 16")
+        self.mTileSize = (inNumRows, inNumColumns)
+
+    def SetBigTiff(self, inBigTiff):
+        """ True or False to force BigTIFF or classic TIFF, None (default) to decide from the size """
+        self.mBigTiff = inBigTiff
+
+    def GetMetadata(self, inCaptureIndex, inTimepoints, inChannels, inZPlanes):
+        theReader = self.mSBFileReader
+        theXSize, theYSize, theZSize = theReader.GetVoxelSize(inCaptureIndex)
+        theMetadata = {
+            'axes' : 'TCZYX',
+            'Name' : theReader.GetImageName(inCaptureIndex),
+            'PhysicalSizeX' : theXSize,
+            'PhysicalSizeXUnit' : 'µm',
+            'PhysicalSizeY' : theYSize,
+            'PhysicalSizeYUnit' : 'µm',
+            'PhysicalSizeZ' : theZSize,
+            'PhysicalSizeZUnit' : 'µm',
+            'Channel' : {'Name' : [theReader.GetChannelName(inCaptureIndex, theChannel) for theChannel in inChannels]},
+        }
+        try:
+            # one entry per plane, in the TCZ order of the pages
+            theDeltaT = []
+            for theTimepoint in inTimepoints:
+                theElapsedTime = theReader.GetElapsedTime(inCaptureIndex, theTimepoint)
+                theDeltaT += [float(theElapsedTime)] * (len(inChannels) * len(inZPlanes))
+            theMetadata['Plane'] = {'DeltaT' : theDeltaT, 'DeltaTUnit' : ['ms'] * len(theDeltaT)}
+        except IndexError:
+            pass
+        return theMetadata
+
+    def ReadPlanes(self, inCaptureIndex, inIndexes):
+        # the planes in order, read by the pool, or by the reader of the exporter with a single thread
+        if self.mNumThreads > 1:
+            for theIndex, thePlane in self.GetPool().ReadPlanes(inCaptureIndex, inIndexes):
+                yield theIndex, thePlane
+            return
+        for theTimepoint, theZPlane, theChannel in inIndexes:
+            yield (theTimepoint, theZPlane, theChannel), self.mSBFileReader.ReadImagePlaneBuf(inCaptureIndex, 0, theTimepoint, theZPlane, theChannel, True)
+
+    def IterateTiles(self, inPlanes, inNumRows, inNumColumns):
+        theTileRows, theTileColumns = self.mTileSize
+        for thePlane in inPlanes:
+            for theTop in range(0, inNumRows, theTileRows):
+                for theLeft in range(0, inNumColumns, theTileColumns):
+                    theTile = thePlane[theTop:theTop + theTileRows, theLeft:theLeft + theTileColumns]
+                    if theTile.shape != self.mTileSize:
+                        thePadded = np.zeros(self.mTileSize, dtype=np.uint16)
+                        thePadded[:theTile.shape[0], :theTile.shape[1]] = theTile
+                        theTile = thePadded
+                    yield theTile
+
+    def IteratePlanes(self, inPlanes, inNumPlanes):
+        theCount = 0
+        for theIndex, thePlane in inPlanes:
+            theCount += 1
+            if self.mPrintProgress and (theCount % 100 == 0 or theCount == inNumPlanes):
+                print ("Exported planes: ", theCount, "/", inNumPlanes)
+            yield thePlane
+
+    def Export(self, inCaptureIndex, inTiffPath, inTimepoints=None, inChannels=None, inZPlanes=None):
+        """ Exports a capture as one multi-page TIFF file
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inTiffPath: str
+            The path of the TIFF file (.ome.tif for OME-TIFF)
+        inTimepoints, inChannels, inZPlanes: list of int, optional
+            The timepoints, channels and z planes to export, all by default
+
+        Returns
+        -------
+        int
+            The number of planes written
+        """
+        theReader = self.mSBFileReader
+        if inTimepoints is None:
+            inTimepoints = range(theReader.GetNumTimepoints(inCaptureIndex))
+        if inChannels is None:
+            inChannels = range(theReader.GetNumChannels(inCaptureIndex))
+        if inZPlanes is None:
+            inZPlanes = range(theReader.GetNumZPlanes(inCaptureIndex))
+        inTimepoints, inChannels, inZPlanes = list(inTimepoints), list(inChannels), list(inZPlanes)
+        theNumRows = theReader.GetNumYRows(inCaptureIndex)
+        theNumColumns = theReader.GetNumXColumns(inCaptureIndex)
+        theShape = (len(inTimepoints), len(inChannels), len(inZPlanes), theNumRows, theNumColumns)
+        theNumPlanes = len(inTimepoints) * len(inChannels) * len(inZPlanes)
+
+        theBigTiff = self.mBigTiff
+        if theBigTiff is None:
+            theBigTiff = theNumPlanes * theNumRows * theNumColumns * 2 > self.kMaxClassicTiffBytes
+
+        # the pages are in the TCZ order
+        theIndexes = ((theTimepoint, theZPlane, theChannel) for theTimepoint in inTimepoints for theChannel in inChannels for theZPlane in inZPlanes)
+        thePlanes = self.IteratePlanes(self.ReadPlanes(inCaptureIndex, theIndexes), theNumPlanes)
+        if self.mTileSize is not None:
+            theData = self.IterateTiles(thePlanes, theNumRows, theNumColumns)
+        else:
+            theData = thePlanes
+        theMetadata = self.GetMetadata(inCaptureIndex, inTimepoints, inChannels, inZPlanes)
+        with tiff.TiffWriter(inTiffPath, bigtiff=theBigTiff, ome=self.mOme) as theTiff:
+            theTiff.write(theData, shape=theShape, dtype=np.uint16, photometric='minisblack', metadata=theMetadata,
+                          tile=self.mTileSize, compression=self.mCompression, maxworkers=self.mNumThreads)
+        return theNumPlanes
+
+
+def usage():
+    print ('usage: python ExportCaptureAsTiff.py -i <sldy input_file> -o <output tiff file> -n capture_number [-c compression] [-t tile_size] [-j threads] [-b]')
+    print ('       exports a capture (base 0) as a multi-page OME-TIFF file with the axes TCZYX')
+
+def main(argv):
+    theFileName = ''
+    theTiffFileName = ''
+    theCapture = -1
+    theCompression = None
+    theTileSize = 0
+    theNumThreads = 4
+    theBigTiff = None
+    try:
+        opts, args = getopt.getopt(argv,'hi:o:n:c:t:j:b',['ifile=','ofile='])
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit()
+        elif opt in ("-i", "--ifile"):
+            theFileName = arg
+        elif opt in ("-o", "--ofile"):
+            theTiffFileName = arg
+        elif opt == '-n':
+            theCapture = int(arg)
+        elif opt == '-c':
+            theCompression = arg
+        elif opt == '-t':
+            theTileSize = int(arg)
+        elif opt == '-j':
+            theNumThreads = int(arg)
+        elif opt == '-b':
+            theBigTiff = True
+    if theFileName == '' or theTiffFileName == '' or theCapture < 0:
+        usage()
+        sys.exit(2)
+
+    theExporter = CTiffExporter(theFileName, theNumThreads)
+    theExporter.SetCompression(theCompression)
+    theExporter.SetBigTiff(theBigTiff)
+    if theTileSize > 0:
+        theExporter.SetTileSize(theTileSize, theTileSize)
+    theExporter.mPrintProgress = True
+    theNumPlanes = theExporter.Export(theCapture, theTiffFileName)
+    theExporter.Close()
+    print ('Written ', theNumPlanes, ' planes to: ', theTiffFileName)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -2,7 +2,7 @@ __copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc.
 __license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
 
 """Read and write TIFF files.
-Exports one plane for each timepoint and channel as a tiff file
+Exports one plane for each timepoint and channel as a multi-page OME-TIFF file
 
 There are two basic ways to use it:
 python ExportOnePlaneAsTiff.py -i input_file.sldy -l
@@ -12,7 +12,8 @@ python ExportOnePlaneAsTiff.py -i input_file.sldy -o output_tiff_file_without_su
 example:
 python ExportOnePlaneAsTiff.py -i c:\Datat|Slides\Slide1 -o c:\Data\Tiffs\Slide1 -n 1 -p 20
     This exports plane 21 (0 is the first plane) for capture 1 (0 is the first capture) 
-    tiff files will be created for each channel and timepoint
+    into c:\Data\Tiffs\Slide1Z0020.ome.tif, with a page for each channel and timepoint
+    (see ExportCaptureAsTiff.py to export whole captures)
 
 tifffile package
 -----------------
@@ -23,10 +24,9 @@ conda install -n SlideBook python=3.8.5 tifffile
 """
 
 from SBReadFile import *
-from matplotlib import pyplot as plt
+from ExportCaptureAsTiff import CTiffExporter
 import numpy as np
 import sys, getopt
-import tifffile as tiff
 
 def usage():
     print ('usage: python ExportOnePlaneAsTiff.py -i <sldy input_file> -l')
@@ -81,6 +81,18 @@ def list(inSBFileReader,inCapture):
     theXmlData =   inSBFileReader.GetAuxSerializedData(inCapture,theChannel,0)
     #print ("*** theXmlData is " ,theXmlData)
 
+def ExportPlane(inSBFileReader,inCapture,inPlane,inTiffFileName,inNumThreads=4):
+    theOutFile = "{0}Z{1:04d}.ome.tif".format(inTiffFileName,inPlane)
+    print('The output file is: ',theOutFile)
+
+    # with inNumThreads=1 the planes are read with inSBFileReader and the slide is not opened again,
+    # otherwise every reader of the pool opens the slide again
+    theExporter = CTiffExporter(inSBFileReader.mDL.mSlidePath,inNumThreads,inSBFileReader)
+    theNumPlanes = theExporter.Export(inCapture,theOutFile,inZPlanes=[inPlane])
+    theExporter.Close()
+    print ("*** The number of planes written is: " , theNumPlanes)
+    return theOutFile
+
 def main(argv):
     theSBFileReader = SBReadFile()
 
@@ -136,26 +148,8 @@ def main(argv):
         print ("Plane number must be specified as: -p plane_number");
         sys.exit()
 
-    theNumRows = theSBFileReader.GetNumYRows(theCapture)
-    theNumColumns = theSBFileReader.GetNumXColumns(theCapture)
-    theNumPlanes = theSBFileReader.GetNumZPlanes(theCapture)
-    theNumChannels = theSBFileReader.GetNumChannels(theCapture)
-    theNumTimepoints = theSBFileReader.GetNumTimepoints(theCapture)
-
-    for theTimepoint in range(theNumTimepoints):
-        for theChannel in range(theNumChannels):
-
-            image = theSBFileReader.ReadImagePlaneBuf(theCapture,0,theTimepoint,thePlane,theChannel,True) #captureid,position,timepoint,zplane,channel,as 2d
-            print ("*** The read buffer len is: " , len(image))
-
-            theOutFile = "{0}C{1:d}Z{2:04d}T{3:04d}.tiff".format(theTiffFileName,theChannel,thePlane,theTimepoint)
-            print('The output file is: ',theOutFile)
-
-            tif = tiff.TiffWriter(theOutFile)
-            tif.write(image)
-            tif.close()
+    ExportPlane(theSBFileReader,theCapture,thePlane,theTiffFileName)
 
-    data = input("Please hit Enter to exit:\n")
     print("Done")
 
 
@@ -20,7 +20,10 @@ import yaml
 
 from dataclasses import dataclass
 import ByteUtil as bu
+from SBAccessStats import SBAccessStats, CInstrumentedSocket
+import SBCommandTable as ct
 import numpy as np
+import pyzstd
 
 
 @dataclass
@@ -316,11 +319,105 @@ class SBAccess(object):
 
     def __init__(self, inSocket):
         self.mSocket = inSocket
+        self.mCompressedTransfer = False
+        self.mZstdCompressor = None
+        self.mZstdDecompressor = None
+        self.mStats = None
 
     def SendCommand(self,inCommand):
+        # a hand built header, for commands outside the command table (SBCommandTable)
+        if self.mStats is not None:
+            self.mStats.BeginCommand(inCommand[1:inCommand.find('(')])
         theBytes = bu.string_to_bytes(inCommand)
         self.mSocket.send(theBytes)
 
+    def EnableStats(self,inEnable=True):
+        """ Enables or disables the recording of per command statistics
+
+        For each command name the number of calls, the bytes sent and received and
+        a latency histogram (from the command sent to the last byte received) are recorded
+
+        Parameters
+        ----------
+        inEnable: bool, optional
+            True to start recording, False to stop recording
+
+        Returns
+        -------
+        SBAccessStats
+            The statistics object (use ExportPrometheus or ExportCSV to export them), None if disabled
+        """
+        if inEnable:
+            if self.mStats is None:
+                self.mStats = SBAccessStats()
+                self.mSocket = CInstrumentedSocket(self.mSocket,self.mStats)
+        elif self.mStats is not None:
+            self.mStats.EndCommand()
+            self.mSocket = self.mSocket.mSocket
+            self.mStats = None
+        return self.mStats
+
+    def GetStats(self):
+        """ Gets a snapshot of the per command statistics
+
+        Returns
+        -------
+        dict
+            command name -> dict with count, bytes_sent, bytes_received, latency_sum_s,
+            latency_max_s, latency_buckets_s and latency_histogram. Empty if the statistics are not enabled
+        """
+        if self.mStats is None:
+            return dict()
+        return self.mStats.GetStats()
+
+    def SendCall(self,inSpec,*inArgs):
+        # sends a command of the command table, header and arguments are encoded in a few buffers
+        if self.mStats is not None:
+            self.mStats.BeginCommand(inSpec.mName)
+        for theBuffer in inSpec.Encode(inArgs):
+            self.mysend(theBuffer)
+
+    def Call(self,inCommandName,*inArgs):
+        """ Sends a command of the command table (SBCommandTable) and decodes its reply
+
+        Parameters
+        ----------
+        inCommandName: str
+            The name of the command, as in SBCommandTable.kCommandTable
+        inArgs:
+            The arguments of the command, in the order of the table
+
+        Returns
+        -------
+            The reply decoded as described by the reply schema of the command:
+            a single value, a tuple of values or None if the command has no reply
+        """
+        theSpec = ct.GetCommand(inCommandName)
+        self.SendCall(theSpec,*inArgs)
+        return theSpec.DecodeReply(self.Recv)
+
+    def CallMany(self,inCalls):
+        """ Sends several commands of the command table before reading any reply
+
+        The replies are then read in order. This saves one round trip per command
+
+        Parameters
+        ----------
+        inCalls: list of (str, tuple)
+            The command names and their arguments
+
+        Returns
+        -------
+        list
+            The decoded replies, in the order of the commands
+        """
+        theSpecs = []
+        for theCommandName, theArgs in inCalls:
+            theSpec = ct.GetCommand(theCommandName)
+            self.SendCall(theSpec,*theArgs)
+            theSpecs.append(theSpec)
+        return [theSpec.DecodeReply(self.Recv) for theSpec in theSpecs]
+
     def SendVal(self,inVal,inType):
         theBytes = bu.type_to_bytes(inVal,inType)
         self.mSocket.send(theBytes)
@@ -340,6 +437,96 @@ class SBAccess(object):
         #self.mSocket.send(inBytes)
         self.mysend(inBytes)
 
+    def GetByteView(self,inNumpyArray):
+        # a byte view on the array buffer, avoids the copy made by tobytes()
+        # a copy is only made if the array is not contiguous
+        theArray = np.ascontiguousarray(inNumpyArray)
+        return memoryview(theArray).cast('B')
+
+    def EnableCompressedTransfer(self,inEnable=True,inLevel=1):
+        """ Enables or disables zstd compression of the plane buffers sent over the socket
+
+        Applies to ReadImagePlaneBuf, ReadMaskPlaneBuf and WriteImagePlaneBuf (and the
+        stack functions built on them). Compression is only enabled if the server
+        supports the compressed version of all these commands, otherwise the
+        uncompressed commands keep being used
+
+        Parameters
+        ----------
+        inEnable: bool, optional
+            True to enable the compressed transfer, False to disable it
+        inLevel: int, optional
+            The zstd compression level used for the planes sent to the server
+
+        Returns
+        -------
+        bool
+            True if the compressed transfer is enabled
+        """
+        self.mCompressedTransfer = False
+        if not inEnable:
+            return False
+        for theCommand in ('ReadImagePlaneBufZstd','ReadMaskPlaneBufZstd','WriteImagePlaneBufZstd'):
+            if not self.GetIsCommandSupported(theCommand):
+                return False
+
+        # the contexts are kept and reused for every plane
+        self.mZstdCompressor = pyzstd.ZstdCompressor(inLevel)
+        try:
+            import zstandard
+            self.mZstdDecompressor = zstandard.ZstdDecompressor()
+        except ImportError:
+            self.mZstdDecompressor = pyzstd.EndlessZstdDecompressor()
+        self.mCompressedTransfer = True
+        return True
+
+    def CompressTransfer(self,inBytes):
+        return self.mZstdCompressor.compress(inBytes,pyzstd.ZstdCompressor.FLUSH_FRAME)
+
+    def DecompressTransfer(self,inBytes):
+        # every plane is one zstd frame, the context is reused from one frame to the next.
+        # zstandard reads the received buffer without a copy, pyzstd.EndlessZstdDecompressor only reads bytes
+        if not isinstance(self.mZstdDecompressor,pyzstd.EndlessZstdDecompressor):
+            theBuf = self.mZstdDecompressor.decompressobj().decompress(inBytes)
+        else:
+            try:
+                theBuf = self.mZstdDecompressor.decompress(inBytes if type(inBytes) is bytes else bytes(inBytes))
+            except pyzstd.ZstdError:
+                # the context may be left in the middle of a frame
+                self.mZstdDecompressor = pyzstd.EndlessZstdDecompressor()
+                raise
+        return np.frombuffer(theBuf,np.uint16)
+
+    def RecvAck(self):
+        # reads the acknowledgement of a write, True if the write succeeded
+        theNum,theVals = self.Recv()
+        return theNum == 1 and theVals[0] == 1
+
+    def RecvWriteAck(self,inCommandName):
+        if not self.RecvAck():
+            raise Exception(inCommandName+": error")
+
+    def WritePlanesPipelined(self,inCommandName,inSendPlane,inNumPlanes,inMaxPending):
+        # sends the planes with at most inMaxPending acknowledgements outstanding. Once a write failed
+        # no more planes are sent, and all the outstanding acknowledgements are read before raising:
+        # the reply of the next command is then not mistaken for one of them
+        thePending = 0
+        theFailed = False
+        for theZPlane in range(inNumPlanes):
+            if theFailed:
+                break
+            inSendPlane(theZPlane)
+            thePending += 1
+            if thePending >= inMaxPending:
+                theFailed = not self.RecvAck() or theFailed
+                thePending -= 1
+
+        while thePending > 0:
+            theFailed = not self.RecvAck() or theFailed
+            thePending -= 1
+        if theFailed:
+            raise Exception(inCommandName+": error")
+
     def RecvBigData(self,n):
         # Helper function to recv n bytes or return None if EOF is hit
         data = bytearray()
@@ -381,13 +568,7 @@ class SBAccess(object):
         theNum = int(prop[0])
         theType = prop[1]
 
-        theSize = 1
-        if (theType == 'i4' or theType == 'u4' or theType == 'f4'):
-            theSize = 4
-        elif (theType == 'i2' or theType == 'u2'):
-            theSize = 2
-        elif (theType == 'i8' or theType == 'u8' or theType == 'f8'):
-            theSize = 8
+        theSize = ct.kTypeSizes.get(theType,1)
 
         theValBuf = b''
         theValBuf =  self.RecvBigData(theNum * theSize)
@@ -404,32 +585,28 @@ class SBAccess(object):
             return theNum,theArr
         
     def SendIntParam(self,inCommandName,inIntParam):
-        self.SendCommand('$'+inCommandName+'(IntParam=i4)')
-        self.SendVal(int(inIntParam),'i4')
+        self.SendCall(ct.GetParamCommand(inCommandName,'i4'),inIntParam)
         theNum,theVals = self.Recv()
         if( theNum != 1 and theVals[0] != 1):
             raise Exception(inCommandName+': error')
         return theVals[0]
 
     def SendFloatParam(self,inCommandName,inFloatParam):
-        self.SendCommand('$'+inCommandName+'(FloatParam=f4)')
-        self.SendVal(float(inFloatParam),'f4')
+        self.SendCall(ct.GetParamCommand(inCommandName,'f4'),inFloatParam)
         theNum,theVals = self.Recv()
         if( theNum != 1 and theVals[0] != 1):
             raise Exception(inCommandName+': error')
         return theVals[0]
 
     def SendStringParam(self,inCommandName,inStringParam):
-        l = len(inStringParam)
-        self.SendCommand('$'+inCommandName+'(StringParam='+str(l)+':s)')
-        self.SendVal(inStringParam,'s')
+        self.SendCall(ct.GetParamCommand(inCommandName,'s'),inStringParam)
         theNum,theVals = self.Recv()
         if( theNum != 1 or theVals[0] == -1):
             raise Exception(inCommandName+': error')
         return theVals[0]
 
     def SendNullParam(self,inCommandName):
-        self.SendCommand('$'+inCommandName+'()')
+        self.SendCall(ct.GetParamCommand(inCommandName,''))
         theNum,theVals = self.Recv()
         if( theNum != 1 and theVals[0] != 1):
             raise Exception(inCommandName+': error')
@@ -450,9 +627,7 @@ class SBAccess(object):
         int
             The Slide Id
         """
-        l = len(inPath)
-        self.SendCommand('$Open(FileName='+str(l)+':s)')
-        self.SendVal(inPath,'s')
+        self.SendCall(ct.GetCommand('Open'),inPath)
         theNum,theVals = self.Recv()
         if( theNum != 1):
             raise Exception("OpenFile: colud not open path: "+inPath)
@@ -470,7 +645,7 @@ class SBAccess(object):
         int
             The Slide Id
         """
-        self.SendCommand('$GetCurrentSlideId()')
+        self.SendCall(ct.GetCommand('GetCurrentSlideId'))
         theNum,theVals = self.Recv()
         if( theNum != 1):
             raise Exception("GetCurrentSlideId: error")
@@ -488,7 +663,7 @@ class SBAccess(object):
         dict
             The dictionary of IDs/SlideName(Pathname)
         """
-        self.SendCommand('$GetOpenSlides()')
+        self.SendCall(ct.GetCommand('GetOpenSlides'))
         theNum,theVals = self.Recv()
         if( theNum != 1):
             raise Exception("GetOpenSlides: error")
@@ -519,8 +694,7 @@ class SBAccess(object):
             1 on success
         """
 
-        self.SendCommand('$SetTargetSlide(SlideId=i4)')
-        self.SendVal(int(inSlideId),'i4')
+        self.SendCall(ct.GetCommand('SetTargetSlide'),inSlideId)
         theNum,theVals = self.Recv()
         if( theNum != 1):
             raise Exception("SetTargetSlide: invalid value")
@@ -537,7 +711,7 @@ class SBAccess(object):
         int
             The Slide Id
         """
-        self.SendCommand('$CreateNewSlide()')
+        self.SendCall(ct.GetCommand('CreateNewSlide'))
         theNum,theVals = self.Recv()
         if( theNum != 1):
             raise Exception("CreateNewSlide: error")
@@ -557,9 +731,7 @@ class SBAccess(object):
         int
             True if successful and false if failure (failure to save is most commonly caused by a new file without a pathname)
         """
-        self.SendCommand('$CloseSlide(SlideId=i4,SaveChanges=i4)')
-        self.SendVal(int(inSlideId),'i4')
-        self.SendVal(int(inSaveChanges),'i4')
+        self.SendCall(ct.GetCommand('CloseSlide'),inSlideId,inSaveChanges)
         theNum,theStatus = self.Recv()
         if( theNum != 1):
             raise Exception("SaveSlide: invalid statuc")
@@ -580,8 +752,7 @@ class SBAccess(object):
         int
             True if successful and false if failure
         """
-        self.SendCommand('$GetIsSlideModified(SlideId=i4)')
-        self.SendVal(int(inSlideId), 'i4')
+        self.SendCall(ct.GetCommand('GetIsSlideModified'),inSlideId)
         theNum, theStatus = self.Recv()
         if (theNum != 1):
             raise Exception("SaveSlide: invalid status")
@@ -603,8 +774,7 @@ class SBAccess(object):
         int
             1 on success
         """
-        self.SendCommand('$SaveSlide(SlideId=i4)')
-        self.SendVal(int(inSlideId),'i4')
+        self.SendCall(ct.GetCommand('SaveSlide'),inSlideId)
         theNum,theVals = self.Recv()
         if( theNum != 1):
             raise Exception("SaveSlide: invalid value")
@@ -629,10 +799,7 @@ class SBAccess(object):
         int
             1 on success
         """
-        l = len(inPathname)
-        self.SendCommand('$SaveAsSlide(SlideId=i4,Pathname='+str(l)+':s)')
-        self.SendVal(int(inSlideId),'i4')
-        self.SendVal(inPathname,'s')
+        self.SendCall(ct.GetCommand('SaveAsSlide'),inSlideId,inPathname)
         theNum,theVals = self.Recv()
         if( theNum != 1):
             raise Exception("SaveAsSlide: invalid value")
@@ -651,14 +818,7 @@ class SBAccess(object):
             The number of captures
         """
 
-        self.SendCommand('$GetNumCaptures()')
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetNumCaptures: invalid value")
-
-        print("GetNumCaptures: ",theVals[0])
-
-        return theVals[0]
+        return self.Call('GetNumCaptures')
 
     def GetNumLiveCaptures(self):
         """ Gets the number of live captures (image groups) in the file
@@ -669,14 +829,7 @@ class SBAccess(object):
             The number of live captures
         """
 
-        self.SendCommand('$GetNumLiveCaptures()')
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetNumLiveCaptures: invalid value")
-
-        print("GetNumLiveCaptures: ",theVals[0])
-
-        return theVals[0]
+        return self.Call('GetNumLiveCaptures')
 
     def GetNumMasks(self,inCaptureIndex):
         """ Gets the number of masks in an image group
@@ -692,14 +845,7 @@ class SBAccess(object):
             The number of masks
         """
 
-        self.SendCommand('$GetNumMasks(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetNumMasks: invalid value")
-
-
-        return theVals[0]
+        return self.Call('GetNumMasks',inCaptureIndex)
 
     def GetNumPositions(self,inCaptureIndex):
         """ Gets the number of (montage) positions in an image group
@@ -715,14 +861,7 @@ class SBAccess(object):
             The number of positions
         """
 
-        self.SendCommand('$GetNumPositions(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetNumPositions: invalid value")
-
-
-        return theVals[0]
+        return self.Call('GetNumPositions',inCaptureIndex)
 
     def GetNumXColumns(self,inCaptureIndex):
         """ Gets the number of columns (width) of an image in an image group
@@ -737,15 +876,7 @@ class SBAccess(object):
         int
             The number of columns or width of the image
         """
-        self.SendCommand('$GetNumXColumns(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetNumXColumns: invalid value")
-
-        print("GetNumXColumns: ",theVals[0])
-
-        return theVals[0]
+        return self.Call('GetNumXColumns',inCaptureIndex)
 
     def GetNumYRows(self,inCaptureIndex):
         """ Gets the number of rows (height) of an image in an image group
@@ -761,15 +892,7 @@ class SBAccess(object):
             The number of rows or height of the image
         """
 
-        self.SendCommand('$GetNumYRows(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetNumYRows: invalid value")
-
-        print("GetNumYRows: ",theVals[0])
-
-        return theVals[0]
+        return self.Call('GetNumYRows',inCaptureIndex)
         
 
 
@@ -787,15 +910,7 @@ class SBAccess(object):
             The number of z planes of the image
         """
 
-        self.SendCommand('$GetNumZPlanes(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetNumZPlanes: invalid value")
-
-        print("GetNumZPlanes: ",theVals[0])
-
-        return theVals[0]
+        return self.Call('GetNumZPlanes',inCaptureIndex)
 
 
     def GetNumImages(self,inCaptureIndex):
@@ -815,14 +930,7 @@ class SBAccess(object):
         if (version < 47415):
             raise Exception("GetNumImages: not available in current API")
 
-        self.SendCommand('$GetNumImages(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetNumImages: invalid value")
-
-
-        return theVals[0]
+        return self.Call('GetNumImages',inCaptureIndex)
 
 
     def GetNumTimepoints(self,inCaptureIndex):
@@ -839,14 +947,7 @@ class SBAccess(object):
             The number of time points
         """
 
-        self.SendCommand('$GetNumTimepoints(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetNumTimepoints: invalid value")
-
-
-        return theVals[0]
+        return self.Call('GetNumTimepoints',inCaptureIndex)
 
 
     def GetNumChannels(self,inCaptureIndex):
@@ -862,13 +963,7 @@ class SBAccess(object):
         int
             The number of channels
         """
-        self.SendCommand('$GetNumChannels(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetNumChannels: invalid value")
-
-        return theVals[0]
+        return self.Call('GetNumChannels',inCaptureIndex)
 
     def GetExposureTime(self,inCaptureIndex,inChannelIndex):
         """ Gets the exposure time in ms for a particular channel of an image group
@@ -886,15 +981,7 @@ class SBAccess(object):
         int
             The exposure time in ms
         """
-        self.SendCommand('$GetExposureTime(CaptureIndex=i4,ChannelIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inChannelIndex),'i4')
-
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetExposureTime: invalid value")
-
-        return theVals[0]
+        return self.Call('GetExposureTime',inCaptureIndex,inChannelIndex)
 
 
     def GetVoxelSize(self,inCaptureIndex):
@@ -915,8 +1002,7 @@ class SBAccess(object):
             The Z voxel size in um
 
         """
-        self.SendCommand('$GetVoxelSize(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('GetVoxelSize'),inCaptureIndex)
 
         theNum,theVoxelX = self.Recv()
         if( theNum != 1):
@@ -948,9 +1034,7 @@ class SBAccess(object):
         float
             The X position in um
         """
-        self.SendCommand('$GetXPosition(CaptureIndex=i4,PositionIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inPositionIndex),'i4')
+        self.SendCall(ct.GetCommand('GetXPosition'),inCaptureIndex,inPositionIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -973,9 +1057,7 @@ class SBAccess(object):
         float
             The Y position in um
         """
-        self.SendCommand('$GetYPosition(CaptureIndex=i4,PositionIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inPositionIndex),'i4')
+        self.SendCall(ct.GetCommand('GetYPosition'),inCaptureIndex,inPositionIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -1000,10 +1082,7 @@ class SBAccess(object):
         float
             The Z position in um
         """
-        self.SendCommand('$GetZPosition(CaptureIndex=i4,PositionIndex=i4,ZPlaneIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inPositionIndex),'i4')
-        self.SendVal(int(inZPlaneIndex),'i4')
+        self.SendCall(ct.GetCommand('GetZPosition'),inCaptureIndex,inPositionIndex,inZPlaneIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -1028,9 +1107,7 @@ class SBAccess(object):
         int
             The row number (first row is 0)
         """
-        self.SendCommand('$GetMontageRow(CaptureIndex=i4,PositionIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inPositionIndex),'i4')
+        self.SendCall(ct.GetCommand('GetMontageRow'),inCaptureIndex,inPositionIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -1053,9 +1130,7 @@ class SBAccess(object):
         int
             The column number (first column is 0) 
         """
-        self.SendCommand('$GetMontageColumn(CaptureIndex=i4,PositionIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inPositionIndex),'i4')
+        self.SendCall(ct.GetCommand('GetMontageColumn'),inCaptureIndex,inPositionIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -1078,15 +1153,7 @@ class SBAccess(object):
         int
             The elapsed time in ms
         """
-        self.SendCommand('$GetElapsedTime(CaptureIndex=i4,TimepointIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inTimepointIndex),'i4')
-
-        theNum,theVals = self.Recv()
-        if( theNum != 1):
-            raise Exception("GetElapsedTime: invalid value")
-
-        return theVals[0]
+        return self.Call('GetElapsedTime',inCaptureIndex,inTimepointIndex)
 
 
 
@@ -1106,9 +1173,7 @@ class SBAccess(object):
         str
             The name of the channel
         """
-        self.SendCommand('$GetChannelName(CaptureIndex=i4,ChannelIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inChannelIndex),'i4')
+        self.SendCall(ct.GetCommand('GetChannelName'),inCaptureIndex,inChannelIndex)
 
         theStr = self.Recv()
         return theStr
@@ -1126,8 +1191,7 @@ class SBAccess(object):
         str
             The name of the lens
         """
-        self.SendCommand('$GetLensName(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('GetLensName'),inCaptureIndex)
 
         theStr = self.Recv()
         return theStr
@@ -1145,8 +1209,7 @@ class SBAccess(object):
         float
             The magnification of the lens
         """
-        self.SendCommand('$GetMagnification(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('GetMagnification'),inCaptureIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -1169,8 +1232,7 @@ class SBAccess(object):
             The name of the image group
         """
 
-        self.SendCommand('$GetImageName(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('GetImageName'),inCaptureIndex)
 
         theStr = self.Recv()
         return theStr
@@ -1190,9 +1252,7 @@ class SBAccess(object):
         int
             The low renormalization value (0-65535) 
         """
-        self.SendCommand('$GetImageLowRenormalization(CaptureIndex=i4,ChannelIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inChannelIndex),'i4')
+        self.SendCall(ct.GetCommand('GetImageLowRenormalization'),inCaptureIndex,inChannelIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -1215,9 +1275,7 @@ class SBAccess(object):
         int
             The low renormalization value (0-65535) 
         """
-        self.SendCommand('$GetImageHighRenormalization(CaptureIndex=i4,ChannelIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inChannelIndex),'i4')
+        self.SendCall(ct.GetCommand('GetImageHighRenormalization'),inCaptureIndex,inChannelIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -1242,9 +1300,7 @@ class SBAccess(object):
             The name of the mask
         """
 
-        self.SendCommand('$GetMaskName(CaptureIndex=i4,MaskIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inMaskIndex),'i4')
+        self.SendCall(ct.GetCommand('GetMaskName'),inCaptureIndex,inMaskIndex)
 
         theStr = self.Recv()
         return theStr
@@ -1262,8 +1318,7 @@ class SBAccess(object):
         str
             The comments of the image group
         """
-        self.SendCommand('$GetImageComment(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('GetImageComment'),inCaptureIndex)
 
         theStr = self.Recv()
         return theStr
@@ -1281,8 +1336,7 @@ class SBAccess(object):
         str
             date is inhe format: yyyy:MM:dd:hh:mm:ss
         """
-        self.SendCommand('$GetCaptureDate(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('GetCaptureDate'),inCaptureIndex)
 
         theStr = self.Recv()
         return theStr
@@ -1299,7 +1353,7 @@ class SBAccess(object):
         list
             a list of CLensDef70 objects
         """
-        self.SendCommand('$GetObjectives()')
+        self.SendCall(ct.GetCommand('GetObjectives'))
 
         theStr = self.Recv()
         txt_stream = io.StringIO(theStr)
@@ -1343,7 +1397,7 @@ class SBAccess(object):
             1 = success 0 = failure
 
         """
-        self.SendCommand('$GetAOOptimizerStatus')
+        self.SendCall(ct.GetCommand('GetAOOptimizerStatus'))
 
         theNum, theNumZernikes = self.Recv()
         if (theNum != 1):
@@ -1389,8 +1443,7 @@ class SBAccess(object):
             Returns success or failure
 
         """
-        self.SendCommand('$SetAOOptimizerExposureTime(ExposureTimeMS=i4)')
-        self.SendVal(int(inExposureTimeMS), 'i4')
+        self.SendCall(ct.GetCommand('SetAOOptimizerExposureTime'),inExposureTimeMS)
         theResultString = self.Recv()
 
         theNum, theResult = self.Recv()
@@ -1416,7 +1469,7 @@ class SBAccess(object):
         list
             a list of CFluorDef70 objects
         """
-        self.SendCommand('$GetFilters()')
+        self.SendCall(ct.GetCommand('GetFilters'))
 
         theStr = self.Recv()
         txt_stream = io.StringIO(theStr)
@@ -1445,7 +1498,7 @@ class SBAccess(object):
         list
             a list of filter set names
         """
-        self.SendCommand('$GetFilterSetNames()')
+        self.SendCall(ct.GetCommand('GetFilterSetNames'))
 
         theNum, theCount = self.Recv()
         theFilterSetList = []
@@ -1469,7 +1522,7 @@ class SBAccess(object):
         list
             a list of saved capture scripts
         """
-        self.SendCommand('$GetExperimentScriptNames()')
+        self.SendCall(ct.GetCommand('GetExperimentScriptNames'))
 
         theNum, theCount = self.Recv()
         theExperimentList = []
@@ -1498,9 +1551,7 @@ class SBAccess(object):
         string 
             The text of the capture preferences (advanced capture settings: photomanipulation, autofocus, TTL, etc)
         """
-        l = len(inScriptName)
-        self.SendCommand('$GetExperimentScriptData(ExperimentName='+str(l)+':s)')
-        self.SendVal(inScriptName,'s')
+        self.SendCall(ct.GetCommand('GetExperimentScriptData'),inScriptName)
 
         theCoreCapturePrefs = self.Recv()
         theAdvancedCapturePrefs = self.Recv()
@@ -1520,7 +1571,7 @@ class SBAccess(object):
         list
             a list of COptovarDef70 objects
         """
-        self.SendCommand('$GetMagnificationChangers()')
+        self.SendCall(ct.GetCommand('GetMagnificationChangers'))
 
         theStr = self.Recv()
 
@@ -1551,7 +1602,7 @@ class SBAccess(object):
         str
             the objectives
         """
-        self.SendCommand('$GetLensInfo()')
+        self.SendCall(ct.GetCommand('GetLensInfo'))
 
         theStr = self.Recv()
         return theStr
@@ -1577,9 +1628,7 @@ class SBAccess(object):
                 bool
                     True (1) if success false (0) if failure
                 """
-        self.SendCommand('$CaptureImage(CameraIndex=i4,ExposureTime=i4)')
-        self.SendVal(int(CameraIndex), 'i4')
-        self.SendVal(int(ExposureTimeMS), 'i4')
+        self.SendCall(ct.GetCommand('CaptureImage'),CameraIndex,ExposureTimeMS)
 
         theNum, theWidth = self.Recv()
         if (theNum != 1):
@@ -1621,11 +1670,7 @@ class SBAccess(object):
         if (version < 47415):
             raise Exception("ReadImagePlaneBufIx: not avai;lable in current API")
 
-        self.SendCommand('$ReadImagePlaneBuf(CaptureIndex=i4,ImageIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inImageIndex),'i4')
-        self.SendVal(int(inZPlaneIndex),'i4')
-        self.SendVal(int(inChannelIndex),'i4')
+        self.SendCall(ct.GetCommand('ReadImagePlaneBufIx'),inCaptureIndex,inImageIndex,inZPlaneIndex,inChannelIndex)
 
         theNum,theVals = self.Recv()
         return theVals
@@ -1653,14 +1698,10 @@ class SBAccess(object):
             The image is returned as 1D numpy uint16 array
 
         """
-        self.SendCommand('$ReadImagePlaneBuf(CaptureIndex=i4,PositionIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inPositionIndex),'i4')
-        self.SendVal(int(inTimepointIndex),'i4')
-        self.SendVal(int(inZPlaneIndex),'i4')
-        self.SendVal(int(inChannelIndex),'i4')
-
-        theNum,theVals = self.Recv()
+        theName = 'ReadImagePlaneBufZstd' if self.mCompressedTransfer else 'ReadImagePlaneBuf'
+        theVals = self.Call(theName,inCaptureIndex,inPositionIndex,inTimepointIndex,inZPlaneIndex,inChannelIndex)
+        if self.mCompressedTransfer:
+            return self.DecompressTransfer(theVals)
         return theVals
 
 
@@ -1678,9 +1719,7 @@ class SBAccess(object):
         int
             The number of elements
         """
-        self.SendCommand('$GetAuxDataNumElements(CaptureIndex=i4,DataType=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inDataType),'i4')
+        self.SendCall(ct.GetCommand('GetAuxDataNumElements'),inCaptureIndex,inDataType)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -1702,10 +1741,7 @@ class SBAccess(object):
         str
             The Element name
         """
-        self.SendCommand('$GetAuxDataName(CaptureIndex=i4,DataType=i4,ElementIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inDataType),'i4')
-        self.SendVal(int(inElementIndex),'i4')
+        self.SendCall(ct.GetCommand('GetAuxDataName'),inCaptureIndex,inDataType,inElementIndex)
         theName = self.Recv()
 
         return theName
@@ -1734,10 +1770,7 @@ class SBAccess(object):
         if inDataType is AuxDataTypes.eDoubleData
             returns a double 64 array
         """
-        self.SendCommand('$GetAuxDataValues(CaptureIndex=i4,DataType=i4,ElementIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inDataType),'i4')
-        self.SendVal(int(inElementIndex),'i4')
+        self.SendCall(ct.GetCommand('GetAuxDataValues'),inCaptureIndex,inDataType,inElementIndex)
 
         if AuxDataTypes(inDataType) == AuxDataTypes.eXMLData:
             theDescription = self.Recv()
@@ -1772,13 +1805,7 @@ class SBAccess(object):
         """
         l = len(inImageName)
 
-        self.SendCommand('$CreateImageGroup(ImageName='+str(l)+':s,NumChannels=i4,NumPlanes=i4,NumRows=i4,NumColumns=i4,NumTimepoints=i4)')
-        self.SendVal(inImageName,'s')
-        self.SendVal(int(inNumChannels),'i4')
-        self.SendVal(int(inNumPlanes),'i4')
-        self.SendVal(int(inNumRows),'i4')
-        self.SendVal(int(inNumColumns),'i4')
-        self.SendVal(int(inNumTimepoints),'i4')
+        self.SendCall(ct.GetCommand('CreateImageGroup'),inImageName,inNumChannels,inNumPlanes,inNumRows,inNumColumns,inNumTimepoints)
 
         theNum,theVals = self.Recv()
         return theVals
@@ -1794,8 +1821,7 @@ class SBAccess(object):
         -------
         none
         """
-        self.SendCommand('$CopyImageGroup(CopyCaptureIndex=i4)')
-        self.SendVal(int(inCopyCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('CopyImageGroup'),inCopyCaptureIndex)
         theNum,theVals = self.Recv()
         return theVals
 
@@ -1814,10 +1840,7 @@ class SBAccess(object):
         -------
         none
         """
-        l = len(inComment)
-        self.SendCommand('$SetImageComment(CaptureIndex=i4,Comment='+str(l)+':s)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(inComment,'s')
+        self.SendCall(ct.GetCommand('SetImageComment'),inCaptureIndex,inComment)
 
 
     def SetChannelName(self,inCaptureIndex,inChannelIndex,inChannelName):
@@ -1836,11 +1859,7 @@ class SBAccess(object):
         -------
         none
         """
-        l = len(inChannelName)
-        self.SendCommand('$SetChannelName(CaptureIndex=i4,ChannelIndex=i4,ChannelName='+str(l)+':s)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inChannelIndex),'i4')
-        self.SendVal(inChannelName,'s')
+        self.SendCall(ct.GetCommand('SetChannelName'),inCaptureIndex,inChannelIndex,inChannelName)
 
 
     def SetMagnification(self,inCaptureIndex,inLensMagnification,inOptovarMagnification):
@@ -1858,10 +1877,7 @@ class SBAccess(object):
         none
         """
         
-        self.SendCommand('$SetMagnification(CaptureIndex=i4,LensMagnification=f4,OptovarMagnification=f4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(float(inLensMagnification),'f4')
-        self.SendVal(float(inOptovarMagnification),'f4')
+        self.SendCall(ct.GetCommand('SetMagnification'),inCaptureIndex,inLensMagnification,inOptovarMagnification)
 
     def SetVoxelSize(self,inCaptureIndex,inSizeX,inSizeY,inSizeZ):
         """ Sets the voxel size in microns of an image group
@@ -1882,11 +1898,7 @@ class SBAccess(object):
         none
         """
         
-        self.SendCommand('$SerVoxelSize(CaptureIndex=i4,SizeX=f4,SizeY=f4,SizeZ=f4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(float(inSizeX),'f4')
-        self.SendVal(float(inSizeY),'f4')
-        self.SendVal(float(inSizeZ),'f4')
+        self.SendCall(ct.GetCommand('SerVoxelSize'),inCaptureIndex,inSizeX,inSizeY,inSizeZ)
 
     def SetCaptureDate(self,inCaptureIndex,inYear,inMonth,inDay,inHour,inMinute,inSecond):
         """ Sets the date of acquisition of an image group
@@ -1902,14 +1914,7 @@ class SBAccess(object):
         -------
         none
         """
-        self.SendCommand('$SetCaptureDate(CaptureIndex=i4,Year=i4,Month=i4,Day=i4,Hour=i4,Minute=i4,Second=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inYear),'i4')
-        self.SendVal(int(inMonth),'i4')
-        self.SendVal(int(inDay),'i4')
-        self.SendVal(int(inHour),'i4')
-        self.SendVal(int(inMinute),'i4')
-        self.SendVal(int(inSecond),'i4')
+        self.SendCall(ct.GetCommand('SetCaptureDate'),inCaptureIndex,inYear,inMonth,inDay,inHour,inMinute,inSecond)
         
     def SetXYZPosition(self,inCaptureIndex,inPositionX,inPositionY,inPositionZ):
         """ Sets the x,y,z position of an image group
@@ -1929,10 +1934,7 @@ class SBAccess(object):
         -------
         none
         """
-        self.SendCommand('$SetXYZPosition(CaptureIndex=i4,PositionX=f4,PositionY=f4,PositionZ=f4)')
-        self.SendVal(float(inPositionX),'f4')
-        self.SendVal(float(inPositionY),'f4')
-        self.SendVal(float(inPositionZ),'f4')
+        self.SendCall(ct.GetCommand('SetXYZPosition'),inCaptureIndex,inPositionX,inPositionY,inPositionZ)
 
     def WriteImagePlaneBuf(self,inCaptureIndex,inTimepointIndex,inZPlaneIndex,inChannelIndex,inNumpyArray):
         """ Writes a z plane of an image from a numpy array
@@ -1954,19 +1956,16 @@ class SBAccess(object):
         -------
         none
         """
-        theBytes = inNumpyArray.tobytes()
-        l = len(theBytes)
-
-        self.SendCommand('$WriteImagePlaneBuf(CaptureIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4,ByteArray='+str(l)+':b)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inTimepointIndex),'i4')
-        self.SendVal(int(inZPlaneIndex),'i4')
-        self.SendVal(int(inChannelIndex),'i4')
-        self.SendByteArray(theBytes);
+        self.SendImagePlane(inCaptureIndex,inTimepointIndex,inZPlaneIndex,inChannelIndex,inNumpyArray)
+        self.RecvWriteAck("WriteImagePlaneBuf")
 
-        theNum,theVals = self.Recv()
-        if( theNum != 1 and theVals[0] != 1):
-            raise Exception("WriteImagePlaneBuf: error")
+    def SendImagePlane(self,inCaptureIndex,inTimepointIndex,inZPlaneIndex,inChannelIndex,inNumpyArray):
+        theBytes = self.GetByteView(inNumpyArray)
+        theName = 'WriteImagePlaneBuf'
+        if self.mCompressedTransfer:
+            theBytes = self.CompressTransfer(theBytes)
+            theName = 'WriteImagePlaneBufZstd'
+        self.SendCall(ct.GetCommand(theName),inCaptureIndex,inTimepointIndex,inZPlaneIndex,inChannelIndex,theBytes)
     
     # Mask fucntions
 
@@ -1990,13 +1989,10 @@ class SBAccess(object):
 
         """
 
-        self.SendCommand('$ReadMaskPlaneBuf(CaptureIndex=i4,MaskIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(int(inMaskIndex),'i4')
-        self.SendVal(int(inTimepointIndex),'i4')
-        self.SendVal(int(inZPlaneIndex),'i4')
-
-        theNum,theVals = self.Recv()
+        theName = 'ReadMaskPlaneBufZstd' if self.mCompressedTransfer else 'ReadMaskPlaneBuf'
+        theVals = self.Call(theName,inCaptureIndex,inMaskIndex,inTimepointIndex,inZPlaneIndex)
+        if self.mCompressedTransfer:
+            return self.DecompressTransfer(theVals)
         return theVals
 
 
@@ -2019,20 +2015,90 @@ class SBAccess(object):
         -------
         none
         """
-        theBytes = inNumpyArray.tobytes()
-        lb = len(theBytes)
-        lm = len(inMaskName)
+        self.SendMaskPlane(inCaptureIndex,inMaskName,inTimepointIndex,inZPlaneIndex,inNumpyArray)
+        self.RecvWriteAck("WriteMaskPlaneBuf")
 
-        self.SendCommand('$WriteMaskPlaneBuf(CaptureIndex=i4,MaskName='+str(lm)+':s,TimepointIndex=i4,ZPlaneIndex=i4,ByteArray='+str(lb)+':b)')
-        self.SendVal(int(inCaptureIndex),'i4')
-        self.SendVal(inMaskName,'s')
-        self.SendVal(int(inTimepointIndex),'i4')
-        self.SendVal(int(inZPlaneIndex),'i4')
-        self.SendByteArray(theBytes);
+    def SendMaskPlane(self,inCaptureIndex,inMaskName,inTimepointIndex,inZPlaneIndex,inNumpyArray):
+        theBytes = self.GetByteView(inNumpyArray)
+        self.SendCall(ct.GetCommand('WriteMaskPlaneBuf'),inCaptureIndex,inMaskName,inTimepointIndex,inZPlaneIndex,theBytes)
 
-        theNum,theVals = self.Recv()
-        if( theNum != 1 and theVals[0] != 1):
-            raise Exception("WriteMaskPlaneBuf: error")
+    def WriteImageStack(self,inCaptureIndex,inTimepointIndex,inChannelIndex,inNumpyArray,inMaxPending=16):
+        """ Writes all the z planes of an image from a 3D numpy array
+
+        The planes are sent back to back without waiting for each acknowledgement,
+        at most inMaxPending acknowledgements are outstanding at any time.
+        If a plane is not written, the following planes are not sent and an exception
+        is raised once the outstanding acknowledgements are read.
+        The plane data is sent directly from the numpy buffer (no copy if the array
+        is C contiguous and of type uint16)
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inTimepointIndex: int
+            The time point
+        inChannelIndex: int
+            The channel number. If the channel number (they start at 0) is equal to the number of channels, then a new channel is added
+        inNumpyArray: numpy array of u2 (unsigned 16 bit integer)
+            The stack to be written, shape is (nz,ny,nx) or (nz,ny*nx). Other types are rejected
+        inMaxPending: int, optional
+            The maximum number of planes sent whose acknowledgement has not been received yet
+
+        Returns
+        -------
+        none
+        """
+        theStack = np.asarray(inNumpyArray)
+        if theStack.dtype != np.uint16:
+            # a conversion would wrap or truncate the values silently
+            raise Exception("WriteImageStack: the array must be of type uint16, not " + str(theStack.dtype))
+        if theStack.ndim < 2:
+            raise Exception("WriteImageStack: the array must have at least 2 dimensions (nz,...)")
+
+        def SendPlane(inZPlane):
+            self.SendImagePlane(inCaptureIndex,inTimepointIndex,inZPlane,inChannelIndex,theStack[inZPlane])
+
+        self.WritePlanesPipelined("WriteImageStack",SendPlane,theStack.shape[0],inMaxPending)
+
+    def WriteMaskStack(self,inCaptureIndex,inMaskName,inTimepointIndex,inNumpyArray,inMaxPending=16):
+        """ Writes all the z planes of a mask from a 3D numpy array
+
+        The planes are sent back to back without waiting for each acknowledgement,
+        at most inMaxPending acknowledgements are outstanding at any time.
+        If a plane is not written, the following planes are not sent and an exception
+        is raised once the outstanding acknowledgements are read.
+        The plane data is sent directly from the numpy buffer (no copy if the array
+        is C contiguous and of type uint16)
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inMaskName: str
+            The name of the mask
+        inTimepointIndex: int
+            The time point
+        inNumpyArray: numpy array of u2 (unsigned 16 bit integer)
+            The mask stack to be written, shape is (nz,ny,nx) or (nz,ny*nx). Other types are rejected
+        inMaxPending: int, optional
+            The maximum number of planes sent whose acknowledgement has not been received yet
+
+        Returns
+        -------
+        none
+        """
+        theStack = np.asarray(inNumpyArray)
+        if theStack.dtype != np.uint16:
+            # a conversion would wrap or truncate the values silently
+            raise Exception("WriteMaskStack: the array must be of type uint16, not " + str(theStack.dtype))
+        if theStack.ndim < 2:
+            raise Exception("WriteMaskStack: the array must have at least 2 dimensions (nz,...)")
+
+        def SendPlane(inZPlane):
+            self.SendMaskPlane(inCaptureIndex,inMaskName,inTimepointIndex,inZPlane,theStack[inZPlane])
+
+        self.WritePlanesPipelined("WriteMaskStack",SendPlane,theStack.shape[0],inMaxPending)
 
     # Live capture functions
     def Start6DCaptureSequential(self,CaptureMode : SequentialCaptureMode, Repetitions):
@@ -2050,9 +2116,7 @@ class SBAccess(object):
             the capture id. If the capture failed to start, return -1
         """
 
-        self.SendCommand('$Start6DCaptureSequential(CaptureMode=i4,Repetitions=i4)')
-        self.SendVal(int(CaptureMode.value),'i4')
-        self.SendVal(int(Repetitions),'i4')
+        self.SendCall(ct.GetCommand('Start6DCaptureSequential'),CaptureMode.value,Repetitions)
         theNum,theVals = self.Recv()
         if( theNum != 1 or theVals[0] == -1):
             raise Exception("StartCapture: error")
@@ -2071,9 +2135,7 @@ class SBAccess(object):
         int
             the capture id. If the capture failed to start, return -1
         """
-        l = len(inScriptName)
-        self.SendCommand('$StartCapture(ScriptName='+str(l)+':s)')
-        self.SendVal(inScriptName,'s')
+        self.SendCall(ct.GetCommand('StartCapture'),inScriptName)
         theNum,theVals = self.Recv()
         if( theNum != 1 or theVals[0] == -1):
             raise Exception("StartCapture: error")
@@ -2092,7 +2154,7 @@ class SBAccess(object):
         int
             0
         """
-        self.SendCommand('$StopCapture()')
+        self.SendCall(ct.GetCommand('StopCapture'))
         theNum,theVals = self.Recv()
         if( theNum != 1 or theVals[0] == -1):
             raise Exception("StopCapture: error")
@@ -2109,7 +2171,7 @@ class SBAccess(object):
         int
             the capture id. If the streaming failed to start, return -1
         """
-        self.SendCommand('$StartStreaming()')
+        self.SendCall(ct.GetCommand('StartStreaming'))
         theNum,theVals = self.Recv()
         if( theNum != 1 or theVals[0] == -1):
             raise Exception("StartStreaming: error")
@@ -2126,7 +2188,7 @@ class SBAccess(object):
         int
             0
         """
-        self.SendCommand('$StopStreaming()')
+        self.SendCall(ct.GetCommand('StopStreaming'))
         theNum,theVals = self.Recv()
         if( theNum != 1 or theVals[0] == -1):
             raise Exception("StopStreaming: error")
@@ -2146,8 +2208,7 @@ class SBAccess(object):
         int
             the capture id
         """
-        self.SendCommand('$GetCurrentCaptureId(PositionIndex=i4)')
-        self.SendVal(int(inPositionIndex),'i4')
+        self.SendCall(ct.GetCommand('GetCurrentCaptureId'),inPositionIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2167,7 +2228,7 @@ class SBAccess(object):
             the index (timepoint) of the current image captured
         """
 
-        self.SendCommand('$GetCurrentTimepointCaptured()')
+        self.SendCall(ct.GetCommand('GetCurrentTimepointCaptured'))
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2190,8 +2251,7 @@ class SBAccess(object):
             the index (timepoint) of the last image captured
         """
 
-        self.SendCommand('$GetLastImageCaptured(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('GetLastImageCaptured'),inCaptureIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2213,8 +2273,7 @@ class SBAccess(object):
             the index (timepoint) of the last image captured
         """
 
-        self.SendCommand('$GetLastImageStreamed(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('GetLastImageStreamed'),inCaptureIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2234,7 +2293,7 @@ class SBAccess(object):
             the index of the plane being captured
         """
 
-        self.SendCommand('$GetCurrentPlaneCaptured()')
+        self.SendCall(ct.GetCommand('GetCurrentPlaneCaptured'))
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2256,8 +2315,7 @@ class SBAccess(object):
             the index (plane) of the last plane captured
         """
 
-        self.SendCommand('$GetLastPlaneCaptured(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('GetLastPlaneCaptured'),inCaptureIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2280,7 +2338,7 @@ class SBAccess(object):
             thei channel number being captured
         """
 
-        self.SendCommand('$GetCurrentChannelCaptured()')
+        self.SendCall(ct.GetCommand('GetCurrentChannelCaptured'))
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2302,8 +2360,7 @@ class SBAccess(object):
             the index (plane) of the last plane captured
         """
 
-        self.SendCommand('$GetLastChannelCaptured(CaptureIndex=i4)')
-        self.SendVal(int(inCaptureIndex),'i4')
+        self.SendCall(ct.GetCommand('GetLastChannelCaptured'),inCaptureIndex)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2323,7 +2380,7 @@ class SBAccess(object):
             the position index of the current captured image
         """
 
-        self.SendCommand('$GetCurrentPositionIndexCaptured()')
+        self.SendCall(ct.GetCommand('GetCurrentPositionIndexCaptured'))
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2344,7 +2401,7 @@ class SBAccess(object):
             the number of positions in the current experiment bein g captured
         """
 
-        self.SendCommand('$GetCurrentNumPositionsCaptured()')
+        self.SendCall(ct.GetCommand('GetCurrentNumPositionsCaptured'))
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2365,7 +2422,7 @@ class SBAccess(object):
             the experiment index being captured
         """
 
-        self.SendCommand('$GetCurrentExperimentCaptured()')
+        self.SendCall(ct.GetCommand('GetCurrentExperimentCaptured'))
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -2385,7 +2442,7 @@ class SBAccess(object):
         bool
             True if is capturing, false if it is not
         """
-        self.SendCommand('$IsCapturing()')
+        self.SendCall(ct.GetCommand('IsCapturing'))
         theNum,theVals = self.Recv()
         if( theNum != 1):
             raise Exception("IsCapturing: failed")
@@ -2405,7 +2462,7 @@ class SBAccess(object):
         bool
             True if is capturing, false if it is not
         """
-        self.SendCommand('$IsStreaming()')
+        self.SendCall(ct.GetCommand('IsStreaming'))
         theNum,theVals = self.Recv()
         if( theNum != 1):
             raise Exception("IsStreaming: failed")
@@ -2427,8 +2484,7 @@ class SBAccess(object):
         bool
             True if is enabled, false if it is not
         """
-        self.SendCommand('$GetIsHardwareComponentEnabled(ComponentIndex=i4)')
-        self.SendVal(int(inComponentID.value), 'i4')
+        self.SendCall(ct.GetCommand('GetIsHardwareComponentEnabled'),inComponentID.value)
         theNum, theVals = self.Recv()
         if (theNum != 1):
             raise Exception("GetIsHardwareComponentEnabled: failed")
@@ -2450,8 +2506,7 @@ class SBAccess(object):
         list
             Returns the device name of inComponentID. If not enabled returns keyword 'Empty'
         """
-        self.SendCommand('$GetHardwareComponentName(ComponentIndex=i4)')
-        self.SendVal(int(inComponentID.value),'i4')
+        self.SendCall(ct.GetCommand('GetHardwareComponentName'),inComponentID.value)
         theString = self.Recv()
         return theString
 
@@ -2470,8 +2525,7 @@ class SBAccess(object):
         result
             Returns success (1) or failure (0)
         """
-        self.SendCommand('$GetHardwareComponentMinMax(ComponentIndex=i4)')
-        self.SendVal(int(inComponentID.value), 'i4')
+        self.SendCall(ct.GetCommand('GetHardwareComponentMinMax'),inComponentID.value)
         theNum, theVals = self.Recv()
         if (theNum != 2):
             raise Exception("GetHardwareComponentMinMax: failed")
@@ -2497,9 +2551,7 @@ class SBAccess(object):
         bool
             Returns success or failure
         """
-        self.SendCommand('$SetHardwareComponentOpen(ComponentIndex=i4,Open=i4)')
-        self.SendVal(int(inComponentID.value), 'i4')
-        self.SendVal(int(inOpen), 'i4')
+        self.SendCall(ct.GetCommand('SetHardwareComponentOpen'),inComponentID.value,inOpen)
         theNum, theVals = self.Recv()
         if (theNum != 1):
             raise Exception("SetHardwareComponentOpen: failed")
@@ -2524,8 +2576,7 @@ class SBAccess(object):
         bool
             Returns success or failure
         """
-        self.SendCommand('$GetHardwareComponentOpen(ComponentIndex=i4)')
-        self.SendVal(int(inComponentID.value), 'i4')
+        self.SendCall(ct.GetCommand('GetHardwareComponentOpen'),inComponentID.value)
 
         theNum,theState = self.Recv()
         if(theNum != 1):
@@ -2555,9 +2606,7 @@ class SBAccess(object):
         bool
             Returns success or failure
         """
-        self.SendCommand('$SetHardwareComponentPosition(ComponentIndex=i4,Position=i4)')
-        self.SendVal(int(inComponentID.value), 'i4')
-        self.SendVal(int(inPosition), 'i4')
+        self.SendCall(ct.GetCommand('SetHardwareComponentPosition'),inComponentID.value,inPosition)
         theNum, theVals = self.Recv()
         if (theNum != 1):
             raise Exception("SetHardwareComponentPosition: failed")
@@ -2582,8 +2631,7 @@ class SBAccess(object):
         int
             Returns success (1) or failure (0)
         """
-        self.SendCommand('$GetHardwareComponentPosition(ComponentIndex=i4)')
-        self.SendVal(int(inComponentID.value), 'i4')
+        self.SendCall(ct.GetCommand('GetHardwareComponentPosition'),inComponentID.value)
         theNum, theVals = self.Recv()
         if (theNum != 1):
             raise Exception("GetHardwareComponentPosition: failed")
@@ -2614,11 +2662,7 @@ class SBAccess(object):
             Returns success or failure
         """
         try:
-            self.SendCommand('$SetHardwareComponentLocationMicrons(ComponentIndex=i4,x=f4,y=f4,z=f4)')
-            self.SendVal(int(inComponentID.value), 'i4')
-            self.SendVal(float(inXMicrons), 'f4')
-            self.SendVal(float(inYMicrons), 'f4')
-            self.SendVal(float(inZMicrons), 'f4')
+            self.SendCall(ct.GetCommand('SetHardwareComponentLocationMicrons'),inComponentID.value,inXMicrons,inYMicrons,inZMicrons)
 
             theNum, theVals = self.Recv()
             if (theNum != 1):
@@ -2651,11 +2695,7 @@ class SBAccess(object):
             Returns success or failure
         """
         try:
-            self.SendCommand('$IncrementHardwareComponentLocationMicrons(ComponentIndex=i4,x=f4,y=f4,z=f4)')
-            self.SendVal(int(inComponentID.value), 'i4')
-            self.SendVal(float(inXMicrons), 'f4')
-            self.SendVal(float(inYMicrons), 'f4')
-            self.SendVal(float(inZMicrons), 'f4')
+            self.SendCall(ct.GetCommand('IncrementHardwareComponentLocationMicrons'),inComponentID.value,inXMicrons,inYMicrons,inZMicrons)
 
             theNum, theVals = self.Recv()
             if (theNum != 1):
@@ -2687,8 +2727,7 @@ class SBAccess(object):
             The Z location in um (0 if unsupported)
 
         """
-        self.SendCommand('$GetHardwareComponentLocationMicrons(ComponentIndex=i4)')
-        self.SendVal(int(inComponentID.value),'i4')
+        self.SendCall(ct.GetCommand('GetHardwareComponentLocationMicrons'),inComponentID.value)
 
         theNum,theX = self.Recv()
         if( theNum != 1):
@@ -2722,10 +2761,7 @@ class SBAccess(object):
             Returns success or failure (command will fail if spin TIRF enabled and inDisableSpin is false)
         """
         try:
-            self.SendCommand('$SetVector3ScannerPosition(X_mV=i4,Y_mV=i4,DisableSpin=i4)')
-            self.SendVal(int(inX_mV), 'i4')
-            self.SendVal(int(inY_mV), 'i4')
-            self.SendVal(int(inDisableSpin), 'i4')
+            self.SendCall(ct.GetCommand('SetVector3ScannerPosition'),inX_mV,inY_mV,inDisableSpin)
             theNum, theVals = self.Recv()
             if (theNum != 1):
                 raise Exception("SetVector3ScannerPosition: failed")
@@ -2752,7 +2788,7 @@ class SBAccess(object):
         int
             current spin state (1=spin, 0=not)
         """
-        self.SendCommand('$GetVector3ScannerPosition()')
+        self.SendCall(ct.GetCommand('GetVector3ScannerPosition'))
         theNum, theX = self.Recv()
         if (theNum != 1):
             raise Exception("GetVector3ScannerPosition: failed")
@@ -2785,8 +2821,7 @@ class SBAccess(object):
             Returns success or failure
         """
         try:
-            self.SendCommand('$SetVector3StepperPosition(Position=i4)')
-            self.SendVal(int(inPosition), 'i4')
+            self.SendCall(ct.GetCommand('SetVector3StepperPosition'),inPosition)
             theNum, theVals = self.Recv()
             if (theNum != 1):
                 raise Exception("SetVector3StepperPosition: failed")
@@ -2809,7 +2844,7 @@ class SBAccess(object):
         int
             Returns the current position of stepper motor
         """
-        self.SendCommand('$GetVector3StepperPosition()')
+        self.SendCall(ct.GetCommand('GetVector3StepperPosition'))
         theNum, theVals = self.Recv()
         if (theNum != 1):
             raise Exception("GetVector3StepperPosition: failed")
@@ -2831,7 +2866,7 @@ class SBAccess(object):
         bool
             Returns True if successful and False if not successful
         """
-        self.SendCommand('$ConfirmFocusWindow()')
+        self.SendCall(ct.GetCommand('ConfirmFocusWindow'))
         theNum, theVals = self.Recv()
         if (theNum != 1):
             raise Exception("ConfirmFocusWindow: failed")
@@ -2852,7 +2887,7 @@ class SBAccess(object):
             Returns True if successful and False if not successful
        """
 
-        self.SendCommand('$ClearXYZPoints()')
+        self.SendCall(ct.GetCommand('ClearXYZPoints'))
 
         theNum, theVals = self.Recv()
         if (theNum != 1):
@@ -2887,8 +2922,7 @@ class SBAccess(object):
         if (isSupported == False):
             return 0, arr, False
 
-        self.SendCommand('$GetXYZMontagePointList(PointIndex=i4)')
-        self.SendVal(int(PointIndex), 'i4')
+        self.SendCall(ct.GetCommand('GetXYZMontagePointList'),PointIndex)
 
         theNum, theNumPoints = self.Recv()
         if (theNum != 1):
@@ -2936,8 +2970,7 @@ class SBAccess(object):
         if (version < 47334):
             return 0, arr, False
 
-        self.SendCommand('$GetXYZPoint(PointIndex=i4)')
-        self.SendVal(int(PointIndex),'i4')
+        self.SendCall(ct.GetCommand('GetXYZPoint'),PointIndex)
 
         theNum, x = self.Recv()
         theNum, y = self.Recv()
@@ -2968,7 +3001,7 @@ class SBAccess(object):
             Returns True if successful and False if not successful
        """
 
-        self.SendCommand('$GetXYZPointCount()')
+        self.SendCall(ct.GetCommand('GetXYZPointCount'))
 
         theNum, theNumPoints = self.Recv()
         if (theNum != 1):
@@ -2997,9 +3030,7 @@ class SBAccess(object):
                 Authorized : bool
                     True if the current hardware protection key authorizes the command, false if the command is not authorized
                 """
-        l = len(Command)
-        self.SendCommand('$GetIsCommandSupported(Command='+str(l)+':s)')
-        self.SendVal(Command, 's')
+        self.SendCall(ct.GetCommand('GetIsCommandSupported'),Command)
         theNum, isSupported = self.Recv()
 
         if(isSupported[0] > 0):
@@ -3025,7 +3056,7 @@ class SBAccess(object):
             SlideBook hardware protection key serial number
         """
 
-        self.SendCommand('$GetSlideBookVersion()')
+        self.SendCall(ct.GetCommand('GetSlideBookVersion'))
 
         theNum, theMajor = self.Recv()
         if (theNum != 1):
@@ -3072,13 +3103,7 @@ class SBAccess(object):
 
         """
 
-        self.SendCommand('$AddXYZPoint(Xum=f4,Yum=f4,Zum=f4,AuxZum=f4,IsAuxZ=i4)')
-
-        self.SendVal(float(inXum),'f4')
-        self.SendVal(float(inYum),'f4')
-        self.SendVal(float(inZum),'f4')
-        self.SendVal(float(inAuxZum),'f4')
-        self.SendVal(int(inIsAuxZ),'i4')
+        self.SendCall(ct.GetCommand('AddXYZPoint'),inXum,inYum,inZum,inAuxZum,inIsAuxZ)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -3100,7 +3125,7 @@ class SBAccess(object):
         list
             a list of strings . If there is no point list defined in the XY Tab, it returns the keyword 'Empty'
         """
-        self.SendCommand('$GetXYZPointList()')
+        self.SendCall(ct.GetCommand('GetXYZPointList'))
 
         theStr = self.Recv()
 
@@ -3121,8 +3146,7 @@ class SBAccess(object):
             
         """
 
-        self.SendCommand('$GetMicroscopeState(state=i4)')
-        self.SendVal(int(state.value),'i4')
+        self.SendCall(ct.GetCommand('GetMicroscopeState'),state.value)
 
         if state == MicroscopeStates.CurrentObjective:
             theStr = self.Recv()
@@ -3705,7 +3729,7 @@ class SBAccess(object):
         """
 
         try:
-            self.SendCommand('$FocusWindowSupportsARCSliceTIRF()')
+            self.SendCall(ct.GetCommand('FocusWindowSupportsARCSliceTIRF'))
             theNum, theVals = self.Recv()
             if (theNum != 1):
                 raise Exception("FocusWindowSupportsARCSliceTIRF: failed")
@@ -3746,11 +3770,7 @@ class SBAccess(object):
             m = len(Slices)
 
 
-            self.SendCommand('$FocusWindowSetARCSliceTIRFParameters(Position=i4,ArcInfo='+str(l)+':s,SliceInfo='+str(m)+':s,Save=i4)')
-            self.SendVal(int(Position), 'i4')
-            self.SendVal(Arcs, 's')
-            self.SendVal(Slices, 's')
-            self.SendVal(int(Save), 'i4')
+            self.SendCall(ct.GetCommand('FocusWindowSetARCSliceTIRFParameters'),Position,Arcs,Slices,Save)
 
             theNum, theVals = self.Recv()
             if (theNum != 1):
@@ -3782,8 +3802,7 @@ class SBAccess(object):
             Returns success or failure
         """
 
-        self.SendCommand('$FocusWindowGetARCSliceTIRFParameters(Position=i4)')
-        self.SendVal(int(Position), 'i4')
+        self.SendCall(ct.GetCommand('FocusWindowGetARCSliceTIRFParameters'),Position)
 
         arcs = self.Recv()
 
@@ -3826,16 +3845,7 @@ class SBAccess(object):
             Returns success or failure
         """
         try:
-            self.SendCommand('$FocusWindowSetTIRFParameters(Position=i4,Radius_mV=i4,X_mV=i4,Y_mV=i4,Duration_ms=f4,MotorPos=i4,MotorEnable=i4,SpinEnable=i4,Save=i4)')
-            self.SendVal(int(Position), 'i4')
-            self.SendVal(int(Radius_mV), 'i4')
-            self.SendVal(int(X_mV), 'i4')
-            self.SendVal(int(Y_mV), 'i4')
-            self.SendVal(float(Duration_ms), 'f4')
-            self.SendVal(int(MotorPos), 'i4')
-            self.SendVal(int(MotorEnable), 'i4')
-            self.SendVal(int(SpinEnable), 'i4')
-            self.SendVal(int(Save), 'i4')
+            self.SendCall(ct.GetCommand('FocusWindowSetTIRFParameters'),Position,Radius_mV,X_mV,Y_mV,Duration_ms,MotorPos,MotorEnable,SpinEnable,Save)
 
             theNum, theVals = self.Recv()
             if (theNum != 1):
@@ -3878,8 +3888,7 @@ class SBAccess(object):
             1 if is succesful, 0 otherwise
         """
 
-        self.SendCommand('$FocusWindowGetTIRFParameters(Position=i4)')
-        self.SendVal(int(Position), 'i4')
+        self.SendCall(ct.GetCommand('FocusWindowGetTIRFParameters'),Position)
 
         theNum, Radius_mV = self.Recv()
         if (theNum != 1):
@@ -3930,14 +3939,7 @@ class SBAccess(object):
             True if is a stimulation region, False otherwise
         """
 
-        self.SendCommand('$LiveWindowAddRectangleRegion(WindowIndex=i4,X=i4,Y=i4,Width=i4,Height=i4,IsStimulation=i4)')
-
-        self.SendVal(int(inWindowIndex),'i4')
-        self.SendVal(int(inX),'i4')
-        self.SendVal(int(inY),'i4')
-        self.SendVal(int(inWidth),'i4')
-        self.SendVal(int(inHeight),'i4')
-        self.SendVal(int(inIsStimulation),'i4')
+        self.SendCall(ct.GetCommand('LiveWindowAddRectangleRegion'),inWindowIndex,inX,inY,inWidth,inHeight,inIsStimulation)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -3966,14 +3968,7 @@ class SBAccess(object):
             True if is a stimulation region, False otherwise
         """
 
-        self.SendCommand('$LiveWindowAddEllipseRegion(WindowIndex=i4,X=i4,Y=i4,Width=i4,Height=i4,IsStimulation=i4)')
-
-        self.SendVal(int(inWindowIndex),'i4')
-        self.SendVal(int(inX),'i4')
-        self.SendVal(int(inY),'i4')
-        self.SendVal(int(inWidth),'i4')
-        self.SendVal(int(inHeight),'i4')
-        self.SendVal(int(inIsStimulation),'i4')
+        self.SendCall(ct.GetCommand('LiveWindowAddEllipseRegion'),inWindowIndex,inX,inY,inWidth,inHeight,inIsStimulation)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -4002,14 +3997,7 @@ class SBAccess(object):
             True if is a stimulation region, False otherwise
         """
 
-        self.SendCommand('$LiveWindowAddLineRegion(WindowIndex=i4,X=i4,Y=i4,Width=i4,Height=i4,IsStimulation=i4)')
-
-        self.SendVal(int(inWindowIndex),'i4')
-        self.SendVal(int(inX),'i4')
-        self.SendVal(int(inY),'i4')
-        self.SendVal(int(inWidth),'i4')
-        self.SendVal(int(inHeight),'i4')
-        self.SendVal(int(inIsStimulation),'i4')
+        self.SendCall(ct.GetCommand('LiveWindowAddLineRegion'),inWindowIndex,inX,inY,inWidth,inHeight,inIsStimulation)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -4035,14 +4023,8 @@ class SBAccess(object):
         theNumPairs = len(inXYPointList) / 2
         theB = np.uint32(inXYPointList)
         theBytes = theB.tobytes();
-        l = len(theBytes)
-
-        self.SendCommand('$LiveWindowAddPolygonRegion(WindowIndex=i4,NumPairs=i4,XYPointList='+str(l)+':b,IsStimulation=i4)')
 
-        self.SendVal(int(inWindowIndex),'i4')
-        self.SendVal(int(theNumPairs),'i4')
-        self.SendByteArray(theBytes);
-        self.SendVal(int(inIsStimulation),'i4')
+        self.SendCall(ct.GetCommand('LiveWindowAddPolygonRegion'),inWindowIndex,theNumPairs,theBytes,inIsStimulation)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -4111,7 +4093,7 @@ class SBAccess(object):
             if(res == 0):
                 return False
 
-        self.SendCommand('$FocusSurface_AddCalibrationPoint()')
+        self.SendCall(ct.GetCommand('FocusSurface_AddCalibrationPoint'))
 
         theNum,theVals = self.Recv()
 
@@ -4135,7 +4117,7 @@ class SBAccess(object):
 
         """
 
-        self.SendCommand('$FocusSurface_ClearCalibrationPoints()')
+        self.SendCall(ct.GetCommand('FocusSurface_ClearCalibrationPoints'))
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -4158,7 +4140,7 @@ class SBAccess(object):
 
         """
 
-        self.SendCommand('$FocusSurface_FitSurface()')
+        self.SendCall(ct.GetCommand('FocusSurface_FitSurface'))
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -4182,7 +4164,7 @@ class SBAccess(object):
 
         """
 
-        self.SendCommand('$FocusSurface_IsSurfaceFit()')
+        self.SendCall(ct.GetCommand('FocusSurface_IsSurfaceFit'))
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -4213,9 +4195,7 @@ class SBAccess(object):
                 The Z2 fitted coordinate
 
         """
-        self.SendCommand('$FocusSurface_FitPoint(XCoord=f4,YCoord=f4)')
-        self.SendVal(float(inXum), 'f4')
-        self.SendVal(float(inYum), 'f4')
+        self.SendCall(ct.GetCommand('FocusSurface_FitPoint'),inXum,inYum)
         theNum,theVals = self.Recv()
         if( theNum != 1):
             raise Exception("FocusSurface_IsSurfaceFit: failed")
@@ -4275,8 +4255,7 @@ class SBAccess(object):
                 If the experiment is not set, the returned string is 'Default'
         """
 
-        self.SendCommand('$GetXYZSavedExperimentName(Index=i4)')
-        self.SendVal(int(inIndex),'i4')
+        self.SendCall(ct.GetCommand('GetXYZSavedExperimentName'),inIndex)
         theStr = self.Recv()
         theNum,theVals = self.Recv()
         if( theNum != 1):
@@ -4301,10 +4280,7 @@ class SBAccess(object):
             Return True/False based on bounds checking AND confirmation that the ExperimentName exists
         """
 
-        l = len(inExperimentName)
-        self.SendCommand('$SetXYZSavedExperimentName(Index=i4,ExperimentName='+str(l)+':s)')
-        self.SendVal(int(inIndex),'i4')
-        self.SendVal(inExperimentName,'s')
+        self.SendCall(ct.GetCommand('SetXYZSavedExperimentName'),inIndex,inExperimentName)
 
         theNum,theVals = self.Recv()
         if( theNum != 1):
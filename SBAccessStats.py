@@ -0,0 +1,217 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Per command instrumentation of an SBAccess session
+
+Enable it with SBAccess.EnableStats(). For every command name ($Name in SendCommand)
+the number of calls, the bytes sent and received and a latency histogram are recorded.
+The latency of a command is measured from the moment its header is sent to the last
+byte sent or received before the next command starts. Commands sent pipelined
+(WriteImageStack) overlap, so their latency is only indicative. A snapshot (GetStats)
+taken while a command is in progress includes its latency so far, the command stays
+in progress: the bytes received after the snapshot still count in its latency.
+"""
+
+import threading
+import time
+import numpy as np
+
+
+class CCommandStats(object):
+    """ the statistics of one command name """
+    def __init__(self, inNumBuckets):
+        self.mCount = 0
+        self.mBytesSent = 0
+        self.mBytesReceived = 0
+        self.mLatencySumS = 0.0
+        self.mLatencyMaxS = 0.0
+        self.mLatencyHistogram = np.zeros(inNumBuckets + 1, dtype=np.int64)
+
+
+class SBAccessStats(object):
+    """ Collects the per command statistics of an SBAccess session """
+
+    # upper bounds of the latency histogram buckets in seconds, the last bucket is +Inf
+    kLatencyBucketsS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+    def __init__(self):
+        self.mLock = threading.Lock()
+        self.mCommandStatsMap = dict()
+        self.mCurrentName = None
+        self.mCurrentStartS = 0.0
+        self.mCurrentLastS = 0.0
+        self.mLastName = None
+
+    def GetCommandStats(self, inName):
+        theStats = self.mCommandStatsMap.get(inName)
+        if theStats is None:
+            theStats = CCommandStats(len(self.kLatencyBucketsS))
+            self.mCommandStatsMap[inName] = theStats
+        return theStats
+
+    def BeginCommand(self, inName):
+        with self.mLock:
+            self.EndCommandLocked()
+            self.GetCommandStats(inName).mCount += 1
+            self.mCurrentName = inName
+            self.mLastName = inName
+            self.mCurrentStartS = time.perf_counter()
+            self.mCurrentLastS = self.mCurrentStartS
+
+    def EndCommand(self):
+        with self.mLock:
+            self.EndCommandLocked()
+
+    def EndCommandLocked(self):
+        if self.mCurrentName is None:
+            return
+        theStats = self.GetCommandStats(self.mCurrentName)
+        theStats.mLatencySumS, theStats.mLatencyMaxS = self.AddLatency(theStats.mLatencySumS, theStats.mLatencyMaxS, theStats.mLatencyHistogram)
+        self.mCurrentName = None
+
+    def AddLatency(self, inLatencySumS, inLatencyMaxS, ioLatencyHistogram):
+        # adds the latency of the command in progress, returns the new sum and max
+        theLatencyS = self.mCurrentLastS - self.mCurrentStartS
+        theBucket = np.searchsorted(self.kLatencyBucketsS, theLatencyS)
+        ioLatencyHistogram[theBucket] += 1
+        return inLatencySumS + theLatencyS, max(inLatencyMaxS, theLatencyS)
+
+    def AddBytesSent(self, inNumBytes):
+        with self.mLock:
+            if self.mLastName is None:
+                return
+            self.GetCommandStats(self.mLastName).mBytesSent += inNumBytes
+            self.mCurrentLastS = time.perf_counter()
+
+    def AddBytesReceived(self, inNumBytes):
+        with self.mLock:
+            if self.mLastName is None:
+                return
+            self.GetCommandStats(self.mLastName).mBytesReceived += inNumBytes
+            self.mCurrentLastS = time.perf_counter()
+
+    def Reset(self):
+        with self.mLock:
+            self.mCommandStatsMap = dict()
+            self.mCurrentName = None
+            self.mLastName = None
+
+    def GetStats(self):
+        """ Gets a snapshot of the statistics
+
+        The command in progress, if any, is included with its latency so far. It is not
+        ended: its latency is recorded when it completes, with the bytes received until then
+
+        Returns
+        -------
+        dict
+            command name -> dict with the keys: count, bytes_sent, bytes_received,
+            latency_sum_s, latency_max_s, latency_buckets_s (upper bounds) and
+            latency_histogram (counts per bucket, the last one is +Inf)
+        """
+        with self.mLock:
+            theSnapshot = dict()
+            for theName, theStats in sorted(self.mCommandStatsMap.items()):
+                theLatencySumS = theStats.mLatencySumS
+                theLatencyMaxS = theStats.mLatencyMaxS
+                theLatencyHistogram = theStats.mLatencyHistogram.copy()
+                if theName == self.mCurrentName:
+                    theLatencySumS, theLatencyMaxS = self.AddLatency(theLatencySumS, theLatencyMaxS, theLatencyHistogram)
+                theSnapshot[theName] = {
+                    'count' : theStats.mCount,
+                    'bytes_sent' : theStats.mBytesSent,
+                    'bytes_received' : theStats.mBytesReceived,
+                    'latency_sum_s' : theLatencySumS,
+                    'latency_max_s' : theLatencyMaxS,
+                    'latency_buckets_s' : list(self.kLatencyBucketsS),
+                    'latency_histogram' : theLatencyHistogram.tolist(),
+                }
+            return theSnapshot
+
+    def ExportPrometheus(self, inPath=None):
+        """ Exports the statistics in the Prometheus text exposition format
+
+        Parameters
+        ----------
+        inPath: str, optional
+            If given, the text is also written to this file (e.g. for the node exporter textfile collector)
+
+        Returns
+        -------
+        str
+            The statistics as Prometheus text
+        """
+        theSnapshot = self.GetStats()
+        theLines = []
+        theCounters = [('sbaccess_command_calls_total', 'count', 'Number of commands sent'),
+                       ('sbaccess_command_bytes_sent_total', 'bytes_sent', 'Bytes sent for the command'),
+                       ('sbaccess_command_bytes_received_total', 'bytes_received', 'Bytes received for the command')]
+        for theMetric, theKey, theHelp in theCounters:
+            theLines.append('# HELP %s %s' % (theMetric, theHelp))
+            theLines.append('# TYPE %s counter' % theMetric)
+            for theName, theStats in theSnapshot.items():
+                theLines.append('%s{command="%s"} %d' % (theMetric, theName, theStats[theKey]))
+
+        theMetric = 'sbaccess_command_latency_seconds'
+        theLines.append('# HELP %s Time from sending the command to the last byte received' % theMetric)
+        theLines.append('# TYPE %s histogram' % theMetric)
+        for theName, theStats in theSnapshot.items():
+            theCumulative = np.cumsum(theStats['latency_histogram'])
+            for theBound, theCount in zip(theStats['latency_buckets_s'], theCumulative):
+                theLines.append('%s_bucket{command="%s",le="%g"} %d' % (theMetric, theName, theBound, theCount))
+            theLines.append('%s_bucket{command="%s",le="+Inf"} %d' % (theMetric, theName, theCumulative[-1]))
+            theLines.append('%s_sum{command="%s"} %.9f' % (theMetric, theName, theStats['latency_sum_s']))
+            theLines.append('%s_count{command="%s"} %d' % (theMetric, theName, theCumulative[-1]))
+
+        theText = '\n'.join(theLines) + '\n'
+        if inPath is not None:
+            with open(inPath, 'w') as theStream:
+                theStream.write(theText)
+        return theText
+
+    def ExportCSV(self, inPath):
+        """ Writes the statistics to a CSV file, one row per command
+
+        Parameters
+        ----------
+        inPath: str
+            The path of the CSV file
+        """
+        theSnapshot = self.GetStats()
+        theBucketNames = ['le_%g' % theBound for theBound in self.kLatencyBucketsS] + ['le_inf']
+        with open(inPath, 'w') as theStream:
+            theStream.write(','.join(['command', 'count', 'bytes_sent', 'bytes_received', 'latency_sum_s', 'latency_max_s'] + theBucketNames) + '\n')
+            for theName, theStats in theSnapshot.items():
+                theRow = [theName, str(theStats['count']), str(theStats['bytes_sent']), str(theStats['bytes_received']),
+                          '%.9f' % theStats['latency_sum_s'], '%.9f' % theStats['latency_max_s']]
+                theRow += [str(theCount) for theCount in theStats['latency_histogram']]
+                theStream.write(','.join(theRow) + '\n')
+
+
+class CInstrumentedSocket(object):
+    """ A socket wrapper counting the bytes sent and received into an SBAccessStats """
+    def __init__(self, inSocket, inStats):
+        self.mSocket = inSocket
+        self.mStats = inStats
+
+    def send(self, inBytes, *args):
+        theSent = self.mSocket.send(inBytes, *args)
+        self.mStats.AddBytesSent(theSent)
+        return theSent
+
+    def sendall(self, inBytes, *args):
+        self.mSocket.sendall(inBytes, *args)
+        self.mStats.AddBytesSent(memoryview(inBytes).nbytes)
+
+    def recv(self, inNumBytes, *args):
+        theBytes = self.mSocket.recv(inNumBytes, *args)
+        self.mStats.AddBytesReceived(len(theBytes))
+        return theBytes
+
+    def recv_into(self, inBuffer, *args):
+        theNumBytes = self.mSocket.recv_into(inBuffer, *args)
+        self.mStats.AddBytesReceived(theNumBytes)
+        return theNumBytes
+
+    def __getattr__(self, inName):
+        return getattr(self.mSocket, inName)
@@ -0,0 +1,304 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Declarative table of the SBAccess commands
+
+Each command is described by its name, its typed arguments and the schema of its reply.
+The header ($Name(Arg=type,...)) is compiled to bytes once, the fixed size arguments are
+packed with a precompiled struct.Struct, so a call is encoded as a few buffers sent
+together instead of a formatted string plus one send per argument.
+
+Argument types are the ones of the protocol: i2,u2,i4,u4,i8,u8,f4,f8 for numbers,
+s for strings and b for byte arrays (the last two carry their length in the header).
+
+Reply schema entries:
+    'v'  one numeric value, returned as a scalar (an error is raised if more are received)
+    'a'  an array of numeric values, returned as a numpy array
+    's'  a string
+The schema is None for the replies whose number of entries depends on their content
+(lists): SBAccess sends them with SendCall and reads their reply itself.
+
+Every SBAccess command is sent from this table. Strings are utf-8 encoded, their length
+in the header is the number of bytes (the hand written headers used the number of
+characters, which only differs for non ASCII strings).
+"""
+
+import struct
+
+kStructCodes = {'i2':'h', 'u2':'H', 'i4':'i', 'u4':'I', 'i8':'q', 'u8':'Q', 'f4':'f', 'f8':'d'}
+kTypeSizes = {'i2':2, 'u2':2, 'i4':4, 'u4':4, 'i8':8, 'u8':8, 'f4':4, 'f8':8}
+kStructConverters = {'i2':int, 'u2':int, 'i4':int, 'u4':int, 'i8':int, 'u8':int, 'f4':float, 'f8':float}
+
+
+class CCommandSpec(object):
+    """ a compiled command: name, typed arguments and reply schema """
+    def __init__(self, inName, inArgs, inReply):
+        self.mName = inName
+        self.mArgs = list(inArgs)
+        self.mReply = None if inReply is None else list(inReply)
+        self.Compile()
+
+    def Compile(self):
+        # mHeaderPieces: constant header bytes, between them the lengths of the s/b arguments
+        # mSegments: ('fixed', Struct, [converters], first, last) or ('s'|'b', index)
+        self.mHeaderPieces = []
+        self.mVariableArgs = []
+        self.mSegments = []
+        theHeader = '$' + self.mName + '('
+        theFixedStart = -1
+        for theIndex, (theArgName, theType) in enumerate(self.mArgs):
+            if theIndex > 0:
+                theHeader += ','
+            theHeader += theArgName + '='
+            if theType in kStructCodes:
+                theHeader += theType
+                if theFixedStart < 0:
+                    theFixedStart = theIndex
+                continue
+            if theType not in ('s', 'b'):
+                raise Exception("CCommandSpec: " + self.mName + ": invalid argument type: " + theType)
+            if theFixedStart >= 0:
+                self.AddFixedSegment(theFixedStart, theIndex)
+                theFixedStart = -1
+            self.mHeaderPieces.append(theHeader.encode())
+            self.mVariableArgs.append(theIndex)
+            self.mSegments.append((theType, theIndex))
+            theHeader = ':' + theType
+        if theFixedStart >= 0:
+            self.AddFixedSegment(theFixedStart, len(self.mArgs))
+        self.mHeaderPieces.append((theHeader + ')').encode())
+        self.mIsFixedSize = len(self.mVariableArgs) == 0
+        if self.mIsFixedSize:
+            self.mHeader = self.mHeaderPieces[0]
+
+    def AddFixedSegment(self, inFirst, inLast):
+        theTypes = [self.mArgs[i][1] for i in range(inFirst, inLast)]
+        theStruct = struct.Struct('<' + ''.join(kStructCodes[t] for t in theTypes))
+        theConverters = [kStructConverters[t] for t in theTypes]
+        self.mSegments.append(('fixed', theStruct, theConverters, inFirst, inLast))
+
+    def Encode(self, inArgs):
+        """ Encodes a call into a list of buffers to be sent in order
+
+        The b arguments are sent as they are (no copy), s arguments are utf-8 encoded
+        """
+        if len(inArgs) != len(self.mArgs):
+            raise Exception(self.mName + ": expected " + str(len(self.mArgs)) + " arguments, got " + str(len(inArgs)))
+        thePayload = []
+        theLengths = []
+        for theSegment in self.mSegments:
+            if theSegment[0] == 'fixed':
+                theStruct, theConverters, theFirst, theLast = theSegment[1:]
+                theValues = [theConvert(theValue) for theConvert, theValue in zip(theConverters, inArgs[theFirst:theLast])]
+                thePayload.append(theStruct.pack(*theValues))
+            elif theSegment[0] == 's':
+                theBytes = str(inArgs[theSegment[1]]).encode()
+                theLengths.append(len(theBytes))
+                thePayload.append(theBytes)
+            else:
+                theBytes = inArgs[theSegment[1]]
+                theLengths.append(memoryview(theBytes).nbytes)
+                thePayload.append(theBytes)
+
+        if self.mIsFixedSize:
+            theHeader = self.mHeader
+        else:
+            theParts = [self.mHeaderPieces[0]]
+            for theLength, thePiece in zip(theLengths, self.mHeaderPieces[1:]):
+                theParts.append(str(theLength).encode())
+                theParts.append(thePiece)
+            theHeader = b''.join(theParts)
+
+        # the header and the small arguments go in one buffer, big byte arrays are sent separately
+        theBuffers = [theHeader]
+        for thePart in thePayload:
+            if isinstance(thePart, bytes) and len(thePart) < 4096:
+                theBuffers[-1] += thePart
+            else:
+                theBuffers.append(thePart)
+                theBuffers.append(b'')
+        return [theBuffer for theBuffer in theBuffers if len(theBuffer) > 0]
+
+    def DecodeReply(self, inRecv):
+        """ Receives and decodes the reply with the function inRecv (SBAccess.Recv) """
+        if self.mReply is None:
+            raise Exception(self.mName + ": the reply depends on its content, it is decoded by SBAccess")
+        theResults = []
+        for theEntry in self.mReply:
+            if theEntry == 's':
+                theResults.append(inRecv())
+                continue
+            theNum, theVals = inRecv()
+            if theEntry == 'v':
+                if theNum != 1:
+                    raise Exception(self.mName + ": invalid value")
+                theResults.append(theVals[0])
+            else:
+                theResults.append(theVals)
+        if len(theResults) == 0:
+            return None
+        if len(theResults) == 1:
+            return theResults[0]
+        return tuple(theResults)
+
+
+def Args(*inNames, inType='i4'):
+    return [(theName, inType) for theName in inNames]
+
+kCommandTable = dict()
+
+def AddCommand(inName, inArgs, inReply, inKey=None):
+    # inKey: the key in the table when it is not the name, for a name sent with other arguments
+    theKey = inName if inKey is None else inKey
+    if theKey in kCommandTable:
+        raise Exception("SBCommandTable: the command " + theKey + " is added twice")
+    kCommandTable[theKey] = CCommandSpec(inName, inArgs, inReply)
+
+def GetCommand(inName):
+    return kCommandTable[inName]
+
+def GetParamCommand(inName, inType):
+    """ Gets (and compiles the first time) a command with a single parameter, as sent by SBAccess.SendIntParam etc. """
+    theKey = inName + ':' + inType
+    theSpec = kCommandTable.get(theKey)
+    if theSpec is None:
+        if inType == 'i4':
+            theArgs = [('IntParam', 'i4')]
+        elif inType == 'f4':
+            theArgs = [('FloatParam', 'f4')]
+        elif inType == 's':
+            theArgs = [('StringParam', 's')]
+        else:
+            theArgs = []
+        theSpec = CCommandSpec(inName, theArgs, ['a'])
+        kCommandTable[theKey] = theSpec
+    return theSpec
+
+
+AddCommand('GetCurrentSlideId', [], ['v'])
+AddCommand('GetNumCaptures', [], ['v'])
+AddCommand('GetNumLiveCaptures', [], ['v'])
+AddCommand('GetNumMasks', Args('CaptureIndex'), ['v'])
+AddCommand('GetNumPositions', Args('CaptureIndex'), ['v'])
+AddCommand('GetNumXColumns', Args('CaptureIndex'), ['v'])
+AddCommand('GetNumYRows', Args('CaptureIndex'), ['v'])
+AddCommand('GetNumZPlanes', Args('CaptureIndex'), ['v'])
+AddCommand('GetNumImages', Args('CaptureIndex'), ['v'])
+AddCommand('GetNumTimepoints', Args('CaptureIndex'), ['v'])
+AddCommand('GetNumChannels', Args('CaptureIndex'), ['v'])
+AddCommand('GetExposureTime', Args('CaptureIndex', 'ChannelIndex'), ['v'])
+AddCommand('GetElapsedTime', Args('CaptureIndex', 'TimepointIndex'), ['v'])
+
+for thePlaneCommand in ('ReadImagePlaneBuf', 'ReadImagePlaneBufZstd'):
+    AddCommand(thePlaneCommand, Args('CaptureIndex', 'PositionIndex', 'TimepointIndex', 'ZPlaneIndex', 'ChannelIndex'), ['a'])
+for theMaskCommand in ('ReadMaskPlaneBuf', 'ReadMaskPlaneBufZstd'):
+    AddCommand(theMaskCommand, Args('CaptureIndex', 'MaskIndex', 'TimepointIndex', 'ZPlaneIndex'), ['a'])
+for theWriteCommand in ('WriteImagePlaneBuf', 'WriteImagePlaneBufZstd'):
+    AddCommand(theWriteCommand, Args('CaptureIndex', 'TimepointIndex', 'ZPlaneIndex', 'ChannelIndex') + [('ByteArray', 'b')], ['a'])
+AddCommand('WriteMaskPlaneBuf', [('CaptureIndex', 'i4'), ('MaskName', 's')] + Args('TimepointIndex', 'ZPlaneIndex') + [('ByteArray', 'b')], ['a'])
+
+AddCommand('Open', [('FileName', 's')], ['v'])
+AddCommand('GetOpenSlides', [], None)
+AddCommand('SetTargetSlide', Args('SlideId'), ['v'])
+AddCommand('CreateNewSlide', [], ['v'])
+AddCommand('CloseSlide', Args('SlideId', 'SaveChanges'), ['v'])
+AddCommand('GetIsSlideModified', Args('SlideId'), ['v', 'v'])
+AddCommand('SaveSlide', Args('SlideId'), ['v'])
+AddCommand('SaveAsSlide', Args('SlideId') + [('Pathname', 's')], ['v'])
+AddCommand('GetVoxelSize', Args('CaptureIndex'), ['v', 'v', 'v'])
+AddCommand('GetXPosition', Args('CaptureIndex', 'PositionIndex'), ['v'])
+AddCommand('GetYPosition', Args('CaptureIndex', 'PositionIndex'), ['v'])
+AddCommand('GetZPosition', Args('CaptureIndex', 'PositionIndex', 'ZPlaneIndex'), ['v'])
+AddCommand('GetMontageRow', Args('CaptureIndex', 'PositionIndex'), ['v'])
+AddCommand('GetMontageColumn', Args('CaptureIndex', 'PositionIndex'), ['v'])
+AddCommand('GetChannelName', Args('CaptureIndex', 'ChannelIndex'), ['s'])
+AddCommand('GetLensName', Args('CaptureIndex'), ['s'])
+AddCommand('GetMagnification', Args('CaptureIndex'), ['v'])
+AddCommand('GetImageName', Args('CaptureIndex'), ['s'])
+AddCommand('GetImageLowRenormalization', Args('CaptureIndex', 'ChannelIndex'), ['v'])
+AddCommand('GetImageHighRenormalization', Args('CaptureIndex', 'ChannelIndex'), ['v'])
+AddCommand('GetMaskName', Args('CaptureIndex', 'MaskIndex'), ['s'])
+AddCommand('GetImageComment', Args('CaptureIndex'), ['s'])
+AddCommand('GetCaptureDate', Args('CaptureIndex'), ['s'])
+AddCommand('GetObjectives', [], ['s'])
+AddCommand('GetAOOptimizerStatus', [], ['v', 'a', 'v', 'v', 'v', 's', 'v'])
+AddCommand('SetAOOptimizerExposureTime', Args('ExposureTimeMS'), ['s', 'v'])
+AddCommand('GetFilters', [], ['s'])
+AddCommand('GetFilterSetNames', [], None)
+AddCommand('GetExperimentScriptNames', [], None)
+AddCommand('GetExperimentScriptData', [('ExperimentName', 's')], ['s', 's', 's'])
+AddCommand('GetMagnificationChangers', [], ['s'])
+AddCommand('GetLensInfo', [], ['s'])
+AddCommand('CaptureImage', Args('CameraIndex', 'ExposureTime'), ['v', 'v', 'a', 'v'])
+# ReadImagePlaneBufIx: the plane of an image index instead of a position and time point
+AddCommand('ReadImagePlaneBuf', Args('CaptureIndex', 'ImageIndex', 'ZPlaneIndex', 'ChannelIndex'), ['a'], inKey='ReadImagePlaneBufIx')
+AddCommand('GetAuxDataNumElements', Args('CaptureIndex', 'DataType'), ['v'])
+AddCommand('GetAuxDataName', Args('CaptureIndex', 'DataType', 'ElementIndex'), ['s'])
+AddCommand('GetAuxDataValues', Args('CaptureIndex', 'DataType', 'ElementIndex'), ['s', 's', 'a'])
+AddCommand('CreateImageGroup', [('ImageName', 's')] + Args('NumChannels', 'NumPlanes', 'NumRows', 'NumColumns', 'NumTimepoints'), ['a'])
+AddCommand('CopyImageGroup', Args('CopyCaptureIndex'), ['a'])
+AddCommand('SetImageComment', Args('CaptureIndex') + [('Comment', 's')], [])
+AddCommand('SetChannelName', Args('CaptureIndex', 'ChannelIndex') + [('ChannelName', 's')], [])
+AddCommand('SetMagnification', Args('CaptureIndex') + Args('LensMagnification', 'OptovarMagnification', inType='f4'), [])
+# the name sent by SBAccess.SetVoxelSize
+AddCommand('SerVoxelSize', Args('CaptureIndex') + Args('SizeX', 'SizeY', 'SizeZ', inType='f4'), [])
+AddCommand('SetCaptureDate', Args('CaptureIndex', 'Year', 'Month', 'Day', 'Hour', 'Minute', 'Second'), [])
+AddCommand('SetXYZPosition', Args('CaptureIndex') + Args('PositionX', 'PositionY', 'PositionZ', inType='f4'), [])
+AddCommand('Start6DCaptureSequential', Args('CaptureMode', 'Repetitions'), ['v'])
+AddCommand('StartCapture', [('ScriptName', 's')], ['v'])
+AddCommand('StopCapture', [], ['v'])
+AddCommand('StartStreaming', [], ['v'])
+AddCommand('StopStreaming', [], ['v'])
+AddCommand('GetCurrentCaptureId', Args('PositionIndex'), ['v'])
+AddCommand('GetCurrentTimepointCaptured', [], ['v'])
+AddCommand('GetLastImageCaptured', Args('CaptureIndex'), ['v'])
+AddCommand('GetLastImageStreamed', Args('CaptureIndex'), ['v'])
+AddCommand('GetCurrentPlaneCaptured', [], ['v'])
+AddCommand('GetLastPlaneCaptured', Args('CaptureIndex'), ['v'])
+AddCommand('GetCurrentChannelCaptured', [], ['v'])
+AddCommand('GetLastChannelCaptured', Args('CaptureIndex'), ['v'])
+AddCommand('GetCurrentPositionIndexCaptured', [], ['v'])
+AddCommand('GetCurrentNumPositionsCaptured', [], ['v'])
+AddCommand('GetCurrentExperimentCaptured', [], ['v'])
+AddCommand('IsCapturing', [], ['v'])
+AddCommand('IsStreaming', [], ['v'])
+AddCommand('GetIsHardwareComponentEnabled', Args('ComponentIndex'), ['v'])
+AddCommand('GetHardwareComponentName', Args('ComponentIndex'), ['s'])
+AddCommand('GetHardwareComponentMinMax', Args('ComponentIndex'), ['a', 'v'])
+AddCommand('SetHardwareComponentOpen', Args('ComponentIndex', 'Open'), ['v'])
+AddCommand('GetHardwareComponentOpen', Args('ComponentIndex'), ['v', 'v'])
+AddCommand('SetHardwareComponentPosition', Args('ComponentIndex', 'Position'), ['v'])
+AddCommand('GetHardwareComponentPosition', Args('ComponentIndex'), ['v', 'v'])
+AddCommand('SetHardwareComponentLocationMicrons', Args('ComponentIndex') + Args('x', 'y', 'z', inType='f4'), ['v'])
+AddCommand('IncrementHardwareComponentLocationMicrons', Args('ComponentIndex') + Args('x', 'y', 'z', inType='f4'), ['v'])
+AddCommand('GetHardwareComponentLocationMicrons', Args('ComponentIndex'), ['v', 'v', 'v'])
+AddCommand('SetVector3ScannerPosition', Args('X_mV', 'Y_mV', 'DisableSpin'), ['v'])
+AddCommand('GetVector3ScannerPosition', [], ['v', 'v', 'v', 'v'])
+AddCommand('SetVector3StepperPosition', Args('Position'), ['v'])
+AddCommand('GetVector3StepperPosition', [], ['v', 'v'])
+AddCommand('ConfirmFocusWindow', [], ['v'])
+AddCommand('ClearXYZPoints', [], ['v'])
+AddCommand('GetXYZMontagePointList', Args('PointIndex'), None)
+AddCommand('GetXYZPoint', Args('PointIndex'), ['a', 'a', 'a', 'a', 'a', 'v'])
+AddCommand('GetXYZPointCount', [], ['v', 'v'])
+AddCommand('GetIsCommandSupported', [('Command', 's')], ['a'])
+AddCommand('GetSlideBookVersion', [], ['v', 'v', 'v', 'v'])
+AddCommand('AddXYZPoint', Args('Xum', 'Yum', 'Zum', 'AuxZum', inType='f4') + Args('IsAuxZ'), ['v'])
+AddCommand('GetXYZPointList', [], ['s'])
+AddCommand('GetMicroscopeState', Args('state'), ['s', 's', 'v', 'v', 'v', 'v', 'v', 'v', 'v', 'v', 'a', 'v', 'v', 'v', 'v'])
+AddCommand('FocusWindowSupportsARCSliceTIRF', [], ['v'])
+AddCommand('FocusWindowSetARCSliceTIRFParameters', Args('Position') + [('ArcInfo', 's')] + [('SliceInfo', 's')] + Args('Save'), ['v'])
+AddCommand('FocusWindowGetARCSliceTIRFParameters', Args('Position'), ['s', 's', 'v'])
+AddCommand('FocusWindowSetTIRFParameters', Args('Position', 'Radius_mV', 'X_mV', 'Y_mV') + Args('Duration_ms', inType='f4') + Args('MotorPos', 'MotorEnable', 'SpinEnable', 'Save'), ['v'])
+AddCommand('FocusWindowGetTIRFParameters', Args('Position'), ['v', 'v', 'v', 'v', 'v', 'v', 'v'])
+AddCommand('LiveWindowAddRectangleRegion', Args('WindowIndex', 'X', 'Y', 'Width', 'Height', 'IsStimulation'), ['v'])
+AddCommand('LiveWindowAddEllipseRegion', Args('WindowIndex', 'X', 'Y', 'Width', 'Height', 'IsStimulation'), ['v'])
+AddCommand('LiveWindowAddLineRegion', Args('WindowIndex', 'X', 'Y', 'Width', 'Height', 'IsStimulation'), ['v'])
+AddCommand('LiveWindowAddPolygonRegion', Args('WindowIndex', 'NumPairs') + [('XYPointList', 'b')] + Args('IsStimulation'), ['v'])
+AddCommand('FocusSurface_AddCalibrationPoint', [], ['v'])
+AddCommand('FocusSurface_ClearCalibrationPoints', [], ['v'])
+AddCommand('FocusSurface_FitSurface', [], ['v'])
+AddCommand('FocusSurface_IsSurfaceFit', [], ['v'])
+AddCommand('FocusSurface_FitPoint', Args('XCoord', 'YCoord', inType='f4'), ['v'])
+AddCommand('GetXYZSavedExperimentName', Args('Index'), ['s', 'v'])
+AddCommand('SetXYZSavedExperimentName', Args('Index') + [('ExperimentName', 's')], ['v'])
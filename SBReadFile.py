@@ -142,6 +142,13 @@ class SBReadFile(object):
         self.mDL.CheckCaptureIndex(inCaptureIndex)
         theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
         theImageGroup.Refresh()
+        if self.mDL.mPrefetcher != None:
+            # the planes read ahead may predate the new data
+            self.mDL.mPrefetcher.Clear()
+        if self.mDL.mPlaneCache != None:
+            self.mDL.mPlaneCache.Invalidate(self.mDL.mSlidePath,inCaptureIndex,True)
+        # the readers of the pool have the former metadata
+        self.mDL.CloseReaderPool()
 
     def GetNumTimepoints(self,inCaptureIndex):
         """ Gets the number of time points in an image group
@@ -223,7 +230,6 @@ class SBReadFile(object):
         list
             list of points
         """
-        theShapeList = [1,2,3,4,7,7,6,7,5]
 
         self.mDL.CheckCaptureIndex(inCaptureIndex)
         theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
@@ -235,7 +241,7 @@ class SBReadFile(object):
         theAnno = theImageGroup.mAnnotationList[0]
         theCubeAnno = theAnno.mCubeAnnotationList[inAnnotationIndex]
         theGraphicType =  theCubeAnno.mAnn.mGraphicType70
-        return theShapeList[theGraphicType],theCubeAnno.mAnn.mVertexes
+        return kGraphicTypeToShape[theGraphicType],theCubeAnno.mAnn.mVertexes
 
     def GetNumFRAPRegions(self,inCaptureIndex, inTimepointIndex):
         """ Gets the number of FRAP Regions in an image group
@@ -291,14 +297,13 @@ class SBReadFile(object):
         list
             list of points
         """
-        theShapeList = [1,2,3,4,7,7,6,7,5]
 
         self.mDL.CheckCaptureIndex(inCaptureIndex)
         theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
         theAnno = theImageGroup.mAnnotationList[inTimepointIndex]
         theFRAPAnno = theAnno.mFRAPRegionAnnotationList[0]
         theGraphicType =  theFRAPAnno.mAnn.mGraphicType70
-        return theShapeList[theGraphicType],theFRAPAnno.mAnn.mVertexes
+        return kGraphicTypeToShape[theGraphicType],theFRAPAnno.mAnn.mVertexes
 
     def GetFRAPRegion(self,inCaptureIndex, inTimepointIndex, inRegionIndex):
         """ Gets a FRAP Region in an image group
@@ -323,7 +328,6 @@ class SBReadFile(object):
         list
             list of points
         """
-        theShapeList = [1,2,3,4,7,7,6,7,5]
 
         self.mDL.CheckCaptureIndex(inCaptureIndex)
         theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
@@ -337,7 +341,33 @@ class SBReadFile(object):
         theRegion = theFRAPAnno.mRegions[inRegionIndex]
 
         theGraphicType =  theRegion.mAnn.mGraphicType70
-        return theShapeList[theGraphicType],theRegion.mAnn.mVertexes
+        return kGraphicTypeToShape[theGraphicType],theRegion.mAnn.mVertexes
+
+    def GetFRAPRegionTable(self,inCaptureIndex, inTimepointIndex):
+        """ Gets all the FRAP Regions of a time point at once, as tables
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+
+        inTimepointIndex: int
+            The time point number
+
+        Returns
+        -------
+        numpy array
+            A structured array, one row per region (as GetFRAPRegion), with the fields mRegionIndex,
+            mGraphicType, mShape (Enum EROI_Shapes), mIsBackground, mIsStimulation, mFirstVertex
+            and mNumVertexes
+        numpy array
+            The (x,y,z) vertexes of all the regions (int64), those of a region are the rows
+            mFirstVertex to mFirstVertex + mNumVertexes - 1
+        """
+
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
+        return theImageGroup.GetFRAPRegionTable(inTimepointIndex)
 
 
     def GetExposureTime(self,inCaptureIndex,inChannelIndex):
@@ -450,6 +480,26 @@ class SBReadFile(object):
         theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
         return theImageGroup.GetZPosition(inPositionIndex,inZPlaneIndex)
 
+    def GetZPositions(self,inCaptureIndex,inPositionIndex):
+        """ Gets the Z positions in microns of all the z planes of an image at once, as GetZPosition
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inPositionIndex: int
+            The index of the image in the montage, or 0 if all images are at the same location
+
+        Returns
+        -------
+        numpy array
+            The Z positions in um (float64), one per z plane
+        """
+
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
+        return theImageGroup.GetZPositions(inPositionIndex)
+
     def GetMontageRow(self,inCaptureIndex,inPositionIndex):
         """ Gets the rows of the montage at a given position in an image group
 
@@ -468,7 +518,7 @@ class SBReadFile(object):
 
         self.mDL.CheckCaptureIndex(inCaptureIndex)
         theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
-        return 0  #TODO
+        return theImageGroup.GetMontageRow(inPositionIndex)
 
     def GetMontageColumn(self,inCaptureIndex,inPositionIndex):
         """ Gets the number of columns of the montage at a given position in an image group
@@ -488,7 +538,113 @@ class SBReadFile(object):
 
         self.mDL.CheckCaptureIndex(inCaptureIndex)
         theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
-        return 0  #TODO
+        return theImageGroup.GetMontageColumn(inPositionIndex)
+
+    def GetStagePositions(self,inCaptureIndex):
+        """ Gets the stage positions of all the images of an image group at once
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+
+        Returns
+        -------
+        numpy array
+            A (number of images,3) float64 array of the (x,y,z) in um of the center of each image
+            (SlideBook time point): the images go through the positions at each time point
+        """
+
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
+        return theImageGroup.GetStagePositions()
+
+    def GetXStagePositions(self,inCaptureIndex):
+        """ Gets the X position in microns of the center of the image at every position, as GetXPosition
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+
+        Returns
+        -------
+        numpy array
+            The X positions in um (float64), one per position (GetNumPositions)
+        """
+
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
+        return theImageGroup.GetPositionLayout().mPositions[:,0]
+
+    def GetYStagePositions(self,inCaptureIndex):
+        """ Gets the Y position in microns of the center of the image at every position, as GetYPosition
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+
+        Returns
+        -------
+        numpy array
+            The Y positions in um (float64), one per position (GetNumPositions)
+        """
+
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
+        return theImageGroup.GetPositionLayout().mPositions[:,1]
+
+    def GetZStagePositions(self,inCaptureIndex):
+        """ Gets the Z position in microns of the first plane at every position, as GetZPosition for plane 0
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+
+        Returns
+        -------
+        numpy array
+            The Z positions in um (float64), one per position (GetNumPositions)
+        """
+
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
+        return theImageGroup.GetPositionLayout().mPositions[:,2]
+
+    def StitchMontage(self,inCaptureIndex,inTimepointIndex,inZPlaneIndex,inChannelIndex,inBlend="linear",inNumThreads=1,inOutput=None):
+        """ Assembles the tiles of a montage into a mosaic, placed by their stage positions and the voxel size
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inTimepointIndex: int
+            The time point of the montage: the tiles are the images inTimepointIndex * GetNumPositions()
+            to inTimepointIndex * GetNumPositions() + GetNumPositions() - 1
+        inZPlaneIndex: int
+            The z plane number
+        inChannelIndex: int
+            The channel number
+        inBlend: str, optional
+            'linear' (default) to blend the overlaps with weights decreasing to the edges of the tiles,
+            'none' to keep the tile of the last position
+        inNumThreads: int, optional
+            The number of threads reading and decompressing the tiles, 1 (default) to read them in this thread
+        inOutput: 2D array, optional
+            The mosaic is written in it band by band (e.g. a np.memmap or a zarr array for a mosaic
+            larger than the memory), of the shape of the mosaic. Allocated by default
+
+        Returns
+        -------
+        numpy array
+            The mosaic as a 2D uint16 array (or inOutput), the tiles of the first row and column at 0
+        """
+
+        from CMontageStitcher import CMontageStitcher
+        theStitcher = CMontageStitcher(self,inCaptureIndex,inBlend,inNumThreads)
+        return theStitcher.Stitch(inTimepointIndex,inZPlaneIndex,inChannelIndex,inOutput)
 
     def GetElapsedTime(self,inCaptureIndex,inTimepointIndex):
         """ Gets the elapsed time in ms at a given time point in an image group
@@ -510,6 +666,62 @@ class SBReadFile(object):
         theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
         return theImageGroup.GetElapsedTime(inTimepointIndex)
 
+    def GetElapsedTimes(self,inCaptureIndex):
+        """ Gets the elapsed times in ms of all the time points of an image group at once
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+
+        Returns
+        -------
+        numpy array
+            The elapsed times in ms (int64), one per time point
+        """
+
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
+        return theImageGroup.GetElapsedTimes()
+
+    def GetSAPositions(self,inCaptureIndex):
+        """ Gets the SA positions of all the time points of an image group at once
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+
+        Returns
+        -------
+        list
+            The SA positions of each time point, an int64 numpy array each
+        """
+
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
+        return theImageGroup.GetSAPositions()
+
+    def GetSAPositionArray(self,inCaptureIndex):
+        """ Gets the SA positions of all the time points of an image group as one array
+
+        The time points must have the same number of SA positions, GetSAPositions gets them otherwise
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+
+        Returns
+        -------
+        numpy array
+            A (number of time points, number of values) int64 array
+        """
+
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
+        return theImageGroup.GetSAPositionArray()
+
     def GetChannelName(self,inCaptureIndex,inChannelIndex):
         """ Gets the name of a given channel of an image group
 
@@ -648,6 +860,101 @@ class SBReadFile(object):
         theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
         return theImageGroup.GetThumbnail()
 
+    def GetHistogram(self,inCaptureIndex,inChannelIndex,inTimepointIndex=None):
+        """ Gets the histogram stored by SlideBook, without reading the pixels
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inChannelIndex: int
+            The channel number
+        inTimepointIndex: int, optional
+            The time point (HistogramData file), None (default) for the summary of all the
+            time points (HistogramSummary file)
+
+        Returns
+        -------
+        numpy array
+            The histogram as stored, memory mapped (read only) if the file is not compressed,
+            None if the slide has no such histogram
+        """
+
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
+        theTimepoint = -1 if inTimepointIndex is None else inTimepointIndex
+        thePath = theImageGroup.mFile.GetHistogramDataFile(theImageGroup.mImageTitle,inChannelIndex,theTimepoint)
+        if not os.path.exists(thePath):
+            # a compressed slide may have compressed histograms
+            thePath = thePath[:-len(theImageGroup.mFile.kBinaryFileSuffix)] + theImageGroup.mFile.kZBinaryFileSuffix
+        return self.mDL.ReadArrayFile(thePath)
+
+    def ComputeHistogram(self,inCaptureIndex,inChannelIndex,inTimepoints=None,inPixelStep=4,inPositionIndex=0,inNumThreads=1,inUseSidecar=False):
+        """ Computes the histogram of a channel from the planes, for the captures without stored histogram
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inChannelIndex: int
+            The channel number
+        inTimepoints: iterable of int, optional
+            The time points, all of them by default (e.g. range(0,theNumTimepoints,10) to sample them)
+        inPixelStep: int, optional
+            One pixel every inPixelStep rows and columns is counted, 4 by default, 1 for all of them
+        inPositionIndex: int, optional
+            The position of the image. If the image group is not a montage, use 0
+        inNumThreads: int, optional
+            The number of threads reading and counting the planes, 1 (default) for this thread only
+        inUseSidecar: bool, optional
+            Whether to load and save the histograms of the time points in the sidecar directory
+            of the capture, next to the slide (one compressed file per channel)
+
+        Returns
+        -------
+        numpy array
+            The histogram, int64 of 65536 bins
+        """
+
+        from CHistogramEngine import CHistogramEngine
+        theEngine = CHistogramEngine(self,inCaptureIndex,inPositionIndex,inPixelStep,inNumThreads,inUseSidecar)
+        return theEngine.GetHistogram(inChannelIndex,inTimepoints)
+
+    def GetPercentiles(self,inCaptureIndex,inChannelIndex,inPercentiles=(0.1,99.9),inTimepoints=None,inPixelStep=4,inPositionIndex=0,inNumThreads=1,inUseSidecar=False):
+        """ Gets intensity percentiles of a channel, e.g. for an auto-contrast
+
+        The percentiles of all the time points of a capture of one position come from the
+        HistogramSummary stored by SlideBook (GetHistogram) when the slide has one, the others
+        from ComputeHistogram
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inChannelIndex: int
+            The channel number
+        inPercentiles: sequence of float, optional
+            The percentiles, in [0,100], (0.1,99.9) by default
+        inTimepoints, inPixelStep, inPositionIndex, inNumThreads, inUseSidecar:
+            As in ComputeHistogram
+
+        Returns
+        -------
+        numpy array
+            The intensities (uint16), one per percentile: the smallest intensity with at least
+            the percentile of the pixels counted at or below it
+        """
+
+        from CHistogramEngine import GetHistogramPercentiles, kNumBins
+        theHistogram = None
+        if inTimepoints is None and self.GetNumPositions(inCaptureIndex) == 1:
+            theHistogram = self.GetHistogram(inCaptureIndex,inChannelIndex)
+            if theHistogram is not None and (theHistogram.shape != (kNumBins,) or not theHistogram.any()):
+                theHistogram = None
+        if theHistogram is None:
+            theHistogram = self.ComputeHistogram(inCaptureIndex,inChannelIndex,inTimepoints,inPixelStep,inPositionIndex,inNumThreads,inUseSidecar)
+        return GetHistogramPercentiles(theHistogram,inPercentiles)
+
     def GetMaskNames(self,inCaptureIndex):
         """ Gets the names of the masks in an image group
 
@@ -695,6 +1002,44 @@ class SBReadFile(object):
         self.mDL.CheckCaptureIndex(inCaptureIndex)
         return self.mDL.ReadPlane(inCaptureIndex,  inPositionIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex,inAs2D)
 
+    def ReadPlaneLevel(self,inCaptureIndex,inTimepointIndex,inZPlaneIndex,inChannelIndex,inLevel,inPositionIndex=0,inMode="mean",inUseSidecar=False):
+        """ Reads a plane at a reduced resolution, for overviews
+
+        The levels are computed on demand from the closest level known and kept in the plane
+        cache (SetPlaneCache) and, optionally, in the sidecar directory of the capture, next to
+        the slide. Both are computed again once the ImageData file changed
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inTimepointIndex: int
+            The time point
+        inZPlaneIndex: int
+            The z plane number
+        inChannelIndex: int
+            The channel number
+        inLevel: int
+            0 for the plane, each level halves the rows and the columns (rounded up),
+            up to the level of a single pixel
+        inPositionIndex: int, optional
+            The position of the image. If the image group is not a montage, use 0
+        inMode: str, optional
+            'mean' (default) to average the blocks of 2x2 pixels, 'stride' to keep their first pixel
+        inUseSidecar: bool, optional
+            Whether to load and save the levels in the sidecar directory (one file per plane
+            and level), False by default
+
+        Returns
+        -------
+        numpy array
+            The level as a 2D numpy uint16 array
+        """
+
+        from CPlanePyramid import CPlanePyramid
+        thePyramid = CPlanePyramid(self,inCaptureIndex,inPositionIndex,inMode,inUseSidecar)
+        return thePyramid.ReadLevel(inTimepointIndex,inZPlaneIndex,inChannelIndex,inLevel)
+
     def ReadMaskBuf(self,inCaptureIndex,inMaskIndex,inTimepointIndex,inAs3D=False):
         """ Reads a full stack of a mask into a numpy array
 
@@ -720,6 +1065,121 @@ class SBReadFile(object):
         self.mDL.CheckCaptureIndex(inCaptureIndex)
         return self.mDL.ReadMaskBuf(inCaptureIndex,  inMaskIndex, inTimepointIndex, inAs3D)
 
+    def EnablePrefetch(self,inNumPlanes=4,inNumThreads=2):
+        """ Reads ahead the planes when ReadImagePlaneBuf is called in sequence
+
+        When consecutive calls walk a capture in order (z within a stack, then channel or
+        time, or channel or time first), the next planes are read and decompressed on
+        background threads while the current one is processed
+
+        Parameters
+        ----------
+        inNumPlanes: int, optional
+            The number of planes read ahead (and kept in memory)
+        inNumThreads: int, optional
+            The number of reader threads
+        """
+
+        self.mDL.EnablePrefetch(inNumPlanes,inNumThreads)
+
+    def DisablePrefetch(self):
+        """ Stops reading ahead, the reader threads are stopped """
+
+        self.mDL.DisablePrefetch()
+
+    def Close(self):
+        """ Stops the read ahead and the reader pool threads, and closes the files kept open
+
+        The slide can still be read after, the next reads open the files again
+        """
+
+        self.mDL.DisablePrefetch()
+        self.mDL.CloseReaderPool()
+        self.mDL.CloseFile()
+
+    def SetPlaneCache(self,inPlaneCache=True):
+        """ Keeps the planes read by ReadImagePlaneBuf in a cache of decoded planes
+
+        The same cache can be set on several SBReadFile objects, a CSharedPlaneCache
+        is also shared with the other processes (POSIX only). The planes are returned read only.
+        Refresh drops the cached planes of the capture whose file changed
+
+        Parameters
+        ----------
+        inPlaneCache: CPlaneCache, CSharedPlaneCache or bool, optional
+            The cache, True (default) for the cache shared by the process (GetSharedPlaneCache),
+            None or False for no cache
+        """
+
+        if inPlaneCache is True:
+            from CPlaneCache import GetSharedPlaneCache
+            inPlaneCache = GetSharedPlaneCache()
+        elif inPlaneCache is False:
+            inPlaneCache = None
+        self.mDL.SetPlaneCache(inPlaneCache)
+
+
+    def ProjectZ(self,inCaptureIndex,inTimepointIndex,inChannelIndex,inMode="max",inZRange=None,inPositionIndex=0,inNumThreads=1):
+        """ Projects the z planes of a stack, plane by plane, without reading the stack at once
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inTimepointIndex: int
+            The time point
+        inChannelIndex: int
+            The channel number
+        inMode: str, optional
+            'max' (default), 'mean', 'sum' or 'std'
+        inZRange: (int,int), optional
+            The first and the end (excluded) z planes, all of them by default
+        inPositionIndex: int, optional
+            The position of the image. If the image group is not a montage, use 0
+        inNumThreads: int, optional
+            The number of threads reading and decompressing the planes, 1 (default) to read them in this thread
+
+        Returns
+        -------
+        numpy array
+            A 2D array (NumRows,NumColumns): uint16 for max, uint64 for sum, float64 for mean and std
+        """
+
+        from CProjection import ProjectPlanes, GetIndexRange
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theIndexes = [(inTimepointIndex,theZPlane,inChannelIndex) for theZPlane in GetIndexRange(inZRange,self.GetNumZPlanes(inCaptureIndex))]
+        return ProjectPlanes(self,inCaptureIndex,inPositionIndex,theIndexes,inMode,inNumThreads)
+
+    def ProjectT(self,inCaptureIndex,inZPlaneIndex,inChannelIndex,inMode="max",inTRange=None,inPositionIndex=0,inNumThreads=1):
+        """ Projects a z plane over the time points, plane by plane
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inZPlaneIndex: int
+            The z plane number
+        inChannelIndex: int
+            The channel number
+        inMode: str, optional
+            'max' (default), 'mean', 'sum' or 'std'
+        inTRange: (int,int), optional
+            The first and the end (excluded) time points, all of them by default
+        inPositionIndex: int, optional
+            The position of the image. If the image group is not a montage, use 0
+        inNumThreads: int, optional
+            The number of threads reading and decompressing the planes, 1 (default) to read them in this thread
+
+        Returns
+        -------
+        numpy array
+            A 2D array (NumRows,NumColumns): uint16 for max, uint64 for sum, float64 for mean and std
+        """
+
+        from CProjection import ProjectPlanes, GetIndexRange
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theIndexes = [(theTimepoint,inZPlaneIndex,inChannelIndex) for theTimepoint in GetIndexRange(inTRange,self.GetNumTimepoints(inCaptureIndex))]
+        return ProjectPlanes(self,inCaptureIndex,inPositionIndex,theIndexes,inMode,inNumThreads)
 
     def GetAuxDataXMLDescriptor(self,inCaptureIndex,inChannelIndex):
         """ Gets the Auxiliary Data XML Descriptor for an image group and a channel
@@ -770,8 +1230,8 @@ class SBReadFile(object):
 
         Returns
         -------
-        list : float
-            The Float Data as a list
+        numpy array
+            The Float Data (float64)
         """
 
         self.mDL.CheckCaptureIndex(inCaptureIndex)
@@ -789,8 +1249,8 @@ class SBReadFile(object):
 
         Returns
         -------
-        list : float
-            The Double Data as a list
+        numpy array
+            The Double Data (float64)
         """
 
         self.mDL.CheckCaptureIndex(inCaptureIndex)
@@ -808,8 +1268,8 @@ class SBReadFile(object):
 
         Returns
         -------
-        list: int
-            The Signed Int32 Data as a list
+        numpy array
+            The Signed Int32 Data (int64)
         """
 
         self.mDL.CheckCaptureIndex(inCaptureIndex)
@@ -827,8 +1287,8 @@ class SBReadFile(object):
 
         Returns
         -------
-        list: int
-            The Signed Int64 Data as a list
+        numpy array
+            The Signed Int64 Data (int64)
         """
 
         self.mDL.CheckCaptureIndex(inCaptureIndex)
@@ -854,3 +1314,103 @@ class SBReadFile(object):
         theImageGroup = self.mDL.GetImageGroup(inCaptureIndex)
         return theImageGroup.GetAuxSerializedData(inChannelIndex,inElementIndex)
 
+    def GetZarrStore(self,inCaptureIndex,inPositionIndex=0):
+        """ Gets a read-only zarr store view of an image group, one chunk per plane read on demand
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inPositionIndex: int, optional
+            The position of the images. If the image group is not a montage, use 0
+
+        Returns
+        -------
+        CZarrStore
+            A zarr (format 2) OME-Zarr store with an array "0" of shape (T,C,Z,Y,X);
+            open it with CZarrStore.OpenZarrGroup()
+        """
+
+        from CZarrStore import CZarrStore
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        return CZarrStore(self,inCaptureIndex,inPositionIndex)
+
+    def ExportZarr(self,inCaptureIndex,inZarrPath,inNumLevels=0,inCompression=None,inNumThreads=4,inResume=True,inPositionIndex=0):
+        """ Exports an image group as an OME-Zarr directory with multiscale levels
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inZarrPath: str
+            The path of the directory (.ome.zarr)
+        inNumLevels: int, optional
+            The number of resolution levels, 0 (default) to halve the planes down to 256 pixels
+        inCompression: str, optional
+            The compression of the chunks: 'zstd', 'zlib' or None (default)
+        inNumThreads: int, optional
+            The number of threads reading the planes and writing the chunks
+        inResume: bool, optional
+            if True (default), the chunks written by a previous, interrupted, export are kept
+        inPositionIndex: int, optional
+            The position of the images. If the image group is not a montage, use 0
+
+        Returns
+        -------
+        int
+            The number of planes written
+        """
+
+        from CZarrStore import COmeZarrWriter
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        with COmeZarrWriter(self.mDL.mSlidePath,inNumThreads) as theWriter:
+            theWriter.SetNumLevels(inNumLevels)
+            theWriter.SetCompression(inCompression)
+            return theWriter.Export(inCaptureIndex,inZarrPath,inPositionIndex,inResume)
+
+    def AsDaskArray(self,inCaptureIndex,inPositionIndex=0):
+        """ Gets a lazy dask array of an image group
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inPositionIndex: int, optional
+            The position of the images. If the image group is not a montage, use 0
+
+        Returns
+        -------
+        dask.array.Array
+            A uint16 array of shape (NumTimepoints,NumChannels,NumZPlanes,NumRows,NumColumns)
+            with one chunk per timepoint and channel (a z stack), read when computed
+        """
+
+        from CLazyCapture import CLazyCapture
+        self.mDL.CheckCaptureIndex(inCaptureIndex)
+        theShape = (self.GetNumTimepoints(inCaptureIndex),self.GetNumChannels(inCaptureIndex),self.GetNumZPlanes(inCaptureIndex),
+                    self.GetNumYRows(inCaptureIndex),self.GetNumXColumns(inCaptureIndex))
+        return CLazyCapture(self,inCaptureIndex,inPositionIndex).AsDaskArray(theShape)
+
+    def AsXarray(self,inCaptureIndex,inPositionIndex=0):
+        """ Gets a lazy xarray DataArray of an image group, with labeled dimensions
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inPositionIndex: int, optional
+            The position of the images. If the image group is not a montage, use 0
+
+        Returns
+        -------
+        xarray.DataArray
+            The dask array of AsDaskArray with the dimensions t,c,z,y,x and their coordinates:
+            elapsed time in ms, channel names, and positions in um from the voxel size
+        """
+
+        import xarray as xr
+        from CLazyCapture import GetCaptureCoordinates
+        theArray = self.AsDaskArray(inCaptureIndex,inPositionIndex)
+        theCoordinates = GetCaptureCoordinates(self,inCaptureIndex)
+        theAttributes = {"name" : self.GetImageName(inCaptureIndex), "t_unit" : "ms", "z_unit" : "um", "y_unit" : "um", "x_unit" : "um"}
+        return xr.DataArray(theArray,dims=("t","c","z","y","x"),coords=theCoordinates,name=self.GetImageName(inCaptureIndex),attrs=theAttributes)
@@ -1,60 +1,200 @@
 __copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
 __license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
 
-#!/usr/bin/env python
-# coding: utf-8
-
-# In[1]:
-
-
+"""Exports captures as MATLAB v7.3 (.mat) files, without MATLAB
+
+A v7.3 MAT-file is an HDF5 file with a 512 bytes header (user block) and MATLAB_class
+attributes on the variables, it is written here with h5py, one plane at a time: the memory
+stays bounded by a few planes whatever the size of the capture. Compressed slides (.sldyz)
+are read like the others.
+
+In MATLAB, load('Slide1_1.mat') gives the variables:
+    image           uint16 array of size (NumRows,NumColumns,NumZPlanes,NumChannels,NumTimepoints)
+    voxelSize       [x y z] in microns
+    channelNames    cell array of the channel names
+    exposureTimes   the exposure time of each channel in ms
+    elapsedTimes    the elapsed time of each timepoint in ms
+    captureName     the name of the capture
+
+usage:
+python SldyToMATLAB.py -i input_file.sldy -o output_file.mat [-n capture_number] [-c compression_level] [-j threads]
+example:
+python SldyToMATLAB.py -i c:\\Data\\Slides\\Slide1.sldyz -o c:\\Data\\Mat\\Slide1.mat -n 1
+    -n the capture (base 0), all the captures by default, in <output_file>_<capture>.mat
+    -c the gzip level of the image, 0 for none (default 1)
+    -j the number of reader threads (default 4)
+
+h5py package
+-----------------
+conda install h5py  or  pip install h5py
+"""
+
+from SBReadFile import *
+from CPlaneReaderPool import CPlaneReaderPool
 import numpy as np
-import os
-import matlab.engine
-
-
-# In[25]:
-
-
-def open_npy_file(path, cap_number, channel):
-    for i in os.listdir(path):
-        #finding the .imgdir for the capture you are interested in 
-        if cap_number and ".imgdir" in i:
-            b=i
-    new_path=os.path.join(path, str(b))
-    for q in os.listdir(new_path):
-        #finding the npy file for the channel you are interested in 
-        if channel and "ImageData" in q:
-            c=q
-    newer_path=os.path.join(new_path, str(c))
-    #opens the npy file that has your channel data in it 
-    print("Opening ",newer_path)
-    im=np.load(newer_path)
-    return (im)
-
-
-# In[29]:
-
-
-test_see=open_npy_file('C:\Data\Slides_msi\QweekTour.dir',"Metaphase B-Cell - 1-1646218556-536","Ch0")
-#directory of the sldy file
-#the capture you are interested in 
-#the channel that your data is on
-np.shape(test_see)
-
-
-# In[ ]:
-
-
-eng = matlab.engine.connect_matlab()
-
-
-# In[28]:
-#in matlab, crate share session 
-# >>matlab.engine.shareEngine('Python')
-# from matlab connect a shared secssion
-# name=matlab.engine.find_matlab()
-# eng.workspace[name[0]] = array
-
-eng.workspace['MATLAB_10144'] = test_see
-#send array to matlab workspace 
-
+import sys, getopt
+import time
+import h5py
+
+
+class CMatExporter(object):
+    """ Exports captures of a slide as MATLAB v7.3 files """
+
+    kUserBlockSize = 512
+
+    def __init__(self, inSlidePath, inNumThreads=4):
+        self.mSlidePath = inSlidePath
+        self.mNumThreads = inNumThreads
+        self.mCompressionLevel = 1
+        self.mPrintProgress = False
+        self.mSBFileReader = SBReadFile()
+        if not self.mSBFileReader.Open(inSlidePath):
+            raise Exception("CMatExporter: could not open: " + inSlidePath)
+
+    def SetCompressionLevel(self, inLevel):
+        """ the gzip level (0-9) of the image, 0 for none """
+        self.mCompressionLevel = inLevel
+
+    def WriteMatHeader(self, inMatPath):
+        # the text header of MAT-files, then the version 0x0200 and the endian indicator
+        theText = "MATLAB 7.3 MAT-file, Platform: GLNXA64, Created on: " + time.strftime("%a %b %d %H:%M:%S %Y") + " HDF5 schema 1.00 ."
+        theHeader = theText.encode().ljust(116, b' ') + b'\x00' * 8 + b'\x00\x02' + b'IM'
+        with open(inMatPath, "r+b") as theFile:
+            theFile.write(theHeader)
+
+    def SetClass(self, inDataset, inClass):
+        inDataset.attrs.create("MATLAB_class", np.bytes_(inClass))
+
+    def WriteDouble(self, inFile, inName, inValues):
+        # MATLAB arrays are column major: a 1xN row vector is stored as (N,1)
+        theDataset = inFile.create_dataset(inName, data=np.asarray(inValues, dtype=np.float64).reshape(-1, 1))
+        self.SetClass(theDataset, "double")
+
+    def WriteString(self, inGroup, inName, inString):
+        if len(inString) == 0:
+            theDataset = inGroup.create_dataset(inName, data=np.zeros(2, dtype=np.uint64))
+            theDataset.attrs.create("MATLAB_empty", np.uint8(1))
+        else:
+            theDataset = inGroup.create_dataset(inName, data=np.frombuffer(inString.encode("utf-16-le"), dtype=np.uint16).reshape(-1, 1))
+        self.SetClass(theDataset, "char")
+        theDataset.attrs.create("MATLAB_int_decode", np.int32(2))
+        return theDataset
+
+    def WriteStringCell(self, inFile, inName, inStrings):
+        # the strings of a cell array are referenced datasets in the group #refs#
+        theRefs = inFile.require_group("#refs#")
+        theReferences = []
+        for theString in inStrings:
+            theDataset = self.WriteString(theRefs, inName + "_" + str(len(theReferences)), theString)
+            theReferences.append(theDataset.ref)
+        theDataset = inFile.create_dataset(inName, data=np.array(theReferences, dtype=h5py.ref_dtype).reshape(-1, 1))
+        self.SetClass(theDataset, "cell")
+
+    def WriteMetadata(self, inFile, inCaptureIndex):
+        theReader = self.mSBFileReader
+        theNumChannels = theReader.GetNumChannels(inCaptureIndex)
+        self.WriteDouble(inFile, "voxelSize", theReader.GetVoxelSize(inCaptureIndex))
+        self.WriteStringCell(inFile, "channelNames", [theReader.GetChannelName(inCaptureIndex, theChannel) for theChannel in range(theNumChannels)])
+        self.WriteDouble(inFile, "exposureTimes", [theReader.GetExposureTime(inCaptureIndex, theChannel) for theChannel in range(theNumChannels)])
+        try:
+            theElapsedTimes = [theReader.GetElapsedTime(inCaptureIndex, theTimepoint) for theTimepoint in range(theReader.GetNumTimepoints(inCaptureIndex))]
+        except IndexError:
+            theElapsedTimes = []
+        self.WriteDouble(inFile, "elapsedTimes", theElapsedTimes)
+        self.WriteString(inFile, "captureName", theReader.GetImageName(inCaptureIndex))
+
+    def Export(self, inCaptureIndex, inMatPath):
+        """ Exports a capture as a MATLAB v7.3 file
+
+        Parameters
+        ----------
+        inCaptureIndex: int
+            The index of the image group. Must be in range(0,number of captures)
+        inMatPath: str
+            The path of the .mat file
+
+        Returns
+        -------
+        int
+            The number of planes written
+        """
+        theReader = self.mSBFileReader
+        theReader.mDL.CheckCaptureIndex(inCaptureIndex)
+        theNumTimepoints = theReader.GetNumTimepoints(inCaptureIndex)
+        theNumChannels = theReader.GetNumChannels(inCaptureIndex)
+        theNumZPlanes = theReader.GetNumZPlanes(inCaptureIndex)
+        theNumRows = theReader.GetNumYRows(inCaptureIndex)
+        theNumColumns = theReader.GetNumXColumns(inCaptureIndex)
+        theNumPlanes = theNumTimepoints * theNumChannels * theNumZPlanes
+
+        with h5py.File(inMatPath, "w", userblock_size=self.kUserBlockSize, libver="earliest") as theFile:
+            self.WriteMetadata(theFile, inCaptureIndex)
+            # reversed axes: MATLAB sees (NumRows,NumColumns,NumZPlanes,NumChannels,NumTimepoints)
+            theShape = (theNumTimepoints, theNumChannels, theNumZPlanes, theNumColumns, theNumRows)
+            theCompression = "gzip" if self.mCompressionLevel > 0 else None
+            theCompressionLevel = self.mCompressionLevel if self.mCompressionLevel > 0 else None
+            theImage = theFile.create_dataset("image", shape=theShape, dtype=np.uint16, chunks=(1, 1, 1, theNumColumns, theNumRows),
+                                              compression=theCompression, compression_opts=theCompressionLevel)
+            self.SetClass(theImage, "uint16")
+            # the planes in the order of the files: timepoint, channel, z
+            theIndexes = ((theTimepoint, theZPlane, theChannel) for theTimepoint in range(theNumTimepoints)
+                          for theChannel in range(theNumChannels) for theZPlane in range(theNumZPlanes))
+            theCount = 0
+            with CPlaneReaderPool(self.mSlidePath, self.mNumThreads) as thePool:
+                for (theTimepoint, theZPlane, theChannel), thePlane in thePool.ReadPlanes(inCaptureIndex, theIndexes):
+                    theImage[theTimepoint, theChannel, theZPlane] = thePlane.T
+                    theCount += 1
+                    if self.mPrintProgress and (theCount % 100 == 0 or theCount == theNumPlanes):
+                        print ("Exported planes: ", theCount, "/", theNumPlanes)
+        self.WriteMatHeader(inMatPath)
+        return theCount
+
+
+def usage():
+    print ('usage: python SldyToMATLAB.py -i <sldy input_file> -o <output mat file> [-n capture_number] [-c compression_level] [-j threads]')
+    print ('       exports a capture (base 0), or all, as MATLAB v7.3 files')
+
+def main(argv):
+    theFileName = ''
+    theMatFileName = ''
+    theCapture = -1
+    theCompressionLevel = 1
+    theNumThreads = 4
+    try:
+        opts, args = getopt.getopt(argv,'hi:o:n:c:j:',['ifile=','ofile='])
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit()
+        elif opt in ("-i", "--ifile"):
+            theFileName = arg
+        elif opt in ("-o", "--ofile"):
+            theMatFileName = arg
+        elif opt == '-n':
+            theCapture = int(arg)
+        elif opt == '-c':
+            theCompressionLevel = int(arg)
+        elif opt == '-j':
+            theNumThreads = int(arg)
+    if theFileName == '' or theMatFileName == '':
+        usage()
+        sys.exit(2)
+
+    theExporter = CMatExporter(theFileName, theNumThreads)
+    theExporter.SetCompressionLevel(theCompressionLevel)
+    theExporter.mPrintProgress = True
+    if theCapture >= 0:
+        theCaptures = [(theCapture, theMatFileName)]
+    else:
+        thePrefix = theMatFileName[:-4] if theMatFileName.lower().endswith('.mat') else theMatFileName
+        theCaptures = [(theIndex, thePrefix + '_' + str(theIndex) + '.mat') for theIndex in range(theExporter.mSBFileReader.GetNumCaptures())]
+    for theIndex, thePath in theCaptures:
+        theNumPlanes = theExporter.Export(theIndex, thePath)
+        print ('Written ', theNumPlanes, ' planes to: ', thePath)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,473 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Writes synthetic SlideBook 7 slides with the CSBFile70 layout, for tests and benchmarks
+
+The slide is written as SlideBook does: the slide record (.sldy or .sldyz), and for every
+capture an .imgdir directory with the yaml records (ImageRecord, ChannelRecord,
+AnnotationRecord, MaskRecord, ElapsedTimes, SAPositionData, StagePositionData, AuxData)
+and the binary data:
+    .sldy   one ImageData_Ch#_TP#######.npy file per channel and timepoint (z,y,x)
+    .sldyz  the same files as .npyz, each plane compressed (zstd, zlib, lz4 or RLE) in its own block
+    single file multi timepoints (1 z plane only): one file per channel of shape (t,y,x),
+            compressed files have one block per timepoint
+    masks   one MaskData_TP#######.npyz per timepoint of shape (masks,z,y,x), one block per mask
+
+Montage positions are stored as SlideBook does, as consecutive timepoints:
+image index = timepoint * number of positions + position, and the stage position table
+has one entry per image index.
+
+The pixel values are a function of (seed, image index, z plane, channel) only, so
+CSyntheticCapture.MakePlane() gives the expected content of any plane.
+
+usage:
+python SyntheticSlide.py -o <output.sldy or output.sldyz> [-n captures] [-x columns] [-y rows] [-z planes]
+        [-c channels] [-t timepoints] [-p positions] [-m masks] [-a zstd|zlib|lz4|rle] [-s]
+    -s writes a single file multi timepoints capture (requires -z 1)
+"""
+
+import os
+import sys, getopt
+import time
+import numpy as np
+from CMetadataLib import *
+from CNpyzWriter import CNpyzWriter
+from CCompressionBase import CCompressionBase, kCompressionAlgorithms
+from CSBFile70 import CSBFile70
+from CSBPoint import CSBPoint
+
+# inverse of BaseDecoder.RestoreSpecialCharacters
+kSpecialCharacters = [("\t", "_#9;"), ("\n", "_#10;"), ("\r", "_#13;"), ("\"", "_#34;"), (":", "_#58;"),
+                      ("[", "_#91;"), ("]", "_#93;"), ("|", "_#124;"), ("<", "_#60;"), (">", "_#62;"), (" ", "_#32;")]
+
+def EscapeSpecialCharacters(inString):
+    if len(inString) == 0:
+        return "__empty"
+    ouString = inString
+    for theCharacter, theEscape in kSpecialCharacters:
+        ouString = ouString.replace(theCharacter, theEscape)
+    return ouString
+
+def EncodeScalar(inValue):
+    if isinstance(inValue, (bool, np.bool_)):
+        return "true" if inValue else "false"
+    if isinstance(inValue, (int, np.integer)):
+        return str(int(inValue))
+    if isinstance(inValue, (float, np.floating)):
+        return repr(float(inValue))
+    return EscapeSpecialCharacters(str(inValue))
+
+def EncodeList(inValues, inFirstIsSize=True):
+    theValues = [EncodeScalar(theValue) for theValue in inValues]
+    if inFirstIsSize:
+        theValues.insert(0, str(len(inValues)))
+    return "[" + ", ".join(theValues) + "]"
+
+def EncodeRecord(inRecord, inExtraLines=None):
+    """ Encodes the scalar and list members of a record as a StartClass/EndClass pair
+
+    The member records (BaseDecoder) are not written, they follow as their own classes.
+    Points are written as name.mX and name.mY as CAnnotation70.DecodeUnknownString expects.
+    """
+    theClassName = inRecord.GetSBClassName()
+    ouLines = ["StartClass:", "  ClassName: " + theClassName]
+    for theName, theValue in vars(inRecord).items():
+        if theName == "ClassName":
+            continue
+        if isinstance(theValue, CSBPoint):
+            ouLines.append("  " + theName + ".mX: " + EncodeScalar(float(theValue.mX)))
+            ouLines.append("  " + theName + ".mY: " + EncodeScalar(float(theValue.mY)))
+        elif isinstance(theValue, list):
+            if len(theValue) == 0 or not isinstance(theValue[0], (bool, int, float)):
+                continue
+            ouLines.append("  " + theName + ": " + EncodeList(theValue))
+        elif isinstance(theValue, (bool, int, float, str)):
+            ouLines.append("  " + theName + ": " + EncodeScalar(theValue))
+    if inExtraLines != None:
+        ouLines += ["  " + theLine for theLine in inExtraLines]
+    ouLines.append("EndClass: " + theClassName)
+    return ouLines
+
+def WriteLines(inPath, inLines):
+    with open(inPath, "w") as theStream:
+        theStream.write("\n".join(inLines) + "\n")
+
+
+class CSyntheticCapture(object):
+    """ The description of a synthetic capture (image group) and the generator of its content """
+    def __init__(self, inTitle, inNumColumns, inNumRows, inNumPlanes, inNumChannels, inNumTimepoints, inNumPositions, inNumMasks, inSingleTimepointFile, inCompressionAlgorithm, inSeed):
+        if inSingleTimepointFile and inNumPlanes != 1:
+            raise Exception("CSyntheticCapture: a single file multi timepoints capture must have 1 z plane")
+        self.mTitle = inTitle
+        self.mNumColumns = inNumColumns
+        self.mNumRows = inNumRows
+        self.mNumPlanes = inNumPlanes
+        self.mNumChannels = inNumChannels
+        self.mNumTimepoints = inNumTimepoints
+        self.mNumPositions = inNumPositions
+        self.mNumMasks = inNumMasks
+        self.mSingleTimepointFile = inSingleTimepointFile
+        self.mCompressionAlgorithm = inCompressionAlgorithm
+        self.mSeed = inSeed
+        self.mMicronPerPixel = 0.5
+        self.mInterplaneSpacing = 1.0
+        self.mTimeLapseIntervalMs = 1000
+        self.mMontageOverlap = 0.1
+        self.mNumROIs = 3
+        self.mNumFRAPRegions = 2
+
+        # smooth background shared by all planes, the planes add a z/channel dependent scale and noise
+        theY = np.linspace(0.0, 4.0 * np.pi, inNumRows, dtype=np.float32)[:, None]
+        theX = np.linspace(0.0, 6.0 * np.pi, inNumColumns, dtype=np.float32)[None, :]
+        self.mBackground = 800.0 + 400.0 * np.sin(theY) * np.cos(theX)
+
+    def GetNumImages(self):
+        """ the number of SlideBook timepoints: timepoints x positions """
+        return self.mNumTimepoints * self.mNumPositions
+
+    def MakePlane(self, inImageIndex, inZPlaneIndex, inChannelIndex):
+        theRng = np.random.default_rng([self.mSeed, inImageIndex, inZPlaneIndex, inChannelIndex])
+        theScale = 1.0 + 0.05 * inZPlaneIndex + 0.5 * inChannelIndex
+        thePlane = self.mBackground * theScale + 10 * (inImageIndex % 64)
+        thePlane = thePlane + theRng.integers(0, 64, size=thePlane.shape, dtype=np.int32)
+        return np.clip(thePlane, 0, 65535).astype(np.uint16)
+
+    def MakeMask(self, inMaskIndex, inImageIndex):
+        """ a labeled mask (nz,ny,nx): a few rectangles moving with the timepoint """
+        theMask = np.zeros((self.mNumPlanes, self.mNumRows, self.mNumColumns), dtype=np.uint16)
+        theNumObjects = 2 + inMaskIndex
+        theHeight = max(1, self.mNumRows // 8)
+        theWidth = max(1, self.mNumColumns // 8)
+        for theObject in range(theNumObjects):
+            theTop = (theObject * 2 * theHeight + inImageIndex) % max(1, self.mNumRows - theHeight)
+            theLeft = (theObject * 3 * theWidth + inImageIndex) % max(1, self.mNumColumns - theWidth)
+            theMask[:, theTop:theTop + theHeight, theLeft:theLeft + theWidth] = theObject + 1
+        return theMask
+
+    def GetStagePosition(self, inPositionIndex):
+        """ the (x,y,z) stage position in um of a montage position, on a grid with mMontageOverlap """
+        theNumGridColumns = int(np.ceil(np.sqrt(self.mNumPositions)))
+        theRow = inPositionIndex // theNumGridColumns
+        theColumn = inPositionIndex % theNumGridColumns
+        theStepX = self.mNumColumns * self.mMicronPerPixel * (1.0 - self.mMontageOverlap)
+        theStepY = self.mNumRows * self.mMicronPerPixel * (1.0 - self.mMontageOverlap)
+        return 1000.0 + theColumn * theStepX, 2000.0 + theRow * theStepY, 50.0
+
+    def GetElapsedTime(self, inImageIndex):
+        theTimepoint = inImageIndex // self.mNumPositions
+        thePosition = inImageIndex % self.mNumPositions
+        return theTimepoint * self.mTimeLapseIntervalMs + thePosition * 10
+
+
+class CSyntheticSlide(object):
+    """ Writes a synthetic slide: add the captures with AddCapture, then call Write """
+    def __init__(self, inSlidePath):
+        self.mSlidePath = inSlidePath
+        self.mFile = CSBFile70(inSlidePath)
+        self.mCaptureList = []
+        self.mCompressionLevel = 1
+
+    def AddCapture(self, inTitle, inNumColumns=256, inNumRows=256, inNumPlanes=4, inNumChannels=2, inNumTimepoints=2, inNumPositions=1, inNumMasks=1, inSingleTimepointFile=False, inCompressionAlgorithm=1, inSeed=0):
+        """ Adds a capture to the slide
+
+        Parameters
+        ----------
+        inTitle: str
+            The title of the capture, also the name of its .imgdir directory
+        inNumColumns, inNumRows, inNumPlanes, inNumChannels, inNumTimepoints, inNumPositions: int
+            The size of the capture
+        inNumMasks: int
+            The number of masks, 0 for none
+        inSingleTimepointFile: bool
+            If True, all the timepoints of a channel are in one file (requires inNumPlanes == 1)
+        inCompressionAlgorithm: int
+            CCompressionBase.eCompressionZstd, eCompressionZlib, eCompressionLz4 or eCompressionRLE, used for .sldyz slides and the masks
+        inSeed: int
+            The seed of the pixel values
+
+        Returns
+        -------
+        CSyntheticCapture
+            The capture, whose MakePlane/MakeMask give the expected content
+        """
+        theCapture = CSyntheticCapture(inTitle, inNumColumns, inNumRows, inNumPlanes, inNumChannels, inNumTimepoints, inNumPositions, inNumMasks, inSingleTimepointFile, inCompressionAlgorithm, inSeed)
+        self.mCaptureList.append(theCapture)
+        return theCapture
+
+    def Write(self):
+        """ Writes the slide record, then the records and the data of every capture """
+        theRootDirectory = self.mFile.GetSlideRootDirectory()
+        os.makedirs(theRootDirectory, exist_ok=True)
+        self.WriteSlideRecord()
+        for theCaptureIndex, theCapture in enumerate(self.mCaptureList):
+            theDirectory = self.mFile.GetImageGroupDirectory(theCapture.mTitle)
+            os.makedirs(theDirectory, exist_ok=True)
+            self.WriteImageRecord(theCapture, theCaptureIndex)
+            self.WriteChannelRecord(theCapture)
+            self.WriteAnnotationRecord(theCapture)
+            self.WriteElapsedTimes(theCapture)
+            self.WriteSAPositions(theCapture)
+            self.WriteStagePositions(theCapture)
+            self.WriteAuxData(theCapture)
+            self.WriteImageData(theCapture)
+            self.WriteMaskData(theCapture)
+
+        # the captures are listed by modification time of their directory (CSBFile70.GetListOfImageGroupTitles)
+        theTimeNS = time.time_ns()
+        for theCaptureIndex, theCapture in enumerate(self.mCaptureList):
+            theDirectory = self.mFile.GetImageGroupDirectory(theCapture.mTitle)
+            theModTimeNS = theTimeNS + theCaptureIndex * 1000000
+            os.utime(theDirectory, ns=(theModTimeNS, theModTimeNS))
+
+    def WriteSlideRecord(self):
+        theSlideRecord = CSlideRecord70()
+        theSlideRecord.mStructVersion = 7
+        theSlideRecord.mNumImages = len(self.mCaptureList)
+        theSlideRecord.mName = os.path.basename(self.mSlidePath)
+        WriteLines(self.mSlidePath, EncodeRecord(theSlideRecord))
+
+    def GetRecordPath(self, inCapture, inFilename):
+        return self.mFile.GetImageGroupDirectory(inCapture.mTitle) + inFilename
+
+    def MakeThumbnail(self, inCapture):
+        thePlane = inCapture.MakePlane(0, inCapture.mNumPlanes // 2, 0)
+        theRows = np.linspace(0, inCapture.mNumRows - 1, 32).astype(np.int64)
+        theColumns = np.linspace(0, inCapture.mNumColumns - 1, 32).astype(np.int64)
+        theGray = thePlane[np.ix_(theRows, theColumns)].astype(np.float64)
+        theGray = (255 * (theGray - theGray.min()) / max(1.0, np.ptp(theGray))).astype(np.uint32)
+        return ((theGray << 16) | (theGray << 8) | theGray).ravel().tolist()
+
+    def WriteImageRecord(self, inCapture, inCaptureIndex):
+        theImageRecord = CImageRecord70()
+        theImageRecord.mStructVersion = 7
+        theImageRecord.mYear, theImageRecord.mMonth, theImageRecord.mDay = 2024, 1, 1 + inCaptureIndex % 28
+        theImageRecord.mHour, theImageRecord.mMinute, theImageRecord.mSecond = 12, 0, 0
+        theImageRecord.mWidth = inCapture.mNumColumns
+        theImageRecord.mHeight = inCapture.mNumRows
+        theImageRecord.mNumPlanes = inCapture.mNumPlanes
+        theImageRecord.mNumChannels = inCapture.mNumChannels
+        theImageRecord.mNumTimepoints = inCapture.GetNumImages()
+        theImageRecord.mNumMasks = inCapture.mNumMasks
+        theImageRecord.mImageGroupIndex = inCaptureIndex
+        theImageRecord.mThumbNail = self.MakeThumbnail(inCapture)
+        theImageRecord.mName = inCapture.mTitle
+        theImageRecord.mInfo = "Synthetic capture"
+        theImageRecord.mUniqueId = "synthetic-" + str(inCaptureIndex)
+
+        theLensDef = CLensDef70()
+        theLensDef.mName = "20X"
+        theLensDef.mNA = 0.8
+        theLensDef.mMicronPerPixel = inCapture.mMicronPerPixel
+        theLensDef.mActualMagnification = 20.0
+        theOptovarDef = COptovarDef70()
+        theOptovarDef.mName = "1X"
+        theOptovarDef.mMagnification = 1.0
+        theMainViewRecord = CMainViewRecord70()
+
+        # same order as CImageRecord70.Decode
+        theLines = EncodeRecord(theImageRecord) + EncodeRecord(theLensDef) + EncodeRecord(theOptovarDef) + EncodeRecord(theMainViewRecord)
+        WriteLines(self.GetRecordPath(inCapture, self.mFile.kImageRecordFilename), theLines)
+
+    def WriteChannelRecord(self, inCapture):
+        theLines = []
+        for theChannel in range(inCapture.mNumChannels):
+            theChannelRecord = CChannelRecord70()
+            theChannelRecord.mNumPlanes = inCapture.mNumPlanes
+            theExposureRecord = CExposureRecord70()
+            theExposureRecord.mExposureTime = 100 + 50 * theChannel
+            theExposureRecord.mXFactor = 1
+            theExposureRecord.mYFactor = 1
+            theExposureRecord.mNumPlanes = inCapture.mNumPlanes
+            theExposureRecord.mInterplaneSpacing = inCapture.mInterplaneSpacing
+            theExposureRecord.mTimeLapseInterval = inCapture.mTimeLapseIntervalMs
+            theChannelDef = CChannelDef70()
+            theChannelDef.mName = "Channel " + str(theChannel)
+            theFluorDef = CFluorDef70()
+            theFluorDef.mName = theChannelDef.mName
+
+            # same order as CChannelRecord70.Decode and CChannelDef70.Decode
+            theLines += EncodeRecord(theChannelRecord) + EncodeRecord(theExposureRecord)
+            theLines += EncodeRecord(theChannelDef) + EncodeRecord(theFluorDef)
+        WriteLines(self.GetRecordPath(inCapture, self.mFile.kChannelRecordFilename), theLines)
+
+    def EncodeAnnotation(self, inGraphicType, inVertexes):
+        theAnnotation = CAnnotation70()
+        theAnnotation.mGraphicType70 = inGraphicType
+        theValues = []
+        for theX, theY in inVertexes:
+            theValues += [int(theX), int(theY), 0]
+        return EncodeRecord(theAnnotation, ["StructArrayValues: " + EncodeList(theValues, False)])
+
+    def EncodeCubeAnnotation(self, inRegionIndex, inGraphicType, inVertexes, inIsFRAP):
+        theCubeAnnotation = CCubeAnnotation70()
+        theCubeAnnotation.mRegionIndex = inRegionIndex
+        theCubeAnnotation.mIsFRAP = inIsFRAP
+        return EncodeRecord(theCubeAnnotation) + self.EncodeAnnotation(inGraphicType, inVertexes)
+
+    def GetRectangleVertexes(self, inCapture, inIndex):
+        theSize = max(2, min(inCapture.mNumRows, inCapture.mNumColumns) // 8)
+        theLeft = (inIndex * theSize) % max(1, inCapture.mNumColumns - theSize)
+        theTop = (inIndex * theSize) % max(1, inCapture.mNumRows - theSize)
+        return [(theLeft, theTop), (theLeft + theSize, theTop + theSize)]
+
+    def WriteAnnotationRecord(self, inCapture):
+        # graphic types: 2 rectangle, 3 polygon, 8 ellipse (see SBReadFile.GetROIAnnotation)
+        theLines = EncodeRecord(CDataTableHeaderRecord70())
+        for theImageIndex in range(inCapture.GetNumImages()):
+            theLines.append("theTimepointIndex: " + str(theImageIndex))
+            theNumROIs = inCapture.mNumROIs if theImageIndex == 0 else 0
+            theLines.append("theCubeAnnotation70ListSize: " + str(theNumROIs))
+            for theROI in range(theNumROIs):
+                theGraphicType = [2, 3, 8][theROI % 3]
+                theVertexes = self.GetRectangleVertexes(inCapture, theROI)
+                if theGraphicType == 3:
+                    (theLeft, theTop), (theRight, theBottom) = theVertexes
+                    theVertexes = [(theLeft, theTop), (theRight, theTop), (theRight, theBottom)]
+                theLines += self.EncodeCubeAnnotation(theROI, theGraphicType, theVertexes, False)
+            theLines.append("theAnnotation70ListSize: 0")
+
+            theNumFRAP = 1 if theImageIndex == 0 and inCapture.mNumFRAPRegions > 0 else 0
+            theLines.append("theFRAPRegionAnnotation70ListSize: " + str(theNumFRAP))
+            if theNumFRAP > 0:
+                theFRAPAnnotation = CFRAPRegionAnnotation70()
+                theLines += EncodeRecord(theFRAPAnnotation)
+                theLines += self.EncodeAnnotation(2, self.GetRectangleVertexes(inCapture, 0))
+                theLines.append("theNumRegions: " + str(inCapture.mNumFRAPRegions))
+                for theRegion in range(inCapture.mNumFRAPRegions):
+                    theLines += self.EncodeCubeAnnotation(theRegion, 2, self.GetRectangleVertexes(inCapture, theRegion + 1), True)
+            theLines.append("theUnknownAnnotation70ListSize: 0")
+        WriteLines(self.GetRecordPath(inCapture, self.mFile.kAnnotationRecordFilename), theLines)
+
+    def WriteElapsedTimes(self, inCapture):
+        theTimes = [inCapture.GetElapsedTime(theImageIndex) for theImageIndex in range(inCapture.GetNumImages())]
+        WriteLines(self.GetRecordPath(inCapture, self.mFile.kElapsedTimesFilename), ["theElapsedTimes: " + EncodeList(theTimes)])
+
+    def WriteSAPositions(self, inCapture):
+        theNumImages = inCapture.GetNumImages()
+        theLines = ["theImageCount: " + str(theNumImages)]
+        theLines += ["theSAPositions: " + EncodeList([0, 0, 0])] * theNumImages
+        WriteLines(self.GetRecordPath(inCapture, self.mFile.kSAPositionDataFilename), theLines)
+
+    def WriteStagePositions(self, inCapture):
+        theValues = []
+        for theImageIndex in range(inCapture.GetNumImages()):
+            theValues += list(inCapture.GetStagePosition(theImageIndex % inCapture.mNumPositions))
+        theLines = ["StructArraySize: " + str(inCapture.GetNumImages()), "StructArrayValues: " + EncodeList(theValues, False)]
+        WriteLines(self.GetRecordPath(inCapture, self.mFile.kStagePositionDataFilename), theLines)
+
+    def WriteAuxData(self, inCapture):
+        theLines = ["theAuxFloatDataTablesSize: 0", "theAuxDoubleDataTablesSize: 0", "theAuxSInt32DataTablesSize: 0",
+                    "theAuxSInt64DataTablesSize: 0", "theAuxSerializedDataTablesSize: 0"]
+        WriteLines(self.GetRecordPath(inCapture, self.mFile.kAuxDataFilename), theLines)
+
+    def WriteNpyFile(self, inPath, inShape, inCompressionAlgorithm, inBlocks):
+        """ Writes a .npy file, or a .npyz file with one compressed block per element of inBlocks
+
+        Returns the list of the (offset,size) of the blocks in the file
+        """
+        with CNpyzWriter(inPath, inShape, inCompressionAlgorithm, self.mCompressionLevel) as theWriter:
+            for theBlock in inBlocks:
+                theWriter.WriteBlock(theBlock)
+        return theWriter.GetBlockPositions()
+
+    def WriteImageData(self, inCapture):
+        theAlgorithm = inCapture.mCompressionAlgorithm if self.mFile.mIsCompressed else CCompressionBase().eCompressionNone
+        theNumImages = inCapture.GetNumImages()
+        for theChannel in range(inCapture.mNumChannels):
+            if inCapture.mSingleTimepointFile:
+                thePath = self.mFile.GetImageDataFile(inCapture.mTitle, theChannel, 0)
+                theShape = (theNumImages, inCapture.mNumRows, inCapture.mNumColumns)
+                thePlanes = (inCapture.MakePlane(theImageIndex, 0, theChannel) for theImageIndex in range(theNumImages))
+                self.WriteNpyFile(thePath, theShape, theAlgorithm, thePlanes)
+                continue
+            for theImageIndex in range(theNumImages):
+                thePath = self.mFile.GetImageDataFile(inCapture.mTitle, theChannel, theImageIndex)
+                theShape = (inCapture.mNumPlanes, inCapture.mNumRows, inCapture.mNumColumns)
+                thePlanes = (inCapture.MakePlane(theImageIndex, theZPlane, theChannel) for theZPlane in range(inCapture.mNumPlanes))
+                self.WriteNpyFile(thePath, theShape, theAlgorithm, thePlanes)
+
+    def WriteMaskData(self, inCapture):
+        theMaskRecordPath = self.GetRecordPath(inCapture, self.mFile.kMaskRecordFilename)
+        theLines = ["theNumMasks: " + str(inCapture.mNumMasks)]
+        for theMask in range(inCapture.mNumMasks):
+            theMaskRecord = CMaskRecord70()
+            theMaskRecord.mName = "Mask " + str(theMask + 1)
+            theLines += EncodeRecord(theMaskRecord)
+        if inCapture.mNumMasks == 0:
+            WriteLines(theMaskRecordPath, theLines)
+            return
+
+        theShape = (inCapture.mNumMasks, inCapture.mNumPlanes, inCapture.mNumRows, inCapture.mNumColumns)
+        for theImageIndex in range(inCapture.GetNumImages()):
+            thePath = self.mFile.GetMaskDataFile(inCapture.mTitle, theImageIndex)
+            theMasks = (inCapture.MakeMask(theMask, theImageIndex) for theMask in range(inCapture.mNumMasks))
+            theBlockPositions = self.WriteNpyFile(thePath, theShape, inCapture.mCompressionAlgorithm, theMasks)
+            theLines.append("theTimepointIndex: " + str(theImageIndex))
+            theLines.append("theMaskCompressedSizes: " + EncodeList([theSize for theOffset, theSize in theBlockPositions]))
+            theLines.append("theMaskFileOffsets: " + EncodeList([theOffset for theOffset, theSize in theBlockPositions]))
+        WriteLines(theMaskRecordPath, theLines)
+
+
+def usage():
+    print ('usage: python SyntheticSlide.py -o <output.sldy or output.sldyz> [-n captures] [-x columns] [-y rows] [-z planes]')
+    print ('       [-c channels] [-t timepoints] [-p positions] [-m masks] [-a zstd|zlib|lz4|rle] [-s]')
+    print ('       writes a synthetic slide, .sldyz slides have compressed image data')
+    print ('       -s writes all the timepoints of a channel in a single file (requires -z 1)')
+
+def main(argv):
+    theSlidePath = ''
+    theNumCaptures = 1
+    theNumColumns = 256
+    theNumRows = 256
+    theNumPlanes = 4
+    theNumChannels = 2
+    theNumTimepoints = 2
+    theNumPositions = 1
+    theNumMasks = 1
+    theAlgorithm = CCompressionBase().eCompressionZstd
+    theSingleTimepointFile = False
+    try:
+        opts, args = getopt.getopt(argv,'ho:n:x:y:z:c:t:p:m:a:s',['ofile='])
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit()
+        elif opt in ("-o", "--ofile"):
+            theSlidePath = arg
+        elif opt == '-n':
+            theNumCaptures = int(arg)
+        elif opt == '-x':
+            theNumColumns = int(arg)
+        elif opt == '-y':
+            theNumRows = int(arg)
+        elif opt == '-z':
+            theNumPlanes = int(arg)
+        elif opt == '-c':
+            theNumChannels = int(arg)
+        elif opt == '-t':
+            theNumTimepoints = int(arg)
+        elif opt == '-p':
+            theNumPositions = int(arg)
+        elif opt == '-m':
+            theNumMasks = int(arg)
+        elif opt == '-a':
+            theAlgorithm = kCompressionAlgorithms[arg]
+        elif opt == '-s':
+            theSingleTimepointFile = True
+    if theSlidePath == '':
+        usage()
+        sys.exit(2)
+
+    theSlide = CSyntheticSlide(theSlidePath)
+    for theCapture in range(theNumCaptures):
+        theSlide.AddCapture("Capture " + str(theCapture + 1), theNumColumns, theNumRows, theNumPlanes, theNumChannels, theNumTimepoints,
+                            theNumPositions, theNumMasks, theSingleTimepointFile, theAlgorithm, theCapture)
+    theSlide.Write()
+    print ('Written: ', theSlidePath)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
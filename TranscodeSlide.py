@@ -0,0 +1,334 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Converts slides between .sldy (raw .npy image data) and .sldyz (compressed .npyz) without SlideBook
+
+Only the image data files change: every plane (a block of the .npyz file) is compressed, or
+decompressed, by a pool of threads while the calling thread reads and writes the files in order.
+The .npyz files have the layout read by CCompressionBase: the npy header (the minor version is
+the compression algorithm), a dictionary of (offset,size) uint64 pairs, one per block, then the
+blocks, written by CNpyzWriter. The metadata, masks and histograms are copied as they are.
+
+When verification is on (default), a checksum of every plane is kept while transcoding and each
+written file is read back and compared, a mismatch raises an exception.
+
+Both layouts of a slide use the same .dir directory: converting Slide1.sldy to Slide1.sldyz adds
+the .npyz files next to the .npy files, -r then removes the source files once verified.
+The modification times of the .imgdir directories, which give the order of the captures, are kept.
+
+usage:
+python TranscodeSlide.py -i input_file.sldy -o output_file.sldyz [-a zstd|zlib|lz4|rle] [-l level] [-j threads] [-r] [-v]
+example:
+python TranscodeSlide.py -i c:\\Data\\Slides\\Slide1.sldy -o c:\\Data\\Archive\\Slide1.sldyz -l 3
+    -a the compression algorithm (default zstd)
+    -l the zstd level (default 1)
+    -j the number of compression threads (default 4)
+    -r removes the source slide once the output is verified
+    -v does not verify the output
+"""
+
+import os
+import sys, getopt
+import shutil
+import zlib
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from CNpyHeader import CNpyHeader
+from CCompressionBase import CCompressionBase, kCompressionAlgorithms
+from CNpyzWriter import CNpyzWriter
+from CSBFile70 import CSBFile70
+
+
+class CTranscodedFile(object):
+    """ the state of a file being transcoded """
+    def __init__(self, inSourcePath, inDestinationPath):
+        self.mSourcePath = inSourcePath
+        self.mDestinationPath = inDestinationPath
+        self.mSourceStream = None
+        self.mSourceHeader = CNpyHeader()
+        self.mSourceCompressor = None
+        self.mWriter = None
+        self.mNumBlocks = 0
+        self.mBlockSize = 0
+        self.mNumWritten = 0
+        self.mChecksums = []
+
+
+class CSlideTranscoder(object):
+    """ Converts a slide between the .sldy and .sldyz layouts """
+
+    def __init__(self, inSourcePath, inDestinationPath, inNumThreads=4):
+        self.mSourceFile = CSBFile70(inSourcePath)
+        self.mDestinationFile = CSBFile70(inDestinationPath)
+        if self.mSourceFile.mIsCompressed == self.mDestinationFile.mIsCompressed:
+            raise Exception("CSlideTranscoder: the slides must be one .sldy and one .sldyz")
+        if not os.path.isfile(inSourcePath):
+            raise Exception("CSlideTranscoder: could not find: " + inSourcePath)
+        self.mNumThreads = max(1, inNumThreads)
+        self.mMaxPending = 2 * self.mNumThreads
+        self.mAlgorithm = CCompressionBase().eCompressionZstd
+        self.mCompressionLevel = 1
+        self.mVerify = True
+        self.mPrintProgress = False
+
+    def SetCompression(self, inAlgorithm, inLevel=1):
+        """ the algorithm of the .npyz blocks: CCompressionBase().eCompressionZstd, eCompressionZlib, eCompressionLz4 or eCompressionRLE """
+        if inAlgorithm not in kCompressionAlgorithms.values() or inAlgorithm == CCompressionBase().eCompressionNone:
+            raise Exception("CSlideTranscoder: unsupported compression algorithm: " + str(inAlgorithm))
+        self.mAlgorithm = inAlgorithm
+        self.mCompressionLevel = inLevel
+
+    def IsInPlace(self):
+        return os.path.abspath(self.mSourceFile.GetSlideRootDirectory()) == os.path.abspath(self.mDestinationFile.GetSlideRootDirectory())
+
+    def GetDestinationPath(self, inSourcePath):
+        theSourceSuffix = self.mSourceFile.kZBinaryFileSuffix if self.mSourceFile.mIsCompressed else self.mSourceFile.kBinaryFileSuffix
+        theDestinationSuffix = self.mDestinationFile.kZBinaryFileSuffix if self.mDestinationFile.mIsCompressed else self.mDestinationFile.kBinaryFileSuffix
+        theRelativePath = os.path.relpath(inSourcePath, self.mSourceFile.GetSlideRootDirectory())
+        return os.path.join(self.mDestinationFile.GetSlideRootDirectory(), theRelativePath[:-len(theSourceSuffix)] + theDestinationSuffix)
+
+    def GetSourceImageFiles(self, inTitle):
+        # in place, the directory may hold the image data files of both layouts
+        theSuffix = self.mSourceFile.kZBinaryFileSuffix if self.mSourceFile.mIsCompressed else self.mSourceFile.kBinaryFileSuffix
+        return sorted(thePath for thePath in self.mSourceFile.GetListOfImageDataFiles(inTitle) if thePath.endswith(theSuffix))
+
+    def CopyMetadata(self):
+        """ copies everything but the image data files, returns the image data files to transcode """
+        theSourceRoot = self.mSourceFile.GetSlideRootDirectory()
+        theDestinationRoot = self.mDestinationFile.GetSlideRootDirectory()
+        theInPlace = self.IsInPlace()
+        theImageFiles = []
+        os.makedirs(theDestinationRoot, exist_ok=True)
+        for theEntry in os.scandir(theSourceRoot):
+            theDestination = os.path.join(theDestinationRoot, theEntry.name)
+            if theEntry.is_dir() and theEntry.name.endswith(self.mSourceFile.kImageDirSuffix):
+                theTitle = theEntry.name[:-len(self.mSourceFile.kImageDirSuffix)]
+                theImageFiles += self.GetSourceImageFiles(theTitle)
+                if theInPlace:
+                    continue
+                os.makedirs(theDestination, exist_ok=True)
+                for theSubEntry in os.scandir(theEntry.path):
+                    if theSubEntry.is_file() and not theSubEntry.name.startswith("ImageData"):
+                        shutil.copy2(theSubEntry.path, os.path.join(theDestination, theSubEntry.name))
+            elif theInPlace:
+                continue
+            elif theEntry.is_dir():
+                shutil.copytree(theEntry.path, theDestination, dirs_exist_ok=True)
+            else:
+                shutil.copy2(theEntry.path, theDestination)
+        return theImageFiles
+
+    def GetImageDirectoryTimes(self):
+        theTimes = dict()
+        theSourceRoot = self.mSourceFile.GetSlideRootDirectory()
+        for theEntry in os.scandir(theSourceRoot):
+            if theEntry.is_dir() and theEntry.name.endswith(self.mSourceFile.kImageDirSuffix):
+                theStat = theEntry.stat()
+                theTimes[theEntry.name] = (theStat.st_atime_ns, theStat.st_mtime_ns)
+        return theTimes
+
+    def SetImageDirectoryTimes(self, inTimes):
+        # the captures are ordered by the modification time of their directory
+        theDestinationRoot = self.mDestinationFile.GetSlideRootDirectory()
+        for theName, theTimes in inTimes.items():
+            thePath = os.path.join(theDestinationRoot, theName)
+            if os.path.isdir(thePath):
+                os.utime(thePath, ns=theTimes)
+            if self.IsInPlace():
+                continue
+            theSourcePath = os.path.join(self.mSourceFile.GetSlideRootDirectory(), theName)
+            if os.path.isdir(theSourcePath):
+                os.utime(theSourcePath, ns=theTimes)
+
+    def OpenFile(self, inSourcePath):
+        theFile = CTranscodedFile(inSourcePath, self.GetDestinationPath(inSourcePath))
+        theFile.mSourceStream = open(inSourcePath, "rb")
+        if not theFile.mSourceHeader.ParseNpyHeader(theFile.mSourceStream):
+            raise Exception("CSlideTranscoder: invalid header: " + inSourcePath)
+        theShape = theFile.mSourceHeader.mShape
+        theNumRows, theNumColumns = theShape[-2], theShape[-1]
+        theFile.mNumBlocks = theShape[0] if len(theShape) == 3 else 1
+        theFile.mBlockSize = theNumRows * theNumColumns * theFile.mSourceHeader.mBytesPerPixel
+        if theFile.mSourceHeader.mCompressionFlag > 0:
+            theFile.mSourceCompressor = CCompressionBase()
+            theFile.mSourceCompressor.InitializeEx(theFile.mSourceHeader.mHeaderSize, theFile.mSourceHeader.mCompressionFlag,
+                                                   theNumColumns, theNumRows, 1, theFile.mNumBlocks, 0)
+            theFile.mSourceCompressor.ReadDictionary(theFile.mSourceStream)
+
+        theAlgorithm = self.mAlgorithm if self.mDestinationFile.mIsCompressed else CCompressionBase().eCompressionNone
+        theFile.mWriter = CNpyzWriter(theFile.mDestinationPath, theShape, theAlgorithm, self.mCompressionLevel)
+        return theFile
+
+    def ReadBlock(self, inFile, inBlock):
+        """ the raw bytes of a block of the source file, compressed or not """
+        if inFile.mSourceCompressor is None:
+            inFile.mSourceStream.seek(inFile.mSourceHeader.mHeaderSize + inBlock * inFile.mBlockSize, 0)
+            return inFile.mSourceStream.read(inFile.mBlockSize)
+        theOffset = int(inFile.mSourceCompressor.GetDataOffsetForBlock(inBlock))
+        theSize = int(inFile.mSourceCompressor.GetDataSizeForBlock(inBlock))
+        inFile.mSourceStream.seek(theOffset, 0)
+        return inFile.mSourceStream.read(theSize)
+
+    def TranscodeBlock(self, inFile, inBuffer):
+        """ runs on a thread of the pool: returns the block to write and the checksum of the plane """
+        if inFile.mSourceCompressor is not None:
+            thePlane = inFile.mSourceCompressor.DecompressBuffer(inBuffer).tobytes()
+        else:
+            thePlane = inBuffer
+        if len(thePlane) != inFile.mBlockSize:
+            raise Exception("CSlideTranscoder: truncated block in: " + inFile.mSourcePath)
+        theChecksum = zlib.crc32(thePlane)
+        return inFile.mWriter.CompressBlock(np.frombuffer(thePlane, dtype=np.uint16)), theChecksum
+
+    def WriteBlock(self, inFile, inBuffer, inChecksum):
+        inFile.mWriter.WriteCompressedBlock(inBuffer)
+        inFile.mChecksums.append(inChecksum)
+        inFile.mNumWritten += 1
+        if inFile.mNumWritten == inFile.mNumBlocks:
+            self.CloseFile(inFile)
+
+    def CloseFile(self, inFile):
+        inFile.mWriter.Close()
+        inFile.mSourceStream.close()
+
+    def VerifyFile(self, inFile):
+        """ reads back a written file, compares the checksums of its planes """
+        with open(inFile.mDestinationPath, "rb") as theStream:
+            theHeader = CNpyHeader()
+            if not theHeader.ParseNpyHeader(theStream):
+                return False
+            theCompressor = None
+            if theHeader.mCompressionFlag > 0:
+                theCompressor = CCompressionBase()
+                theCompressor.InitializeEx(theHeader.mHeaderSize, theHeader.mCompressionFlag, theHeader.mShape[-1], theHeader.mShape[-2], 1, inFile.mNumBlocks, 0)
+                theCompressor.ReadDictionary(theStream)
+            for theBlock in range(inFile.mNumBlocks):
+                if theCompressor is None:
+                    theStream.seek(theHeader.mHeaderSize + theBlock * inFile.mBlockSize, 0)
+                    thePlane = theStream.read(inFile.mBlockSize)
+                else:
+                    thePlane = theCompressor.ReadData(theStream, theBlock).tobytes()
+                if len(thePlane) != inFile.mBlockSize or zlib.crc32(thePlane) != inFile.mChecksums[theBlock]:
+                    return False
+        return True
+
+    def RemoveSource(self):
+        """ removes the source slide file and its image data, and the directory if not shared """
+        if self.IsInPlace():
+            theSourceRoot = self.mSourceFile.GetSlideRootDirectory()
+            for theEntry in os.scandir(theSourceRoot):
+                if theEntry.is_dir() and theEntry.name.endswith(self.mSourceFile.kImageDirSuffix):
+                    theTitle = theEntry.name[:-len(self.mSourceFile.kImageDirSuffix)]
+                    for thePath in self.GetSourceImageFiles(theTitle):
+                        os.remove(thePath)
+        else:
+            shutil.rmtree(self.mSourceFile.GetSlideRootDirectory())
+        os.remove(self.mSourceFile.mSlidePath)
+
+    def Transcode(self, inRemoveSource=False):
+        """ Converts the slide
+
+        Parameters
+        ----------
+        inRemoveSource: bool, optional
+            if True, the source slide is removed once the output is written (and verified)
+
+        Returns
+        -------
+        int
+            The number of image data files transcoded
+        """
+        theTimes = self.GetImageDirectoryTimes()
+        theImageFiles = self.CopyMetadata()
+        theExecutor = ThreadPoolExecutor(max_workers=self.mNumThreads, thread_name_prefix="CSlideTranscoder")
+        thePending = deque()
+        theVerifications = []
+        theOpenFiles = []
+        try:
+            for theCount, theSourcePath in enumerate(theImageFiles):
+                theFile = self.OpenFile(theSourcePath)
+                theOpenFiles.append(theFile)
+                for theBlock in range(theFile.mNumBlocks):
+                    theBuffer = self.ReadBlock(theFile, theBlock)
+                    thePending.append((theFile, theExecutor.submit(self.TranscodeBlock, theFile, theBuffer)))
+                    if len(thePending) >= self.mMaxPending:
+                        theWrittenFile, theFuture = thePending.popleft()
+                        self.WriteBlock(theWrittenFile, *theFuture.result())
+                        if self.mVerify and theWrittenFile.mNumWritten == theWrittenFile.mNumBlocks:
+                            theVerifications.append((theWrittenFile, theExecutor.submit(self.VerifyFile, theWrittenFile)))
+                if self.mPrintProgress and ((theCount + 1) % 100 == 0 or theCount + 1 == len(theImageFiles)):
+                    print ("Transcoded files: ", theCount + 1, "/", len(theImageFiles))
+            while len(thePending) > 0:
+                theWrittenFile, theFuture = thePending.popleft()
+                self.WriteBlock(theWrittenFile, *theFuture.result())
+                if self.mVerify and theWrittenFile.mNumWritten == theWrittenFile.mNumBlocks:
+                    theVerifications.append((theWrittenFile, theExecutor.submit(self.VerifyFile, theWrittenFile)))
+            for theFile, theFuture in theVerifications:
+                if not theFuture.result():
+                    raise Exception("CSlideTranscoder: verification failed: " + theFile.mDestinationPath)
+        finally:
+            for theFile, theFuture in thePending:
+                theFuture.cancel()
+            theExecutor.shutdown(wait=True)
+            for theFile in theOpenFiles:
+                if not theFile.mSourceStream.closed:
+                    theFile.mWriter.Abort()
+                    theFile.mSourceStream.close()
+
+        shutil.copy2(self.mSourceFile.mSlidePath, self.mDestinationFile.mSlidePath)
+        if inRemoveSource:
+            self.RemoveSource()
+        self.SetImageDirectoryTimes(theTimes)
+        return len(theImageFiles)
+
+
+def usage():
+    print ('usage: python TranscodeSlide.py -i <input sldy or sldyz file> -o <output sldyz or sldy file> [-a zstd|zlib|lz4|rle] [-l level] [-j threads] [-r] [-v]')
+    print ('       converts a slide between the raw (.sldy) and compressed (.sldyz) layouts')
+
+def main(argv):
+    theSourcePath = ''
+    theDestinationPath = ''
+    theAlgorithm = CCompressionBase().eCompressionZstd
+    theLevel = 1
+    theNumThreads = 4
+    theRemoveSource = False
+    theVerify = True
+    try:
+        opts, args = getopt.getopt(argv,'hi:o:a:l:j:rv',['ifile=','ofile='])
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit()
+        elif opt in ("-i", "--ifile"):
+            theSourcePath = arg
+        elif opt in ("-o", "--ofile"):
+            theDestinationPath = arg
+        elif opt == '-a':
+            theAlgorithm = kCompressionAlgorithms[arg]
+        elif opt == '-l':
+            theLevel = int(arg)
+        elif opt == '-j':
+            theNumThreads = int(arg)
+        elif opt == '-r':
+            theRemoveSource = True
+        elif opt == '-v':
+            theVerify = False
+    if theSourcePath == '' or theDestinationPath == '':
+        usage()
+        sys.exit(2)
+
+    theTranscoder = CSlideTranscoder(theSourcePath, theDestinationPath, theNumThreads)
+    theTranscoder.SetCompression(theAlgorithm, theLevel)
+    theTranscoder.mVerify = theVerify
+    theTranscoder.mPrintProgress = True
+    theNumFiles = theTranscoder.Transcode(theRemoveSource)
+    print ('Transcoded ', theNumFiles, ' files to: ', theDestinationPath)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,9 +1,21 @@
 from BaseDecoder import *
 from CCompressionBase import *
+from CHistogramEngine import *
 from CImageGroup import *
+from CLazyCapture import *
 from CMetadataLib import *
+from CMontageStitcher import *
 from CNpyHeader import *
+from CNpyzWriter import *
+from CPlaneCache import *
+from CPlanePrefetcher import *
+from CPlanePyramid import *
+from CPlaneReaderPool import *
+from CProjection import *
 from CSBFile70 import *
 from CSBPoint import *
+from CSharedPlaneCache import *
+from CSidecarStore import *
+from CZarrStore import *
 from DataLoader import *
 from SBReadFile import *
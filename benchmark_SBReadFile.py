@@ -0,0 +1,303 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Benchmarks of SBReadFile on synthetic slides (pytest-benchmark)
+
+The slides are the session fixtures of conftest.py. The correctness of what is read is
+tested by the plain tests (test_DataLoader.py...), which run without pytest-benchmark:
+the checks here only make sure that a benchmark measures a working path.
+
+usage:
+python -m pytest benchmark_SBReadFile.py
+python -m pytest benchmark_SBReadFile.py --benchmark-save=baseline
+python -m pytest benchmark_SBReadFile.py --benchmark-compare=0001 --benchmark-group-by=func
+
+The size of the captures can be changed with the environment variables
+SB_BENCH_COLUMNS, SB_BENCH_ROWS, SB_BENCH_PLANES, SB_BENCH_CHANNELS and SB_BENCH_TIMEPOINTS.
+"""
+
+import pytest
+import numpy as np
+
+pytest.importorskip("pytest_benchmark")
+
+from SBReadFile import *
+from conftest import CopySlide, kLayouts, kNumColumns, kNumRows, OpenSlide
+
+
+@pytest.mark.parametrize("layout", list(kLayouts))
+def test_open(benchmark, slides, layout):
+    thePath, theCapture = slides[layout]
+    benchmark(OpenSlide, thePath)
+
+@pytest.mark.parametrize("layout", list(kLayouts))
+def test_open_essential_metadata(benchmark, slides, layout):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = SBReadFile()
+    benchmark(theSBFileReader.Open, thePath, False)
+
+@pytest.mark.parametrize("layout", list(kLayouts))
+def test_read_image_plane(benchmark, slides, layout):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    # cycles through all the planes so every layout reads different blocks/offsets
+    theIndexes = [(t, z, c) for t in range(theCapture.GetNumImages()) for z in range(theCapture.mNumPlanes) for c in range(theCapture.mNumChannels)]
+    theState = {"next" : 0}
+
+    def ReadNextPlane():
+        t, z, c = theIndexes[theState["next"] % len(theIndexes)]
+        theState["next"] += 1
+        return theSBFileReader.ReadImagePlaneBuf(0, 0, t, z, c, True)
+
+    benchmark(ReadNextPlane)
+
+@pytest.mark.parametrize("layout", list(kLayouts))
+def test_read_capture(benchmark, slides, layout):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+
+    def ReadAllPlanes():
+        theSum = 0
+        for t in range(theCapture.GetNumImages()):
+            for z in range(theCapture.mNumPlanes):
+                for c in range(theCapture.mNumChannels):
+                    theSum += int(theSBFileReader.ReadImagePlaneBuf(0, 0, t, z, c)[0])
+        return theSum
+
+    benchmark(ReadAllPlanes)
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd", "npyz_rle"])
+def test_read_mask(benchmark, slides, layout):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    benchmark(theSBFileReader.ReadMaskBuf, 0, 0, 0, True)
+
+@pytest.mark.parametrize("layout", ["npy", "sfmt_npy"])
+def test_refresh(benchmark, slides, layout):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    benchmark(theSBFileReader.Refresh, 0)
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+def test_export_one_plane_as_tiff(benchmark, slides, layout, tmp_path):
+    ExportOnePlaneAsTiff = pytest.importorskip("ExportOnePlaneAsTiff")
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    benchmark(ExportOnePlaneAsTiff.ExportPlane, theSBFileReader, 0, theCapture.mNumPlanes // 2, str(tmp_path / "plane"))
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_export_capture_as_tiff(benchmark, slides, layout, threads, tmp_path):
+    ExportCaptureAsTiff = pytest.importorskip("ExportCaptureAsTiff")
+    thePath, theCapture = slides[layout]
+    theExporter = ExportCaptureAsTiff.CTiffExporter(thePath, threads)
+    benchmark(theExporter.Export, 0, str(tmp_path / "capture.ome.tif"))
+    theExporter.Close()
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+def test_export_zarr(benchmark, slides, layout, tmp_path):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    theState = {"next" : 0}
+
+    def ExportZarr():
+        theState["next"] += 1
+        return theSBFileReader.ExportZarr(0, str(tmp_path / (str(theState["next"]) + ".ome.zarr")), 2, None, 4)
+
+    benchmark(ExportZarr)
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+def test_read_zarr_store(benchmark, slides, layout):
+    CZarrStore = pytest.importorskip("CZarrStore")
+    pytest.importorskip("zarr")
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    theArray = CZarrStore.OpenZarrGroup(theSBFileReader.GetZarrStore(0))["0"]
+    benchmark(theArray.__getitem__, slice(None))
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd", "sfmt_npy"])
+def test_dask_max_projection(benchmark, slides, layout):
+    pytest.importorskip("dask")
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    theArray = theSBFileReader.AsDaskArray(0)
+    benchmark(lambda: theArray.max(axis=2).compute(scheduler="threads"))
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_export_capture_as_hdf5(benchmark, slides, layout, threads, tmp_path):
+    h5py = pytest.importorskip("h5py")
+    ExportCaptureAsHdf5 = pytest.importorskip("ExportCaptureAsHdf5")
+    thePath, theCapture = slides[layout]
+
+    def Export(inExporter):
+        with h5py.File(str(tmp_path / "capture.h5"), "w") as theFile:
+            return inExporter.Export(0, theFile)
+
+    with ExportCaptureAsHdf5.CHdf5Exporter(thePath, threads) as theExporter:
+        theExporter.SetFilter("zstd")
+        benchmark(Export, theExporter)
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_transcode(benchmark, slides, layout, threads, tmp_path):
+    from TranscodeSlide import CSlideTranscoder
+    thePath, theCapture = slides[layout]
+    theSuffix = ".sldy" if thePath.endswith(".sldyz") else ".sldyz"
+    theState = {"next" : 0}
+
+    def Transcode():
+        theState["next"] += 1
+        return CSlideTranscoder(thePath, str(tmp_path / (str(theState["next"]) + theSuffix)), threads).Transcode()
+
+    benchmark(Transcode)
+
+@pytest.mark.parametrize("algorithm", [1, 5])
+@pytest.mark.parametrize("threads", [0, 4])
+def test_write_npyz(benchmark, slides, algorithm, threads, tmp_path):
+    from CNpyzWriter import CNpyzWriter
+    thePath, theCapture = slides["npy"]
+    thePlanes = [theCapture.MakePlane(0, z, 0) for z in range(theCapture.mNumPlanes)]
+
+    def Write():
+        with CNpyzWriter(str(tmp_path / "ImageData.npyz"), (len(thePlanes),) + thePlanes[0].shape, algorithm, 1, threads) as theWriter:
+            for thePlane in thePlanes:
+                theWriter.WriteBlock(thePlane)
+
+    benchmark(Write)
+
+@pytest.mark.parametrize("algorithm", [1, 2, 3, 5])
+def test_decode_codec(benchmark, slides, algorithm):
+    from CCompressionBase import CCompressionBase
+    if algorithm == 3:
+        pytest.importorskip("lz4")
+    thePath, theCapture = slides["npy"]
+    thePlane = theCapture.MakePlane(0, 0, 0)
+    theCompressor = CCompressionBase()
+    theCompressor.mAlgorythm = algorithm
+    theCompressor.mDataLenBY = thePlane.nbytes
+    theBuffer = theCompressor.CompressBuffer(thePlane, 1)
+    theOutput = np.empty(thePlane.size, dtype=np.uint16)
+
+    benchmark(theCompressor.DecompressBuffer, theBuffer, theOutput)
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd", "npyz_rle"])
+def test_read_stack(benchmark, slides, layout):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    benchmark(theSBFileReader.mDL.ReadStack, 0, 0, 1, 1)
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_read_planes_in_order(benchmark, slides, layout, prefetch):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    if prefetch > 0:
+        theSBFileReader.EnablePrefetch(prefetch, 2)
+
+    def ReadAll():
+        theSum = 0
+        for theTimepoint in range(theCapture.mNumTimepoints):
+            for theChannel in range(theCapture.mNumChannels):
+                for theZPlane in range(theCapture.mNumPlanes):
+                    theSum += int(theSBFileReader.ReadImagePlaneBuf(0, 0, theTimepoint, theZPlane, theChannel, True)[0, 0])
+        return theSum
+
+    benchmark(ReadAll)
+    theSBFileReader.DisablePrefetch()
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("cached", [False, True])
+def test_scrub_timepoints(benchmark, slides, layout, cached):
+    from CPlaneCache import CPlaneCache
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    if cached:
+        theSBFileReader.SetPlaneCache(CPlaneCache())
+    theTimepoints = list(range(theCapture.mNumTimepoints)) + list(range(theCapture.mNumTimepoints - 2, 0, -1))
+
+    def Scrub():
+        for theTimepoint in theTimepoints:
+            theSBFileReader.ReadImagePlaneBuf(0, 0, theTimepoint, 0, 0, True)
+
+    benchmark(Scrub)
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+def test_read_plane_shared_cache(benchmark, slides, layout, tmp_path):
+    from CSharedPlaneCache import CSharedPlaneCache
+    thePath, theCapture = slides[layout]
+    theCache = CSharedPlaneCache("benchmark_" + layout, 64 * kNumColumns * kNumRows * 2, kNumColumns * kNumRows * 2, str(tmp_path))
+    try:
+        # a worker published the plane, this one finds it
+        theWorker = OpenSlide(thePath)
+        theWorker.SetPlaneCache(theCache)
+        theWorker.ReadImagePlaneBuf(0, 0, 1, 1, 1, True)
+        theSBFileReader = OpenSlide(thePath)
+        theSBFileReader.SetPlaneCache(theCache)
+        benchmark(theSBFileReader.ReadImagePlaneBuf, 0, 0, 1, 1, 1, True)
+    finally:
+        theCache.Remove()
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("mode", ["max", "std"])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_project_z(benchmark, slides, layout, mode, threads):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    # the projections are checked by test_Analysis.py
+    benchmark(theSBFileReader.ProjectZ, 0, 1, 1, mode, None, 0, threads)
+    theSBFileReader.Close()
+
+def test_get_histogram(benchmark, slides, tmp_path):
+    theCapture = slides["npy"][1]
+    theSBFileReader = OpenSlide(CopySlide(slides["npy"][0], tmp_path))
+    theImageGroup = theSBFileReader.mDL.GetImageGroup(0)
+    # SlideBook writes the histograms when capturing, the synthetic slides have none: one is
+    # written into a copy of the slide
+    theHistogram = np.bincount(theCapture.MakePlane(0, 0, 0).ravel(), minlength=65536).astype(np.uint32)
+    np.save(theImageGroup.mFile.GetHistogramDataFile(theImageGroup.mImageTitle, 0, 0), theHistogram)
+    benchmark(theSBFileReader.GetHistogram, 0, 0, 0)
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("step", [1, 4])
+def test_get_percentiles(benchmark, slides, layout, step):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    benchmark(theSBFileReader.GetPercentiles, 0, 1, [0.1, 99.9], None, step)
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("level", [2, 3])
+def test_read_plane_level(benchmark, slides, layout, level):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    benchmark(theSBFileReader.ReadPlaneLevel, 0, 1, 1, 1, level)
+
+@pytest.mark.parametrize("blend", ["linear", "none"])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_stitch_montage(benchmark, montage, blend, threads):
+    thePath, theCapture = montage
+    theSBFileReader = OpenSlide(thePath)
+    benchmark(theSBFileReader.StitchMontage, 0, 0, 0, 0, blend, threads)
+    theSBFileReader.Close()
+
+def test_position_layout(benchmark, montage):
+    from CImageGroup import CPositionLayout
+    thePath, theCapture = montage
+    # a plate scan: 100 positions, 100 time points
+    thePositions = np.array([theCapture.GetStagePosition(theImage % 100) for theImage in range(10000)])
+    benchmark(CPositionLayout, thePositions, theCapture.mMicronPerPixel, kNumColumns, kNumRows)
+
+def test_get_time_axis(benchmark, montage):
+    thePath, theCapture = montage
+    theSBFileReader = OpenSlide(thePath)
+    benchmark(theSBFileReader.GetElapsedTimes, 0)
+
+@pytest.mark.parametrize("values", ["int", "float"])
+def test_decode_yaml_sequence(benchmark, values):
+    import io
+    from BaseDecoder import BaseDecoder, ComposeYaml
+    theValues = np.arange(100000) * 3 - 1000 if values == "int" else np.linspace(-1.0, 1.0, 100000)
+    theText = "theAuxData: [" + str(len(theValues)) + ", " + ", ".join(repr(theValue) for theValue in theValues.tolist()) + "]\n"
+    theDecoder = BaseDecoder()
+    theGetArray = theDecoder.GetIntArray if values == "int" else theDecoder.GetFloatArray
+    benchmark(lambda: theGetArray(ComposeYaml(io.StringIO(theText)).value[0][1], "theAuxData", True))
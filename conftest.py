@@ -0,0 +1,72 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""The synthetic slides shared by the tests and the benchmarks
+
+The slides are written once per session by SyntheticSlide.py, with fixed seeds, in every
+layout: .npy, .npyz zstd, .npyz RLE and single file multi timepoints (.npy and .npyz).
+The tests must not modify them: a test writing into a slide copies it first (CopySlide).
+
+The size of the captures can be changed with the environment variables
+SB_BENCH_COLUMNS, SB_BENCH_ROWS, SB_BENCH_PLANES, SB_BENCH_CHANNELS and SB_BENCH_TIMEPOINTS.
+"""
+
+import os
+import shutil
+import pytest
+
+from SBReadFile import SBReadFile
+from SyntheticSlide import CSyntheticSlide
+
+kNumColumns = int(os.environ.get("SB_BENCH_COLUMNS", 256))
+kNumRows = int(os.environ.get("SB_BENCH_ROWS", 256))
+kNumPlanes = int(os.environ.get("SB_BENCH_PLANES", 8))
+kNumChannels = int(os.environ.get("SB_BENCH_CHANNELS", 2))
+kNumTimepoints = int(os.environ.get("SB_BENCH_TIMEPOINTS", 4))
+
+# name: (slide suffix, compression algorithm, single file multi timepoints)
+kLayouts = {
+    "npy" : (".sldy", 1, False),
+    "npyz_zstd" : (".sldyz", 1, False),
+    "npyz_rle" : (".sldyz", 5, False),
+    "sfmt_npy" : (".sldy", 1, True),
+    "sfmt_npyz_zstd" : (".sldyz", 1, True),
+}
+
+
+@pytest.fixture(scope="session")
+def slides(tmp_path_factory):
+    theDirectory = tmp_path_factory.mktemp("slides")
+    theSlides = dict()
+    for theName, (theSuffix, theAlgorithm, theSingleTimepointFile) in kLayouts.items():
+        thePath = str(theDirectory / (theName + theSuffix))
+        theSlide = CSyntheticSlide(thePath)
+        theNumPlanes = 1 if theSingleTimepointFile else kNumPlanes
+        theCapture = theSlide.AddCapture("Capture 1", kNumColumns, kNumRows, theNumPlanes, kNumChannels, kNumTimepoints,
+                                         1, 1, theSingleTimepointFile, theAlgorithm, 0)
+        theSlide.Write()
+        theSlides[theName] = (thePath, theCapture)
+    return theSlides
+
+@pytest.fixture(scope="session")
+def montage(tmp_path_factory):
+    thePath = str(tmp_path_factory.mktemp("montage") / "montage.sldyz")
+    theSlide = CSyntheticSlide(thePath)
+    theCapture = theSlide.AddCapture("Montage", kNumColumns, kNumRows, 1, 1, 1, 9, 0, False, 1, 0)
+    theSlide.Write()
+    return thePath, theCapture
+
+def OpenSlide(inPath):
+    theSBFileReader = SBReadFile()
+    if not theSBFileReader.Open(inPath):
+        raise Exception("Could not open: " + inPath)
+    return theSBFileReader
+
+def CopySlide(inPath, inDirectory):
+    # a private copy of a slide (the slide record and its .dir directory), returns its path
+    theRoot, theSuffix = os.path.splitext(inPath)
+    theName = os.path.basename(inPath)
+    thePath = os.path.join(str(inDirectory), theName)
+    shutil.copy2(inPath, thePath)
+    shutil.copytree(theRoot + ".dir", os.path.splitext(thePath)[0] + ".dir")
+    return thePath
@@ -0,0 +1,245 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the analysis helpers: projections, histograms, percentiles and reduced levels,
+compared with numpy on the synthetic slides
+
+usage:
+python -m pytest test_Analysis.py
+"""
+
+import pytest
+import numpy as np
+
+from conftest import CopySlide, OpenSlide
+
+
+def ProjectExpected(inPlanes, inMode):
+    # the projection of a stack of planes computed by numpy
+    theStack = np.array(inPlanes)
+    if inMode == "max":
+        return theStack.max(axis=0)
+    if inMode == "sum":
+        return theStack.sum(axis=0, dtype=np.uint64)
+    if inMode == "mean":
+        return theStack.mean(axis=0, dtype=np.float64)
+    return theStack.std(axis=0, dtype=np.float64)
+
+def CheckProjection(inProjection, inExpected, inMode):
+    if inMode in ("max", "sum"):
+        assert inProjection.dtype == inExpected.dtype
+        assert np.array_equal(inProjection, inExpected)
+    else:
+        assert inProjection.dtype == np.float64
+        assert np.allclose(inProjection, inExpected, rtol=1e-9, atol=1e-6)
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("mode", ["max", "mean", "sum", "std"])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_project_z(slides, layout, mode, threads):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    try:
+        theProjection = theSBFileReader.ProjectZ(0, 1, 1, mode, None, 0, threads)
+        CheckProjection(theProjection, ProjectExpected([theCapture.MakePlane(1, z, 1) for z in range(theCapture.mNumPlanes)], mode), mode)
+        theProjection = theSBFileReader.ProjectZ(0, 1, 1, mode, (2, 5), 0, threads)
+        CheckProjection(theProjection, ProjectExpected([theCapture.MakePlane(1, z, 1) for z in range(2, 5)], mode), mode)
+    finally:
+        theSBFileReader.Close()
+
+@pytest.mark.parametrize("mode", ["max", "mean", "sum", "std"])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_project_t(slides, mode, threads):
+    thePath, theCapture = slides["npyz_zstd"]
+    theSBFileReader = OpenSlide(thePath)
+    try:
+        theProjection = theSBFileReader.ProjectT(0, 3, 0, mode, None, 0, threads)
+        CheckProjection(theProjection, ProjectExpected([theCapture.MakePlane(t, 3, 0) for t in range(theCapture.mNumTimepoints)], mode), mode)
+    finally:
+        theSBFileReader.Close()
+
+def test_project_of_a_constant_stack_has_no_deviation():
+    from CProjection import CProjectionAccumulator
+    theAccumulator = CProjectionAccumulator("std", 4, 5)
+    for theIndex in range(3):
+        theAccumulator.Add(np.full((4, 5), 60000, dtype=np.uint16))
+    assert np.array_equal(theAccumulator.GetResult(), np.zeros((4, 5)))
+
+def test_close_stops_the_threads_and_closes_the_files(slides):
+    thePath, theCapture = slides["npyz_zstd"]
+    theSBFileReader = OpenSlide(thePath)
+    theSBFileReader.EnablePrefetch(4, 2)
+    theSBFileReader.ProjectZ(0, 0, 0, "max", None, 0, 3)
+    theSBFileReader.ReadImagePlaneBuf(0, 0, 0, 0, 0, True)
+    thePool = theSBFileReader.mDL.mReaderPool
+    theStreams = [theStream for theReader in thePool.mReaders for theStream in theReader.mDL.mPathToStreamMap.values()]
+    theStreams += list(theSBFileReader.mDL.mPathToStreamMap.values())
+    assert len(theStreams) > 0
+    theSBFileReader.Close()
+    assert theSBFileReader.mDL.mReaderPool is None
+    assert theSBFileReader.mDL.mPrefetcher is None
+    assert len(theSBFileReader.mDL.mPathToStreamMap) == 0
+    assert all(theStream.closed for theStream in theStreams)
+    # the slide can still be read
+    assert np.array_equal(theSBFileReader.ReadImagePlaneBuf(0, 0, 2, 1, 1, True), theCapture.MakePlane(2, 1, 1))
+    theSBFileReader.Close()
+
+def test_get_histogram(slides, tmp_path):
+    # SlideBook writes the histograms when capturing, the synthetic slides have none: they are
+    # written into a copy of the slide
+    thePath = CopySlide(slides["npy"][0], tmp_path)
+    theCapture = slides["npy"][1]
+    theSBFileReader = OpenSlide(thePath)
+    assert theSBFileReader.GetHistogram(0, 0, 0) is None
+    theImageGroup = theSBFileReader.mDL.GetImageGroup(0)
+    theHistograms = [np.bincount(theCapture.MakePlane(theTimepoint, 0, 0).ravel(), minlength=65536).astype(np.uint32) for theTimepoint in range(2)]
+    for theTimepoint, theHistogram in enumerate(theHistograms):
+        np.save(theImageGroup.mFile.GetHistogramDataFile(theImageGroup.mImageTitle, 0, theTimepoint), theHistogram)
+    np.save(theImageGroup.mFile.GetHistogramDataFile(theImageGroup.mImageTitle, 0, -1), np.sum(theHistograms, axis=0, dtype=np.uint32))
+    for theTimepoint, theHistogram in enumerate(theHistograms):
+        assert np.array_equal(theSBFileReader.GetHistogram(0, 0, theTimepoint), theHistogram)
+    assert np.array_equal(theSBFileReader.GetHistogram(0, 0), np.sum(theHistograms, axis=0))
+    assert theSBFileReader.GetHistogram(0, 1, 0) is None
+    # the session slide is unchanged
+    assert OpenSlide(slides["npy"][0]).GetHistogram(0, 0, 0) is None
+
+def GetChannelPixels(inCapture, inChannelIndex, inTimepoints, inPixelStep):
+    return np.concatenate([inCapture.MakePlane(t, z, inChannelIndex)[::inPixelStep, ::inPixelStep].ravel() for t in inTimepoints for z in range(inCapture.mNumPlanes)])
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("step", [1, 4])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_compute_histogram(slides, layout, step, threads):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    try:
+        theHistogram = theSBFileReader.ComputeHistogram(0, 1, None, step, 0, threads)
+        assert theHistogram.dtype == np.int64
+        assert np.array_equal(theHistogram, np.bincount(GetChannelPixels(theCapture, 1, range(theCapture.mNumTimepoints), step), minlength=65536))
+        # a time point given twice is counted twice
+        theHistogram = theSBFileReader.ComputeHistogram(0, 0, [2, 0, 2], step, 0, threads)
+        assert np.array_equal(theHistogram, np.bincount(GetChannelPixels(theCapture, 0, [2, 0, 2], step), minlength=65536))
+    finally:
+        theSBFileReader.Close()
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+@pytest.mark.parametrize("step", [1, 4])
+def test_get_percentiles(slides, layout, step):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    thePercentiles = theSBFileReader.GetPercentiles(0, 1, [0, 0.1, 50, 99.9, 100], None, step)
+    thePixels = GetChannelPixels(theCapture, 1, range(theCapture.mNumTimepoints), step)
+    assert np.array_equal(thePercentiles, np.percentile(thePixels, [0, 0.1, 50, 99.9, 100], method="inverted_cdf").astype(np.uint16))
+
+def test_get_percentiles_of_the_stored_summary(slides, tmp_path):
+    thePath = CopySlide(slides["npy"][0], tmp_path)
+    theCapture = slides["npy"][1]
+    theSBFileReader = OpenSlide(thePath)
+    theImageGroup = theSBFileReader.mDL.GetImageGroup(0)
+    # a summary that the pixels cannot give: it is the one used
+    theSummary = np.zeros(65536, dtype=np.uint32)
+    theSummary[[1000, 3000]] = [1, 99]
+    np.save(theImageGroup.mFile.GetHistogramDataFile(theImageGroup.mImageTitle, 1, -1), theSummary)
+    assert list(theSBFileReader.GetPercentiles(0, 1, [0.5, 2, 100])) == [1000, 3000, 3000]
+    # some of the time points, or a channel without summary: computed from the planes
+    thePixels = GetChannelPixels(theCapture, 1, [0, 1], 4)
+    assert np.array_equal(theSBFileReader.GetPercentiles(0, 1, [50], [0, 1]), np.percentile(thePixels, [50], method="inverted_cdf").astype(np.uint16))
+    thePixels = GetChannelPixels(theCapture, 0, range(theCapture.mNumTimepoints), 4)
+    assert np.array_equal(theSBFileReader.GetPercentiles(0, 0, [50]), np.percentile(thePixels, [50], method="inverted_cdf").astype(np.uint16))
+
+def test_histogram_sidecar(slides, tmp_path, monkeypatch):
+    import os
+    import glob
+    from CHistogramEngine import CHistogramEngine
+    thePath = CopySlide(slides["npy"][0], tmp_path)
+    theCapture = slides["npy"][1]
+    theSBFileReader = OpenSlide(thePath)
+    theExpected = np.bincount(GetChannelPixels(theCapture, 1, range(theCapture.mNumTimepoints), 4), minlength=65536)
+    assert np.array_equal(CHistogramEngine(theSBFileReader, 0, 0, 4, 1, True).GetHistogram(1), theExpected)
+    # one compressed file per channel, with the non zero bins of every time point
+    theImageGroup = theSBFileReader.mDL.GetImageGroup(0)
+    theFiles = glob.glob(os.path.join(theImageGroup.mFile.GetSidecarDirectory(theImageGroup.mImageTitle), "*"))
+    assert [os.path.basename(theFile) for theFile in theFiles] == ["Histograms_Ch1_P0_S4.npz"]
+    with np.load(theFiles[0]) as theFile:
+        assert list(theFile["mTimepoints"]) == list(range(theCapture.mNumTimepoints))
+        assert theFile["mBins"].dtype == np.uint16
+        assert theFile["mBins"].size == np.sum([np.unique(GetChannelPixels(theCapture, 1, [t], 4)).size for t in range(theCapture.mNumTimepoints)])
+
+    # a new engine reads the sidecar, only the time point whose file changed is counted again
+    theCounted = []
+    theComputePlaneHistogram = CHistogramEngine.ComputePlaneHistogram
+    def ComputePlaneHistogram(inEngine, inReader, inTimepointIndex, inZPlaneIndex, inChannelIndex):
+        theCounted.append(inTimepointIndex)
+        return theComputePlaneHistogram(inEngine, inReader, inTimepointIndex, inZPlaneIndex, inChannelIndex)
+    monkeypatch.setattr(CHistogramEngine, "ComputePlaneHistogram", ComputePlaneHistogram)
+    assert np.array_equal(CHistogramEngine(theSBFileReader, 0, 0, 4, 1, True).GetHistogram(1), theExpected)
+    assert theCounted == []
+    theDataFile = theImageGroup.mFile.GetImageDataFile(theImageGroup.mImageTitle, 1, 2)
+    theStat = os.stat(theDataFile)
+    os.utime(theDataFile, ns=(theStat.st_atime_ns, theStat.st_mtime_ns + 1000000000))
+    assert np.array_equal(CHistogramEngine(theSBFileReader, 0, 0, 4, 1, True).GetHistogram(1), theExpected)
+    assert theCounted == [2] * theCapture.mNumPlanes
+    theCounted.clear()
+    assert np.array_equal(CHistogramEngine(theSBFileReader, 0, 0, 4, 1, True).GetHistogram(1), theExpected)
+    assert theCounted == []
+
+def DownsampleExpected(inPlane):
+    # the 2x2 means rounded half up, by a reshape of the plane, the last row/column repeated if odd
+    thePlane = np.pad(inPlane, ((0, inPlane.shape[0] % 2), (0, inPlane.shape[1] % 2)), mode="edge").astype(np.float64)
+    theBlocks = thePlane.reshape(thePlane.shape[0] // 2, 2, thePlane.shape[1] // 2, 2)
+    return np.floor(theBlocks.mean(axis=(1, 3)) + 0.5).astype(np.uint16)
+
+@pytest.mark.parametrize("shape", [(6, 8), (7, 5), (1, 3), (5, 1), (1, 1)])
+def test_downsample_plane(shape):
+    from CZarrStore import Downsample2x
+    from CPlanePyramid import DownsamplePlane, GetLevelShape
+    thePlane = np.random.default_rng(0).integers(0, 65536, size=shape, dtype=np.uint16)
+    # the extremes: no overflow, and the rounding of .5 up
+    thePlane.flat[0] = 65535
+    assert np.array_equal(Downsample2x(thePlane), DownsampleExpected(thePlane))
+    assert np.array_equal(DownsamplePlane(thePlane, "mean"), DownsampleExpected(thePlane))
+    assert DownsamplePlane(thePlane, "mean").shape == GetLevelShape(shape[0], shape[1], 1)
+    assert np.array_equal(DownsamplePlane(thePlane, "stride"), thePlane[::2, ::2])
+    assert np.array_equal(Downsample2x(np.array([[1, 2], [2, 1]], dtype=np.uint16)), [[2]])
+    assert np.array_equal(Downsample2x(np.full((2, 2), 65535, dtype=np.uint16)), [[65535]])
+
+@pytest.mark.parametrize("size", [(64, 48), (37, 21)])
+@pytest.mark.parametrize("mode", ["mean", "stride"])
+def test_read_plane_level(tmp_path, size, mode):
+    import os
+    from SyntheticSlide import CSyntheticSlide
+    from CPlanePyramid import GetNumLevels
+    thePath = str(tmp_path / "levels.sldy")
+    theSlide = CSyntheticSlide(thePath)
+    theCapture = theSlide.AddCapture("Levels", size[0], size[1], 2, 1, 1, 1, 0, False, 0, 0)
+    theSlide.Write()
+    theSBFileReader = OpenSlide(thePath)
+    theExpected = theCapture.MakePlane(0, 1, 0)
+    theNumLevels = GetNumLevels(theCapture.mNumRows, theCapture.mNumColumns)
+    for theLevel in range(theNumLevels):
+        if theLevel > 0:
+            theExpected = DownsampleExpected(theExpected) if mode == "mean" else theExpected[::2, ::2]
+        assert np.array_equal(theSBFileReader.ReadPlaneLevel(0, 0, 1, 0, theLevel, 0, mode), theExpected)
+    assert theExpected.shape == (1, 1)
+    with pytest.raises(Exception, match="invalid level"):
+        theSBFileReader.ReadPlaneLevel(0, 0, 1, 0, theNumLevels)
+    # no sidecar by default
+    theImageGroup = theSBFileReader.mDL.GetImageGroup(0)
+    assert not os.path.exists(theImageGroup.mFile.GetSidecarDirectory(theImageGroup.mImageTitle))
+
+def test_read_plane_level_sidecar(slides, tmp_path, monkeypatch):
+    import os
+    from DataLoader import DataLoader
+    thePath = CopySlide(slides["npyz_zstd"][0], tmp_path)
+    theCapture = slides["npyz_zstd"][1]
+    theSBFileReader = OpenSlide(thePath)
+    theLevel = theSBFileReader.ReadPlaneLevel(0, 1, 2, 1, 2, 0, "mean", True)
+    assert np.array_equal(theLevel, DownsampleExpected(DownsampleExpected(theCapture.MakePlane(1, 2, 1))))
+    theImageGroup = theSBFileReader.mDL.GetImageGroup(0)
+    theDirectory = theImageGroup.mFile.GetSidecarDirectory(theImageGroup.mImageTitle)
+    assert sorted(os.listdir(theDirectory)) == ["Level1_mean_Ch1_TP0000001_Z00002_P0.npz", "Level2_mean_Ch1_TP0000001_Z00002_P0.npz"]
+    # read back from the sidecar, the plane is not read
+    def ReadPlane(*inArgs):
+        raise AssertionError("the plane is read")
+    monkeypatch.setattr(DataLoader, "ReadPlane", ReadPlane)
+    assert np.array_equal(OpenSlide(thePath).ReadPlaneLevel(0, 1, 2, 1, 2, 0, "mean", True), theLevel)
@@ -0,0 +1,135 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the YAML composition of the records (BaseDecoder.ComposeYaml), compared with yaml.compose
+
+usage:
+python -m pytest test_BaseDecoder.py
+"""
+
+import io
+import os
+import glob
+import pytest
+import yaml
+import numpy as np
+
+from conftest import OpenSlide
+from BaseDecoder import BaseDecoder, CBulkComposer, CBulkLoader, CBulkSequenceNode, ComposeYaml, kBulkSequenceMinLength
+
+
+class CPythonBulkLoader(CBulkComposer, yaml.SafeLoader):
+    """ the loader of ComposeYaml without libyaml """
+
+def CheckSameNodes(inNode, inExpected):
+    # the nodes composed by ComposeYaml are those of yaml.compose, the plain style is None or '' (libyaml)
+    assert inNode.tag == inExpected.tag
+    if isinstance(inExpected, yaml.nodes.ScalarNode):
+        assert isinstance(inNode, yaml.nodes.ScalarNode)
+        assert inNode.value == inExpected.value
+        assert (inNode.style or None) == (inExpected.style or None)
+        return
+    assert type(inNode) in (type(inExpected), CBulkSequenceNode)
+    assert len(inNode.value) == len(inExpected.value)
+    if isinstance(inExpected, yaml.nodes.MappingNode):
+        for (theKey, theValue), (theExpectedKey, theExpectedValue) in zip(inNode.value, inExpected.value):
+            CheckSameNodes(theKey, theExpectedKey)
+            CheckSameNodes(theValue, theExpectedValue)
+    else:
+        for theValue, theExpectedValue in zip(inNode.value, inExpected.value):
+            CheckSameNodes(theValue, theExpectedValue)
+
+def GetBulkNodes(inNode):
+    if isinstance(inNode, CBulkSequenceNode):
+        return [inNode]
+    if isinstance(inNode, yaml.nodes.MappingNode):
+        return [theBulk for theKey, theValue in inNode.value for theBulk in GetBulkNodes(theValue)]
+    if isinstance(inNode, yaml.nodes.SequenceNode):
+        return [theBulk for theValue in inNode.value for theBulk in GetBulkNodes(theValue)]
+    return []
+
+def test_loader_uses_libyaml():
+    if getattr(yaml, "__with_libyaml__", False):
+        assert issubclass(CBulkLoader, yaml.CSafeLoader)
+    else:
+        assert issubclass(CBulkLoader, yaml.SafeLoader)
+
+def test_compose_record_files(slides, montage, tmp_path):
+    from SyntheticSlide import CSyntheticSlide
+    # a capture of many time points: its elapsed times, SA and stage positions are long sequences
+    thePath = str(tmp_path / "timelapse.sldy")
+    theSlide = CSyntheticSlide(thePath)
+    theCapture = theSlide.AddCapture("Timelapse", 8, 8, 1, 1, 300, 1, 0, False, 0, 0)
+    theSlide.Write()
+    theSlidePaths = [theSlidePath for theSlidePath, theSlideCapture in slides.values()] + [montage[0], thePath]
+    theNumBulkNodes = 0
+    for theSlidePath in theSlidePaths:
+        theRecordPaths = [theSlidePath] + sorted(glob.glob(os.path.join(os.path.splitext(theSlidePath)[0] + ".dir", "*", "*.yaml")))
+        assert len(theRecordPaths) > 1
+        for theRecordPath in theRecordPaths:
+            with open(theRecordPath, "r") as theStream:
+                theText = theStream.read()
+            theExpected = yaml.compose(theText, Loader=yaml.SafeLoader)
+            for theLoader in (CBulkLoader, CPythonBulkLoader):
+                theNode = yaml.compose(theText, Loader=theLoader)
+                theNumBulkNodes += len(GetBulkNodes(theNode))
+                CheckSameNodes(theNode, theExpected)
+            with open(theRecordPath, "r") as theStream:
+                CheckSameNodes(ComposeYaml(theStream), theExpected)
+    assert theNumBulkNodes > 0
+    # and the records decode to the capture
+    theSBFileReader = OpenSlide(thePath)
+    assert np.array_equal(theSBFileReader.GetElapsedTimes(0), [theCapture.GetElapsedTime(theImage) for theImage in range(300)])
+    assert np.array_equal(theSBFileReader.GetSAPositionArray(0), np.zeros((300, 3), dtype=np.int64))
+    assert np.allclose(theSBFileReader.GetXStagePositions(0), [theCapture.GetStagePosition(0)[0]] * 300)
+
+def test_compose_keeps_the_text_of_the_scalars():
+    theNumbers = ", ".join(str(theValue) for theValue in range(kBulkSequenceMinLength * 2))
+    theText = ("literal: |\n  x: [" + theNumbers + "]\n  y: 1\n"
+               "folded: >\n  x: [" + theNumbers + "]\n  second line\n"
+               "plain: first line\n  z = [" + theNumbers + "]\n"
+               "quoted: \"x: [" + theNumbers + "]\n  continued\"\n"
+               "numbers: [" + theNumbers + "]\n"
+               "block:\n" + "".join("  - " + str(theValue) + "\n" for theValue in range(kBulkSequenceMinLength)))
+    theExpected = yaml.compose(theText, Loader=yaml.SafeLoader)
+    for theLoader in (CBulkLoader, CPythonBulkLoader):
+        theNode = yaml.compose(theText, Loader=theLoader)
+        CheckSameNodes(theNode, theExpected)
+        assert theNode.value[0][1].value == "x: [" + theNumbers + "]\ny: 1\n"
+        assert [type(theValue) for theKey, theValue in theNode.value][-2:] == [CBulkSequenceNode, CBulkSequenceNode]
+
+def test_compose_sequences_of_other_nodes():
+    theNumbers = [str(theValue) for theValue in range(kBulkSequenceMinLength + 10)]
+    theText = ("mixed: [" + ", ".join(theNumbers + ['"quoted"', "[1, 2]", "7"]) + "]\n"
+               "tagged: [" + ", ".join(theNumbers + ["!!str 8"]) + "]\n"
+               "anchored: &values [" + ", ".join(theNumbers) + "]\n"
+               "alias: *values\n"
+               "short: [1, 2.5, -3]\n")
+    theExpected = yaml.compose(theText, Loader=yaml.SafeLoader)
+    for theLoader in (CBulkLoader, CPythonBulkLoader):
+        theNode = yaml.compose(theText, Loader=theLoader)
+        CheckSameNodes(theNode, theExpected)
+        theValues = dict((theKey.value, theValue) for theKey, theValue in theNode.value)
+        assert type(theValues["mixed"]) is yaml.nodes.SequenceNode and type(theValues["tagged"]) is yaml.nodes.SequenceNode
+        assert type(theValues["anchored"]) is CBulkSequenceNode and theValues["alias"] is theValues["anchored"]
+        assert type(theValues["short"]) is yaml.nodes.SequenceNode
+        theDecoder = BaseDecoder()
+        assert theDecoder.GetIntArray(theValues["anchored"], "anchored", False).tolist() == list(range(kBulkSequenceMinLength + 10))
+        assert theDecoder.GetIntArray(theValues["anchored"], "anchored", True).tolist() == list(range(1, kBulkSequenceMinLength + 10))
+        assert theDecoder.GetFloatArray(theValues["short"], "short", False).tolist() == [1.0, 2.5, -3.0]
+
+def test_get_arrays_of_a_long_sequence():
+    theValues = np.arange(10000) * 3 - 1000
+    theText = "theAuxData: [" + str(len(theValues)) + ", " + ", ".join(str(theValue) for theValue in theValues.tolist()) + "]\n"
+    theNode = ComposeYaml(io.StringIO(theText)).value[0][1]
+    assert isinstance(theNode, CBulkSequenceNode)
+    theDecoder = BaseDecoder()
+    assert theDecoder.GetIntArray(theNode, "theAuxData", True).dtype == np.int64
+    assert np.array_equal(theDecoder.GetIntArray(theNode, "theAuxData", True), theValues)
+    assert np.array_equal(theDecoder.GetFloatArray(theNode, "theAuxData", True), theValues.astype(np.float64))
+    assert theDecoder.GetStringArray(theNode, "theAuxData", True, False) == [str(theValue) for theValue in theValues.tolist()]
+    theFloats = np.linspace(-1.0, 1.0, 1001)
+    theText = "theAuxData: [" + str(len(theFloats)) + ", " + ", ".join(repr(theValue) for theValue in theFloats.tolist()) + "]\n"
+    assert np.array_equal(theDecoder.GetFloatArray(ComposeYaml(io.StringIO(theText)).value[0][1], "theAuxData", True), theFloats)
+    # the scalar nodes are made on demand, with their resolved tags
+    assert [theScalar.tag for theScalar in theNode.value[:2]] == ["tag:yaml.org,2002:int"] * 2
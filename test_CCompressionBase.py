@@ -0,0 +1,280 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the .npyz block dictionary and of the codecs of CCompressionBase
+
+usage:
+python -m pytest test_CCompressionBase.py
+"""
+
+import pytest
+import numpy as np
+
+from CCompressionBase import CCompressionBase
+from CNpyHeader import CNpyHeader
+from conftest import OpenSlide
+
+
+def OpenImageData(inSlides, inLayout, inTimepointIndex, inChannelIndex):
+    # the stream and the header of an ImageData file of a synthetic slide, the stream is at its start
+    thePath, theCapture = inSlides[inLayout]
+    theImageGroup = OpenSlide(thePath).mDL.GetImageGroup(0)
+    theStream = open(theImageGroup.mFile.GetImageDataFile(theImageGroup.mImageTitle, inChannelIndex, inTimepointIndex), "rb")
+    theNpyHeader = CNpyHeader()
+    assert theNpyHeader.ParseNpyHeader(theStream)
+    theStream.seek(0, 0)
+    return theStream, theNpyHeader, theCapture
+
+def test_read_dictionary_of_timepoint_blocks(slides):
+    # a single file multi timepoints: one block per timepoint of a single plane
+    theStream, theNpyHeader, theCapture = OpenImageData(slides, "sfmt_npyz_zstd", 0, 1)
+    with theStream:
+        theNumBlocks = theNpyHeader.mShape[0]
+        assert theNumBlocks == theCapture.mNumTimepoints > 1
+        theCompressor = CCompressionBase()
+        theCompressor.InitializeEx(theNpyHeader.mHeaderSize, theNpyHeader.mCompressionFlag, theCapture.mNumColumns, theCapture.mNumRows, 1, theNumBlocks, 0)
+        theCompressor.ReadDictionary(theStream)
+        assert theCompressor.mBlockDictionary.size == 2 * theNumBlocks
+        for theBlock in reversed(range(theNumBlocks)):
+            thePlane = theCompressor.ReadData(theStream, theBlock)
+            assert np.array_equal(thePlane.reshape(theCapture.mNumRows, theCapture.mNumColumns), theCapture.MakePlane(theBlock, 0, 1))
+        # the dictionary is read from its position, wherever the stream is
+        theCompressor.ReadDictionary(theStream)
+        assert theCompressor.mBlockDictionary.size == 2 * theNumBlocks
+        assert theCompressor.GetDataOffsetForBlock(1) > theCompressor.mDataPosition
+
+@pytest.mark.parametrize("context", ["default", "pyzstd"])
+def test_decompress_zstd_plane(monkeypatch, context):
+    import pyzstd
+    import CCompressionBase as cb
+    if context == "pyzstd":
+        monkeypatch.setattr(cb.gZstdContexts, "mContext", pyzstd.EndlessZstdDecompressor(), raising=False)
+    thePlane = (np.arange(48 * 40, dtype=np.uint32) * 37 % 65536).astype(np.uint16).reshape(48, 40)
+    theCompressor = CCompressionBase()
+    theCompressor.Initialize(0, theCompressor.eCompressionZstd, 40, 48, 1, 0)
+    theBuffer = pyzstd.compress(thePlane.tobytes())
+    # an array of uint16, not the decoded bytes
+    theDecoded = theCompressor.DecompressBuffer(theBuffer)
+    assert isinstance(theDecoded, np.ndarray) and theDecoded.dtype == np.uint16
+    assert np.array_equal(theDecoded, thePlane.ravel())
+    theOutput = np.empty_like(thePlane)
+    assert theCompressor.DecompressBuffer(theBuffer, theOutput) is theOutput
+    assert np.array_equal(theOutput, thePlane)
+
+def WriteBlocks(inPath, inBlocks, inAlgorithm):
+    # a .npyz file of the blocks, returns its header size
+    from CNpyzWriter import CNpyzWriter
+    with CNpyzWriter(inPath, (len(inBlocks),) + inBlocks[0].shape, inAlgorithm) as theWriter:
+        for theBlock in inBlocks:
+            theWriter.WriteBlock(theBlock)
+    return theWriter.mHeaderSize
+
+@pytest.mark.parametrize("algorithm", [1, 2, 5])
+def test_read_data_checks_the_block_size(tmp_path, algorithm):
+    thePath = str(tmp_path / "ImageData.npyz")
+    thePlanes = [(np.arange(8 * 10, dtype=np.uint16) + 100 * theIndex).reshape(8, 10) for theIndex in range(3)]
+    theHeaderSize = WriteBlocks(thePath, thePlanes, algorithm)
+    with open(thePath, "rb") as theStream:
+        # a block per plane: the size of a plane, whatever the number of blocks
+        theCompressor = CCompressionBase()
+        theCompressor.InitializeEx(theHeaderSize, algorithm, 10, 8, 1, 3, 0)
+        for theIndex, thePlane in enumerate(thePlanes):
+            assert np.array_equal(theCompressor.ReadData(theStream, theIndex), thePlane.ravel())
+        if algorithm == 5:
+            # the RLE decoder fills the expected size
+            return
+        # a block of another size is an error
+        theCompressor = CCompressionBase()
+        theCompressor.InitializeEx(theHeaderSize, algorithm, 10, 8, 2, 3, 0)
+        with pytest.raises(NameError):
+            theCompressor.ReadData(theStream, 1)
+
+def test_read_data_of_stack_blocks(tmp_path):
+    # a mask file: a block per mask of a whole stack
+    thePath = str(tmp_path / "MaskData.npyz")
+    theMasks = [(np.arange(3 * 8 * 10, dtype=np.uint16) % (theIndex + 2)).reshape(3, 8, 10) for theIndex in range(2)]
+    theHeaderSize = WriteBlocks(thePath, theMasks, 5)
+    with open(thePath, "rb") as theStream:
+        theCompressor = CCompressionBase()
+        theCompressor.InitializeEx(theHeaderSize, 5, 10, 8, 3, 2, 0)
+        for theIndex, theMask in enumerate(theMasks):
+            assert np.array_equal(theCompressor.ReadData(theStream, theIndex), theMask.ravel())
+
+def DecodeRLELoop(inData, inNumValues):
+    # the RLE decoder of the first versions of CCompressionBase, one value at a time
+    # (the values not decoded are 0, they were not initialized)
+    ouData = np.zeros(inNumValues, dtype=np.uint16)
+    j = 0
+    i = 0
+    while True:
+        theValue = inData[j]
+        j += 1
+
+        # Is this a count?
+        if theValue & 0x8000:
+            theCount = theValue & 0x7fff
+            theValue = inData[j]
+            j += 1
+        else:
+            theCount = 1
+
+        while theCount > 0 and i < inNumValues:
+            ouData[i] = theValue
+            i += 1
+            theCount -= 1
+
+        if i >= inNumValues or j >= inData.size:
+            break
+    return ouData
+
+def MakeRLEData():
+    # single values, short and long runs, values with the bit 0x8000, a run longer than the largest count
+    theRandom = np.random.default_rng(5)
+    theData = [theRandom.integers(0, 65536, 50, dtype=np.uint16),
+               np.full(7, 12, dtype=np.uint16), np.full(3, 0x8001, dtype=np.uint16), np.array([0x9000, 5, 0x7fff], dtype=np.uint16),
+               np.full(0x7fff * 2 + 10, 3, dtype=np.uint16), theRandom.integers(0, 4, 1000, dtype=np.uint16)]
+    return np.concatenate(theData)
+
+def test_compress_rle():
+    theCompressor = CCompressionBase()
+    theCompressor.mAlgorythm = theCompressor.eCompressionRLE
+    theEncoded = np.frombuffer(theCompressor.CompressBuffer(np.array([1, 2, 2, 2, 0x8000, 7], dtype=np.uint16).tobytes()), dtype=np.uint16)
+    assert theEncoded.tolist() == [1, 0x8003, 2, 0x8001, 0x8000, 7]
+    theData = MakeRLEData()
+    theEncoded = np.frombuffer(theCompressor.CompressBuffer(theData.tobytes()), dtype=np.uint16)
+    assert np.array_equal(DecodeRLELoop(theEncoded, theData.size), theData)
+    # the long run is split in runs of 0x7fff
+    assert np.count_nonzero(theEncoded == 0xffff) >= 2
+    assert theCompressor.CompressBuffer(np.zeros(0, dtype=np.uint16).tobytes()) == b''
+
+@pytest.mark.parametrize("algorithm", [1, 2, 3, 5])
+def test_compress_buffer_round_trip(algorithm):
+    if algorithm == 3:
+        pytest.importorskip("lz4")
+    theData = MakeRLEData()
+    theCompressor = CCompressionBase()
+    theCompressor.mAlgorythm = algorithm
+    theCompressor.mDataLenBY = theData.nbytes
+    theDecoded = theCompressor.DecompressBuffer(theCompressor.CompressBuffer(theData.tobytes()))
+    assert np.array_equal(theDecoded, theData)
+
+@pytest.mark.parametrize("shape", [(3, 8, 10), (2, 3, 8, 10), (1000,)])
+@pytest.mark.parametrize("flag", [0, 1, 5])
+def test_write_npy_header(tmp_path, shape, flag):
+    thePath = str(tmp_path / "header.npy")
+    with open(thePath, "wb") as theStream:
+        theHeaderSize = CNpyHeader().WriteNpyHeader(theStream, shape, flag)
+    assert theHeaderSize % 64 == 0
+    with open(thePath, "rb") as theStream:
+        # numpy reads it, the minor version is the compression flag
+        assert np.lib.format.read_magic(theStream) == (1, flag)
+        assert np.lib.format.read_array_header_1_0(theStream) == (shape, False, np.dtype("<u2"))
+        assert theStream.tell() == theHeaderSize
+        theStream.seek(0, 0)
+        theNpyHeader = CNpyHeader()
+        assert theNpyHeader.ParseNpyHeader(theStream)
+    assert tuple(theNpyHeader.mShape) == shape
+    assert (theNpyHeader.mCompressionFlag, theNpyHeader.mHeaderSize, theNpyHeader.mBytesPerPixel) == (flag, theHeaderSize, 2)
+
+@pytest.mark.parametrize("algorithm", [0, 1, 2, 3, 5])
+@pytest.mark.parametrize("threads", [0, 4])
+def test_write_npyz(tmp_path, algorithm, threads):
+    from CNpyzWriter import CNpyzWriter
+    if algorithm == 3:
+        pytest.importorskip("lz4")
+    thePath = str(tmp_path / ("ImageData.npyz" if algorithm > 0 else "ImageData.npy"))
+    theRandom = np.random.default_rng(algorithm)
+    theBlocks = [theRandom.integers(0, 64, (12, 20), dtype=np.uint16) for theIndex in range(7)]
+    with CNpyzWriter(thePath, (len(theBlocks), 12, 20), algorithm, 1, threads) as theWriter:
+        for theBlock in theBlocks:
+            theWriter.WriteBlock(theBlock)
+    theBlockPositions = theWriter.GetBlockPositions()
+    if algorithm == 0:
+        assert np.array_equal(np.load(thePath), np.array(theBlocks))
+        return
+    assert len(theBlockPositions) == len(theBlocks)
+    with open(thePath, "rb") as theStream:
+        theNpyHeader = CNpyHeader()
+        assert theNpyHeader.ParseNpyHeader(theStream)
+        assert theNpyHeader.mCompressionFlag == algorithm
+        assert tuple(theNpyHeader.mShape) == (len(theBlocks), 12, 20)
+        theCompressor = CCompressionBase()
+        theCompressor.InitializeEx(theNpyHeader.mHeaderSize, algorithm, 20, 12, 1, len(theBlocks), 0)
+        theCompressor.ReadDictionary(theStream)
+        # the dictionary holds the positions returned by the writer, the blocks follow each other
+        assert [(int(theCompressor.GetDataOffsetForBlock(theIndex)), int(theCompressor.GetDataSizeForBlock(theIndex))) for theIndex in range(len(theBlocks))] == \
+               [(int(thePosition), int(theSize)) for thePosition, theSize in theBlockPositions]
+        for theIndex in reversed(range(len(theBlocks))):
+            assert np.array_equal(theCompressor.ReadData(theStream, theIndex), theBlocks[theIndex].ravel())
+
+@pytest.mark.parametrize("algorithm", [2, 3])
+def test_decompress_zlib_lz4(algorithm):
+    import zlib
+    if algorithm == 3:
+        pytest.importorskip("lz4")
+    thePlane = (np.arange(30 * 20, dtype=np.uint32) * 7 % 300).astype(np.uint16).reshape(30, 20)
+    theCompressor = CCompressionBase()
+    theCompressor.Initialize(0, algorithm, 20, 30, 1, 0)
+    theBuffer = theCompressor.CompressBuffer(thePlane.tobytes())
+    theOutput = np.full_like(thePlane, 1)
+    assert theCompressor.DecompressBuffer(theBuffer, theOutput) is theOutput
+    assert np.array_equal(theOutput, thePlane)
+    assert np.array_equal(theCompressor.DecompressBuffer(theBuffer), thePlane.ravel())
+    if algorithm == 3:
+        assert theCompressor.DecompressBuffer(theBuffer).flags.writeable
+    # a block larger than the plane is an error, and is not decoded past the size of the plane
+    theCompressor.Initialize(0, algorithm, 20, 29, 1, 0)
+    with pytest.raises(Exception):
+        theCompressor.DecompressBuffer(theBuffer, np.empty((29, 20), dtype=np.uint16))
+    if algorithm == 2:
+        # a gzip header is accepted too
+        theCompressor.Initialize(0, algorithm, 20, 30, 1, 0)
+        theGzip = zlib.compressobj(1, zlib.DEFLATED, 31)
+        theBuffer = theGzip.compress(thePlane.tobytes()) + theGzip.flush()
+        assert np.array_equal(theCompressor.DecompressBuffer(theBuffer), thePlane.ravel())
+        # a truncated block
+        with pytest.raises(NameError):
+            theCompressor.DecompressBuffer(theBuffer[:len(theBuffer) // 2])
+
+def MakeRLEStream(inRandom, inNumTokens):
+    # a valid RLE stream: single values below 0x8000, and (count, value) pairs, with counts of 0 and values with the bit 0x8000
+    theTokens = []
+    for theIndex in range(inNumTokens):
+        theKind = inRandom.integers(0, 4)
+        if theKind == 0:
+            theTokens.append(int(inRandom.integers(0, 0x8000)))
+        else:
+            theCount = int(inRandom.integers(0, 40)) if theKind < 3 else int(inRandom.integers(0, 0x8000))
+            theTokens += [0x8000 | theCount, int(inRandom.integers(0, 65536))]
+    return np.array(theTokens, dtype=np.uint16)
+
+def DecodeTokens(inStream):
+    # the counts, or the single values, of a stream
+    theTokens = []
+    j = 0
+    while j < inStream.size:
+        theTokens.append(int(inStream[j]))
+        j += 2 if inStream[j] & 0x8000 else 1
+    return theTokens
+
+@pytest.mark.parametrize("seed", range(8))
+def test_decompress_rle_matches_the_loop(seed):
+    theRandom = np.random.default_rng(seed)
+    theStream = MakeRLEStream(theRandom, int(theRandom.integers(1, 60)))
+    theCompressor = CCompressionBase()
+    # the whole stream, a short output (the end of the stream is dropped) and a long one (completed with 0)
+    theFullSize = int(sum((theValue & 0x7fff) if theValue & 0x8000 else 1 for theValue in DecodeTokens(theStream)))
+    for theSize in [theFullSize, theFullSize // 2 + 1, theFullSize + 17]:
+        theOutput = np.full(theSize, 0xabcd, dtype=np.uint16)
+        theCompressor.DecompressRLE(theStream, theOutput)
+        assert np.array_equal(theOutput, DecodeRLELoop(theStream, theSize))
+
+def test_decompress_rle_edge_cases():
+    theCompressor = CCompressionBase()
+    theOutput = np.full(4, 9, dtype=np.uint16)
+    # empty runs, a run of 0x8000 values, a value equal to the previous one after an empty run
+    theStream = np.array([0x8000, 5, 0x8002, 0x8000, 0x8000, 0x8000, 0x8001, 0x8000], dtype=np.uint16)
+    assert theCompressor.DecompressRLE(theStream, theOutput).tolist() == [0x8000, 0x8000, 0x8000, 0] == DecodeRLELoop(theStream, 4).tolist()
+    # a count without its value is ignored, an empty stream gives zeros
+    assert theCompressor.DecompressRLE(np.array([3, 0x8004], dtype=np.uint16), theOutput).tolist() == [3, 0, 0, 0]
+    assert theCompressor.DecompressRLE(np.zeros(0, dtype=np.uint16), theOutput).tolist() == [0, 0, 0, 0]
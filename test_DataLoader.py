@@ -0,0 +1,118 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the reading of the image and mask data of the synthetic slides (conftest.py)
+
+usage:
+python -m pytest test_DataLoader.py
+"""
+
+import pytest
+import numpy as np
+
+from conftest import kLayouts, OpenSlide
+
+
+@pytest.mark.parametrize("layout", list(kLayouts))
+def test_read_planes_of_several_files(slides, layout):
+    # the files are open together: each one must be read with its own header and block dictionary
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    theIndexes = [(0, 0, 0), (1, 0, 1), (0, theCapture.mNumPlanes - 1, 0), (3, 0, 1), (1, 0, 1), (0, 0, 0)]
+    for theTimepoint, theZPlane, theChannel in theIndexes:
+        thePlane = theSBFileReader.ReadImagePlaneBuf(0, 0, theTimepoint, theZPlane, theChannel, True)
+        assert np.array_equal(thePlane, theCapture.MakePlane(theTimepoint, theZPlane, theChannel))
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd", "sfmt_npyz_zstd"])
+def test_close_oldest_file(slides, layout):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    theDataLoader = theSBFileReader.mDL
+    theDataLoader.kMaxNumberOpenFiles = 3
+    theStreams = []
+    for theRepeat in range(2):
+        for theTimepoint in range(theCapture.mNumTimepoints):
+            for theChannel in range(theCapture.mNumChannels):
+                thePlane = theSBFileReader.ReadImagePlaneBuf(0, 0, theTimepoint, 0, theChannel, True)
+                assert np.array_equal(thePlane, theCapture.MakePlane(theTimepoint, 0, theChannel))
+                theStreams += list(theDataLoader.mPathToStreamMap.values())
+                assert len(theDataLoader.mPathToStreamMap) <= 3
+                assert set(theDataLoader.mCounterToPathMap.values()) == set(theDataLoader.mPathToStreamMap)
+                # the header and the compressor of a file go with its stream
+                assert set(theDataLoader.mPathToHeaderMap) <= set(theDataLoader.mPathToStreamMap)
+                assert set(theDataLoader.mPathToCompressorMap) <= set(theDataLoader.mPathToStreamMap)
+    theOpenStreams = set(theDataLoader.mPathToStreamMap.values())
+    assert all(theStream.closed for theStream in theStreams if theStream not in theOpenStreams)
+    assert not any(theStream.closed for theStream in theOpenStreams)
+
+def test_read_mask_of_another_size(tmp_path):
+    from CNpyzWriter import CNpyzWriter
+    from SyntheticSlide import CSyntheticSlide
+    thePath = str(tmp_path / "mask.sldyz")
+    theSlide = CSyntheticSlide(thePath)
+    theCapture = theSlide.AddCapture("Masks", 24, 16, 3, 1, 1, 1, 1, False, 1, 0)
+    theSlide.Write()
+    theSBFileReader = OpenSlide(thePath)
+    theImageGroup = theSBFileReader.mDL.GetImageGroup(0)
+    assert np.array_equal(theSBFileReader.ReadMaskBuf(0, 0, 0, True), theCapture.MakeMask(0, 0))
+
+    # a mask file with more rows than the image: zeros and an error, the file is not decoded
+    theSBFileReader = OpenSlide(thePath)
+    with CNpyzWriter(theImageGroup.mFile.GetMaskDataFile(theImageGroup.mImageTitle, 0), (1, 3, 18, 24), 5) as theWriter:
+        theWriter.WriteBlock(np.ones((3, 18, 24), dtype=np.uint16))
+    for theRepeat in range(2):
+        theMask = theSBFileReader.ReadMaskBuf(0, 0, 0, True)
+        assert theMask.shape == (3, 16, 24) and not theMask.any()
+    assert "Mask Size does not match Image size" in theSBFileReader.mDL.mErrorMessage
+    assert theSBFileReader.ReadMaskBuf(0, 0, 0).shape == (3 * 16 * 24,)
+
+def GetStack(inCapture, inTimepointIndex, inChannelIndex):
+    return np.array([inCapture.MakePlane(inTimepointIndex, theZPlane, inChannelIndex) for theZPlane in range(inCapture.mNumPlanes)])
+
+@pytest.mark.parametrize("layout", list(kLayouts))
+@pytest.mark.parametrize("cached", [False, True])
+def test_read_stack(slides, layout, cached):
+    from CPlaneCache import CPlaneCache
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    if cached:
+        theSBFileReader.SetPlaneCache(CPlaneCache())
+    for theTimepoint, theChannel in [(1, 1), (0, 0), (1, 1)]:
+        theStack = theSBFileReader.mDL.ReadStack(0, 0, theTimepoint, theChannel)
+        assert np.array_equal(theStack, GetStack(theCapture, theTimepoint, theChannel))
+        # every path returns a new writable array, the cached planes are not modified through it
+        assert theStack.flags.writeable and theStack.flags.owndata
+        theStack[0] = 0
+    assert np.array_equal(theSBFileReader.ReadImagePlaneBuf(0, 0, 1, 0, 1, True), theCapture.MakePlane(1, 0, 1))
+
+@pytest.mark.parametrize("algorithm", [0, 1, 2, 3, 5])
+@pytest.mark.parametrize("shape", [(3, 40, 50), (2, 1001)])
+def test_read_array_file(slides, tmp_path, algorithm, shape):
+    from CNpyzWriter import CNpyzWriter
+    if algorithm == 3:
+        pytest.importorskip("lz4")
+    # runs of equal values, so that RLE compresses them
+    theArray = (np.arange(int(np.prod(shape))) // 7 % 300).astype(np.uint16).reshape(shape)
+    thePath = str(tmp_path / ("array.npy" if algorithm == 0 else "array.npyz"))
+    with CNpyzWriter(thePath, shape, algorithm) as theWriter:
+        for theBlock in theArray:
+            theWriter.WriteBlock(theBlock)
+    theDataLoader = OpenSlide(slides["npy"][0]).mDL
+    theRead = theDataLoader.ReadArrayFile(thePath)
+    assert theRead.dtype == np.uint16
+    assert np.array_equal(theRead, theArray)
+    assert theDataLoader.ReadArrayFile(str(tmp_path / "missing.npyz")) is None
+
+def test_read_array_file_of_odd_blocks(slides, tmp_path):
+    # a compressed uint8 array whose blocks are an odd number of bytes cannot be decoded as uint16
+    thePath = str(tmp_path / "odd.npyz")
+    with open(thePath, "wb") as theStream:
+        np.lib.format.write_array_header_1_0(theStream, {"descr": "|u1", "fortran_order": False, "shape": (2, 3)})
+        theStream.write(bytes(64))
+    with open(thePath, "r+b") as theStream:
+        # the minor version is the compression flag: zstd
+        theStream.seek(7)
+        theStream.write(bytes([1]))
+    theDataLoader = OpenSlide(slides["npy"][0]).mDL
+    with pytest.raises(Exception, match="not a whole number of uint16"):
+        theDataLoader.ReadArrayFile(thePath)
@@ -0,0 +1,159 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the exporters: the files written are read back and compared with the synthetic slides
+
+usage:
+python -m pytest test_Exporters.py
+"""
+
+import pytest
+import numpy as np
+
+from conftest import OpenSlide
+
+
+def GetCaptureData(inCapture, inZPlanes=None):
+    # the expected content of a capture, (t,c,z,y,x)
+    theZPlanes = range(inCapture.mNumPlanes) if inZPlanes is None else inZPlanes
+    return np.array([[[inCapture.MakePlane(theTimepoint, theZPlane, theChannel) for theZPlane in theZPlanes]
+                      for theChannel in range(inCapture.mNumChannels)] for theTimepoint in range(inCapture.GetNumImages())])
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+def test_export_one_plane_as_tiff(slides, layout, tmp_path):
+    tifffile = pytest.importorskip("tifffile")
+    import ExportOnePlaneAsTiff
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    thePlane = theCapture.mNumPlanes // 2
+    theOutFile = ExportOnePlaneAsTiff.ExportPlane(theSBFileReader, 0, thePlane, str(tmp_path / "plane"))
+    assert theOutFile == str(tmp_path / "plane") + "Z%04d.ome.tif" % thePlane
+    with tifffile.TiffFile(theOutFile) as theTiff:
+        theData = theTiff.series[0].asarray()
+    assert np.array_equal(theData.reshape(-1), GetCaptureData(theCapture, [thePlane]).reshape(-1))
+    assert theData.size == theCapture.GetNumImages() * theCapture.mNumChannels * theCapture.mNumRows * theCapture.mNumColumns
+
+def test_export_one_plane_as_tiff_single_thread(slides, tmp_path):
+    tifffile = pytest.importorskip("tifffile")
+    import ExportOnePlaneAsTiff
+    thePath, theCapture = slides["npyz_zstd"]
+    theSBFileReader = OpenSlide(thePath)
+    # the planes are read by the reader given, no pool is started
+    theOutFile = ExportOnePlaneAsTiff.ExportPlane(theSBFileReader, 0, 1, str(tmp_path / "plane"), 1)
+    assert len(theSBFileReader.mDL.mPathToStreamMap) == theCapture.GetNumImages() * theCapture.mNumChannels
+    with tifffile.TiffFile(theOutFile) as theTiff:
+        theData = theTiff.series[0].asarray()
+    assert np.array_equal(theData.reshape(-1), GetCaptureData(theCapture, [1]).reshape(-1))
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_export_capture_as_tiff(slides, threads, tmp_path):
+    tifffile = pytest.importorskip("tifffile")
+    from ExportCaptureAsTiff import CTiffExporter
+    thePath, theCapture = slides["npyz_zstd"]
+    with CTiffExporter(thePath, threads) as theExporter:
+        theExporter.SetCompression("zlib")
+        theNumPlanes = theExporter.Export(0, str(tmp_path / "capture.ome.tif"), None, None, [0, 2])
+        assert (theExporter.mPool is None) == (threads == 1)
+    assert theNumPlanes == theCapture.GetNumImages() * theCapture.mNumChannels * 2
+    with tifffile.TiffFile(str(tmp_path / "capture.ome.tif")) as theTiff:
+        theData = theTiff.series[0].asarray()
+    assert np.array_equal(theData.reshape(-1), GetCaptureData(theCapture, [0, 2]).reshape(-1))
+
+def test_reader_pool_close_closes_the_files(slides):
+    from CPlaneReaderPool import CPlaneReaderPool
+    thePath, theCapture = slides["npyz_zstd"]
+    thePool = CPlaneReaderPool(thePath, 3)
+    theIndexes = [(theTimepoint, 0, theChannel) for theTimepoint in range(theCapture.mNumTimepoints) for theChannel in range(theCapture.mNumChannels)]
+    for theIndex, thePlane in thePool.ReadPlanes(0, theIndexes):
+        assert np.array_equal(thePlane, theCapture.MakePlane(theIndex[0], theIndex[1], theIndex[2]))
+    theStreams = [theStream for theReader in thePool.mReaders for theStream in theReader.mDL.mPathToStreamMap.values()]
+    assert len(theStreams) >= len(theIndexes)
+    thePool.Close()
+    assert all(theStream.closed for theStream in theStreams)
+    assert len(thePool.mReaders) == 0
+
+@pytest.mark.parametrize("position", [0, 2])
+def test_export_zarr(slides, position, tmp_path, monkeypatch):
+    zarr = pytest.importorskip("zarr")
+    import CZarrStore
+    thePath, theCapture = slides["npyz_zstd"]
+    theSBFileReader = OpenSlide(thePath)
+    thePositions = []
+    theExport = CZarrStore.COmeZarrWriter.Export
+
+    def Export(inWriter, inCaptureIndex, inZarrPath, inPositionIndex=0, inResume=True):
+        thePositions.append(inPositionIndex)
+        return theExport(inWriter, inCaptureIndex, inZarrPath, inPositionIndex, inResume)
+
+    monkeypatch.setattr(CZarrStore.COmeZarrWriter, "Export", Export)
+    theZarrPath = str(tmp_path / "capture.ome.zarr")
+    theNumPlanes = theSBFileReader.ExportZarr(0, theZarrPath, 2, "zstd", 2, True, position)
+    assert thePositions == [position]
+    assert theNumPlanes == theCapture.GetNumImages() * theCapture.mNumChannels * theCapture.mNumPlanes
+    theGroup = zarr.open_group(theZarrPath, mode="r")
+    assert np.array_equal(theGroup["0"][:], GetCaptureData(theCapture))
+
+def ReadMatString(inDataset):
+    # a MATLAB char array: utf-16 code units
+    return inDataset[:].astype(np.uint16).tobytes().decode("utf-16-le")
+
+@pytest.mark.parametrize("level", [0, 1])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_export_mat(slides, level, threads, tmp_path):
+    h5py = pytest.importorskip("h5py")
+    from SldyToMATLAB import CMatExporter
+    thePath, theCapture = slides["npyz_zstd"]
+    theMatPath = str(tmp_path / "capture.mat")
+    theExporter = CMatExporter(thePath, threads)
+    theExporter.SetCompressionLevel(level)
+    assert theExporter.Export(0, theMatPath) == theCapture.GetNumImages() * theCapture.mNumChannels * theCapture.mNumPlanes
+
+    with open(theMatPath, "rb") as theFile:
+        theHeader = theFile.read(128)
+    assert theHeader.startswith(b"MATLAB 7.3 MAT-file") and theHeader[124:128] == b"\x00\x02IM"
+    theSBFileReader = OpenSlide(thePath)
+    with h5py.File(theMatPath, "r") as theFile:
+        theImage = theFile["image"]
+        assert theImage.attrs["MATLAB_class"] == b"uint16"
+        # MATLAB reverses the axes: (t,c,z,x,y) here is (y,x,z,c,t) there
+        assert theImage.shape == (theCapture.GetNumImages(), theCapture.mNumChannels, theCapture.mNumPlanes, theCapture.mNumColumns, theCapture.mNumRows)
+        assert np.array_equal(theImage[1, 1, 2].T, theCapture.MakePlane(1, 2, 1))
+        assert np.array_equal(theImage[:].transpose(0, 1, 2, 4, 3), GetCaptureData(theCapture))
+        assert np.allclose(theFile["voxelSize"][:, 0], theSBFileReader.GetVoxelSize(0))
+        theNames = [ReadMatString(theFile[theReference]) for theReference in theFile["channelNames"][:, 0]]
+        assert theNames == [theSBFileReader.GetChannelName(0, theChannel) for theChannel in range(theCapture.mNumChannels)]
+        assert theFile["channelNames"].attrs["MATLAB_class"] == b"cell"
+        assert np.allclose(theFile["exposureTimes"][:, 0], [theSBFileReader.GetExposureTime(0, theChannel) for theChannel in range(theCapture.mNumChannels)])
+        assert np.allclose(theFile["elapsedTimes"][:, 0], [theCapture.GetElapsedTime(theIndex) for theIndex in range(theCapture.GetNumImages())])
+        assert ReadMatString(theFile["captureName"]) == theSBFileReader.GetImageName(0)
+
+@pytest.mark.parametrize("filter", [None, "gzip", "zstd", "lz4"])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_export_capture_as_hdf5(slides, filter, threads, tmp_path):
+    h5py = pytest.importorskip("h5py")
+    if filter in ("zstd", "lz4"):
+        # the filters to read the chunks back
+        pytest.importorskip("hdf5plugin")
+    if filter == "lz4":
+        pytest.importorskip("lz4")
+    from ExportCaptureAsHdf5 import CHdf5Exporter
+    thePath, theCapture = slides["npyz_zstd"]
+    theHdf5Path = str(tmp_path / "capture.h5")
+    with CHdf5Exporter(thePath, threads) as theExporter:
+        theExporter.SetFilter(filter)
+        with h5py.File(theHdf5Path, "w") as theFile:
+            assert theExporter.Export(0, theFile) == theCapture.GetNumImages() * theCapture.mNumChannels * theCapture.mNumPlanes
+    theSBFileReader = OpenSlide(thePath)
+    with h5py.File(theHdf5Path, "r") as theFile:
+        theDataset = theFile["capture_0"]
+        assert theDataset.chunks == (1, 1, 1, theCapture.mNumRows, theCapture.mNumColumns)
+        thePropertyList = theDataset.id.get_create_plist()
+        if filter is None:
+            assert thePropertyList.get_nfilters() == 0
+        else:
+            assert thePropertyList.get_filter(0)[0] == CHdf5Exporter.kFilterIds[filter]
+        assert np.array_equal(theDataset[:], GetCaptureData(theCapture))
+        assert theDataset.attrs["axes"] == "TCZYX"
+        assert theDataset.attrs["capture_name"] == theSBFileReader.GetImageName(0)
+        assert list(theDataset.attrs["channel_names"]) == [theSBFileReader.GetChannelName(0, theChannel) for theChannel in range(theCapture.mNumChannels)]
+        assert np.allclose(theDataset.attrs["elapsed_times_ms"], [theCapture.GetElapsedTime(theIndex) for theIndex in range(theCapture.GetNumImages())])
@@ -0,0 +1,61 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the metadata read from the records of the synthetic slides
+
+usage:
+python -m pytest test_Metadata.py
+"""
+
+import os
+import pytest
+import numpy as np
+
+from conftest import CopySlide, OpenSlide
+from SyntheticSlide import EncodeList, WriteLines
+
+
+def test_get_time_axis(montage):
+    thePath, theCapture = montage
+    theSBFileReader = OpenSlide(thePath)
+    theElapsedTimes = theSBFileReader.GetElapsedTimes(0)
+    assert theElapsedTimes.dtype == np.int64
+    assert np.array_equal(theElapsedTimes, [theCapture.GetElapsedTime(theImage) for theImage in range(theCapture.GetNumImages())])
+    assert [theSBFileReader.GetElapsedTime(0, theImage) for theImage in range(theCapture.GetNumImages())] == theElapsedTimes.tolist()
+    assert np.array_equal(theSBFileReader.GetZPositions(0, 0), [theSBFileReader.GetZPosition(0, 0, theZPlane) for theZPlane in range(theCapture.mNumPlanes)])
+
+def test_get_sa_positions(slides, tmp_path):
+    thePath, theCapture = slides["npy"]
+    theSBFileReader = OpenSlide(thePath)
+    thePositions = theSBFileReader.GetSAPositions(0)
+    assert isinstance(thePositions, list) and len(thePositions) == theCapture.GetNumImages()
+    assert all(thePosition.dtype == np.int64 and thePosition.tolist() == [0, 0, 0] for thePosition in thePositions)
+    assert np.array_equal(theSBFileReader.GetSAPositionArray(0), np.zeros((theCapture.GetNumImages(), 3), dtype=np.int64))
+
+    # time points with different numbers of values: a list still, no array
+    thePath = CopySlide(thePath, tmp_path)
+    theSBFileReader = OpenSlide(thePath)
+    theImageGroup = theSBFileReader.mDL.GetImageGroup(0)
+    WriteLines(os.path.join(theImageGroup.mFile.GetImageGroupDirectory(theImageGroup.mImageTitle), theImageGroup.mFile.kSAPositionDataFilename),
+               ["theImageCount: 2", "theSAPositions: " + EncodeList([1, 2, 3]), "theSAPositions: " + EncodeList([4, 5])])
+    theSBFileReader = OpenSlide(thePath)
+    assert [thePosition.tolist() for thePosition in theSBFileReader.GetSAPositions(0)] == [[1, 2, 3], [4, 5]]
+    with pytest.raises(Exception, match="same number of SA positions"):
+        theSBFileReader.GetSAPositionArray(0)
+
+def test_annotation_shapes(slides):
+    from SBReadFile import EROI_Shapes
+    from CImageGroup import kGraphicTypeToShape
+    thePath, theCapture = slides["npy"]
+    theSBFileReader = OpenSlide(thePath)
+    # the synthetic ROIs are rectangles (2), polygons (3) and ellipses (8)
+    theShapes = [theSBFileReader.GetROIAnnotation(0, theROI)[0] for theROI in range(theSBFileReader.GetNumROIAnnotations(0))]
+    assert len(theShapes) == theCapture.mNumROIs
+    assert theShapes == [[EROI_Shapes.eRectangle.value, EROI_Shapes.ePolygon.value, EROI_Shapes.eEllipse.value][theROI % 3] for theROI in range(len(theShapes))]
+    assert theSBFileReader.GetFRAPAnnotation(0, 0)[0] == kGraphicTypeToShape[2] == EROI_Shapes.eRectangle.value
+    theRegions, theVertexes = theSBFileReader.GetFRAPRegionTable(0, 0)
+    assert len(theRegions) == theCapture.mNumFRAPRegions
+    for theRegion in theRegions:
+        theShape, thePoints = theSBFileReader.GetFRAPRegion(0, 0, int(theRegion["mRegionIndex"]))
+        assert theShape == theRegion["mShape"] == kGraphicTypeToShape[theRegion["mGraphicType"]]
+        assert theVertexes[theRegion["mFirstVertex"]:theRegion["mFirstVertex"] + theRegion["mNumVertexes"], 0].tolist() == [thePoint.mX for thePoint in thePoints]
@@ -0,0 +1,127 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the montages: the positions are laid out on a grid, the tiles placed by their
+stage positions and stitched
+
+usage:
+python -m pytest test_Montage.py
+"""
+
+import pytest
+import numpy as np
+
+from conftest import OpenSlide
+
+
+def GetExpectedOrigins(inCapture, inXSize, inYSize):
+    # the (row, column) of the tiles, from the stage positions written in the slide
+    thePositions = np.array([inCapture.GetStagePosition(thePosition) for thePosition in range(inCapture.mNumPositions)])
+    theRows = np.rint(thePositions[:, 1] / inYSize).astype(np.int64)
+    theColumns = np.rint(thePositions[:, 0] / inXSize).astype(np.int64)
+    return np.stack([theRows - theRows.min(), theColumns - theColumns.min()], axis=1)
+
+def StitchExpected(inCapture, inOrigins, inBlend):
+    # the mosaic of the tiles of time point 0, in float64, and the number of tiles over each pixel
+    theShape = (inOrigins[:, 0].max() + inCapture.mNumRows, inOrigins[:, 1].max() + inCapture.mNumColumns)
+    theSum = np.zeros(theShape)
+    theWeightSum = np.zeros(theShape)
+    theCount = np.zeros(theShape, dtype=np.int64)
+    # the distance (from 1) to the closest edge of a tile
+    theWeights = np.minimum.outer(np.minimum(np.arange(1, inCapture.mNumRows + 1), np.arange(inCapture.mNumRows, 0, -1)),
+                                  np.minimum(np.arange(1, inCapture.mNumColumns + 1), np.arange(inCapture.mNumColumns, 0, -1)))
+    for thePosition, (theTop, theLeft) in enumerate(inOrigins):
+        theArea = (slice(theTop, theTop + inCapture.mNumRows), slice(theLeft, theLeft + inCapture.mNumColumns))
+        theTile = inCapture.MakePlane(thePosition, 0, 0).astype(np.float64)
+        if inBlend == "linear":
+            theSum[theArea] += theTile * theWeights
+            theWeightSum[theArea] += theWeights
+        else:
+            theSum[theArea] = theTile
+            theWeightSum[theArea] = 1
+        theCount[theArea] += 1
+    return np.divide(theSum, theWeightSum, out=np.zeros(theShape), where=theWeightSum > 0), theCount
+
+def test_tile_origins(montage):
+    from CMontageStitcher import CMontageStitcher
+    thePath, theCapture = montage
+    theSBFileReader = OpenSlide(thePath)
+    theStitcher = CMontageStitcher(theSBFileReader, 0)
+    assert np.array_equal(theStitcher.mTileOrigins, GetExpectedOrigins(theCapture, theCapture.mMicronPerPixel, theCapture.mMicronPerPixel))
+    # 10% of overlap on the 3x3 grid
+    assert np.array_equal(theStitcher.mTileOrigins[:3, 1], np.rint(np.arange(3) * theCapture.mNumColumns * 0.9))
+    assert np.array_equal(theStitcher.mTileOrigins[::3, 0], np.rint(np.arange(3) * theCapture.mNumRows * 0.9))
+
+def test_tile_origins_use_the_y_voxel_size(montage, monkeypatch):
+    from CMontageStitcher import CMontageStitcher
+    thePath, theCapture = montage
+    theSBFileReader = OpenSlide(thePath)
+    # non square pixels: the rows are at the Y size, the columns at the X size
+    monkeypatch.setattr(theSBFileReader, "GetVoxelSize", lambda inCaptureIndex: (theCapture.mMicronPerPixel, theCapture.mMicronPerPixel / 2, 1.0))
+    theOrigins = CMontageStitcher(theSBFileReader, 0).mTileOrigins
+    assert np.array_equal(theOrigins, GetExpectedOrigins(theCapture, theCapture.mMicronPerPixel, theCapture.mMicronPerPixel / 2))
+    assert theOrigins[3, 0] == np.rint(theCapture.mNumRows * 0.9 * 2)
+    monkeypatch.setattr(theSBFileReader, "GetVoxelSize", lambda inCaptureIndex: (theCapture.mMicronPerPixel, 0.0, 1.0))
+    with pytest.raises(Exception, match="invalid voxel size"):
+        CMontageStitcher(theSBFileReader, 0)
+
+def test_position_layout(montage):
+    from CImageGroup import CPositionLayout
+    thePath, theCapture = montage
+    theSBFileReader = OpenSlide(thePath)
+    assert theSBFileReader.GetNumPositions(0) == 9
+    assert [theSBFileReader.GetMontageRow(0, thePosition) for thePosition in range(9)] == [0, 0, 0, 1, 1, 1, 2, 2, 2]
+    assert [theSBFileReader.GetMontageColumn(0, thePosition) for thePosition in range(9)] == [0, 1, 2] * 3
+    # a plate scan: 100 positions, repeated over 100 time points, on the 3 columns grid of the montage
+    thePositions = np.array([theCapture.GetStagePosition(theImage % 100) for theImage in range(10000)])
+    theLayout = CPositionLayout(thePositions, theCapture.mMicronPerPixel, theCapture.mNumColumns, theCapture.mNumRows)
+    assert theLayout.mNumPositions == 100
+    assert np.array_equal(theLayout.mMontageRows, np.arange(100) // 3)
+    assert np.array_equal(theLayout.mMontageColumns, np.arange(100) % 3)
+
+@pytest.mark.parametrize("blend", ["linear", "none"])
+@pytest.mark.parametrize("threads", [1, 4])
+@pytest.mark.parametrize("bandrows", [None, 37])
+def test_stitch_montage(montage, blend, threads, bandrows):
+    from CMontageStitcher import CMontageStitcher
+    thePath, theCapture = montage
+    theSBFileReader = OpenSlide(thePath)
+    try:
+        theStitcher = CMontageStitcher(theSBFileReader, 0, blend, threads)
+        theMosaic = theStitcher.Stitch(0, 0, 0, None, bandrows)
+    finally:
+        theSBFileReader.Close()
+    theOrigins = GetExpectedOrigins(theCapture, theCapture.mMicronPerPixel, theCapture.mMicronPerPixel)
+    theExpected, theCount = StitchExpected(theCapture, theOrigins, blend)
+    assert theMosaic.dtype == np.uint16 and theMosaic.shape == theExpected.shape
+    # outside the overlaps, the pixels of the tiles
+    theSingle = theCount == 1
+    assert np.array_equal(theMosaic[theSingle], theExpected[theSingle])
+    theOverlap = theCount > 1
+    assert np.count_nonzero(theOverlap) > 0
+    if blend == "none":
+        # the last tile
+        assert np.array_equal(theMosaic[theOverlap], theExpected[theOverlap])
+        return
+    # the weighted mean of the tiles, up to the float32 rounding of the stitcher
+    assert np.max(np.abs(theMosaic[theOverlap] - theExpected[theOverlap])) <= 1
+    # the blend moves from one tile to the next: at the middle of the overlap of the first two
+    # tiles of a row both weigh the same, close to their edges one tile dominates
+    theOverlapColumns = range(theOrigins[1, 1], theOrigins[0, 1] + theCapture.mNumColumns)
+    theRow = theCapture.mNumRows // 2
+    theLeft = theCapture.MakePlane(0, 0, 0)[theRow].astype(np.float64)
+    theRight = theCapture.MakePlane(1, 0, 0)[theRow].astype(np.float64)
+    theMiddle = (theOverlapColumns.start + theOverlapColumns.stop - 1) // 2
+    theLeftWeight = theCapture.mNumColumns - theMiddle
+    theRightWeight = theMiddle - theOrigins[1, 1] + 1
+    theMean = (theLeft[theMiddle] * theLeftWeight + theRight[theMiddle - theOrigins[1, 1]] * theRightWeight) / (theLeftWeight + theRightWeight)
+    assert abs(int(theMosaic[theRow, theMiddle]) - theMean) <= 1
+    assert abs(int(theMosaic[theRow, theOverlapColumns.start]) - (theLeft[theOverlapColumns.start] * (theCapture.mNumColumns - theOverlapColumns.start) + theRight[0]) / (theCapture.mNumColumns - theOverlapColumns.start + 1)) <= 1
+
+def test_stitch_to_npy(montage, tmp_path):
+    from CMontageStitcher import CMontageStitcher
+    thePath, theCapture = montage
+    theSBFileReader = OpenSlide(thePath)
+    theStitcher = CMontageStitcher(theSBFileReader, 0)
+    theStitcher.StitchToNpy(0, 0, 0, str(tmp_path / "mosaic.npy"), 50)
+    assert np.array_equal(np.load(str(tmp_path / "mosaic.npy")), theSBFileReader.StitchMontage(0, 0, 0, 0))
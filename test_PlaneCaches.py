@@ -0,0 +1,129 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the read-ahead prefetcher and of the plane caches
+
+usage:
+python -m pytest test_PlaneCaches.py
+"""
+
+import pytest
+import numpy as np
+import multiprocessing
+
+from conftest import OpenSlide
+from CSharedPlaneCache import CSharedPlaneCache
+
+
+def GetWalk(inCapture):
+    # all the planes in the order of the files: timepoint, channel, z
+    return [(theTimepoint, theZPlane, theChannel) for theTimepoint in range(inCapture.mNumTimepoints)
+            for theChannel in range(inCapture.mNumChannels) for theZPlane in range(inCapture.mNumPlanes)]
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd", "sfmt_npyz_zstd"])
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_read_planes_in_order(slides, layout, prefetch):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    if prefetch > 0:
+        theSBFileReader.EnablePrefetch(prefetch, 2)
+    try:
+        for theTimepoint, theZPlane, theChannel in GetWalk(theCapture):
+            thePlane = theSBFileReader.ReadImagePlaneBuf(0, 0, theTimepoint, theZPlane, theChannel, True)
+            assert np.array_equal(thePlane, theCapture.MakePlane(theTimepoint, theZPlane, theChannel))
+            theFlat = theSBFileReader.ReadImagePlaneBuf(0, 0, theTimepoint, theZPlane, theChannel)
+            assert np.array_equal(theFlat, thePlane.ravel())
+        if prefetch > 0:
+            assert theSBFileReader.mDL.mPrefetcher.mNumHits > len(GetWalk(theCapture)) // 2
+    finally:
+        theSBFileReader.DisablePrefetch()
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+def test_prefetched_planes_are_cached(slides, layout):
+    from CPlaneCache import CPlaneCache
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    theCache = CPlaneCache()
+    theSBFileReader.SetPlaneCache(theCache)
+    theSBFileReader.EnablePrefetch(4, 2)
+    try:
+        for theTimepoint, theZPlane, theChannel in GetWalk(theCapture):
+            theSBFileReader.ReadImagePlaneBuf(0, 0, theTimepoint, theZPlane, theChannel, True)
+        assert theSBFileReader.mDL.mPrefetcher.mNumHits > 0
+    finally:
+        theSBFileReader.DisablePrefetch()
+    # every plane, read ahead or not, is in the cache
+    for theTimepoint, theZPlane, theChannel in GetWalk(theCapture):
+        thePlane = theCache.Get(theCache.GetKey(thePath, 0, theTimepoint, theZPlane, theChannel))
+        assert thePlane is not None
+        assert np.array_equal(thePlane, theCapture.MakePlane(theTimepoint, theZPlane, theChannel))
+
+def MakeKeyPlane(inWorker, inIndex):
+    # a plane whose every pixel depends on its key, a torn copy does not match it
+    return ((np.arange(64 * 64, dtype=np.uint32) * 7 + inWorker * 1000 + inIndex) % 65536).astype(np.uint16).reshape(64, 64)
+
+def PutAndGetPlanes(inCache, inWorker, inNumWorkers, inNumIterations):
+    # publishes the planes of inWorker and reads those of all the workers, returns (hits, wrong planes)
+    theNumWrong = 0
+    theRandom = np.random.default_rng(inWorker)
+    for theIteration in range(inNumIterations):
+        theIndex = theIteration % 16
+        inCache.Put(("slide", 0, inWorker, theIndex, 0), MakeKeyPlane(inWorker, theIndex), "slide", (0, 0))
+        theOther = int(theRandom.integers(inNumWorkers))
+        theOtherIndex = int(theRandom.integers(16))
+        thePlane = inCache.Get(("slide", 0, theOther, theOtherIndex, 0))
+        if thePlane is not None and not np.array_equal(thePlane, MakeKeyPlane(theOther, theOtherIndex)):
+            theNumWrong += 1
+    return inCache.mNumHits, theNumWrong
+
+@pytest.mark.skipif(not CSharedPlaneCache.IsSupported(), reason="POSIX only")
+def test_shared_cache_concurrent_put_get(tmp_path):
+    # 8 slots of 8 ways: every plane of every worker goes to the same set
+    theCache = CSharedPlaneCache("test", 8 * 64 * 64 * 2, 64 * 64 * 2, str(tmp_path))
+    assert theCache.mNumSets == 1
+    theNumWorkers = 4
+    try:
+        # spawn: the workers attach the cache from its pickled state
+        with multiprocessing.get_context("spawn").Pool(theNumWorkers) as thePool:
+            theResults = thePool.starmap(PutAndGetPlanes, [(theCache, theWorker, theNumWorkers, 2000) for theWorker in range(theNumWorkers)])
+        assert sum(theNumWrong for theNumHits, theNumWrong in theResults) == 0
+        assert sum(theNumHits for theNumHits, theNumWrong in theResults) > 0
+        # the planes left in the set are whole
+        theNumFound = 0
+        for theWorker in range(theNumWorkers):
+            for theIndex in range(16):
+                thePlane = theCache.Get(("slide", 0, theWorker, theIndex, 0))
+                if thePlane is not None:
+                    assert np.array_equal(thePlane, MakeKeyPlane(theWorker, theIndex))
+                    theNumFound += 1
+        assert theNumFound == 8
+    finally:
+        theCache.Remove()
+
+@pytest.mark.skipif(not CSharedPlaneCache.IsSupported(), reason="POSIX only")
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd"])
+def test_shared_cache_between_readers(slides, layout, tmp_path):
+    thePath, theCapture = slides[layout]
+    theCache = CSharedPlaneCache("test_" + layout, 16 * theCapture.mNumRows * theCapture.mNumColumns * 2,
+                                 theCapture.mNumRows * theCapture.mNumColumns * 2, str(tmp_path))
+    try:
+        # a worker publishes the planes, another reader finds them
+        theWorker = OpenSlide(thePath)
+        theWorker.SetPlaneCache(theCache)
+        theWorker.ReadImagePlaneBuf(0, 0, 1, 1, 1, True)
+        theSBFileReader = OpenSlide(thePath)
+        theSBFileReader.SetPlaneCache(theCache)
+        theNumHits = theCache.mNumHits
+        assert np.array_equal(theSBFileReader.ReadImagePlaneBuf(0, 0, 1, 1, 1, True), theCapture.MakePlane(1, 1, 1))
+        assert np.array_equal(theSBFileReader.ReadImagePlaneBuf(0, 0, 1, 1, 1), theCapture.MakePlane(1, 1, 1).ravel())
+        assert theCache.mNumHits == theNumHits + 2
+        assert len(theSBFileReader.mDL.mPathToStreamMap) == 0
+        assert np.array_equal(theSBFileReader.ReadImagePlaneBuf(0, 0, 0, 1, 1, True), theCapture.MakePlane(0, 1, 1))
+    finally:
+        theCache.Remove()
+
+def test_shared_cache_needs_posix(monkeypatch):
+    import os
+    monkeypatch.delattr(os, "pread", raising=False)
+    with pytest.raises(Exception, match="CSharedPlaneCache: needs fcntl.flock"):
+        CSharedPlaneCache("test_posix", 1024 * 1024, 64 * 64 * 2)
@@ -0,0 +1,621 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+"""Tests of the SBAccess protocol without a SlideBook server
+
+A fake socket replays scripted replies and records the bytes sent, so the tests check
+the exact bytes of the commands and the values decoded from the replies.
+
+    python -m pytest -q test_SBAccessProtocol.py
+"""
+
+import re
+import numpy as np
+import pytest
+import pyzstd
+import ByteUtil as bu
+import SBCommandTable as ct
+from SBAccess import SBAccess
+
+
+class CFakeSocket(object):
+    """ A socket whose replies are scripted, a reply can be held until some bytes have been sent """
+    def __init__(self):
+        self.mSent = bytearray()
+        self.mReplies = bytearray()
+        self.mHeldReplies = []
+        self.mReplyStarts = []
+        self.mNumReceived = 0
+        self.mMaxUnreadReplies = 0
+        self.mEvents = []
+
+    def AddReply(self, inReply, inAfterNumBytesSent=0):
+        # the reply can be received once inAfterNumBytesSent bytes have been sent in total
+        self.mHeldReplies.append((inAfterNumBytesSent, bytes(inReply)))
+        self.ReleaseReplies()
+
+    def ReleaseReplies(self):
+        while len(self.mHeldReplies) > 0 and self.mHeldReplies[0][0] <= len(self.mSent):
+            self.mReplyStarts.append(self.mNumReceived + len(self.mReplies))
+            self.mReplies += self.mHeldReplies.pop(0)[1]
+            self.mEvents.append('reply')
+            theNumUnread = sum(1 for theStart in self.mReplyStarts if theStart >= self.mNumReceived)
+            self.mMaxUnreadReplies = max(self.mMaxUnreadReplies, theNumUnread)
+
+    def send(self, inBytes):
+        theBytes = bytes(inBytes)
+        self.mSent += theBytes
+        self.mEvents.append('send')
+        self.ReleaseReplies()
+        return len(theBytes)
+
+    def recv(self, inNumBytes):
+        if len(self.mReplies) == 0:
+            raise AssertionError("recv would block: no reply was sent for the commands sent so far")
+        theBytes = bytes(self.mReplies[:inNumBytes])
+        del self.mReplies[:inNumBytes]
+        self.mNumReceived += len(theBytes)
+        self.mEvents.append('recv')
+        return theBytes
+
+
+def Reply(inValues, inType='i4'):
+    # a reply of n values: &(n:type) followed by the values
+    theValues = np.atleast_1d(np.asarray(inValues, dtype=bu.bytes_to_type(b'', inType).dtype))
+    return ('&(%d:%s)' % (theValues.size, inType)).encode() + theValues.tobytes()
+
+def StringReply(inString):
+    theBytes = inString.encode()
+    return ('&(%d:s)' % len(theBytes)).encode() + theBytes
+
+def LegacyCommand(inHeader, *inValues):
+    # the bytes sent by SendCommand followed by one SendVal per argument
+    theBytes = bu.string_to_bytes(inHeader)
+    for theValue, theType in inValues:
+        theBytes += theValue if theType == 'b' else bu.type_to_bytes(theValue, theType)
+    return theBytes
+
+def WriteImagePlaneCommand(inCaptureIndex, inTimepointIndex, inZPlaneIndex, inChannelIndex, inPlane, inName='WriteImagePlaneBuf'):
+    thePlaneBytes = inPlane.tobytes()
+    theHeader = '$%s(CaptureIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4,ByteArray=%d:b)' % (inName, len(thePlaneBytes))
+    return LegacyCommand(theHeader, (inCaptureIndex, 'i4'), (inTimepointIndex, 'i4'), (inZPlaneIndex, 'i4'), (inChannelIndex, 'i4'), (thePlaneBytes, 'b'))
+
+def WriteMaskPlaneCommand(inCaptureIndex, inMaskName, inTimepointIndex, inZPlaneIndex, inPlane):
+    thePlaneBytes = inPlane.tobytes()
+    theHeader = '$WriteMaskPlaneBuf(CaptureIndex=i4,MaskName=%d:s,TimepointIndex=i4,ZPlaneIndex=i4,ByteArray=%d:b)' % (len(inMaskName.encode()), len(thePlaneBytes))
+    return LegacyCommand(theHeader, (inCaptureIndex, 'i4'), (inMaskName, 's'), (inTimepointIndex, 'i4'), (inZPlaneIndex, 'i4'), (thePlaneBytes, 'b'))
+
+def MakeStack(inNumPlanes=5, inNumRows=4, inNumColumns=6):
+    return np.arange(inNumPlanes * inNumRows * inNumColumns, dtype=np.uint16).reshape(inNumPlanes, inNumRows, inNumColumns) * 7
+
+def ScriptAcks(inSocket, inCommands, inAck=1):
+    # one acknowledgement per command, available once the command has been sent completely
+    theEnd = len(inSocket.mSent)
+    for theCommand in inCommands:
+        theEnd += len(theCommand)
+        inSocket.AddReply(Reply(inAck), theEnd)
+
+@pytest.mark.parametrize("inMaxPending", [1, 2, 16])
+def test_write_image_stack_pipelined(inMaxPending):
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    theStack = MakeStack()
+    theCommands = [WriteImagePlaneCommand(2, 3, z, 1, theStack[z]) for z in range(theStack.shape[0])]
+    ScriptAcks(theSocket, theCommands)
+
+    theAccess.WriteImageStack(2, 3, 1, theStack, inMaxPending=inMaxPending)
+
+    assert bytes(theSocket.mSent) == b''.join(theCommands)
+    assert len(theSocket.mReplies) == 0 and len(theSocket.mHeldReplies) == 0
+    # at most inMaxPending acknowledgements are outstanding, the first one is read after inMaxPending planes were sent
+    assert theSocket.mMaxUnreadReplies == min(inMaxPending, theStack.shape[0])
+    assert theSocket.mEvents[:theSocket.mEvents.index('recv')].count('reply') == min(inMaxPending, theStack.shape[0])
+
+def test_write_mask_stack_pipelined():
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    theStack = MakeStack(3)
+    theCommands = [WriteMaskPlaneCommand(0, "Mask 1", 4, z, theStack[z]) for z in range(theStack.shape[0])]
+    ScriptAcks(theSocket, theCommands)
+
+    theAccess.WriteMaskStack(0, "Mask 1", 4, theStack, inMaxPending=2)
+
+    assert bytes(theSocket.mSent) == b''.join(theCommands)
+    assert len(theSocket.mReplies) == 0 and len(theSocket.mHeldReplies) == 0
+    assert theSocket.mMaxUnreadReplies == 2
+
+def test_write_image_plane_buf():
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    thePlane = MakeStack(1)[0]
+    theSocket.AddReply(Reply(1))
+
+    theAccess.WriteImagePlaneBuf(1, 0, 2, 0, thePlane)
+
+    assert bytes(theSocket.mSent) == WriteImagePlaneCommand(1, 0, 2, 0, thePlane)
+
+@pytest.mark.parametrize("inAck", [Reply(0), Reply([1, 1]), Reply(-1)])
+def test_write_stack_failed_ack_raises(inAck):
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    theStack = MakeStack(2)
+    for theIndex in range(theStack.shape[0]):
+        theSocket.AddReply(inAck)
+    with pytest.raises(Exception, match="WriteImageStack: error"):
+        theAccess.WriteImageStack(0, 0, 0, theStack, inMaxPending=1)
+
+@pytest.mark.parametrize("inMask", [False, True])
+def test_write_stack_failed_ack_reads_the_outstanding_acks(inMask):
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    theStack = MakeStack(6)
+    if inMask:
+        theCommands = [WriteMaskPlaneCommand(0, "Mask 1", 1, z, theStack[z]) for z in range(theStack.shape[0])]
+    else:
+        theCommands = [WriteImagePlaneCommand(0, 1, z, 2, theStack[z]) for z in range(theStack.shape[0])]
+    # the second plane fails while the third and fourth are in flight, the others are not sent
+    theEnd = 0
+    for theCommand, theAck in zip(theCommands[:4], [1, 0, 1, 1]):
+        theEnd += len(theCommand)
+        theSocket.AddReply(Reply(theAck), theEnd)
+    theSocket.AddReply(Reply(7), theEnd + len(ct.GetCommand('GetNumCaptures').Encode(())[0]))
+
+    with pytest.raises(Exception, match="Write%sStack: error" % ("Mask" if inMask else "Image")):
+        if inMask:
+            theAccess.WriteMaskStack(0, "Mask 1", 1, theStack, inMaxPending=3)
+        else:
+            theAccess.WriteImageStack(0, 1, 2, theStack, inMaxPending=3)
+
+    assert bytes(theSocket.mSent) == b''.join(theCommands[:4])
+    assert len(theSocket.mReplies) == 0
+    # the next command reads its own reply
+    assert theAccess.GetNumCaptures() == 7
+    assert len(theSocket.mReplies) == 0 and len(theSocket.mHeldReplies) == 0
+
+@pytest.mark.parametrize("inDtype", [np.int32, np.float32, np.uint8, np.int16])
+def test_write_stack_rejects_other_types(inDtype):
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    theStack = MakeStack(2).astype(inDtype)
+    with pytest.raises(Exception, match="must be of type uint16"):
+        theAccess.WriteImageStack(0, 0, 0, theStack)
+    with pytest.raises(Exception, match="must be of type uint16"):
+        theAccess.WriteMaskStack(0, "Mask", 0, theStack)
+    assert len(theSocket.mSent) == 0
+
+def test_write_stack_non_contiguous():
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    theStack = MakeStack(3, 4, 12)[:, :, ::2]
+    theCommands = [WriteImagePlaneCommand(0, 0, z, 0, np.ascontiguousarray(theStack[z])) for z in range(theStack.shape[0])]
+    ScriptAcks(theSocket, theCommands)
+
+    theAccess.WriteImageStack(0, 0, 0, theStack)
+
+    assert bytes(theSocket.mSent) == b''.join(theCommands)
+
+def BytesReply(inBytes):
+    return ('&(%d:b)' % len(inBytes)).encode() + bytes(inBytes)
+
+def ScriptCommandsSupported(inSocket, inSupported=(1, 1, 1)):
+    for theSupported in inSupported:
+        inSocket.AddReply(Reply(theSupported))
+
+def CommandSupportedCommand(inCommand):
+    return LegacyCommand('$GetIsCommandSupported(Command=%d:s)' % len(inCommand), (inCommand, 's'))
+
+def test_enable_compressed_transfer():
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    ScriptCommandsSupported(theSocket)
+
+    assert theAccess.EnableCompressedTransfer()
+
+    assert bytes(theSocket.mSent) == b''.join(CommandSupportedCommand(theCommand) for theCommand in ('ReadImagePlaneBufZstd', 'ReadMaskPlaneBufZstd', 'WriteImagePlaneBufZstd'))
+
+def test_enable_compressed_transfer_not_supported():
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    ScriptCommandsSupported(theSocket, (1, 0))
+
+    assert not theAccess.EnableCompressedTransfer()
+
+    # the uncompressed command is used
+    thePlane = MakeStack(1)[0]
+    theSocket.mSent.clear()
+    theSocket.AddReply(Reply(thePlane.reshape(-1), 'u2'))
+    theValues = theAccess.ReadImagePlaneBuf(0, 0, 1, 2, 3)
+    assert bytes(theSocket.mSent) == LegacyCommand('$ReadImagePlaneBuf(CaptureIndex=i4,PositionIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4)',
+                                                   (0, 'i4'), (0, 'i4'), (1, 'i4'), (2, 'i4'), (3, 'i4'))
+    np.testing.assert_array_equal(theValues, thePlane.reshape(-1))
+
+@pytest.mark.parametrize("inUseZstandard", [True, False])
+def test_compressed_read_image_and_mask_plane(inUseZstandard):
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    ScriptCommandsSupported(theSocket)
+    assert theAccess.EnableCompressedTransfer()
+    if not inUseZstandard:
+        theAccess.mZstdDecompressor = pyzstd.EndlessZstdDecompressor()
+    theSocket.mSent.clear()
+    thePlane = MakeStack(1, 16, 16)[0]
+    theMask = (thePlane % 3).astype(np.uint16)
+    theSocket.AddReply(BytesReply(pyzstd.compress(thePlane.tobytes())))
+    theSocket.AddReply(BytesReply(pyzstd.compress(theMask.tobytes())))
+
+    theValues = theAccess.ReadImagePlaneBuf(1, 0, 2, 3, 0)
+    theMaskValues = theAccess.ReadMaskPlaneBuf(1, 2, 0, 3)
+
+    assert bytes(theSocket.mSent) == (
+        LegacyCommand('$ReadImagePlaneBufZstd(CaptureIndex=i4,PositionIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4)',
+                      (1, 'i4'), (0, 'i4'), (2, 'i4'), (3, 'i4'), (0, 'i4')) +
+        LegacyCommand('$ReadMaskPlaneBufZstd(CaptureIndex=i4,MaskIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4)',
+                      (1, 'i4'), (2, 'i4'), (0, 'i4'), (3, 'i4')))
+    np.testing.assert_array_equal(theValues, thePlane.reshape(-1))
+    np.testing.assert_array_equal(theMaskValues, theMask.reshape(-1))
+
+def test_compressed_write_image_stack():
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    ScriptCommandsSupported(theSocket)
+    assert theAccess.EnableCompressedTransfer()
+    theSocket.mSent.clear()
+    theStack = MakeStack(3, 16, 16)
+    for theIndex in range(theStack.shape[0]):
+        theSocket.AddReply(Reply(1))
+
+    theAccess.WriteImageStack(0, 1, 2, theStack, inMaxPending=2)
+
+    # each plane is sent as a zstd frame in a WriteImagePlaneBufZstd command
+    theSent = bytes(theSocket.mSent)
+    thePrefix = b'$WriteImagePlaneBufZstd(CaptureIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4,ByteArray='
+    for theZPlane in range(theStack.shape[0]):
+        assert theSent.startswith(thePrefix)
+        theEnd = theSent.index(b':b)')
+        theLength = int(theSent[len(thePrefix):theEnd])
+        theArgs = np.frombuffer(theSent[theEnd + 3:theEnd + 19], dtype=np.int32)
+        np.testing.assert_array_equal(theArgs, [0, 1, theZPlane, 2])
+        theFrame = theSent[theEnd + 19:theEnd + 19 + theLength]
+        assert pyzstd.decompress(theFrame) == theStack[theZPlane].tobytes()
+        theSent = theSent[theEnd + 19 + theLength:]
+    assert len(theSent) == 0
+
+@pytest.mark.parametrize("inUseZstandard", [True, False])
+def test_decompress_transfer_reads_the_received_buffer(inUseZstandard):
+    theAccess = SBAccess(CFakeSocket())
+    if inUseZstandard:
+        zstandard = pytest.importorskip("zstandard")
+        theAccess.mZstdDecompressor = zstandard.ZstdDecompressor()
+    else:
+        theAccess.mZstdDecompressor = pyzstd.EndlessZstdDecompressor()
+    theDecompressor = theAccess.mZstdDecompressor
+    theStack = MakeStack(3, 8, 8)
+    # the buffer of Recv is a bytearray, a memoryview must work as well; the context is reused for every plane
+    for thePlane in theStack:
+        theFrame = pyzstd.compress(thePlane.tobytes())
+        for theBuffer in (theFrame, bytearray(theFrame), memoryview(bytearray(theFrame))):
+            np.testing.assert_array_equal(theAccess.DecompressTransfer(theBuffer), thePlane.reshape(-1))
+    assert theAccess.mZstdDecompressor is theDecompressor
+
+def test_decompress_transfer_after_a_corrupt_frame():
+    theAccess = SBAccess(CFakeSocket())
+    theAccess.mZstdDecompressor = pyzstd.EndlessZstdDecompressor()
+    thePlane = MakeStack(1, 8, 8)[0]
+    theFrame = pyzstd.compress(thePlane.tobytes())
+    with pytest.raises(pyzstd.ZstdError):
+        theAccess.DecompressTransfer(bytearray(theFrame[:8] + b'\xff' * (len(theFrame) - 8)))
+    np.testing.assert_array_equal(theAccess.DecompressTransfer(bytearray(theFrame)), thePlane.reshape(-1))
+
+class CFakeClock(object):
+    """ perf_counter returning the time set by the test """
+    def __init__(self):
+        self.mTime = 0.0
+
+    def perf_counter(self):
+        return self.mTime
+
+def test_stats_per_command():
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    theStats = theAccess.EnableStats()
+    theStack = MakeStack(3)
+    theCommands = [WriteImagePlaneCommand(0, 0, z, 0, theStack[z]) for z in range(theStack.shape[0])]
+    theSocket.AddReply(Reply(7))
+    ScriptAcks(theSocket, [LegacyCommand('$GetNumTimepoints(CaptureIndex=i4)', (0, 'i4'))] + theCommands)
+
+    assert theAccess.GetNumTimepoints(0) == 7
+    theAccess.WriteImageStack(0, 0, 0, theStack, inMaxPending=2)
+    theSnapshot = theAccess.GetStats()
+
+    assert sorted(theSnapshot) == ['GetNumTimepoints', 'WriteImagePlaneBuf']
+    assert theSnapshot['GetNumTimepoints']['count'] == 1
+    assert theSnapshot['GetNumTimepoints']['bytes_sent'] == len(LegacyCommand('$GetNumTimepoints(CaptureIndex=i4)', (0, 'i4')))
+    assert theSnapshot['GetNumTimepoints']['bytes_received'] == len(Reply(7))
+    # the acknowledgements of pipelined planes are received while later planes are sent, all count for the command
+    assert theSnapshot['WriteImagePlaneBuf']['count'] == 3
+    assert theSnapshot['WriteImagePlaneBuf']['bytes_sent'] == sum(len(theCommand) for theCommand in theCommands)
+    assert theSnapshot['WriteImagePlaneBuf']['bytes_received'] == 3 * len(Reply(1))
+    assert sum(theSnapshot['WriteImagePlaneBuf']['latency_histogram']) == 3
+    assert 'sbaccess_command_calls_total{command="WriteImagePlaneBuf"} 3' in theStats.ExportPrometheus()
+
+    # disabling restores the socket
+    assert theAccess.EnableStats(False) is None
+    assert theAccess.mSocket is theSocket
+    assert theAccess.GetStats() == dict()
+
+def test_stats_snapshot_keeps_the_command_in_progress(monkeypatch):
+    import SBAccessStats
+    theClock = CFakeClock()
+    monkeypatch.setattr(SBAccessStats, "time", theClock)
+    theStats = SBAccessStats.SBAccessStats()
+
+    theStats.BeginCommand('ReadImagePlaneBuf')
+    theClock.mTime = 0.002
+    theStats.AddBytesSent(40)
+    theSnapshot = theStats.GetStats()['ReadImagePlaneBuf']
+    # the latency so far is in the snapshot
+    assert theSnapshot['latency_sum_s'] == pytest.approx(0.002)
+    assert sum(theSnapshot['latency_histogram']) == 1
+
+    # the reply arrives after the snapshot: its bytes and its latency are both recorded
+    theClock.mTime = 0.03
+    theStats.AddBytesReceived(1000)
+    theStats.EndCommand()
+    theSnapshot = theStats.GetStats()['ReadImagePlaneBuf']
+    assert theSnapshot['bytes_received'] == 1000
+    assert theSnapshot['latency_sum_s'] == pytest.approx(0.03)
+    assert theSnapshot['latency_max_s'] == pytest.approx(0.03)
+    assert sum(theSnapshot['latency_histogram']) == 1
+    assert theSnapshot['latency_histogram'][np.searchsorted(theStats.kLatencyBucketsS, 0.03)] == 1
+    assert theSnapshot['count'] == 1
+
+# The headers SBAccess built by hand before the command table, %d is the length of an s or b argument
+kLegacyHeaders = {
+    'Open' : '$Open(FileName=%d:s)',
+    'GetCurrentSlideId' : '$GetCurrentSlideId()',
+    'GetOpenSlides' : '$GetOpenSlides()',
+    'SetTargetSlide' : '$SetTargetSlide(SlideId=i4)',
+    'CreateNewSlide' : '$CreateNewSlide()',
+    'CloseSlide' : '$CloseSlide(SlideId=i4,SaveChanges=i4)',
+    'GetIsSlideModified' : '$GetIsSlideModified(SlideId=i4)',
+    'SaveSlide' : '$SaveSlide(SlideId=i4)',
+    'SaveAsSlide' : '$SaveAsSlide(SlideId=i4,Pathname=%d:s)',
+    'GetNumCaptures' : '$GetNumCaptures()',
+    'GetNumLiveCaptures' : '$GetNumLiveCaptures()',
+    'GetNumMasks' : '$GetNumMasks(CaptureIndex=i4)',
+    'GetNumPositions' : '$GetNumPositions(CaptureIndex=i4)',
+    'GetNumXColumns' : '$GetNumXColumns(CaptureIndex=i4)',
+    'GetNumYRows' : '$GetNumYRows(CaptureIndex=i4)',
+    'GetNumZPlanes' : '$GetNumZPlanes(CaptureIndex=i4)',
+    'GetNumImages' : '$GetNumImages(CaptureIndex=i4)',
+    'GetNumTimepoints' : '$GetNumTimepoints(CaptureIndex=i4)',
+    'GetNumChannels' : '$GetNumChannels(CaptureIndex=i4)',
+    'GetExposureTime' : '$GetExposureTime(CaptureIndex=i4,ChannelIndex=i4)',
+    'GetVoxelSize' : '$GetVoxelSize(CaptureIndex=i4)',
+    'GetXPosition' : '$GetXPosition(CaptureIndex=i4,PositionIndex=i4)',
+    'GetYPosition' : '$GetYPosition(CaptureIndex=i4,PositionIndex=i4)',
+    'GetZPosition' : '$GetZPosition(CaptureIndex=i4,PositionIndex=i4,ZPlaneIndex=i4)',
+    'GetMontageRow' : '$GetMontageRow(CaptureIndex=i4,PositionIndex=i4)',
+    'GetMontageColumn' : '$GetMontageColumn(CaptureIndex=i4,PositionIndex=i4)',
+    'GetElapsedTime' : '$GetElapsedTime(CaptureIndex=i4,TimepointIndex=i4)',
+    'GetChannelName' : '$GetChannelName(CaptureIndex=i4,ChannelIndex=i4)',
+    'GetLensName' : '$GetLensName(CaptureIndex=i4)',
+    'GetMagnification' : '$GetMagnification(CaptureIndex=i4)',
+    'GetImageName' : '$GetImageName(CaptureIndex=i4)',
+    'GetImageLowRenormalization' : '$GetImageLowRenormalization(CaptureIndex=i4,ChannelIndex=i4)',
+    'GetImageHighRenormalization' : '$GetImageHighRenormalization(CaptureIndex=i4,ChannelIndex=i4)',
+    'GetMaskName' : '$GetMaskName(CaptureIndex=i4,MaskIndex=i4)',
+    'GetImageComment' : '$GetImageComment(CaptureIndex=i4)',
+    'GetCaptureDate' : '$GetCaptureDate(CaptureIndex=i4)',
+    'GetObjectives' : '$GetObjectives()',
+    'GetAOOptimizerStatus' : '$GetAOOptimizerStatus',
+    'SetAOOptimizerExposureTime' : '$SetAOOptimizerExposureTime(ExposureTimeMS=i4)',
+    'GetFilters' : '$GetFilters()',
+    'GetFilterSetNames' : '$GetFilterSetNames()',
+    'GetExperimentScriptNames' : '$GetExperimentScriptNames()',
+    'GetExperimentScriptData' : '$GetExperimentScriptData(ExperimentName=%d:s)',
+    'GetMagnificationChangers' : '$GetMagnificationChangers()',
+    'GetLensInfo' : '$GetLensInfo()',
+    'CaptureImage' : '$CaptureImage(CameraIndex=i4,ExposureTime=i4)',
+    'ReadImagePlaneBufIx' : '$ReadImagePlaneBuf(CaptureIndex=i4,ImageIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4)',
+    'GetAuxDataNumElements' : '$GetAuxDataNumElements(CaptureIndex=i4,DataType=i4)',
+    'GetAuxDataName' : '$GetAuxDataName(CaptureIndex=i4,DataType=i4,ElementIndex=i4)',
+    'GetAuxDataValues' : '$GetAuxDataValues(CaptureIndex=i4,DataType=i4,ElementIndex=i4)',
+    'CreateImageGroup' : '$CreateImageGroup(ImageName=%d:s,NumChannels=i4,NumPlanes=i4,NumRows=i4,NumColumns=i4,NumTimepoints=i4)',
+    'CopyImageGroup' : '$CopyImageGroup(CopyCaptureIndex=i4)',
+    'SetImageComment' : '$SetImageComment(CaptureIndex=i4,Comment=%d:s)',
+    'SetChannelName' : '$SetChannelName(CaptureIndex=i4,ChannelIndex=i4,ChannelName=%d:s)',
+    'SetMagnification' : '$SetMagnification(CaptureIndex=i4,LensMagnification=f4,OptovarMagnification=f4)',
+    'SerVoxelSize' : '$SerVoxelSize(CaptureIndex=i4,SizeX=f4,SizeY=f4,SizeZ=f4)',
+    'SetCaptureDate' : '$SetCaptureDate(CaptureIndex=i4,Year=i4,Month=i4,Day=i4,Hour=i4,Minute=i4,Second=i4)',
+    'SetXYZPosition' : '$SetXYZPosition(CaptureIndex=i4,PositionX=f4,PositionY=f4,PositionZ=f4)',
+    'WriteMaskPlaneBuf' : '$WriteMaskPlaneBuf(CaptureIndex=i4,MaskName=%d:s,TimepointIndex=i4,ZPlaneIndex=i4,ByteArray=%d:b)',
+    'Start6DCaptureSequential' : '$Start6DCaptureSequential(CaptureMode=i4,Repetitions=i4)',
+    'StartCapture' : '$StartCapture(ScriptName=%d:s)',
+    'StopCapture' : '$StopCapture()',
+    'StartStreaming' : '$StartStreaming()',
+    'StopStreaming' : '$StopStreaming()',
+    'GetCurrentCaptureId' : '$GetCurrentCaptureId(PositionIndex=i4)',
+    'GetCurrentTimepointCaptured' : '$GetCurrentTimepointCaptured()',
+    'GetLastImageCaptured' : '$GetLastImageCaptured(CaptureIndex=i4)',
+    'GetLastImageStreamed' : '$GetLastImageStreamed(CaptureIndex=i4)',
+    'GetCurrentPlaneCaptured' : '$GetCurrentPlaneCaptured()',
+    'GetLastPlaneCaptured' : '$GetLastPlaneCaptured(CaptureIndex=i4)',
+    'GetCurrentChannelCaptured' : '$GetCurrentChannelCaptured()',
+    'GetLastChannelCaptured' : '$GetLastChannelCaptured(CaptureIndex=i4)',
+    'GetCurrentPositionIndexCaptured' : '$GetCurrentPositionIndexCaptured()',
+    'GetCurrentNumPositionsCaptured' : '$GetCurrentNumPositionsCaptured()',
+    'GetCurrentExperimentCaptured' : '$GetCurrentExperimentCaptured()',
+    'IsCapturing' : '$IsCapturing()',
+    'IsStreaming' : '$IsStreaming()',
+    'GetIsHardwareComponentEnabled' : '$GetIsHardwareComponentEnabled(ComponentIndex=i4)',
+    'GetHardwareComponentName' : '$GetHardwareComponentName(ComponentIndex=i4)',
+    'GetHardwareComponentMinMax' : '$GetHardwareComponentMinMax(ComponentIndex=i4)',
+    'SetHardwareComponentOpen' : '$SetHardwareComponentOpen(ComponentIndex=i4,Open=i4)',
+    'GetHardwareComponentOpen' : '$GetHardwareComponentOpen(ComponentIndex=i4)',
+    'SetHardwareComponentPosition' : '$SetHardwareComponentPosition(ComponentIndex=i4,Position=i4)',
+    'GetHardwareComponentPosition' : '$GetHardwareComponentPosition(ComponentIndex=i4)',
+    'SetHardwareComponentLocationMicrons' : '$SetHardwareComponentLocationMicrons(ComponentIndex=i4,x=f4,y=f4,z=f4)',
+    'IncrementHardwareComponentLocationMicrons' : '$IncrementHardwareComponentLocationMicrons(ComponentIndex=i4,x=f4,y=f4,z=f4)',
+    'GetHardwareComponentLocationMicrons' : '$GetHardwareComponentLocationMicrons(ComponentIndex=i4)',
+    'SetVector3ScannerPosition' : '$SetVector3ScannerPosition(X_mV=i4,Y_mV=i4,DisableSpin=i4)',
+    'GetVector3ScannerPosition' : '$GetVector3ScannerPosition()',
+    'SetVector3StepperPosition' : '$SetVector3StepperPosition(Position=i4)',
+    'GetVector3StepperPosition' : '$GetVector3StepperPosition()',
+    'ConfirmFocusWindow' : '$ConfirmFocusWindow()',
+    'ClearXYZPoints' : '$ClearXYZPoints()',
+    'GetXYZMontagePointList' : '$GetXYZMontagePointList(PointIndex=i4)',
+    'GetXYZPoint' : '$GetXYZPoint(PointIndex=i4)',
+    'GetXYZPointCount' : '$GetXYZPointCount()',
+    'GetIsCommandSupported' : '$GetIsCommandSupported(Command=%d:s)',
+    'GetSlideBookVersion' : '$GetSlideBookVersion()',
+    'AddXYZPoint' : '$AddXYZPoint(Xum=f4,Yum=f4,Zum=f4,AuxZum=f4,IsAuxZ=i4)',
+    'GetXYZPointList' : '$GetXYZPointList()',
+    'GetMicroscopeState' : '$GetMicroscopeState(state=i4)',
+    'FocusWindowSupportsARCSliceTIRF' : '$FocusWindowSupportsARCSliceTIRF()',
+    'FocusWindowSetARCSliceTIRFParameters' : '$FocusWindowSetARCSliceTIRFParameters(Position=i4,ArcInfo=%d:s,SliceInfo=%d:s,Save=i4)',
+    'FocusWindowGetARCSliceTIRFParameters' : '$FocusWindowGetARCSliceTIRFParameters(Position=i4)',
+    'FocusWindowSetTIRFParameters' : '$FocusWindowSetTIRFParameters(Position=i4,Radius_mV=i4,X_mV=i4,Y_mV=i4,Duration_ms=f4,MotorPos=i4,MotorEnable=i4,SpinEnable=i4,Save=i4)',
+    'FocusWindowGetTIRFParameters' : '$FocusWindowGetTIRFParameters(Position=i4)',
+    'LiveWindowAddRectangleRegion' : '$LiveWindowAddRectangleRegion(WindowIndex=i4,X=i4,Y=i4,Width=i4,Height=i4,IsStimulation=i4)',
+    'LiveWindowAddEllipseRegion' : '$LiveWindowAddEllipseRegion(WindowIndex=i4,X=i4,Y=i4,Width=i4,Height=i4,IsStimulation=i4)',
+    'LiveWindowAddLineRegion' : '$LiveWindowAddLineRegion(WindowIndex=i4,X=i4,Y=i4,Width=i4,Height=i4,IsStimulation=i4)',
+    'LiveWindowAddPolygonRegion' : '$LiveWindowAddPolygonRegion(WindowIndex=i4,NumPairs=i4,XYPointList=%d:b,IsStimulation=i4)',
+    'FocusSurface_AddCalibrationPoint' : '$FocusSurface_AddCalibrationPoint()',
+    'FocusSurface_ClearCalibrationPoints' : '$FocusSurface_ClearCalibrationPoints()',
+    'FocusSurface_FitSurface' : '$FocusSurface_FitSurface()',
+    'FocusSurface_IsSurfaceFit' : '$FocusSurface_IsSurfaceFit()',
+    'FocusSurface_FitPoint' : '$FocusSurface_FitPoint(XCoord=f4,YCoord=f4)',
+    'GetXYZSavedExperimentName' : '$GetXYZSavedExperimentName(Index=i4)',
+    'SetXYZSavedExperimentName' : '$SetXYZSavedExperimentName(Index=i4,ExperimentName=%d:s)',
+    'ReadImagePlaneBuf' : '$ReadImagePlaneBuf(CaptureIndex=i4,PositionIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4)',
+    'ReadImagePlaneBufZstd' : '$ReadImagePlaneBufZstd(CaptureIndex=i4,PositionIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4)',
+    'ReadMaskPlaneBuf' : '$ReadMaskPlaneBuf(CaptureIndex=i4,MaskIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4)',
+    'ReadMaskPlaneBufZstd' : '$ReadMaskPlaneBufZstd(CaptureIndex=i4,MaskIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4)',
+    'WriteImagePlaneBuf' : '$WriteImagePlaneBuf(CaptureIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4,ByteArray=%d:b)',
+    'WriteImagePlaneBufZstd' : '$WriteImagePlaneBufZstd(CaptureIndex=i4,TimepointIndex=i4,ZPlaneIndex=i4,ChannelIndex=i4,ByteArray=%d:b)',
+}
+
+def GetLegacyArgs(inHeader):
+    # sample arguments for the types of a header, in order
+    theValues = []
+    for theIndex, theType in enumerate(re.findall(r'=(i4|f4|%d:s|%d:b)', inHeader)):
+        if theType == 'i4':
+            theValues.append((theIndex * 3 - 2, 'i4'))
+        elif theType == 'f4':
+            theValues.append((theIndex + 0.25, 'f4'))
+        elif theType == '%d:s':
+            theValues.append(('Arg %d' % theIndex, 's'))
+        else:
+            theValues.append((np.arange(theIndex + 5, dtype=np.uint16).tobytes(), 'b'))
+    return theValues
+
+def EncodeLegacy(inHeader, inValues):
+    # the bytes sent by the hand written commands: the header with the number of characters of the strings
+    theLengths = tuple(len(theValue) for theValue, theType in inValues if theType in ('s', 'b'))
+    return LegacyCommand(inHeader % theLengths, *inValues)
+
+def test_command_table_covers_the_legacy_commands():
+    assert sorted(kLegacyHeaders) == sorted(theKey for theKey in ct.kCommandTable if ':' not in theKey)
+
+def test_command_table_rejects_a_command_added_twice():
+    theSpec = ct.GetCommand('GetCurrentSlideId')
+    with pytest.raises(Exception, match="GetCurrentSlideId is added twice"):
+        ct.AddCommand('GetCurrentSlideId', [], ['v'])
+    assert ct.GetCommand('GetCurrentSlideId') is theSpec
+
+@pytest.mark.parametrize("inKey", sorted(kLegacyHeaders))
+def test_encode_matches_the_legacy_bytes(inKey):
+    theHeader = kLegacyHeaders[inKey]
+    theValues = GetLegacyArgs(theHeader)
+    theSpec = ct.GetCommand(inKey)
+    theEncoded = b''.join(bytes(theBuffer) for theBuffer in theSpec.Encode([theValue for theValue, theType in theValues]))
+    if inKey == 'GetAOOptimizerStatus':
+        # the hand written header had no parentheses
+        assert theHeader == '$GetAOOptimizerStatus'
+        assert theEncoded == b'$GetAOOptimizerStatus()'
+    else:
+        assert theEncoded == EncodeLegacy(theHeader, theValues)
+
+@pytest.mark.parametrize("inType, inValue, inLegacyHeader", [('i4', -3, '$FocusWindowMainSetExposure(IntParam=i4)'),
+                                                            ('f4', 2.5, '$FocusWindowMainMoveX(FloatParam=f4)'),
+                                                            ('s', '20x', '$FocusWindowMainMoveX(StringParam=%d:s)'),
+                                                            ('', None, '$FocusWindowMainMoveX()')])
+def test_encode_param_commands(inType, inValue, inLegacyHeader):
+    theName = re.match(r'\$(\w+)', inLegacyHeader).group(1)
+    theSpec = ct.GetParamCommand(theName, inType)
+    theArgs = [] if inValue is None else [inValue]
+    theValues = [] if inValue is None else [(inValue, inType)]
+    assert b''.join(theSpec.Encode(theArgs)) == EncodeLegacy(inLegacyHeader, theValues)
+
+def test_encode_non_ascii_string():
+    # the length of a string is its number of utf-8 bytes, the hand written headers used the number of characters
+    thePath = 'C:/Données/Été 2025.sldy'
+    theEncoded = b''.join(ct.GetCommand('SaveAsSlide').Encode([3, thePath]))
+    thePathBytes = thePath.encode('utf-8')
+    assert theEncoded == b'$SaveAsSlide(SlideId=i4,Pathname=27:s)' + np.int32(3).tobytes() + thePathBytes
+    assert len(thePathBytes) == 27 and len(thePath) == 24
+    assert EncodeLegacy(kLegacyHeaders['SaveAsSlide'], [(3, 'i4'), (thePath, 's')]) == theEncoded.replace(b'=27:s', b'=24:s')
+
+def test_methods_send_the_legacy_bytes():
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    thePoints = [1, 2, 30, 4, 5, 60]
+    theCalls = [(lambda: theAccess.SetCaptureDate(1, 2025, 7, 14, 9, 30, 5), 'SetCaptureDate', [1, 2025, 7, 14, 9, 30, 5], []),
+                (lambda: theAccess.SetMagnification(2, 63.0, 1.5), 'SetMagnification', [2, 63.0, 1.5], []),
+                (lambda: theAccess.CreateImageGroup('Group é', 2, 3, 4, 5, 6), 'CreateImageGroup', ['Group é', 2, 3, 4, 5, 6], [Reply(7)]),
+                (lambda: theAccess.FocusWindowSetTIRFParameters(1, 2, 3, 4, 5.5, 6, 1, 0, 1), 'FocusWindowSetTIRFParameters', [1, 2, 3, 4, 5.5, 6, 1, 0, 1], [Reply(1)]),
+                (lambda: theAccess.LiveWindowAddPolygonRegion(0, thePoints, True), 'LiveWindowAddPolygonRegion', [0, 3, np.uint32(thePoints).tobytes(), 1], [Reply(1)]),
+                (lambda: theAccess.SetXYZPosition(4, 1.0, 2.0, 3.0), 'SetXYZPosition', [4, 1.0, 2.0, 3.0], [])]
+    for theCall, theKey, theArgs, theReplies in theCalls:
+        theSocket.mSent.clear()
+        for theReply in theReplies:
+            theSocket.AddReply(theReply)
+        theCall()
+        theTypes = re.findall(r'=(i4|f4|%d:s|%d:b)', kLegacyHeaders[theKey])
+        theValues = [(theArg, 's' if theType == '%d:s' else ('b' if theType == '%d:b' else theType)) for theArg, theType in zip(theArgs, theTypes)]
+        theHeader = kLegacyHeaders[theKey]
+        # the table uses the byte length of the strings
+        theLengths = tuple(len(theValue.encode()) if theType == 's' else len(theValue) for theValue, theType in theValues if theType in ('s', 'b'))
+        assert bytes(theSocket.mSent) == LegacyCommand(theHeader % theLengths, *theValues), theKey
+        assert len(theSocket.mReplies) == 0
+
+def test_decode_reply():
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    for theSize in [0.5, 0.25, 2.0]:
+        theSocket.AddReply(Reply(theSize, 'f4'))
+    theSocket.AddReply(Reply(5))
+    theSocket.AddReply(StringReply('Canal é'))
+    theSocket.AddReply(Reply([3, 4], 'i4'))
+    theSocket.AddReply(Reply([1, 2, 3], 'u2'))
+
+    theSpec = ct.GetCommand('GetVoxelSize')
+    assert theSpec.DecodeReply(theAccess.Recv) == (0.5, 0.25, 2.0)
+    assert ct.GetCommand('GetNumChannels').DecodeReply(theAccess.Recv) == 5
+    assert ct.GetCommand('GetChannelName').DecodeReply(theAccess.Recv) == 'Canal é'
+    with pytest.raises(Exception, match="GetNumTimepoints: invalid value"):
+        ct.GetCommand('GetNumTimepoints').DecodeReply(theAccess.Recv)
+    theValues = ct.GetCommand('ReadImagePlaneBuf').DecodeReply(theAccess.Recv)
+    assert theValues.dtype == np.uint16
+    np.testing.assert_array_equal(theValues, [1, 2, 3])
+    with pytest.raises(Exception, match="decoded by SBAccess"):
+        ct.GetCommand('GetOpenSlides').DecodeReply(theAccess.Recv)
+
+def test_methods_decode_the_replies():
+    theSocket = CFakeSocket()
+    theAccess = SBAccess(theSocket)
+    theSocket.AddReply(StringReply('Canal é'))
+    for theSize in [0.5, 0.25, 2.0]:
+        theSocket.AddReply(Reply(theSize, 'f4'))
+    theSocket.AddReply(Reply(2))
+    theSocket.AddReply(Reply(1))
+    theSocket.AddReply(StringReply('C:/Données/a.sldy'))
+    theSocket.AddReply(Reply(4))
+    theSocket.AddReply(StringReply('D:/b.sldy'))
+
+    assert theAccess.GetChannelName(0, 1) == 'Canal é'
+    assert theAccess.GetVoxelSize(0) == (0.5, 0.25, 2.0)
+    assert theAccess.GetOpenSlides() == {1: 'C:/Données/a.sldy', 4: 'D:/b.sldy'}
+    assert bytes(theSocket.mSent) == (LegacyCommand('$GetChannelName(CaptureIndex=i4,ChannelIndex=i4)', (0, 'i4'), (1, 'i4')) +
+                                      LegacyCommand('$GetVoxelSize(CaptureIndex=i4)', (0, 'i4')) +
+                                      LegacyCommand('$GetOpenSlides()'))
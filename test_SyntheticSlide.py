@@ -0,0 +1,52 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the synthetic slides shared by the tests and the benchmarks: they are read back with SBReadFile
+
+usage:
+python -m pytest test_SyntheticSlide.py
+"""
+
+import pytest
+import numpy as np
+
+from conftest import kLayouts, OpenSlide
+from SBReadFile import SBReadFile
+from SyntheticSlide import CSyntheticSlide
+
+
+@pytest.mark.parametrize("layout", list(kLayouts))
+@pytest.mark.parametrize("all", [True, False])
+def test_read_slide(slides, layout, all):
+    thePath, theCapture = slides[layout]
+    theSBFileReader = SBReadFile()
+    assert theSBFileReader.Open(thePath, all)
+    assert theSBFileReader.GetNumCaptures() == 1
+    assert theSBFileReader.GetImageName(0) == theCapture.mTitle
+    assert theSBFileReader.GetNumTimepoints(0) == theCapture.GetNumImages()
+    assert theSBFileReader.GetNumChannels(0) == theCapture.mNumChannels
+    assert theSBFileReader.GetNumZPlanes(0) == theCapture.mNumPlanes
+    assert (theSBFileReader.GetNumYRows(0), theSBFileReader.GetNumXColumns(0)) == (theCapture.mNumRows, theCapture.mNumColumns)
+    for theTimepoint in range(theCapture.GetNumImages()):
+        for theChannel in range(theCapture.mNumChannels):
+            for theZPlane in range(theCapture.mNumPlanes):
+                thePlane = theSBFileReader.ReadImagePlaneBuf(0, 0, theTimepoint, theZPlane, theChannel, True)
+                assert np.array_equal(thePlane, theCapture.MakePlane(theTimepoint, theZPlane, theChannel))
+        for theMask in range(theCapture.mNumMasks):
+            assert np.array_equal(theSBFileReader.ReadMaskBuf(0, theMask, theTimepoint, True), theCapture.MakeMask(theMask, theTimepoint))
+
+@pytest.mark.parametrize("single", [False, True])
+def test_refresh(tmp_path, single):
+    # the capture grows: the slide is written again with more time points
+    thePath = str(tmp_path / "growing.sldy")
+    theSlide = CSyntheticSlide(thePath)
+    theSlide.AddCapture("Growing", 32, 24, 1 if single else 3, 2, 2, 1, 1, single, 1, 0)
+    theSlide.Write()
+    theSBFileReader = OpenSlide(thePath)
+    assert theSBFileReader.GetNumTimepoints(0) == 2
+    theSlide = CSyntheticSlide(thePath)
+    theCapture = theSlide.AddCapture("Growing", 32, 24, 1 if single else 3, 2, 5, 1, 1, single, 1, 0)
+    theSlide.Write()
+    theSBFileReader.Refresh(0)
+    assert theSBFileReader.GetNumTimepoints(0) == 5
+    assert np.array_equal(theSBFileReader.ReadImagePlaneBuf(0, 0, 4, 0, 1, True), theCapture.MakePlane(4, 0, 1))
@@ -0,0 +1,125 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the .sldy <-> .sldyz transcoder: the transcoded slides are read back and compared with the synthetic slides
+
+usage:
+python -m pytest test_TranscodeSlide.py
+"""
+
+import os
+import glob
+import pytest
+import numpy as np
+
+from conftest import CopySlide, OpenSlide
+from test_Exporters import GetCaptureData
+from CCompressionBase import CCompressionBase
+from CNpyHeader import CNpyHeader
+from TranscodeSlide import CSlideTranscoder
+
+
+def GetOtherSuffix(inPath):
+    return ".sldy" if inPath.endswith(".sldyz") else ".sldyz"
+
+def GetImageDataFiles(inPath, inSuffix):
+    return sorted(glob.glob(os.path.join(os.path.splitext(inPath)[0] + ".dir", "*", "ImageData*" + inSuffix)))
+
+def GetImageDirectoryTimes(inPath):
+    return dict((os.path.basename(thePath), os.stat(thePath).st_mtime_ns) for thePath in glob.glob(os.path.join(os.path.splitext(inPath)[0] + ".dir", "*.imgdir")))
+
+def CheckSlide(inPath, inCapture):
+    # every plane and mask of the slide is those of the synthetic capture
+    theSBFileReader = OpenSlide(inPath)
+    theData = np.array([[[theSBFileReader.ReadImagePlaneBuf(0, 0, theTimepoint, theZPlane, theChannel, True)
+                          for theZPlane in range(inCapture.mNumPlanes)] for theChannel in range(inCapture.mNumChannels)]
+                        for theTimepoint in range(inCapture.GetNumImages())])
+    assert np.array_equal(theData, GetCaptureData(inCapture))
+    for theMask in range(inCapture.mNumMasks):
+        for theTimepoint in range(inCapture.GetNumImages()):
+            assert np.array_equal(theSBFileReader.ReadMaskBuf(0, theMask, theTimepoint, True), inCapture.MakeMask(theMask, theTimepoint))
+    assert np.array_equal(theSBFileReader.GetElapsedTimes(0), [inCapture.GetElapsedTime(theImage) for theImage in range(inCapture.GetNumImages())])
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd", "npyz_rle", "sfmt_npy", "sfmt_npyz_zstd"])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_transcode(slides, layout, threads, tmp_path):
+    thePath, theCapture = slides[layout]
+    theSuffix = GetOtherSuffix(thePath)
+    theSourceFiles = GetImageDataFiles(thePath, ".npyz" if thePath.endswith(".sldyz") else ".npy")
+    theDestinationPath = str(tmp_path / ("transcoded" + theSuffix))
+    theNumFiles = CSlideTranscoder(thePath, theDestinationPath, threads).Transcode()
+    # a single timepoint file holds all the timepoints of a channel
+    assert theNumFiles == len(theSourceFiles) == (1 if theCapture.mSingleTimepointFile else theCapture.GetNumImages()) * theCapture.mNumChannels
+    assert len(GetImageDataFiles(theDestinationPath, ".npyz" if theSuffix == ".sldyz" else ".npy")) == theNumFiles
+    CheckSlide(theDestinationPath, theCapture)
+    # the order of the captures is kept
+    assert list(GetImageDirectoryTimes(theDestinationPath).values()) == list(GetImageDirectoryTimes(thePath).values())
+
+@pytest.mark.parametrize("algorithm", ["zstd", "zlib", "lz4", "rle"])
+def test_transcode_algorithms(slides, algorithm, tmp_path):
+    if algorithm == "lz4":
+        pytest.importorskip("lz4")
+    thePath, theCapture = slides["npy"]
+    theAlgorithm = getattr(CCompressionBase(), "eCompression" + {"zstd" : "Zstd", "zlib" : "Zlib", "lz4" : "Lz4", "rle" : "RLE"}[algorithm])
+    theDestinationPath = str(tmp_path / "transcoded.sldyz")
+    theTranscoder = CSlideTranscoder(thePath, theDestinationPath, 2)
+    theTranscoder.SetCompression(theAlgorithm, 3)
+    theTranscoder.Transcode()
+    for theFile in GetImageDataFiles(theDestinationPath, ".npyz"):
+        theHeader = CNpyHeader()
+        with open(theFile, "rb") as theStream:
+            assert theHeader.ParseNpyHeader(theStream)
+        assert theHeader.mCompressionFlag == theAlgorithm
+    CheckSlide(theDestinationPath, theCapture)
+
+def test_transcode_round_trip(slides, tmp_path):
+    # .sldy -> .sldyz -> .sldy gives back the same image data files
+    thePath, theCapture = slides["npy"]
+    CSlideTranscoder(thePath, str(tmp_path / "slide.sldyz"), 2).Transcode()
+    CSlideTranscoder(str(tmp_path / "slide.sldyz"), str(tmp_path / "back" / "slide.sldy"), 2).Transcode()
+    theSourceFiles = GetImageDataFiles(thePath, ".npy")
+    theFiles = GetImageDataFiles(str(tmp_path / "back" / "slide.sldy"), ".npy")
+    assert [os.path.relpath(theFile, str(tmp_path / "back" / "slide.dir")) for theFile in theFiles] == [os.path.relpath(theFile, os.path.splitext(thePath)[0] + ".dir") for theFile in theSourceFiles]
+    for theSourceFile, theFile in zip(theSourceFiles, theFiles):
+        with open(theSourceFile, "rb") as theSourceStream, open(theFile, "rb") as theStream:
+            assert theSourceStream.read() == theStream.read()
+
+def test_transcode_in_place(slides, tmp_path):
+    # Slide.sldyz next to Slide.sldy shares its directory, the source image data files are removed
+    thePath, theCapture = slides["npyz_zstd"]
+    theSourcePath = CopySlide(thePath, tmp_path)
+    theDestinationPath = os.path.splitext(theSourcePath)[0] + ".sldy"
+    theTimes = GetImageDirectoryTimes(theSourcePath)
+    theTranscoder = CSlideTranscoder(theSourcePath, theDestinationPath, 4)
+    assert theTranscoder.IsInPlace()
+    theNumFiles = theTranscoder.Transcode(True)
+    assert not os.path.exists(theSourcePath)
+    assert GetImageDataFiles(theDestinationPath, ".npyz") == []
+    assert len(GetImageDataFiles(theDestinationPath, ".npy")) == theNumFiles
+    assert GetImageDirectoryTimes(theDestinationPath) == theTimes
+    CheckSlide(theDestinationPath, theCapture)
+
+def test_transcode_verification_fails(slides, tmp_path, monkeypatch):
+    thePath, theCapture = slides["npy"]
+    theTranscodeBlock = CSlideTranscoder.TranscodeBlock
+
+    def TranscodeBlock(inTranscoder, inFile, inBuffer):
+        theBuffer, theChecksum = theTranscodeBlock(inTranscoder, inFile, inBuffer)
+        return theBuffer, theChecksum ^ 1
+
+    monkeypatch.setattr(CSlideTranscoder, "TranscodeBlock", TranscodeBlock)
+    with pytest.raises(Exception, match="CSlideTranscoder: verification failed"):
+        CSlideTranscoder(thePath, str(tmp_path / "transcoded.sldyz"), 2).Transcode()
+    theTranscoder = CSlideTranscoder(thePath, str(tmp_path / "unverified.sldyz"), 2)
+    theTranscoder.mVerify = False
+    theTranscoder.Transcode()
+    CheckSlide(str(tmp_path / "unverified.sldyz"), theCapture)
+
+def test_transcode_errors(slides, tmp_path):
+    thePath, theCapture = slides["npy"]
+    with pytest.raises(Exception, match="one .sldy and one .sldyz"):
+        CSlideTranscoder(thePath, str(tmp_path / "same.sldy"))
+    with pytest.raises(Exception, match="could not find"):
+        CSlideTranscoder(str(tmp_path / "missing.sldy"), str(tmp_path / "missing.sldyz"))
+    with pytest.raises(Exception, match="unsupported compression algorithm"):
+        CSlideTranscoder(thePath, str(tmp_path / "slide.sldyz")).SetCompression(CCompressionBase().eCompressionNone)
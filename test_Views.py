@@ -0,0 +1,120 @@
+__copyright__  = "Copyright (c) 2022-2025, Intelligent Imaging Innovations, Inc. All rights reserved.  All rights reserved."
+__license__  = "This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree."
+
+"""Tests of the views of the captures: the read-only zarr store and the lazy dask and xarray arrays
+
+usage:
+python -m pytest test_Views.py
+"""
+
+import pickle
+import pytest
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import OpenSlide
+from test_Exporters import GetCaptureData
+
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd", "npyz_rle", "sfmt_npy"])
+def test_zarr_store(slides, layout):
+    pytest.importorskip("zarr")
+    import CZarrStore
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    theStore = theSBFileReader.GetZarrStore(0)
+    theData = GetCaptureData(theCapture)
+    assert theStore.mShape == theData.shape
+    theArray = CZarrStore.OpenZarrGroup(theStore)["0"]
+    assert theArray.shape == theData.shape and theArray.dtype == np.uint16
+    assert np.array_equal(theArray[:], theData)
+    theZPlane = theCapture.mNumPlanes - 1
+    assert np.array_equal(theArray[1, 1, theZPlane], theCapture.MakePlane(1, theZPlane, 1))
+    # one key per chunk (plane), and the metadata
+    theKeys = list(theStore)
+    assert len(theKeys) == len(theStore) == 3 + theData.shape[0] * theData.shape[1] * theData.shape[2]
+    assert all(theKey in theStore for theKey in theKeys)
+    assert theStore[CZarrStore.GetChunkKey(0, 1, 1, theZPlane)] == theCapture.MakePlane(1, theZPlane, 1).tobytes()
+
+def test_zarr_store_keys_out_of_the_capture(slides):
+    import CZarrStore
+    thePath, theCapture = slides["npy"]
+    theStore = OpenSlide(thePath).GetZarrStore(0)
+    theNumTimepoints, theNumChannels, theNumZPlanes = theStore.mShape[:3]
+    for theKey in [CZarrStore.GetChunkKey(0, theNumTimepoints, 0, 0), CZarrStore.GetChunkKey(0, 0, theNumChannels, 0),
+                   CZarrStore.GetChunkKey(0, 0, 0, theNumZPlanes), CZarrStore.GetChunkKey(1, 0, 0, 0), "0/0/0/0/1/0", "0/a/0/0/0/0", "0/.zattrs"]:
+        assert theKey not in theStore
+        with pytest.raises(KeyError):
+            theStore[theKey]
+    with pytest.raises(Exception):
+        OpenSlide(thePath).GetZarrStore(1)
+
+def test_zarr_store_threads_and_pickle(slides):
+    import CZarrStore
+    thePath, theCapture = slides["npyz_zstd"]
+    theSBFileReader = OpenSlide(thePath)
+    theStore = theSBFileReader.GetZarrStore(0)
+    theKeys = [theKey for theKey in theStore if theKey not in theStore.mMetadata]
+
+    def ReadChunk(inKey):
+        return theStore[inKey], theStore.GetReader()
+
+    # the other threads open their own reader
+    with ThreadPoolExecutor(max_workers=4) as theExecutor:
+        theResults = list(theExecutor.map(ReadChunk, theKeys))
+    for theKey, (theChunk, theReader) in zip(theKeys, theResults):
+        theTimepoint, theChannel, theZPlane = theStore.ParseChunkKey(theKey)
+        assert theChunk == theCapture.MakePlane(theTimepoint, theZPlane, theChannel).tobytes()
+    assert all(theReader is not theSBFileReader for theChunk, theReader in theResults)
+    assert theStore.GetReader() is theSBFileReader
+    # the unpickled store opens the slide again
+    theCopy = pickle.loads(pickle.dumps(theStore))
+    assert theCopy.GetReader() is not theSBFileReader
+    assert theCopy[theKeys[-1]] == theStore[theKeys[-1]]
+    assert theCopy[".zattrs"] == theStore[".zattrs"]
+
+@pytest.mark.parametrize("layout", ["npy", "npyz_zstd", "npyz_rle", "sfmt_npyz_zstd"])
+def test_dask_array(slides, layout):
+    pytest.importorskip("dask")
+    thePath, theCapture = slides[layout]
+    theSBFileReader = OpenSlide(thePath)
+    theArray = theSBFileReader.AsDaskArray(0)
+    theData = GetCaptureData(theCapture)
+    assert theArray.shape == theData.shape and theArray.dtype == np.uint16
+    # one chunk per z stack
+    assert theArray.numblocks == theData.shape[:2] + (1, 1, 1)
+    assert np.array_equal(theArray.compute(scheduler="threads"), theData)
+    assert np.array_equal(theArray.max(axis=2).compute(scheduler="threads"), theData.max(axis=2))
+    assert np.array_equal(theArray[1, 0, :, 10:20].compute(scheduler="sync"), theData[1, 0, :, 10:20])
+
+def test_dask_array_pickled(slides):
+    pytest.importorskip("dask")
+    from CLazyCapture import CLazyCapture
+    thePath, theCapture = slides["npyz_zstd"]
+    theSBFileReader = OpenSlide(thePath)
+    # the chunks of a distributed scheduler are read by the unpickled capture, with its own reader
+    theLazyCapture = pickle.loads(pickle.dumps(CLazyCapture(theSBFileReader, 0)))
+    assert theLazyCapture.GetReader() is not theSBFileReader
+    theStack = theLazyCapture.ReadBlock((1, 1, 0, 0, 0))
+    assert theStack.shape == (1, 1, theCapture.mNumPlanes, theCapture.mNumRows, theCapture.mNumColumns)
+    assert np.array_equal(theStack[0, 0], GetCaptureData(theCapture)[1, 1])
+    # the arrays of two captures or two slides are not mixed up by dask
+    assert theSBFileReader.AsDaskArray(0).name != OpenSlide(slides["npy"][0]).AsDaskArray(0).name
+
+def test_xarray(slides):
+    pytest.importorskip("xarray")
+    thePath, theCapture = slides["npyz_zstd"]
+    theSBFileReader = OpenSlide(thePath)
+    theArray = theSBFileReader.AsXarray(0)
+    theData = GetCaptureData(theCapture)
+    assert theArray.dims == ("t", "c", "z", "y", "x")
+    assert theArray.name == theSBFileReader.GetImageName(0)
+    theXSize, theYSize, theZSize = theSBFileReader.GetVoxelSize(0)
+    assert np.array_equal(theArray["t"], [theCapture.GetElapsedTime(theImage) for theImage in range(theCapture.GetNumImages())])
+    assert list(theArray["c"].values) == [theSBFileReader.GetChannelName(0, theChannel) for theChannel in range(theCapture.mNumChannels)]
+    assert np.allclose(theArray["z"], np.arange(theCapture.mNumPlanes) * theZSize)
+    assert np.allclose(theArray["y"], np.arange(theCapture.mNumRows) * theYSize)
+    assert np.allclose(theArray["x"], np.arange(theCapture.mNumColumns) * theXSize)
+    assert np.array_equal(theArray.max("z").compute(scheduler="threads").values, theData.max(axis=2))
+    theChannel = theArray["c"].values[1]
+    assert np.array_equal(theArray.sel(c=theChannel).isel(t=-1).values, theData[-1, 1])